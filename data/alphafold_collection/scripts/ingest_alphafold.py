@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """
-Upload AlphaFold metadata TSVs to MinIO and run data_lakehouse_ingest.
+Upload AlphaFold metadata Parquet tables to MinIO and run data_lakehouse_ingest.
 
-Uploads prepared TSVs to MinIO bronze storage, then runs the BERDL ingest
-pipeline to create Delta Lake tables in the kescience_alphafold database.
+Uploads the Parquet part files prepared for each table to MinIO bronze
+storage, then runs the BERDL ingest pipeline to create Delta Lake tables in
+the kescience_alphafold database.
 
 Prerequisites:
-  - TSVs generated by prepare_alphafold_tables.py
+  - {alphafold_entries,alphafold_msa_depths}/part-NNNNN.parquet generated by
+    prepare_alphafold_tables.py
   - Active Spark session on JupyterHub
 
 Usage:
@@ -26,11 +28,8 @@ DATA_DIR = "/pscratch/sd/p/psdehal/alphafold_collection"
 BUCKET = "cdm-lake"
 BRONZE_PREFIX = "tenant-general-warehouse/kescience/datasets/alphafold"
 
-FILES_TO_UPLOAD = [
-    ("alphafold_entries.tsv", DATA_DIR),
-    ("alphafold_msa_depths.tsv", DATA_DIR),
-    ("alphafold_collection.json", SCRIPT_DIR),
-]
+TABLES = ["alphafold_entries", "alphafold_msa_depths"]
+CONFIG_FILE = "alphafold_collection.json"
 
 INGEST_CONFIG = {
     "tenant": "kescience",
@@ -39,12 +38,11 @@ INGEST_CONFIG = {
         "bronze_base": f"s3a://{BUCKET}/{BRONZE_PREFIX}/",
         "silver_base": "s3a://cdm-lake/tenant-sql-warehouse/kescience/kescience_alphafold.db",
     },
-    "defaults": {"tsv": {"header": True, "delimiter": "\t", "inferSchema": False}},
     "tables": [
         {
             "name": "alphafold_entries",
-            "format": "tsv",
-            "bronze_path": f"s3a://{BUCKET}/{BRONZE_PREFIX}/alphafold_entries.tsv",
+            "format": "parquet",
+            "bronze_path": f"s3a://{BUCKET}/{BRONZE_PREFIX}/alphafold_entries/",
             "schema_sql": (
                 "uniprot_accession STRING, first_residue INT, last_residue INT, "
                 "alphafold_id STRING, model_version INT"
@@ -52,8 +50,8 @@ INGEST_CONFIG = {
         },
         {
             "name": "alphafold_msa_depths",
-            "format": "tsv",
-            "bronze_path": f"s3a://{BUCKET}/{BRONZE_PREFIX}/alphafold_msa_depths.tsv",
+            "format": "parquet",
+            "bronze_path": f"s3a://{BUCKET}/{BRONZE_PREFIX}/alphafold_msa_depths/",
             "schema_sql": "uniprot_accession STRING, msa_depth INT",
         },
     ],
@@ -77,19 +75,58 @@ def get_minio_client():
     return client
 
 
+def local_parts(table_name):
+    """Sorted Parquet part files for a table, or [] if its directory is missing."""
+    table_dir = os.path.join(DATA_DIR, table_name)
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(f for f in os.listdir(table_dir) if f.endswith(".parquet"))
+
+
+def remove_stale_parts(minio_client, table_name, parts):
+    """Delete objects under a table's bronze prefix that are not among parts.
+
+    Parts left by an earlier run with a different chunking would otherwise
+    be read alongside this run's, duplicating rows.
+    """
+    prefix = f"{BRONZE_PREFIX}/{table_name}/"
+    stale = [
+        obj.object_name
+        for obj in minio_client.list_objects(BUCKET, prefix=prefix, recursive=True)
+        if obj.object_name[len(prefix):] not in parts
+    ]
+    for name in stale:
+        minio_client.remove_object(BUCKET, name)
+    if stale:
+        print(f"  Removed {len(stale):,} stale objects under {prefix}")
+
+
 def upload_files(minio_client):
-    """Upload TSVs and config JSON to MinIO bronze storage."""
+    """Upload each table's Parquet part files and the config JSON to MinIO bronze storage.
+
+    Objects under a table's prefix that are not part of this run are
+    deleted first.
+    """
     print(f"\nUploading to s3a://{BUCKET}/{BRONZE_PREFIX}/")
-    for fname, local_dir in FILES_TO_UPLOAD:
-        local_path = os.path.join(local_dir, fname)
-        if not os.path.exists(local_path):
-            print(f"  SKIP {fname} (not found at {local_path})")
+    for table_name in TABLES:
+        parts = local_parts(table_name)
+        if not parts:
+            print(f"  SKIP {table_name} (no Parquet files in {os.path.join(DATA_DIR, table_name)})")
             continue
-        remote_key = f"{BRONZE_PREFIX}/{fname}"
-        fsize = os.path.getsize(local_path)
-        print(f"  Uploading {fname} ({fsize:,} bytes)...", end="", flush=True)
-        minio_client.fput_object(BUCKET, remote_key, local_path)
+        remove_stale_parts(minio_client, table_name, set(parts))
+        table_dir = os.path.join(DATA_DIR, table_name)
+        size = sum(os.path.getsize(os.path.join(table_dir, f)) for f in parts)
+        print(f"  Uploading {table_name}: {len(parts):,} files ({size / 1e9:.1f} GB)...",
+              end="", flush=True)
+        for f in parts:
+            minio_client.fput_object(
+                BUCKET, f"{BRONZE_PREFIX}/{table_name}/{f}", os.path.join(table_dir, f),
+                content_type="application/vnd.apache.parquet",
+            )
         print(" done")
+    minio_client.fput_object(
+        BUCKET, f"{BRONZE_PREFIX}/{CONFIG_FILE}", os.path.join(SCRIPT_DIR, CONFIG_FILE))
+    print(f"  Uploaded {CONFIG_FILE}")
 
     # Verify uploads
     print(f"\nVerifying uploads:")
@@ -103,7 +140,6 @@ def upload_files(minio_client):
 def run_ingestion(minio_client):
     """Run data_lakehouse_ingest with inline config."""
     print(f"\nRunning data_lakehouse_ingest (inline config, 2 tables)...")
-    print("NOTE: alphafold_entries.tsv is ~8 GB — this may take a while.\n")
     report = ingest(INGEST_CONFIG, minio_client=minio_client)
 
     # Summary
@@ -1,23 +1,68 @@
 #!/usr/bin/env python3
 """
-Parse AlphaFold EBI metadata CSVs into headerized TSVs for Delta Lake ingestion.
+Parse AlphaFold EBI metadata CSVs into typed Parquet tables for Delta Lake ingestion.
 
 Input files (from EBI FTP, no headers):
   accession_ids.csv — 5 columns: uniprot_accession, first_residue, last_residue, alphafold_id, version
   msa_depths.csv    — 2 columns: alphafold_id, msa_depth (assumed format)
 
-Output files:
-  alphafold_entries.tsv    — with header row, tab-separated
-  alphafold_msa_depths.tsv — with header row, tab-separated
+Output (partitioned Parquet, one part file per input chunk):
+  alphafold_entries/part-NNNNN.parquet
+  alphafold_msa_depths/part-NNNNN.parquet
+  alphafold_reconciliation.json — input lines vs. rows written, per table
+
+Each CSV is split into byte ranges of --chunk-mb aligned to line ends, and
+the chunks are converted on a process pool (--workers). A worker reads its
+range in blocks and uses Arrow compute kernels to split fields, strip
+whitespace, extract the UniProt accession and cast INT columns (values
+that are not integers become null, as Spark does reading the TSVs), so no
+row goes through Python. Rows are kept or skipped exactly as the TSV
+parser below does. The reconciliation report checks that every input line
+was written or accounted for as blank or short, and that the part files
+hold the rows written; the script exits non-zero if not.
+
+--format tsv writes the original headerized TSVs single-threaded instead.
 
 Usage:
   python prepare_alphafold_tables.py [--input-dir DIR] [--output-dir DIR] [--sample N]
+  python prepare_alphafold_tables.py --workers 32 --chunk-mb 256
 """
 
 import argparse
 import csv
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Input bytes per work item (one Parquet part file each)
+CHUNK_SIZE = 256 << 20
+# Input bytes parsed by Arrow at a time within a chunk
+BLOCK_SIZE = 32 << 20
+PARQUET_COMPRESSION = "zstd"
+REPORT_FILE = "alphafold_reconciliation.json"
+
+# Types follow schema_sql in alphafold_collection.json
+ENTRIES_SCHEMA = pa.schema([
+    ("uniprot_accession", pa.string()),
+    ("first_residue", pa.int32()),
+    ("last_residue", pa.int32()),
+    ("alphafold_id", pa.string()),
+    ("model_version", pa.int32()),
+])
+
+MSA_DEPTHS_SCHEMA = pa.schema([
+    ("uniprot_accession", pa.string()),
+    ("msa_depth", pa.int32()),
+])
+
+INT32_MIN, INT32_MAX = -(2 ** 31), 2 ** 31 - 1
 
 
 def parse_accession_ids(input_path, output_path, sample_n=0):
@@ -123,6 +168,231 @@ def parse_msa_depths(input_path, output_path, sample_n=0):
     return count
 
 
+def byte_ranges(path, chunk_size):
+    """Split path into (start, end) byte ranges of ~chunk_size ending at line ends."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def iter_blocks(path, start, end, block_size=BLOCK_SIZE):
+    """Yield the bytes of [start, end) in blocks of whole lines."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        carry = b""
+        while remaining > 0:
+            data = f.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            data = carry + data
+            cut = data.rfind(b"\n") + 1 if remaining > 0 else len(data)
+            if cut:
+                yield data[:cut]
+            carry = data[cut:]
+        if carry:
+            yield carry
+
+
+def split_fields(block):
+    """Comma-split the lines of a block.
+
+    Returns (list<string> array with one entry per non-blank line, lines in
+    the block). EBI's files are unquoted; lines containing a quote are
+    re-parsed with csv.reader so quoted fields keep their csv semantics.
+    """
+    n_lines = block.count(b"\n") + (not block.endswith(b"\n"))
+    if not block.strip(b"\r\n"):
+        return pa.array([], pa.list_(pa.string())), n_lines
+    lines = pacsv.read_csv(
+        pa.py_buffer(block),
+        read_options=pacsv.ReadOptions(column_names=["line"], use_threads=False),
+        # \x1f never occurs in the CSVs, so each line is one field
+        parse_options=pacsv.ParseOptions(
+            delimiter="\x1f", quote_char=False, escape_char=False,
+            ignore_empty_lines=True),
+        convert_options=pacsv.ConvertOptions(column_types={"line": pa.string()}),
+    ).column(0).combine_chunks()
+    fields = pc.split_pattern(lines, ",")
+    if b'"' in block:
+        quoted = np.flatnonzero(pc.match_substring(lines, '"').to_numpy(zero_copy_only=False))
+        parsed = pa.array(list(csv.reader(lines.take(quoted).to_pylist())),
+                          pa.list_(pa.string()))
+        order = np.arange(len(fields))
+        order[quoted] = len(fields) + np.arange(len(quoted))
+        fields = pa.concat_arrays([fields, parsed]).take(pa.array(order))
+    return fields, n_lines
+
+
+def to_int32(values):
+    """Cast strings to int32; anything that is not an int32 integer becomes null."""
+    is_int = pc.match_substring_regex(values, r"^[+-]?[0-9]{1,18}$")
+    wide = pc.cast(pc.if_else(is_int, values, pa.scalar(None, pa.string())), pa.int64())
+    in_range = pc.and_(pc.greater_equal(wide, INT32_MIN), pc.less_equal(wide, INT32_MAX))
+    return pc.cast(pc.if_else(in_range, wide, pa.scalar(None, pa.int64())), pa.int32())
+
+
+def _field(fields, i):
+    return pc.utf8_trim_whitespace(pc.list_element(fields, i))
+
+
+def entries_table(fields, uses_af_id=False):
+    """alphafold_entries rows from split lines (lines with < 5 fields dropped)."""
+    fields = pc.filter(fields, pc.greater_equal(pc.list_value_length(fields), 5))
+    return pa.table([
+        _field(fields, 0),
+        to_int32(_field(fields, 1)),
+        to_int32(_field(fields, 2)),
+        _field(fields, 3),
+        to_int32(_field(fields, 4)),
+    ], schema=ENTRIES_SCHEMA)
+
+
+def msa_depths_table(fields, uses_af_id):
+    """alphafold_msa_depths rows from split lines (lines with < 2 fields dropped).
+
+    With uses_af_id, identifiers like AF-A8H2R3-F1 become A8H2R3.
+    """
+    fields = pc.filter(fields, pc.greater_equal(pc.list_value_length(fields), 2))
+    identifier = _field(fields, 0)
+    if uses_af_id:
+        # AF-A8H2R3-F1 -> A8H2R3-F1 -> A8H2R3
+        accession = pc.list_element(
+            pc.split_pattern(pc.utf8_slice_codeunits(identifier, 3), "-", max_splits=1), 0)
+        identifier = pc.if_else(pc.starts_with(identifier, "AF-"), accession, identifier)
+    return pa.table([identifier, to_int32(_field(fields, 1))], schema=MSA_DEPTHS_SCHEMA)
+
+
+TABLE_BUILDERS = {
+    "alphafold_entries": (entries_table, ENTRIES_SCHEMA),
+    "alphafold_msa_depths": (msa_depths_table, MSA_DEPTHS_SCHEMA),
+}
+
+
+def convert_chunk(args):
+    """Convert one byte range of a CSV into a Parquet part file; return its counts."""
+    table_name, input_path, start, end, part_path, uses_af_id, limit = args
+    build, schema = TABLE_BUILDERS[table_name]
+    counts = {"bytes": end - start, "lines": 0, "blank_lines": 0, "short_rows": 0, "rows": 0}
+    tmp_path = part_path + ".tmp"
+    with pq.ParquetWriter(tmp_path, schema, compression=PARQUET_COMPRESSION) as writer:
+        for block in iter_blocks(input_path, start, end):
+            fields, n_lines = split_fields(block)
+            table = build(fields, uses_af_id)
+            if limit and counts["rows"] + table.num_rows >= limit:
+                table = table.slice(0, limit - counts["rows"])
+                writer.write_table(table)
+                counts["rows"] += table.num_rows
+                break
+            writer.write_table(table)
+            counts["lines"] += n_lines
+            counts["blank_lines"] += n_lines - len(fields)
+            counts["short_rows"] += len(fields) - table.num_rows
+            counts["rows"] += table.num_rows
+    os.replace(tmp_path, part_path)
+    return table_name, counts
+
+
+def detect_af_ids(input_path):
+    """Whether msa_depths.csv is keyed by AlphaFold ID (AF-...) rather than accession."""
+    with open(input_path, "r") as f:
+        first_line = f.readline().strip()
+    parts = first_line.split(",")
+    print(f"  {os.path.basename(input_path)} first line: {first_line}")
+    print(f"  Detected {len(parts)} columns")
+    return parts[0].strip().startswith("AF-")
+
+
+def convert_to_parquet(inputs, output_dir, workers, chunk_size=CHUNK_SIZE, sample_n=0):
+    """Convert {table name: CSV path} to partitioned Parquet under output_dir.
+
+    Returns {table name: reconciliation counts}.
+    """
+    work = []
+    for table_name, input_path in inputs.items():
+        table_dir = os.path.join(output_dir, table_name)
+        os.makedirs(table_dir, exist_ok=True)
+        # Parts of an earlier run may not line up with this run's chunks
+        for f in os.listdir(table_dir):
+            if f.startswith("part-") and f.endswith(".parquet"):
+                os.remove(os.path.join(table_dir, f))
+        uses_af_id = table_name == "alphafold_msa_depths" and detect_af_ids(input_path)
+        if sample_n:
+            ranges = [(0, os.path.getsize(input_path))]
+        else:
+            ranges = byte_ranges(input_path, chunk_size)
+        print(f"  {table_name}: {os.path.getsize(input_path) / 1e9:.2f} GB in "
+              f"{len(ranges)} chunks")
+        for i, (start, end) in enumerate(ranges):
+            part_path = os.path.join(table_dir, f"part-{i:05d}.parquet")
+            work.append((table_name, input_path, start, end, part_path, uses_af_id, sample_n))
+
+    totals = {
+        name: {"input": path, "input_bytes": os.path.getsize(path), "parts": 0,
+               "bytes": 0, "lines": 0, "blank_lines": 0, "short_rows": 0, "rows": 0}
+        for name, path in inputs.items()
+    }
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for table_name, counts in pool.map(convert_chunk, work):
+            totals[table_name]["parts"] += 1
+            for key, value in counts.items():
+                totals[table_name][key] += value
+            done += 1
+            if done % 10 == 0 or done == len(work):
+                rows = sum(t["rows"] for t in totals.values())
+                print(f"  [{done:>5}/{len(work)}] chunks done, {rows:,} rows")
+    return totals
+
+
+def reconcile(totals, output_dir, sample=False):
+    """Check row counts end to end and write the reconciliation report.
+
+    Returns True if every table reconciles.
+    """
+    all_ok = True
+    for table_name, t in totals.items():
+        table_dir = os.path.join(output_dir, table_name)
+        t["parquet_rows"] = sum(
+            pq.ParquetFile(os.path.join(table_dir, f)).metadata.num_rows
+            for f in os.listdir(table_dir) if f.endswith(".parquet"))
+        checks = [t["parquet_rows"] == t["rows"]]
+        if not sample:
+            checks.append(t["bytes"] == t["input_bytes"])
+            checks.append(t["lines"] == t["rows"] + t["blank_lines"] + t["short_rows"])
+        t["ok"] = all(checks)
+        all_ok &= t["ok"]
+
+    report_path = os.path.join(output_dir, REPORT_FILE)
+    with open(report_path + ".tmp", "w") as f:
+        json.dump({"sample": sample, "tables": totals}, f, indent=2)
+    os.replace(report_path + ".tmp", report_path)
+
+    print(f"\n{'=' * 60}")
+    print("RECONCILIATION")
+    print(f"{'=' * 60}")
+    for table_name, t in totals.items():
+        print(f"  {table_name}:")
+        if not sample:
+            print(f"    input lines:      {t['lines']:>14,}")
+            print(f"    blank lines:      {t['blank_lines']:>14,}")
+            print(f"    short rows:       {t['short_rows']:>14,} (skipped)")
+        print(f"    rows written:     {t['rows']:>14,} in {t['parts']} parts")
+        print(f"    rows in Parquet:  {t['parquet_rows']:>14,}  "
+              f"[{'OK' if t['ok'] else 'MISMATCH'}]")
+    print(f"  Report: {report_path}")
+    return all_ok
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Prepare AlphaFold metadata for Delta Lake ingestion"
@@ -135,7 +405,7 @@ def main():
     parser.add_argument(
         "--output-dir",
         default="/pscratch/sd/p/psdehal/alphafold_collection",
-        help="Directory for output TSVs",
+        help="Directory for output tables",
     )
     parser.add_argument(
         "--sample",
@@ -143,23 +413,59 @@ def main():
         default=0,
         help="Only process first N rows (0 = all rows)",
     )
+    parser.add_argument(
+        "--format",
+        choices=["parquet", "tsv"],
+        default="parquet",
+        help="parquet: partitioned Parquet on a process pool (default); "
+        "tsv: headerized TSVs, single-threaded",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes converting chunks (default: all CPUs)",
+    )
+    parser.add_argument(
+        "--chunk-mb",
+        type=int,
+        default=CHUNK_SIZE >> 20,
+        help=f"Input MB per chunk / Parquet part (default: {CHUNK_SIZE >> 20})",
+    )
     args = parser.parse_args()
 
     os.makedirs(args.output_dir, exist_ok=True)
 
-    # Parse accession_ids.csv
     acc_in = os.path.join(args.input_dir, "accession_ids.csv")
-    acc_out = os.path.join(args.output_dir, "alphafold_entries.tsv")
+    msa_in = os.path.join(args.input_dir, "msa_depths.csv")
     if not os.path.exists(acc_in):
         print(f"ERROR: {acc_in} not found. Run download_alphafold_data.sh first.")
         sys.exit(1)
+    if not os.path.exists(msa_in):
+        print(f"WARNING: {msa_in} not found. Skipping MSA depths.")
+
+    if args.format == "parquet":
+        inputs = {"alphafold_entries": acc_in}
+        if os.path.exists(msa_in):
+            inputs["alphafold_msa_depths"] = msa_in
+        print(f"Converting to Parquet with {args.workers} workers, "
+              f"{args.chunk_mb} MB chunks")
+        totals = convert_to_parquet(inputs, args.output_dir, args.workers,
+                                    args.chunk_mb << 20, args.sample)
+        ok = reconcile(totals, args.output_dir, sample=bool(args.sample))
+        print(f"\nOutput directory: {args.output_dir}")
+        if not ok:
+            print("ERROR: row counts do not reconcile; see the report above.")
+            sys.exit(1)
+        return
+
+    # Parse accession_ids.csv
+    acc_out = os.path.join(args.output_dir, "alphafold_entries.tsv")
     n_entries = parse_accession_ids(acc_in, acc_out, sample_n=args.sample)
 
     # Parse msa_depths.csv
-    msa_in = os.path.join(args.input_dir, "msa_depths.csv")
     msa_out = os.path.join(args.output_dir, "alphafold_msa_depths.tsv")
     if not os.path.exists(msa_in):
-        print(f"WARNING: {msa_in} not found. Skipping MSA depths.")
         n_msa = 0
     else:
         n_msa = parse_msa_depths(msa_in, msa_out, sample_n=args.sample)
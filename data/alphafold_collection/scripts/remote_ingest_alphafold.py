@@ -2,14 +2,14 @@
 """
 Ingest AlphaFold metadata into Delta Lake via Spark Connect (remote).
 
-Reads TSVs from MinIO bronze storage and writes Delta Lake tables to
+Reads the Parquet tables from MinIO bronze storage and writes Delta Lake tables to
 kescience_alphafold, using Spark Connect through the SSH tunnel proxy.
 
 Prerequisites:
   - SSH SOCKS tunnels on ports 1337, 1338
   - pproxy on port 8123
   - Active JupyterHub Spark session
-  - TSVs already uploaded to MinIO
+  - Parquet part files already uploaded to MinIO (ingest_alphafold.py --upload-only)
 
 Usage:
   /tmp/berdl_py313/bin/python3 scripts/remote_ingest_alphafold.py
@@ -37,7 +37,7 @@ DATABASE = "kescience_alphafold"
 TABLES = [
     {
         "name": "alphafold_entries",
-        "file": f"{BRONZE_BASE}/alphafold_entries.tsv",
+        "file": f"{BRONZE_BASE}/alphafold_entries/",
         "schema": (
             "uniprot_accession STRING, first_residue INT, last_residue INT, "
             "alphafold_id STRING, model_version INT"
@@ -45,7 +45,7 @@ TABLES = [
     },
     {
         "name": "alphafold_msa_depths",
-        "file": f"{BRONZE_BASE}/alphafold_msa_depths.tsv",
+        "file": f"{BRONZE_BASE}/alphafold_msa_depths/",
         "schema": "uniprot_accession STRING, msa_depth INT",
     },
 ]
@@ -77,15 +77,9 @@ def main():
         print(f"Ingesting {full_name}")
         print(f"{'=' * 60}")
 
-        # Read TSV from MinIO
+        # Read Parquet parts from MinIO
         print(f"  Reading from {table_info['file']}...")
-        df = (
-            spark.read.option("header", "true")
-            .option("delimiter", "\t")
-            .option("inferSchema", "false")
-            .schema(table_info["schema"])
-            .csv(table_info["file"])
-        )
+        df = spark.read.schema(table_info["schema"]).parquet(table_info["file"])
 
         # Show sample
         print(f"  Schema:")
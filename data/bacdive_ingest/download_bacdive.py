@@ -2,34 +2,142 @@
 """
 Download the full BacDive database via the REST API.
 
-Iterates BacDive IDs in batches of 100, saves raw JSON per batch.
-No authentication needed (v2 API). Estimated: ~2,000 calls for ~100K strains.
+Fetches BacDive IDs in batches of 100 and saves raw JSON per batch
+(raw/batch_NNNNNN.json). No authentication needed (v2 API). Estimated:
+~2,000 calls for ~100K strains.
+
+Batches are fetched by --workers threads sharing a token-bucket rate limit
+(--rate requests/s). The rate halves when the API answers 429 and creeps
+back up on success. Each batch is retried with backoff; batches that still
+fail go to a persistent failed queue, retried before the run completes and
+first thing on the next run.
+
+download_state.json records every batch fetched and how many strains it
+held, so a rerun resumes where the last one stopped. The same map tells
+dense ID ranges from known-empty ones: --refresh refetches batches that had
+strains and skips known-empty ranges (unless --rescan-empty). Beyond the
+highest ID with strains, the run stops after --tail-empty consecutive
+empty batches.
 
 Usage:
     python download_bacdive.py [--start START_ID] [--end END_ID] [--batch-size 100]
+    python download_bacdive.py --workers 8 --rate 5
+    python download_bacdive.py --refresh
+    python download_bacdive.py --api-base http://localhost:8000/v2   # mock API
 """
 
 import argparse
+import glob
 import json
 import os
 import sys
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests
 
 API_BASE = "https://api.bacdive.dsmz.de/v2"
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
+STATE_FILE = os.path.join(os.path.dirname(__file__), "download_state.json")
+# Written by earlier versions: {"last_id", "total_strains"}
 PROGRESS_FILE = os.path.join(os.path.dirname(__file__), "download_progress.json")
 
+REQUEST_TIMEOUT = 60
+RETRY_MAX = 4
+RETRY_BACKOFF = 2
+# Rounds over the failed queue before giving up for this run
+FAILED_ROUNDS = 3
+# Save state every N completed batches
+SAVE_INTERVAL = 20
+# Print progress every N completed batches
+REPORT_INTERVAL = 50
+
+
+class TransientError(Exception):
+    """A batch request that may succeed if retried (429, 5xx, network, bad body).
+
+    status is the HTTP status code, or None if no usable response came back.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to 429 responses.
+
+    acquire() blocks until a token is available. throttle() halves the
+    rate (at most once per second, so a burst of 429s counts once);
+    success() adds back a small step, up to the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.2):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._last_throttle = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
 
-def fetch_batch(ids: list[int], session: requests.Session) -> dict:
-    """Fetch a batch of BacDive IDs. Returns {id: record} dict."""
+    def throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_throttle >= 1.0:
+                self._last_throttle = now
+                self.rate = max(self.min_rate, self.rate / 2)
+
+    def success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+
+def fetch_batch(ids: list[int], session: requests.Session, api_base: str = API_BASE) -> dict:
+    """Fetch a batch of BacDive IDs. Returns {id: record} dict.
+
+    Raises:
+        TransientError: on 429, 5xx, a network error or a malformed body
+        requests.HTTPError: on any other error status
+    """
     id_str = ";".join(str(i) for i in ids)
-    url = f"{API_BASE}/fetch/{id_str}"
-    resp = session.get(url, timeout=60)
+    url = f"{api_base}/fetch/{id_str}"
+    try:
+        resp = session.get(url, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        raise TransientError(str(e) or type(e).__name__) from e
     if resp.status_code == 404:
         return {}
+    if resp.status_code == 429 or resp.status_code >= 500:
+        retry_after = resp.headers.get("Retry-After", "")
+        raise TransientError(f"HTTP {resp.status_code}", resp.status_code,
+                             float(retry_after) if retry_after.isdigit() else None)
     resp.raise_for_status()
-    data = resp.json()
+    try:
+        return parse_results(resp.json())
+    except ValueError as e:  # requests.JSONDecodeError, or an ID that is not an int
+        raise TransientError(f"malformed response: {e}", resp.status_code) from e
+
+
+def parse_results(data) -> dict:
+    """{id: record} from a fetch response body; ValueError if it is malformed."""
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
     # API returns {"count": N, "results": {id_str: record, ...}} for batch queries
     results = {}
     if "results" in data and isinstance(data["results"], dict):
@@ -44,83 +152,243 @@ def fetch_batch(ids: list[int], session: requests.Session) -> dict:
     return results
 
 
-def save_progress(last_id: int, total_strains: int):
-    with open(PROGRESS_FILE, "w") as f:
-        json.dump({"last_id": last_id, "total_strains": total_strains,
-                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+def batch_path(raw_dir: str, batch_start: int) -> str:
+    return os.path.join(raw_dir, f"batch_{batch_start:06d}.json")
 
 
-def load_progress() -> tuple[int, int]:
+def load_state(batch_size: int) -> dict:
+    """Download state: strain count per fetched batch start, and the failed queue."""
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            state = json.load(f)
+        if state["batch_size"] != batch_size:
+            sys.exit(f"ERROR: {STATE_FILE} was written with batch size {state['batch_size']}; "
+                     f"rerun with --batch-size {state['batch_size']}")
+        return {
+            "batch_size": batch_size,
+            "batches": {int(k): v for k, v in state["batches"].items()},
+            "failed": {int(k): v for k, v in state["failed"].items()},
+        }
+
+    state = {"batch_size": batch_size, "batches": {}, "failed": {}}
     if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE) as f:
-            data = json.load(f)
-        return data["last_id"], data["total_strains"]
-    return 0, 0
+        # Earlier versions only kept the last ID reached and skipped failed
+        # batches silently: trust the batch files, refetch everything else.
+        for path in glob.glob(os.path.join(RAW_DIR, "batch_*.json")):
+            with open(path) as f:
+                state["batches"][int(os.path.basename(path)[6:12])] = len(json.load(f))
+        print(f"Migrated {len(state['batches'])} batch files from {PROGRESS_FILE}")
+    return state
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Download BacDive database")
-    parser.add_argument("--start", type=int, default=None, help="Start ID (default: resume from last)")
-    parser.add_argument("--end", type=int, default=210000, help="End ID (default: 210000)")
-    parser.add_argument("--batch-size", type=int, default=100, help="IDs per API call")
-    parser.add_argument("--sleep", type=float, default=0.3, help="Seconds between API calls")
-    args = parser.parse_args()
+def save_state(state: dict):
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "batch_size": state["batch_size"],
+            "total_strains": sum(state["batches"].values()),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "batches": {str(k): v for k, v in sorted(state["batches"].items())},
+            "failed": {str(k): v for k, v in sorted(state["failed"].items())},
+        }, f)
+    os.replace(tmp_path, STATE_FILE)
 
-    os.makedirs(RAW_DIR, exist_ok=True)
 
-    # Resume from last progress
-    last_id, total_strains = load_progress()
-    start_id = args.start if args.start is not None else last_id + 1
-    end_id = args.end
+def id_ranges(starts, batch_size) -> list[tuple[int, int]]:
+    """Merge batch starts into (first ID, last ID) ranges."""
+    ranges = []
+    for start in sorted(starts):
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1][1] = start + batch_size - 1
+        else:
+            ranges.append([start, start + batch_size - 1])
+    return [tuple(r) for r in ranges]
+
 
-    print(f"BacDive download: IDs {start_id} to {end_id}, batch size {args.batch_size}")
-    print(f"Resuming with {total_strains} strains already downloaded")
+class BacDiveDownloader:
+    """Fetch batches of BacDive IDs concurrently under a shared rate limit."""
 
-    session = requests.Session()
-    batch_num = 0
-    empty_streak = 0
+    def __init__(self, state: dict, api_base: str = API_BASE, raw_dir: str = RAW_DIR,
+                 workers: int = 4, rate: float = 3.0):
+        self.state = state
+        self.batch_size = state["batch_size"]
+        self.api_base = api_base
+        self.raw_dir = raw_dir
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(rate, burst=self.workers)
+        self._local = threading.local()
+        self.completed = 0
 
-    for batch_start in range(start_id, end_id + 1, args.batch_size):
-        batch_ids = list(range(batch_start, min(batch_start + args.batch_size, end_id + 1)))
-        batch_num += 1
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
 
-        try:
-            results = fetch_batch(batch_ids, session)
-        except requests.exceptions.RequestException as e:
-            print(f"  ERROR at batch {batch_start}: {e}. Retrying in 5s...")
-            time.sleep(5)
+    def fetch(self, batch_start: int, end_id: int) -> dict:
+        """Fetch one batch with retries; raises TransientError when they run out."""
+        ids = list(range(batch_start, min(batch_start + self.batch_size, end_id + 1)))
+        for attempt in range(RETRY_MAX):
+            self.bucket.acquire()
             try:
-                results = fetch_batch(batch_ids, session)
-            except requests.exceptions.RequestException as e2:
-                print(f"  RETRY FAILED: {e2}. Skipping batch.")
-                continue
+                results = fetch_batch(ids, self._session(), self.api_base)
+            except TransientError as e:
+                if e.status == 429:
+                    self.bucket.throttle()
+                if attempt == RETRY_MAX - 1:
+                    raise
+                time.sleep(e.retry_after or RETRY_BACKOFF * 2 ** attempt)
+            else:
+                self.bucket.success()
+                return results
 
+    def _record(self, batch_start: int, results: dict):
+        path = batch_path(self.raw_dir, batch_start)
         if results:
-            # Save batch
-            out_file = os.path.join(RAW_DIR, f"batch_{batch_start:06d}.json")
-            with open(out_file, "w") as f:
+            with open(path, "w") as f:
                 json.dump(results, f)
-            total_strains += len(results)
-            empty_streak = 0
-        else:
-            empty_streak += 1
+        elif os.path.exists(path):
+            # Refreshed batch whose strains were all removed upstream
+            os.remove(path)
+        self.state["batches"][batch_start] = len(results)
+        self.state["failed"].pop(batch_start, None)
+
+    def run(self, batch_starts, end_id: int, tail_empty: int | None = None) -> int:
+        """Fetch batches (in ID order, `workers` at a time); return strains fetched.
+
+        With tail_empty, stops scheduling once that many consecutive batches
+        past the highest ID with strains have come back empty.
+        """
+        batch_starts = iter(batch_starts)
+        highest = max((s for s, n in self.state["batches"].items() if n), default=0)
+        empty_tail = set()
+        strains = 0
+        in_flight = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                while not exhausted and len(in_flight) < self.workers:
+                    start = next(batch_starts, None)
+                    past_end = (tail_empty is not None and start is not None
+                                and len(empty_tail) >= tail_empty and start > highest)
+                    if start is None or past_end:
+                        if past_end:
+                            print(f"  {tail_empty} empty batches past ID {highest:,}; "
+                                  f"stopping at {start:,}")
+                        exhausted = True
+                        break
+                    in_flight[pool.submit(self.fetch, start, end_id)] = start
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except (TransientError, requests.HTTPError) as e:
+                        attempts = self.state["failed"].get(start, 0) + 1
+                        self.state["failed"][start] = attempts
+                        print(f"  FAILED batch {start} ({e}); queued for retry")
+                        continue
+                    self._record(start, results)
+                    strains += len(results)
+                    if results:
+                        highest = max(highest, start)
+                        empty_tail = {s for s in empty_tail if s > start}
+                    elif start > highest:
+                        empty_tail.add(start)
+                    self.completed += 1
+                    if self.completed % SAVE_INTERVAL == 0:
+                        save_state(self.state)
+                    if self.completed % REPORT_INTERVAL == 0:
+                        total = sum(self.state["batches"].values())
+                        print(f"  {self.completed:,} batches done, at ID {start:>6d} — "
+                              f"{total:,} strains total, {self.bucket.rate:.1f} req/s")
+        save_state(self.state)
+        return strains
+
+
+def plan_batches(state, start_id, end_id, refresh=False, rescan_empty=False):
+    """Batch starts to fetch in [start_id, end_id], skipping done or known-empty ones."""
+    batch_size = state["batch_size"]
+    first = start_id - (start_id - 1) % batch_size
+    planned = []
+    for batch_start in range(first, end_id + 1, batch_size):
+        count = state["batches"].get(batch_start)
+        if count is None or (refresh and (count or rescan_empty)):
+            planned.append(batch_start)
+    return planned
+
+
+def download(downloader: BacDiveDownloader, start_id: int, end_id: int, refresh=False,
+             rescan_empty=False, tail_empty=None) -> int:
+    """Fetch [start_id, end_id] as planned from downloader's state.
 
-        # Progress
-        if batch_num % 20 == 0 or results:
-            pct = (batch_start - start_id) / max(end_id - start_id, 1) * 100
-            print(f"  ID {batch_start:>6d} ({pct:5.1f}%) — {len(results):>3d} strains this batch, {total_strains:>6d} total")
-            save_progress(batch_start + args.batch_size - 1, total_strains)
+    The failed queue is retried first, then the planned batches are
+    fetched, then batches that failed are retried for up to FAILED_ROUNDS
+    rounds. Returns the number of batches still failing.
+    """
+    state = downloader.state
+    if state["failed"]:
+        print(f"\nRetrying {len(state['failed'])} batches from the failed queue...")
+        downloader.run(sorted(state["failed"]), end_id)
 
-        # Early stop if we've hit a long stretch of empty IDs
-        if empty_streak > 100:
-            print(f"  100 consecutive empty batches at ID {batch_start}. Stopping.")
+    planned = plan_batches(state, start_id, end_id, refresh, rescan_empty)
+    skipped = len(range(start_id, end_id + 1, state["batch_size"])) - len(planned)
+    print(f"\nFetching {len(planned):,} batches ({skipped:,} done or known empty, skipped)...")
+    downloader.run(planned, end_id, tail_empty)
+
+    for round_num in range(1, FAILED_ROUNDS + 1):
+        if not state["failed"]:
             break
+        wait_s = RETRY_BACKOFF * 2 ** (round_num + 1)
+        print(f"\nRetry round {round_num}: {len(state['failed'])} failed batches "
+              f"(after {wait_s}s)...")
+        time.sleep(wait_s)
+        downloader.run(sorted(state["failed"]), end_id)
+    return len(state["failed"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download BacDive database")
+    parser.add_argument("--start", type=int, default=1, help="Start ID (default: 1)")
+    parser.add_argument("--end", type=int, default=210000, help="End ID (default: 210000)")
+    parser.add_argument("--batch-size", type=int, default=100, help="IDs per API call")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests (default: 4)")
+    parser.add_argument("--rate", type=float, default=3.0,
+                        help="Max API calls per second across workers (default: 3)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Refetch batches that had strains (known-empty ranges are skipped)")
+    parser.add_argument("--rescan-empty", action="store_true",
+                        help="With --refresh, also refetch known-empty batches")
+    parser.add_argument("--tail-empty", type=int, default=100,
+                        help="Stop after this many empty batches past the highest known ID "
+                             "(default: 100)")
+    parser.add_argument("--api-base", default=API_BASE,
+                        help=f"API base URL, e.g. a local mock (default: {API_BASE})")
+    args = parser.parse_args()
+
+    os.makedirs(RAW_DIR, exist_ok=True)
+    state = load_state(args.batch_size)
+    downloader = BacDiveDownloader(state, args.api_base, RAW_DIR, args.workers, args.rate)
+
+    known = state["batches"]
+    dense = id_ranges([s for s, n in known.items() if n], args.batch_size)
+    print(f"BacDive download: IDs {args.start} to {args.end}, batch size {args.batch_size}, "
+          f"{args.workers} workers at {args.rate:g} req/s")
+    print(f"State: {len(known):,} batches fetched ({sum(known.values()):,} strains in "
+          f"{len(dense):,} dense ranges), {len(state['failed']):,} failed batches queued")
 
-        time.sleep(args.sleep)
+    t0 = time.time()
+    download(downloader, args.start, args.end, args.refresh, args.rescan_empty,
+             args.tail_empty)
 
-    save_progress(end_id, total_strains)
-    print(f"\nDone! Downloaded {total_strains} strains to {RAW_DIR}/")
+    total = sum(state["batches"].values())
+    print(f"\nDone in {time.time() - t0:.0f}s: {total:,} strains in {RAW_DIR}/")
     print(f"Raw files: {len(os.listdir(RAW_DIR))} batch files")
+    if state["failed"]:
+        print(f"WARNING: {len(state['failed'])} batches still failing "
+              f"(first ID {min(state['failed'])}); rerun to retry them")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -8,16 +8,52 @@ Writes: data/bacdive_ingest/*.tsv (one per table)
 Tables:
   strain, taxonomy, culture_condition, isolation,
   physiology, metabolite_utilization, sequence_info, enzyme
+
+Batch files are streamed: each is flattened on its own and its rows are
+appended to all eight tables, so memory stays flat however many strains
+BacDive holds. --workers N flattens batch files on a process pool;
+--format parquet writes <table>.parquet instead, with each table's column
+names and types taken from its schema_sql in bacdive.json (so taxonomy's
+class/order columns are tax_class/tax_order there, as after ingest).
+
+Usage:
+    python flatten_bacdive.py [--format parquet] [--workers N]
 """
 
+import argparse
 import csv
 import glob
 import json
 import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 OUT_DIR = os.path.dirname(__file__)
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "bacdive.json")
+# Batch files flattened per task (~1,000 strains)
+FILES_PER_TASK = 10
+# Print progress every N tasks
+REPORT_INTERVAL = 100
+
+# Columns per table, in output order
+TABLES = {
+    "strain": ["bacdive_id", "dsm_number", "description", "ncbi_taxid", "ncbi_taxid_match_level",
+               "species_name", "strain_designation", "type_strain", "keywords", "doi"],
+    "taxonomy": ["bacdive_id", "domain", "phylum", "class", "order", "family", "genus",
+                 "species", "full_name"],
+    "culture_condition": ["bacdive_id", "medium_name", "growth", "medium_link", "temperature",
+                          "record_type"],
+    "isolation": ["bacdive_id", "sample_type", "country", "continent", "geographic_location",
+                  "cat1", "cat2", "cat3"],
+    "physiology": ["bacdive_id", "gram_stain", "cell_shape", "motility", "oxygen_tolerance",
+                   "murein_type", "predicted_gram", "predicted_motility", "predicted_oxygen"],
+    "metabolite_utilization": ["bacdive_id", "compound_name", "chebi_id", "utilization"],
+    "sequence_info": ["bacdive_id", "accession_type", "accession", "database", "assembly_level",
+                      "description"],
+    "enzyme": ["bacdive_id", "enzyme_name", "ec_number", "activity"],
+}
 
 
 def safe_get(d, *keys, default=""):
@@ -305,85 +341,172 @@ def flatten_enzyme(bid, record):
     return rows
 
 
-def write_tsv(filename, rows, fieldnames):
-    """Write rows to TSV file."""
-    path = os.path.join(OUT_DIR, filename)
-    with open(path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t",
-                                extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"  {filename}: {len(rows):>8,} rows")
-    return path
+class TSVTable:
+    """Incremental TSV writer for one table."""
 
+    def __init__(self, path, name, columns):
+        self.f = open(path, "w", newline="")
+        self.writer = csv.writer(self.f, delimiter="\t")
+        self.writer.writerow(columns)
 
-def main():
-    # Load all batch files
-    batch_files = sorted(glob.glob(os.path.join(RAW_DIR, "batch_*.json")))
-    print(f"Loading {len(batch_files)} batch files...")
+    def write(self, rows):
+        self.writer.writerows(rows)
 
-    all_records = {}
-    for bf in batch_files:
-        with open(bf) as f:
-            batch = json.load(f)
-        for bid_str, record in batch.items():
-            all_records[int(bid_str)] = record
+    def close(self):
+        self.f.close()
+
+
+def parquet_schema(name, columns):
+    """pyarrow schema for table name from its schema_sql in bacdive.json.
 
-    print(f"Total strains loaded: {len(all_records):,}")
+    schema_sql lists the columns in TABLES order, under the names the
+    ingested tables use.
+    """
+    import pyarrow as pa
 
-    # Flatten into tables
-    strains = []
-    taxonomies = []
-    culture_conditions = []
-    isolations = []
-    physiologies = []
-    metabolites = []
-    sequences = []
-    enzymes = []
+    types = {"INT": pa.int32(), "STRING": pa.string()}
+    with open(CONFIG_PATH) as f:
+        tables = {t["name"]: t for t in json.load(f)["tables"]}
+    fields = [col.split() for col in tables[name]["schema_sql"].split(",")]
+    if len(fields) != len(columns):
+        raise ValueError(f"{name}: schema_sql has {len(fields)} columns, TABLES {len(columns)}")
+    return pa.schema([(col, types[sql_type.upper()]) for col, sql_type in fields])
 
-    for bid, record in sorted(all_records.items()):
-        strains.append(flatten_strain(bid, record))
-        taxonomies.append(flatten_taxonomy(bid, record))
-        culture_conditions.extend(flatten_culture_conditions(bid, record))
 
-        iso = flatten_isolation(bid, record)
-        if iso:
-            isolations.append(iso)
+class ParquetTable:
+    """Incremental Parquet writer for one table, with an explicit schema.
 
-        physiologies.append(flatten_physiology(bid, record))
-        metabolites.extend(flatten_metabolite_utilization(bid, record))
-        sequences.extend(flatten_sequence_info(bid, record))
-        enzymes.extend(flatten_enzyme(bid, record))
+    The schema is the table's schema_sql in bacdive.json: bacdive_id is
+    INT and every other column a STRING holding the same text as the TSV.
+    """
 
-    # Write TSV files
-    print(f"\nWriting TSV files:")
-    write_tsv("strain.tsv", strains,
-              ["bacdive_id", "dsm_number", "description", "ncbi_taxid", "ncbi_taxid_match_level",
-               "species_name", "strain_designation", "type_strain", "keywords", "doi"])
+    def __init__(self, path, name, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
 
-    write_tsv("taxonomy.tsv", taxonomies,
-              ["bacdive_id", "domain", "phylum", "class", "order", "family", "genus", "species", "full_name"])
+        self.pa = pa
+        self.schema = parquet_schema(name, columns)
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
 
-    write_tsv("culture_condition.tsv", culture_conditions,
-              ["bacdive_id", "medium_name", "growth", "medium_link", "temperature", "record_type"])
+    def write(self, rows):
+        if not rows:
+            return
+        arrays = []
+        for i, field in enumerate(self.schema):
+            values = [row[i] for row in rows]
+            if field.type == self.pa.string():
+                values = ["" if v is None else str(v) for v in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
 
-    write_tsv("isolation.tsv", isolations,
-              ["bacdive_id", "sample_type", "country", "continent", "geographic_location", "cat1", "cat2", "cat3"])
+    def close(self):
+        self.writer.close()
 
-    write_tsv("physiology.tsv", physiologies,
-              ["bacdive_id", "gram_stain", "cell_shape", "motility", "oxygen_tolerance", "murein_type",
-               "predicted_gram", "predicted_motility", "predicted_oxygen"])
 
-    write_tsv("metabolite_utilization.tsv", metabolites,
-              ["bacdive_id", "compound_name", "chebi_id", "utilization"])
+def flatten_record(bid, record):
+    """All tables' rows (as dicts) for one strain."""
+    iso = flatten_isolation(bid, record)
+    return {
+        "strain": [flatten_strain(bid, record)],
+        "taxonomy": [flatten_taxonomy(bid, record)],
+        "culture_condition": flatten_culture_conditions(bid, record),
+        "isolation": [iso] if iso else [],
+        "physiology": [flatten_physiology(bid, record)],
+        "metabolite_utilization": flatten_metabolite_utilization(bid, record),
+        "sequence_info": flatten_sequence_info(bid, record),
+        "enzyme": flatten_enzyme(bid, record),
+    }
 
-    write_tsv("sequence_info.tsv", sequences,
-              ["bacdive_id", "accession_type", "accession", "database", "assembly_level", "description"])
 
-    write_tsv("enzyme.tsv", enzymes,
-              ["bacdive_id", "enzyme_name", "ec_number", "activity"])
+def flatten_batches(batch_files):
+    """Rows per table (as lists in TABLES column order) for some batch files.
+
+    Strains come out in BacDive ID order: batch files cover disjoint ID
+    ranges and are named by their first ID. Returns (rows, strains).
+    """
+    out = {name: [] for name in TABLES}
+    n_strains = 0
+    for bf in batch_files:
+        with open(bf) as f:
+            batch = json.load(f)
+        for bid, record in sorted((int(k), v) for k, v in batch.items()):
+            for name, rows in flatten_record(bid, record).items():
+                columns = TABLES[name]
+                out[name].extend([row.get(c, "") for c in columns] for row in rows)
+            n_strains += 1
+    return out, n_strains
+
+
+def flatten_all(batch_files, out_dir=OUT_DIR, fmt="tsv", workers=1):
+    """Stream batch files into the 8 tables; return {table: rows written}.
+
+    Batch files are flattened FILES_PER_TASK at a time, on a process pool
+    if workers > 1, and their rows appended to every table in ID order, so
+    at most ~2 x workers tasks' rows are held in memory at once.
+    """
+    table_cls = ParquetTable if fmt == "parquet" else TSVTable
+    ext = "parquet" if fmt == "parquet" else "tsv"
+    tables = {
+        name: table_cls(os.path.join(out_dir, f"{name}.{ext}"), name, columns)
+        for name, columns in TABLES.items()
+    }
+    rows_written = dict.fromkeys(TABLES, 0)
+    n_strains = 0
+    tasks = [batch_files[i:i + FILES_PER_TASK]
+             for i in range(0, len(batch_files), FILES_PER_TASK)]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight = deque()
+
+    def write(result):
+        nonlocal n_strains
+        rows, strains = result
+        for name, table in tables.items():
+            table.write(rows[name])
+            rows_written[name] += len(rows[name])
+        n_strains += strains
+
+    try:
+        for done, task in enumerate(tasks, 1):
+            if pool is None:
+                write(flatten_batches(task))
+            else:
+                in_flight.append(pool.submit(flatten_batches, task))
+                while len(in_flight) > 2 * workers:
+                    write(in_flight.popleft().result())
+            if done % REPORT_INTERVAL == 0:
+                print(f"  {done * FILES_PER_TASK:,}/{len(batch_files):,} batch files, "
+                      f"{n_strains:,} strains flattened")
+        while in_flight:
+            write(in_flight.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        for table in tables.values():
+            table.close()
+
+    print(f"Total strains flattened: {n_strains:,}")
+    print(f"\nWrote {ext.upper()} files:")
+    for name, rows in rows_written.items():
+        print(f"  {name}.{ext}: {rows:>8,} rows")
+    return rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten BacDive raw JSON into tables")
+    parser.add_argument("--format", choices=["tsv", "parquet"], default="tsv",
+                        help="Output format (parquet needs pyarrow)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes flattening batch files (default: 1, in-process)")
+    args = parser.parse_args()
+
+    batch_files = sorted(glob.glob(os.path.join(RAW_DIR, "batch_*.json")))
+    if not batch_files:
+        print(f"ERROR: no batch files in {RAW_DIR}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Streaming {len(batch_files)} batch files...")
 
-    print(f"\nDone! {len(strains):,} strains flattened into 8 tables.")
+    rows_written = flatten_all(batch_files, OUT_DIR, args.format, args.workers)
+    print(f"\nDone! {rows_written['strain']:,} strains flattened into {len(TABLES)} tables.")
 
 
 if __name__ == "__main__":
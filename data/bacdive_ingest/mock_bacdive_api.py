@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Local mock of the BacDive v2 fetch endpoint, for exercising download_bacdive.py.
+
+Serves GET /v2/fetch/<id;id;...> with {"count", "results"} for the IDs that
+exist, and 404 when none do. Strains are dense within --ranges and absent
+elsewhere. With --error-rate a fraction of requests get a 503, and with
+--max-rate requests arriving faster than that get a 429 with Retry-After.
+Tests can also queue statuses for a batch by its first ID (failures); a
+queued 200 is answered with a truncated, non-JSON body.
+
+Usage:
+    python mock_bacdive_api.py --port 8000 --ranges 1-5000,130000-131500 \\
+        --error-rate 0.05 --max-rate 20
+    python download_bacdive.py --api-base http://localhost:8000/v2 --end 140000
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FETCH_PATH = re.compile(r"^/v2/fetch/([\d;]+)$")
+
+
+def parse_ranges(spec: str) -> list[tuple[int, int]]:
+    """"1-5000,130000-131500" -> [(1, 5000), (130000, 131500)]"""
+    ranges = []
+    for part in spec.split(","):
+        lo, _, hi = part.partition("-")
+        ranges.append((int(lo), int(hi or lo)))
+    return ranges
+
+
+def make_record(bacdive_id: int) -> dict:
+    return {
+        "General": {"BacDive-ID": bacdive_id, "DSM-Number": bacdive_id,
+                    "description": f"Mock strain {bacdive_id}"},
+        "Name and taxonomic classification": {
+            "species": "Mockella testii", "strain designation": f"M{bacdive_id}"},
+    }
+
+
+class MockBacDive:
+    """Request state shared by handler threads: counters and 429 pacing."""
+
+    def __init__(self, ranges, error_rate=0.0, max_rate=0.0, seed=0):
+        self.ranges = ranges
+        self.error_rate = error_rate
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.last_request = 0.0
+        self.counts = {"ok": 0, "not_found": 0, "error": 0, "throttled": 0}
+        # First ID of a batch -> statuses returned before it is answered normally
+        self.failures = {}
+
+    def exists(self, bacdive_id: int) -> bool:
+        return any(lo <= bacdive_id <= hi for lo, hi in self.ranges)
+
+    def respond(self, ids):
+        """(status, body) for a fetch of ids."""
+        with self.lock:
+            now = time.monotonic()
+            if self.interval and now - self.last_request < self.interval:
+                self.counts["throttled"] += 1
+                return 429, {"detail": "rate limit exceeded"}
+            self.last_request = now
+            pending = self.failures.get(ids[0]) if ids else None
+            if pending:
+                self.counts["error"] += 1
+                return pending.pop(0), None
+            if self.random.random() < self.error_rate:
+                self.counts["error"] += 1
+                return 503, {"detail": "service unavailable"}
+        results = {str(i): make_record(i) for i in ids if self.exists(i)}
+        with self.lock:
+            self.counts["ok" if results else "not_found"] += 1
+        if not results:
+            return 404, {"detail": "not found"}
+        return 200, {"count": len(results), "next": None, "previous": None,
+                     "results": results}
+
+
+def make_server(mock: MockBacDive, port: int = 0) -> ThreadingHTTPServer:
+    """HTTP server for mock on localhost (port 0 picks a free port)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = FETCH_PATH.match(self.path)
+            if not match:
+                status, body = 404, {"detail": "not found"}
+            else:
+                status, body = mock.respond(
+                    [int(i) for i in match.group(1).split(";") if i])
+            # body None: a truncated response, as from a failing proxy
+            payload = json.dumps(body).encode() if body is not None else b'{"count": 1, "res'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock BacDive API for local testing")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ranges", default="1-5000,130000-131500",
+                        help="BacDive ID ranges that exist, e.g. 1-5000,130000-131500")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 503")
+    parser.add_argument("--max-rate", type=float, default=0.0,
+                        help="Answer 429 to requests arriving faster than this (per second)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mock = MockBacDive(parse_ranges(args.ranges), args.error_rate, args.max_rate, args.seed)
+    server = make_server(mock, args.port)
+    print(f"Mock BacDive API on http://127.0.0.1:{server.server_port}/v2 "
+          f"(IDs {args.ranges})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests: {mock.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Tests for download_bacdive.py — concurrent downloader against the local mock API."""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import download_bacdive
+from download_bacdive import (
+    BacDiveDownloader,
+    TransientError,
+    download,
+    fetch_batch,
+    plan_batches,
+)
+from mock_bacdive_api import MockBacDive, make_server
+
+
+class TestPlanBatches(unittest.TestCase):
+
+    def setUp(self):
+        self.state = {"batch_size": 100, "batches": {1: 100, 101: 0, 201: 50}, "failed": {}}
+
+    def test_skips_done_batches(self):
+        self.assertEqual(plan_batches(self.state, 1, 500), [301, 401])
+        # A start inside a batch is aligned to the batch
+        self.assertEqual(plan_batches(self.state, 250, 400), [301])
+
+    def test_refresh_skips_known_empty_unless_rescanned(self):
+        self.assertEqual(plan_batches(self.state, 1, 300, refresh=True), [1, 201])
+        self.assertEqual(plan_batches(self.state, 1, 300, refresh=True, rescan_empty=True),
+                         [1, 101, 201])
+
+
+class TestFetchBatch(unittest.TestCase):
+
+    def response(self, body=None, status=200, json_error=None):
+        resp = mock.MagicMock(status_code=status, headers={})
+        if json_error:
+            resp.json.side_effect = json_error
+        else:
+            resp.json.return_value = body
+        session = mock.MagicMock()
+        session.get.return_value = resp
+        return session
+
+    def test_malformed_bodies_are_transient(self):
+        for session in [
+            self.response(json_error=requests.JSONDecodeError("Expecting value", "<html>", 0)),
+            self.response({"count": 1, "results": {"not-an-id": {"General": {}}}}),
+            self.response(["not", "an", "object"]),
+        ]:
+            with self.assertRaises(TransientError) as ctx:
+                fetch_batch([1, 2], session, "http://mock")
+            self.assertEqual(ctx.exception.status, 200)
+
+    def test_status_recorded_on_transient_errors(self):
+        session = self.response(status=429)
+        session.get.return_value.headers = {"Retry-After": "7"}
+        with self.assertRaises(TransientError) as ctx:
+            fetch_batch([1], session, "http://mock")
+        self.assertEqual((ctx.exception.status, ctx.exception.retry_after), (429, 7.0))
+
+
+@mock.patch.object(download_bacdive, "RETRY_BACKOFF", 0)
+class TestDownloadAgainstMock(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.raw_dir = self._tmp.name
+        patcher = mock.patch.object(download_bacdive, "STATE_FILE",
+                                    os.path.join(self.raw_dir, "state.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock = MockBacDive([(1, 450), (901, 950)])
+        self.server = make_server(self.mock)
+        self.api = f"http://127.0.0.1:{self.server.server_port}/v2"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._tmp.cleanup()
+
+    def downloader(self, state=None):
+        state = state or {"batch_size": 50, "batches": {}, "failed": {}}
+        return BacDiveDownloader(state, self.api, self.raw_dir, workers=4, rate=1000)
+
+    def strains_on_disk(self):
+        ids = set()
+        for name in os.listdir(self.raw_dir):
+            if name.startswith("batch_"):
+                with open(os.path.join(self.raw_dir, name)) as f:
+                    ids.update(int(k) for k in json.load(f))
+        return ids
+
+    def test_downloads_and_resumes(self):
+        downloader = self.downloader()
+        self.assertEqual(download(downloader, 1, 1000), 0)
+        expected = set(range(1, 451)) | set(range(901, 951))
+        self.assertEqual(self.strains_on_disk(), expected)
+        self.assertEqual(sum(downloader.state["batches"].values()), len(expected))
+        with open(download_bacdive.STATE_FILE) as f:
+            saved = json.load(f)
+        self.assertEqual(saved["total_strains"], len(expected))
+
+        # A rerun from the saved state fetches nothing
+        fetched = dict(self.mock.counts)
+        state = download_bacdive.load_state(50)
+        download(self.downloader(state), 1, 1000)
+        self.assertEqual(self.mock.counts, fetched)
+
+    def test_refresh_removes_batches_that_became_empty(self):
+        downloader = self.downloader()
+        download(downloader, 1, 150)
+        self.assertTrue(os.path.exists(download_bacdive.batch_path(self.raw_dir, 51)))
+
+        # Strains 51-150 were removed from BacDive since the last download
+        self.mock.ranges = [(1, 50)]
+        state = download_bacdive.load_state(50)
+        download(self.downloader(state), 1, 150, refresh=True)
+        self.assertEqual(state["batches"], {1: 50, 51: 0, 101: 0})
+        self.assertFalse(os.path.exists(download_bacdive.batch_path(self.raw_dir, 51)))
+        self.assertEqual(self.strains_on_disk(), set(range(1, 51)))
+
+    def test_failed_batches_queued_and_retried(self):
+        # Batch 51 fails every attempt of the main pass; batch 101 returns a
+        # truncated body once; both succeed in the failed-queue rounds
+        self.mock.failures[51] = [503] * download_bacdive.RETRY_MAX
+        self.mock.failures[101] = [200]
+        with mock.patch.object(download_bacdive, "FAILED_ROUNDS", 0):
+            downloader = self.downloader()
+            self.assertEqual(download(downloader, 1, 200), 1)
+        self.assertEqual(downloader.state["failed"], {51: 1})
+        self.assertEqual(downloader.state["batches"][101], 50)
+        self.assertNotIn(51, downloader.state["batches"])
+
+        # The next run retries the failed queue first
+        state = download_bacdive.load_state(50)
+        self.assertEqual(state["failed"], {51: 1})
+        self.assertEqual(download(self.downloader(state), 1, 200), 0)
+        self.assertEqual(state["batches"][51], 50)
+        self.assertEqual(self.strains_on_disk(), set(range(1, 201)))
+
+    def test_failed_rounds_within_a_run(self):
+        self.mock.failures[151] = [503] * (download_bacdive.RETRY_MAX + 1)
+        downloader = self.downloader()
+        self.assertEqual(download(downloader, 1, 300), 0)
+        self.assertEqual(downloader.state["batches"][151], 50)
+
+    def test_stops_after_empty_tail(self):
+        downloader = self.downloader()
+        download(downloader, 1, 5000, tail_empty=3)
+        batches = downloader.state["batches"]
+        # Stopped a few batches past ID 450: the strains at 901+ are not reached
+        self.assertLess(max(batches), 901)
+        self.assertEqual(sum(batches.values()), 450)
+
+        # With the dense range known, the empty tail counts from its end
+        state = {"batch_size": 50, "batches": {901: 50}, "failed": {}}
+        download(self.downloader(state), 1, 5000, tail_empty=3)
+        # Up to `workers` batches already in flight still complete
+        self.assertLessEqual(max(state["batches"]), 901 + (3 + 4) * 50)
+        self.assertEqual(sum(state["batches"].values()), 500)
+
+    def test_throttled_batches_lower_the_rate(self):
+        self.mock.failures[1] = [429, 429]
+        downloader = self.downloader()
+        with mock.patch.object(download_bacdive.time, "sleep"):
+            download(downloader, 1, 50)
+        self.assertLess(downloader.bucket.rate, 1000)
+        self.assertEqual(downloader.state["batches"][1], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
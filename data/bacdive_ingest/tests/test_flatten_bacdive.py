@@ -0,0 +1,161 @@
+"""Tests for flatten_bacdive.py — streaming BacDive batch files into tables."""
+
+import csv
+import glob
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import flatten_bacdive
+from flatten_bacdive import (
+    TABLES,
+    flatten_all,
+    flatten_culture_conditions,
+    flatten_enzyme,
+    flatten_isolation,
+    flatten_metabolite_utilization,
+    flatten_physiology,
+    flatten_sequence_info,
+    flatten_strain,
+    flatten_taxonomy,
+)
+
+
+def make_record(i):
+    """A BacDive record exercising list/dict variants, missing sections and odd text."""
+    record = {
+        "General": {
+            "BacDive-ID": i, "DSM-Number": i, "doi": f"10.13145/bacdive{i}",
+            "description": f'strain {i}\twith "quotes"\nand a newline',
+            "keywords": ["Bacteria", "mesophilic"] if i % 2 else "Bacteria",
+            "NCBI tax id": {"NCBI tax id": 562, "Matching level": "species"},
+        },
+        "Name and taxonomic classification": {
+            "species": "Escherichia coli", "strain designation": f"K-{i}",
+            "type strain": "no", "domain": "Bacteria", "class": "Gammaproteobacteria",
+            "LPSN": {"order": "Enterobacterales", "genus": "Escherichia"} if i % 3 else {},
+        },
+        "Culture and growth conditions": {
+            "culture medium": [{"name": "LB", "growth": "positive", "link": "http://x"},
+                               {"growth": "negative"}] if i % 2 else {"name": "TSA"},
+            "culture temp": {"growth": "positive", "temperature": "37"},
+        },
+        "Physiology and metabolism": {
+            "oxygen tolerance": [{"oxygen tolerance": "facultative anaerobe"}],
+            "murein": {"murein type": "A1gamma"},
+            "metabolite utilization": [
+                {"metabolite": "glucose", "chebi id": 17234, "utilization activity": "+"},
+                {"metabolite": ["not", "a", "string"]},
+            ],
+            "metabolite production": {"metabolite": "indole", "chebi id": 16881},
+            "enzymes": [{"value": "catalase", "ec": "1.11.1.6", "activity": "+"}, "junk"],
+        },
+        "Morphology": {"cell morphology": [{"gram stain": "negative", "cell shape": "rod"}]},
+        "Genome-based predictions": {"gram stain": {"prediction": "negative"}},
+        "Sequence information": {
+            "16S sequences": {"accession": f"X{i}", "database": "ena"},
+            "Genome sequences": [{"INSDC accession": f"GCA_{i}", "assembly level": "complete"}],
+            "GC content": {"GC-content": 50.8, "method": "genome sequence"},
+        },
+    }
+    if i % 4 == 0:
+        record["Isolation, sampling and environmental information"] = {
+            "isolation": [{"sample type": "feces", "country": "Germany"}],
+            "isolation source categories": [{"Cat1": "#Host", "Cat2": "#Human"}],
+        }
+    if i % 5 == 0:
+        del record["Physiology and metabolism"]
+        del record["Sequence information"]
+    return record
+
+
+def old_flatten(batch_files, out_dir):
+    """The flattener as it was before streaming: load everything, DictWriter per table."""
+    all_records = {}
+    for bf in batch_files:
+        with open(bf) as f:
+            for bid_str, record in json.load(f).items():
+                all_records[int(bid_str)] = record
+    rows = {name: [] for name in TABLES}
+    for bid, record in sorted(all_records.items()):
+        rows["strain"].append(flatten_strain(bid, record))
+        rows["taxonomy"].append(flatten_taxonomy(bid, record))
+        rows["culture_condition"].extend(flatten_culture_conditions(bid, record))
+        iso = flatten_isolation(bid, record)
+        if iso:
+            rows["isolation"].append(iso)
+        rows["physiology"].append(flatten_physiology(bid, record))
+        rows["metabolite_utilization"].extend(flatten_metabolite_utilization(bid, record))
+        rows["sequence_info"].extend(flatten_sequence_info(bid, record))
+        rows["enzyme"].extend(flatten_enzyme(bid, record))
+    for name, columns in TABLES.items():
+        with open(os.path.join(out_dir, f"{name}.tsv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, delimiter="\t",
+                                    extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows[name])
+
+
+class TestFlattenAll(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        raw = os.path.join(self.dir, "raw")
+        os.makedirs(raw)
+        for start in range(1, 300, 20):
+            with open(os.path.join(raw, f"batch_{start:06d}.json"), "w") as f:
+                json.dump({str(i): make_record(i) for i in range(start, start + 20)
+                           if i % 7}, f)
+        self.batch_files = sorted(glob.glob(os.path.join(raw, "batch_*.json")))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def output(self, name):
+        os.makedirs(os.path.join(self.dir, name))
+        return os.path.join(self.dir, name)
+
+    def read(self, out_dir, name):
+        with open(os.path.join(out_dir, f"{name}.tsv"), "rb") as f:
+            return f.read()
+
+    def test_tsv_matches_old_flattener(self):
+        old, new, pooled = self.output("old"), self.output("new"), self.output("pooled")
+        old_flatten(self.batch_files, old)
+        counts = flatten_all(self.batch_files, new)
+        flatten_all(self.batch_files, pooled, workers=2)
+        for name in TABLES:
+            self.assertEqual(self.read(new, name), self.read(old, name), name)
+            self.assertEqual(self.read(pooled, name), self.read(old, name), name)
+        self.assertEqual(counts["strain"], sum(1 for i in range(1, 301) if i % 7))
+
+    def test_parquet_uses_schema_sql_names(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tsv, parquet = self.output("tsv"), self.output("parquet")
+        flatten_all(self.batch_files, tsv)
+        flatten_all(self.batch_files, parquet, fmt="parquet")
+        with open(flatten_bacdive.CONFIG_PATH) as f:
+            schema_sql = {t["name"]: t["schema_sql"] for t in json.load(f)["tables"]}
+
+        for name in TABLES:
+            table = pq.read_table(os.path.join(parquet, f"{name}.parquet"))
+            self.assertEqual(table.schema.names,
+                             [c.split()[0] for c in schema_sql[name].split(",")])
+            self.assertEqual(table.schema.field("bacdive_id").type, pa.int32())
+            with open(os.path.join(tsv, f"{name}.tsv"), newline="") as f:
+                rows = list(csv.reader(f, delimiter="\t"))[1:]
+            self.assertEqual(
+                [[str(v) for v in row.values()] for row in table.to_pylist()], rows)
+        taxonomy = pq.read_table(os.path.join(parquet, "taxonomy.parquet"))
+        self.assertIn("tax_class", taxonomy.schema.names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark seq_stats.py against Biopython's ProteinAnalysis.
+
+Computes molecular weight and isoelectric point for the same sequences
+three ways -- one ProteinAnalysis per sequence (how extract_bakta_tables.py
+used to do it), compute_seq_stats_batch() and compute_seq_stats_parallel()
+-- and reports timings and any sequence whose rounded values differ.
+
+Sequences come from a protein FASTA file or are generated at random
+(residue frequencies roughly as in bacterial proteomes, with a sprinkling
+of stop codons, ambiguous residues and lower case).
+
+Usage:
+  python benchmark_seq_stats.py [--fasta proteins.faa] [--n 100000] [--workers 4]
+"""
+
+import argparse
+import random
+import time
+
+from Bio.SeqUtils.ProtParam import ProteinAnalysis
+
+from seq_stats import compute_seq_stats_batch, compute_seq_stats_parallel
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+# Approximate bacterial amino acid composition (%)
+FREQUENCIES = [9.5, 1.1, 5.2, 6.1, 3.9, 7.4, 2.2, 6.0, 4.4, 10.5,
+               2.6, 3.9, 4.4, 4.4, 5.5, 5.8, 5.3, 7.1, 1.3, 2.8]
+
+
+def biopython_seq_stats(aa_seq):
+    """Reference: the per-sequence computation seq_stats.py replaces."""
+    seq = aa_seq.rstrip("*")
+    if not seq:
+        return None, None
+    try:
+        pa = ProteinAnalysis(seq)
+        return round(pa.molecular_weight(), 2), round(pa.isoelectric_point(), 2)
+    except Exception:
+        return None, None
+
+
+def random_sequences(n, seed=0):
+    rng = random.Random(seed)
+    seqs = []
+    for _ in range(n):
+        length = min(int(rng.lognormvariate(5.6, 0.6)) + 1, 5000)
+        seq = "M" + "".join(rng.choices(AMINO_ACIDS, FREQUENCIES, k=length - 1))
+        r = rng.random()
+        if r < 0.3:
+            seq += "*"
+        elif r < 0.31:
+            seq = seq[:length // 2] + "X" + seq[length // 2:]
+        elif r < 0.32:
+            seq = seq.lower()
+        seqs.append(seq)
+    return seqs
+
+
+def read_fasta(path, limit=None):
+    seqs, parts = [], None
+    with open(path) as f:
+        for line in f:
+            if line.startswith(">"):
+                if parts is not None:
+                    seqs.append("".join(parts))
+                    if limit and len(seqs) >= limit:
+                        return seqs
+                parts = []
+            elif parts is not None:
+                parts.append(line.strip())
+    if parts is not None:
+        seqs.append("".join(parts))
+    return seqs[:limit] if limit else seqs
+
+
+def timed(label, n_residues, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.2f}s  {n_residues / elapsed / 1e6:8.2f} M residues/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch seq stats against Biopython")
+    parser.add_argument("--fasta", help="Protein FASTA (default: random sequences)")
+    parser.add_argument("--n", type=int, default=100_000, help="Number of sequences")
+    parser.add_argument("--workers", type=int, default=4, help="Processes for the parallel run")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    seqs = read_fasta(args.fasta, args.n) if args.fasta else random_sequences(args.n)
+    n_residues = sum(map(len, seqs))
+    print(f"{len(seqs):,} sequences, {n_residues:,} residues\n")
+
+    reference, t_bio = timed("Biopython (per sequence)", n_residues,
+                             lambda: [biopython_seq_stats(s) for s in seqs])
+    (mws, pis), t_batch = timed("compute_seq_stats_batch", n_residues,
+                                compute_seq_stats_batch, seqs)
+    parallel, t_par = timed(f"parallel ({args.workers} workers)", n_residues,
+                            compute_seq_stats_parallel, seqs, args.workers, args.batch_size)
+    print(f"\n  speedup: batch {t_bio / t_batch:.1f}x, parallel {t_bio / t_par:.1f}x")
+
+    mismatches = [(s, ref, (mw, pi)) for s, ref, mw, pi in zip(seqs, reference, mws, pis)
+                  if ref != (mw, pi)]
+    max_mw = max((abs(ref[0] - mw) for ref, mw in zip(reference, mws)
+                  if ref[0] is not None and mw is not None), default=0.0)
+    max_pi = max((abs(ref[1] - pi) for ref, pi in zip(reference, pis)
+                  if ref[1] is not None and pi is not None), default=0.0)
+    print(f"  mismatches vs Biopython: {len(mismatches):,} "
+          f"(max |dMW| {max_mw:.2f}, max |dpI| {max_pi:.2f})")
+    if parallel != (mws, pis):
+        print("  WARNING: parallel results differ from batch results")
+    for seq, ref, got in mismatches[:5]:
+        print(f"    {seq[:30]}...  biopython={ref}  batch={got}")
+
+
+if __name__ == "__main__":
+    main()
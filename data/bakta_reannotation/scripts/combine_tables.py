@@ -1,20 +1,57 @@
 #!/usr/bin/env python3
 """
-Combine per-chunk bakta table TSVs into final tables.
+Combine per-chunk bakta tables into final tables.
 
-Reads all tables/chunk_NNN/ and tables/cts_chunk_NNN/ directories,
-concatenates matching TSVs, and writes final combined files.
+Reads all tables/chunk_NNN/ and tables/cts_chunk_NNN/ directories and
+combines matching tables, the four tables concurrently.
+
+Row counts come from each chunk's manifest.json (written by
+extract_bakta_tables.py), checked against the file sizes it records, so no
+chunk is read line by line; chunks extracted before manifests existed are
+counted once through their sidecar line index. The totals are written to
+tables/final/manifest.json.
+
+TSV output (default): each chunk's body, after its header, is appended to
+tables/final/<table>.tsv with in-kernel copies (copy_file_range, then
+sendfile, then plain block reads). Progress is checkpointed to
+tables/final/combine_progress.json after every chunk as the last chunk
+copied and the output size, so an interrupted run truncates the output
+back to the last checkpoint and picks up at the next chunk instead of
+starting over. The progress entry also
+records each chunk's table file size and mtime; if chunks are added,
+removed or re-extracted, the next run recombines that table from scratch.
+
+Parquet output (--format parquet, needs pyarrow): one dataset directory per
+table, tables/final/<table>/<chunk>.parquet. Parquet chunks are copied as
+they are and TSV chunks are converted; parts already present with the
+expected row count are kept, so a rerun resumes.
 
 Usage:
-  python combine_tables.py
+  python combine_tables.py [--format parquet] [--restart]
 """
 
+import argparse
+import errno
 import glob
+import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from tsv_cursor import TSVCursor  # noqa: E402
 
 WORK_DIR = "/pscratch/sd/p/psdehal/bakta_reannotation"
 TABLES_DIR = os.path.join(WORK_DIR, "tables")
 FINAL_DIR = os.path.join(TABLES_DIR, "final")
+PROGRESS_FILE = os.path.join(FINAL_DIR, "combine_progress.json")
+MANIFEST_FILE = "manifest.json"
+
+# Largest single copy request; the kernel may copy less per call
+COPY_BLOCK = 64 << 20
+# pyarrow CSV block size when converting TSV chunks to Parquet
+PARQUET_READ_BLOCK = 64 << 20
 
 TABLE_NAMES = [
     "bakta_annotations",
@@ -23,53 +60,298 @@ TABLE_NAMES = [
     "bakta_amr",
 ]
 
+# Guards the shared progress dict and its file across table threads
+_progress_lock = threading.Lock()
+
+
+def load_progress():
+    if os.path.exists(PROGRESS_FILE):
+        with open(PROGRESS_FILE) as f:
+            return json.load(f)
+    return {}
 
-def combine_table(table_name):
-    """Combine all per-chunk TSVs for one table into a single file."""
-    chunk_dirs = sorted(
+
+def update_progress(progress, table_name, **fields):
+    """Set fields of one table's progress entry and checkpoint the file."""
+    with _progress_lock:
+        progress.setdefault(table_name, {}).update(fields)
+        tmp_path = PROGRESS_FILE + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(progress, f, indent=2)
+        os.replace(tmp_path, PROGRESS_FILE)
+
+
+def find_chunk_dirs():
+    return sorted(
         glob.glob(os.path.join(TABLES_DIR, "chunk_*"))
         + glob.glob(os.path.join(TABLES_DIR, "cts_chunk_*"))
     )
 
+
+def chunk_table(chunk_dir, table_name):
+    """(path, format, rows) of one chunk's table, or None if it is missing.
+
+    Raises ValueError if the file no longer matches the size in the chunk's
+    manifest.
+    """
+    manifest_path = os.path.join(chunk_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            entry = json.load(f)["tables"].get(table_name)
+        if entry is None:
+            return None
+        path = os.path.join(chunk_dir, entry["file"])
+        size = os.path.getsize(path)
+        if size != entry["bytes"]:
+            raise ValueError(
+                f"{path} is {size:,} bytes but its manifest says {entry['bytes']:,}; "
+                f"re-extract the chunk"
+            )
+        return path, os.path.splitext(path)[1].lstrip("."), entry["rows"]
+
+    # Extracted before manifests: count rows once through the line index
+    path = os.path.join(chunk_dir, f"{table_name}.tsv")
+    if not os.path.exists(path):
+        return None
+    return path, "tsv", TSVCursor(path).total_rows()
+
+
+def chunk_sources(chunk_dirs, table_name):
+    """[chunk, bytes, mtime_ns] of each chunk's table file, in chunk order."""
+    sources = []
+    for chunk_dir in chunk_dirs:
+        for ext in ("tsv", "parquet"):
+            path = os.path.join(chunk_dir, f"{table_name}.{ext}")
+            if os.path.exists(path):
+                st = os.stat(path)
+                sources.append([os.path.basename(chunk_dir), st.st_size, st.st_mtime_ns])
+                break
+    return sources
+
+
+def _copy_file_range(src, dst, offset, dst_offset, count):
+    return os.copy_file_range(src, dst, count, offset, dst_offset)
+
+
+def _sendfile(src, dst, offset, dst_offset, count):
+    os.lseek(dst, dst_offset, os.SEEK_SET)
+    return os.sendfile(dst, src, offset, count)
+
+
+def _pread_pwrite(src, dst, offset, dst_offset, count):
+    return os.pwrite(dst, os.pread(src, count, offset), dst_offset)
+
+
+_COPY_METHODS = [
+    method for method, available in (
+        (_copy_file_range, hasattr(os, "copy_file_range")),
+        (_sendfile, hasattr(os, "sendfile")),
+        (_pread_pwrite, True),
+    ) if available
+]
+# Errors meaning "this copy method does not work for these files"
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def copy_range(src, dst, offset, end, dst_offset):
+    """Copy bytes [offset, end) of fd src to fd dst at dst_offset.
+
+    Tries copy_file_range, sendfile and pread/pwrite in turn, falling back
+    when a method is unsupported for this pair of files. Returns the output
+    offset after the copied bytes.
+    """
+    methods = list(_COPY_METHODS)
+    while offset < end:
+        try:
+            copied = methods[0](src, dst, offset, dst_offset, min(end - offset, COPY_BLOCK))
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS or len(methods) == 1:
+                raise
+            methods.pop(0)
+            continue
+        if copied == 0:
+            raise OSError(f"Unexpected end of input at byte {offset:,}")
+        offset += copied
+        dst_offset += copied
+    return dst_offset
+
+
+def combine_table(table_name, chunk_dirs, progress):
+    """Combine all per-chunk TSVs for one table into a single file.
+
+    progress[table_name] records the chunk table files combined (see
+    chunk_sources), the last chunk copied and the output size after it; a
+    rerun over the same chunk files truncates the output back to that size
+    and resumes at the next chunk, and a rerun over different ones starts
+    over.
+    """
     output_path = os.path.join(FINAL_DIR, f"{table_name}.tsv")
-    row_count = 0
-    chunks_found = 0
-    header_written = False
+    with _progress_lock:
+        prog = dict(progress.get(table_name) or {})
+    chunk_names = [os.path.basename(d) for d in chunk_dirs]
+    sources = chunk_sources(chunk_dirs, table_name)
+    if prog and prog.get("sources") != sources:
+        print(f"  {table_name}: chunks changed since the last combine, starting over")
+        prog = None
+    if prog and os.path.exists(output_path) and (
+        prog["done"] or prog["chunk"] in chunk_names
+    ):
+        if prog["done"]:
+            print(f"  {table_name:30s} {prog['rows']:>14,} rows  (already combined)")
+            return prog["rows"]
+        print(f"  {table_name}: resuming after {prog['chunk']} ({prog['rows']:,} rows done)")
+        os.truncate(output_path, prog["out_bytes"])
+        first = chunk_names.index(prog["chunk"]) + 1
+    else:
+        prog = {
+            "chunk": None, "out_bytes": 0, "rows": 0, "chunks_found": 0,
+            "done": False, "sources": sources,
+        }
+        first = 0
+        open(output_path, "wb").close()
 
-    with open(output_path, "w") as out_f:
-        for chunk_dir in chunk_dirs:
-            tsv_path = os.path.join(chunk_dir, f"{table_name}.tsv")
-            if not os.path.exists(tsv_path):
-                print(f"  WARNING: {tsv_path} not found")
+    header = None
+    out_fd = os.open(output_path, os.O_RDWR)
+    try:
+        for chunk_dir in chunk_dirs[first:]:
+            found = chunk_table(chunk_dir, table_name)
+            if found is None:
+                print(f"  WARNING: {table_name} not found in {chunk_dir}")
                 continue
-            chunks_found += 1
-            with open(tsv_path) as in_f:
-                header = in_f.readline()
-                if not header_written:
-                    out_f.write(header)
-                    header_written = True
-                for line in in_f:
-                    out_f.write(line)
-                    row_count += 1
+            tsv_path, fmt, chunk_rows = found
+            if fmt != "tsv":
+                raise ValueError(f"{tsv_path} is {fmt}; combine with --format parquet")
+
+            cursor = TSVCursor(tsv_path)
+            if header is None:
+                header = cursor.header_line
+                if prog["out_bytes"] == 0:
+                    prog["out_bytes"] = os.pwrite(out_fd, header, 0)
+            elif cursor.header_line != header:
+                raise ValueError(f"{tsv_path} header differs from the first chunk's")
+
+            with open(tsv_path, "rb") as in_f:
+                out_bytes = copy_range(in_f.fileno(), out_fd, cursor.data_start,
+                                       os.path.getsize(tsv_path), prog["out_bytes"])
+            if chunk_rows and not _ends_with_newline(out_fd, out_bytes):
+                raise ValueError(f"{tsv_path} does not end with a newline")
+            prog.update(chunk=os.path.basename(chunk_dir), out_bytes=out_bytes,
+                        rows=prog["rows"] + chunk_rows,
+                        chunks_found=prog["chunks_found"] + 1)
+            update_progress(progress, table_name, **prog)
+    finally:
+        os.close(out_fd)
 
+    prog["done"] = True
+    update_progress(progress, table_name, **prog)
+    row_count = prog["rows"]
     fsize = os.path.getsize(output_path)
     print(
         f"  {table_name:30s} {row_count:>14,} rows  "
-        f"{fsize / (1024**3):>8.2f} GB  ({chunks_found} chunks)"
+        f"{fsize / (1024**3):>8.2f} GB  ({prog['chunks_found']} chunks)"
     )
     return row_count
 
 
+def _ends_with_newline(fd, size):
+    return size > 0 and os.pread(fd, 1, size - 1) == b"\n"
+
+
+def combine_table_parquet(table_name, chunk_dirs, restart=False):
+    """Build tables/final/<table>/ with one Parquet part per chunk."""
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+
+    from extract_bakta_tables import TABLES
+
+    schema = pa.schema([(name, getattr(pa, t)()) for name, t in TABLES[table_name]])
+    dataset_dir = os.path.join(FINAL_DIR, table_name)
+    os.makedirs(dataset_dir, exist_ok=True)
+    row_count = 0
+    chunks_found = 0
+    for chunk_dir in chunk_dirs:
+        found = chunk_table(chunk_dir, table_name)
+        if found is None:
+            print(f"  WARNING: {table_name} not found in {chunk_dir}")
+            continue
+        path, fmt, chunk_rows = found
+        chunks_found += 1
+        row_count += chunk_rows
+        part_path = os.path.join(dataset_dir, f"{os.path.basename(chunk_dir)}.parquet")
+        if not restart and os.path.exists(part_path):
+            if pq.read_metadata(part_path).num_rows == chunk_rows:
+                continue
+
+        tmp_path = part_path + ".tmp"
+        if fmt == "parquet":
+            with open(path, "rb") as in_f, open(tmp_path, "wb") as out_f:
+                copy_range(in_f.fileno(), out_f.fileno(), 0, os.path.getsize(path), 0)
+        else:
+            reader = pv.open_csv(
+                path,
+                read_options=pv.ReadOptions(block_size=PARQUET_READ_BLOCK),
+                parse_options=pv.ParseOptions(delimiter="\t"),
+                convert_options=pv.ConvertOptions(
+                    column_types=schema, include_columns=schema.names,
+                    strings_can_be_null=False,
+                ),
+            )
+            with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+        written = pq.read_metadata(tmp_path).num_rows
+        if written != chunk_rows:
+            os.remove(tmp_path)
+            raise ValueError(f"{path}: {written:,} rows read but its manifest says {chunk_rows:,}")
+        os.replace(tmp_path, part_path)
+
+    fsize = sum(e.stat().st_size for e in os.scandir(dataset_dir) if e.name.endswith(".parquet"))
+    print(
+        f"  {table_name:30s} {row_count:>14,} rows  "
+        f"{fsize / (1024**3):>8.2f} GB  ({chunks_found} chunks, parquet)"
+    )
+    return row_count
+
+
+def write_final_manifest(fmt, rows):
+    """Record the combined row count and location of each table."""
+    tables = {}
+    for table_name, row_count in rows.items():
+        name = table_name if fmt == "parquet" else f"{table_name}.tsv"
+        tables[table_name] = {"file": name, "rows": row_count}
+    manifest_path = os.path.join(FINAL_DIR, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"format": fmt, "tables": tables}, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Combine per-chunk bakta tables")
+    parser.add_argument("--format", choices=["tsv", "parquet"], default="tsv",
+                        help="Combined output: single TSVs or Parquet datasets (needs pyarrow)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore saved progress and recombine every table")
+    args = parser.parse_args()
+
     os.makedirs(FINAL_DIR, exist_ok=True)
     print(f"Combining tables into {FINAL_DIR}/\n")
 
-    total_rows = 0
-    for table_name in TABLE_NAMES:
-        rows = combine_table(table_name)
-        total_rows += rows
+    chunk_dirs = find_chunk_dirs()
+    if args.format == "parquet":
+        def combine(table_name):
+            return combine_table_parquet(table_name, chunk_dirs, args.restart)
+    else:
+        progress = {} if args.restart else load_progress()
+
+        def combine(table_name):
+            return combine_table(table_name, chunk_dirs, progress)
+
+    with ThreadPoolExecutor(max_workers=len(TABLE_NAMES)) as pool:
+        rows = dict(zip(TABLE_NAMES, pool.map(combine, TABLE_NAMES)))
+    write_final_manifest(args.format, rows)
 
-    print(f"\nTotal rows across all tables: {total_rows:,}")
+    print(f"\nTotal rows across all tables: {sum(rows.values()):,}")
 
 
 if __name__ == "__main__":
@@ -2,193 +2,400 @@
 """
 Extract structured tables from bakta_proteins JSON output.
 
-Parses one bakta JSON file and produces 4 per-chunk TSVs:
+Parses one bakta JSON file and produces 4 per-chunk tables:
   - bakta_annotations.tsv    (one row per protein)
   - bakta_db_xrefs.tsv       (one row per cross-reference)
   - bakta_pfam_domains.tsv   (one row per Pfam domain hit)
   - bakta_amr.tsv            (one row per AMR expert annotation)
 
 Computes molecular_weight and isoelectric_point for ALL proteins
-(bakta only computes these for hypothetical proteins).
+(bakta only computes these for hypothetical proteins). They are computed a
+batch at a time with seq_stats.py, optionally on a process pool
+(--workers N), and match Biopython's ProteinAnalysis values.
+
+The JSON is parsed incrementally: top-level values are decoded one at a
+time and each element of the "features" array is handed over as soon as
+it is complete, so memory stays constant however large the chunk is. Rows
+are buffered and written in batches, as TSV (default) or as Parquet
+(--format parquet, needs pyarrow). A manifest.json written last records
+each table's file, row count and size; combine_tables.py validates
+chunks against it instead of recounting lines.
 
 Usage:
-  python extract_bakta_tables.py <input.json> <output_dir>
+  python extract_bakta_tables.py <input.json> <output_dir> [--format parquet] [--workers N]
 """
 
 import argparse
+import codecs
 import csv
 import json
 import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-from Bio.SeqUtils.ProtParam import ProteinAnalysis
+from seq_stats import compute_seq_stats_batch
 
+# Bytes read from the JSON file at a time
+READ_BLOCK = 1 << 20
+# Features whose rows are buffered before each batched write
+BATCH_FEATURES = 10_000
+# Print progress every N features
+REPORT_INTERVAL = 100_000
+# Written last into the output directory; its presence marks a finished chunk
+MANIFEST_FILE = "manifest.json"
 
-def compute_seq_stats(aa_seq):
-    """Compute molecular weight and isoelectric point for a protein sequence."""
-    seq = aa_seq.rstrip("*")
-    if not seq:
-        return None, None
-    try:
-        pa = ProteinAnalysis(seq)
-        mw = round(pa.molecular_weight(), 2)
-        pi = round(pa.isoelectric_point(), 2)
-        return mw, pi
-    except Exception:
-        return None, None
+# (column, pyarrow type) per table; types follow schema_sql in bakta_reannotation.json
+TABLES = {
+    "bakta_annotations": [
+        ("gene_cluster_id", "string"), ("length", "int32"), ("gene", "string"),
+        ("product", "string"), ("hypothetical", "bool_"), ("ec", "string"),
+        ("go", "string"), ("cog_id", "string"), ("cog_category", "string"),
+        ("kegg_orthology_id", "string"), ("refseq", "string"), ("uniparc", "string"),
+        ("uniref100", "string"), ("uniref90", "string"), ("uniref50", "string"),
+        ("molecular_weight", "float64"), ("isoelectric_point", "float64"),
+    ],
+    "bakta_db_xrefs": [
+        ("gene_cluster_id", "string"), ("db", "string"), ("accession", "string"),
+    ],
+    "bakta_pfam_domains": [
+        ("gene_cluster_id", "string"), ("pfam_id", "string"), ("pfam_name", "string"),
+        ("start", "int32"), ("stop", "int32"), ("score", "float64"),
+        ("evalue", "float64"), ("aa_cov", "float64"), ("hmm_cov", "float64"),
+    ],
+    "bakta_amr": [
+        ("gene_cluster_id", "string"), ("amr_gene", "string"), ("amr_product", "string"),
+        ("method", "string"), ("identity", "float64"), ("query_cov", "float64"),
+        ("subject_cov", "float64"), ("accession", "string"),
+    ],
+}
 
 
-def extract_tables(json_path, output_dir):
-    """Extract 4 tables from a bakta JSON file."""
-    os.makedirs(output_dir, exist_ok=True)
+_VALUE_ENDS = set(" \t\r\n,:]}")
+
+
+class JSONStream:
+    """Decode JSON values one at a time from a file read in blocks."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f, block_size=READ_BLOCK):
+        self.f = f
+        self.block_size = block_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def _fill(self, size):
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + self.text_decoder.decode(data, final=self.eof)
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character, or "" at end of file."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill(self.block_size)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at byte ~{self.bytes_read:,}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next value, reading more of the file until it is complete."""
+        self.peek()
+        size = self.block_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # A number cut off by the end of the buffer decodes as its
+                # prefix ("2." as 2); a complete value is always followed by
+                # whitespace or one of , : ] }
+                if self.buf[end:end + 1] in _VALUE_ENDS or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read geometrically more so a large value is re-decoded O(log n) times
+            self._fill(size)
+            size = max(size, len(self.buf))
+
+
+def iter_json_array(f, key, block_size=READ_BLOCK):
+    """Yield the elements of the array under a top-level key of a JSON object.
 
-    print(f"Loading {json_path}...")
-    with open(json_path) as f:
-        data = json.load(f)
-    features = data.get("features", [])
-    print(f"  {len(features):,} features loaded")
-
-    # Output file paths
-    ann_path = os.path.join(output_dir, "bakta_annotations.tsv")
-    xref_path = os.path.join(output_dir, "bakta_db_xrefs.tsv")
-    pfam_path = os.path.join(output_dir, "bakta_pfam_domains.tsv")
-    amr_path = os.path.join(output_dir, "bakta_amr.tsv")
-
-    # Column definitions
-    ann_fields = [
-        "gene_cluster_id", "length", "gene", "product", "hypothetical",
-        "ec", "go", "cog_id", "cog_category", "kegg_orthology_id",
-        "refseq", "uniparc", "uniref100", "uniref90", "uniref50",
-        "molecular_weight", "isoelectric_point",
-    ]
-    xref_fields = ["gene_cluster_id", "db", "accession"]
-    pfam_fields = [
-        "gene_cluster_id", "pfam_id", "pfam_name", "start", "stop",
-        "score", "evalue", "aa_cov", "hmm_cov",
-    ]
-    amr_fields = [
-        "gene_cluster_id", "amr_gene", "amr_product", "method",
-        "identity", "query_cov", "subject_cov", "accession",
-    ]
-
-    with (
-        open(ann_path, "w", newline="") as ann_f,
-        open(xref_path, "w", newline="") as xref_f,
-        open(pfam_path, "w", newline="") as pfam_f,
-        open(amr_path, "w", newline="") as amr_f,
-    ):
-        ann_w = csv.DictWriter(ann_f, fieldnames=ann_fields, delimiter="\t")
-        xref_w = csv.DictWriter(xref_f, fieldnames=xref_fields, delimiter="\t")
-        pfam_w = csv.DictWriter(pfam_f, fieldnames=pfam_fields, delimiter="\t")
-        amr_w = csv.DictWriter(amr_f, fieldnames=amr_fields, delimiter="\t")
-
-        ann_w.writeheader()
-        xref_w.writeheader()
-        pfam_w.writeheader()
-        amr_w.writeheader()
-
-        counts = {"annotations": 0, "db_xrefs": 0, "pfam_domains": 0, "amr": 0}
-        stats_computed = 0
-        stats_from_json = 0
-
-        for i, feat in enumerate(features):
-            if (i + 1) % 100000 == 0:
-                print(f"  Processing feature {i + 1:,}/{len(features):,}...")
-
-            gene_cluster_id = feat["id"]
-            psc = feat.get("psc") or {}
-            pscc = feat.get("pscc") or {}
-            ups = feat.get("ups") or {}
-            ips = feat.get("ips") or {}
-
-            # Molecular weight and isoelectric point
-            seq_stats = feat.get("seq_stats")
-            if seq_stats:
-                mw = seq_stats.get("molecular_weight", "")
-                pi = seq_stats.get("isoelectric_point", "")
-                stats_from_json += 1
+    Other top-level values are decoded and discarded. Yields nothing if the
+    key is missing.
+    """
+    stream = JSONStream(f, block_size)
+    stream.expect("{")
+    while (c := stream.peek()) != "}":
+        if c == ",":
+            stream.pos += 1
+            continue
+        if c != '"':
+            raise ValueError(f"Malformed JSON object at byte ~{stream.bytes_read:,}")
+        name = stream.value()
+        stream.expect(":")
+        if name != key or stream.peek() != "[":
+            stream.value()
+            continue
+        stream.pos += 1
+        while (c := stream.peek()) != "]":
+            if c == ",":
+                stream.pos += 1
+            elif not c:
+                raise ValueError(f"Truncated {key!r} array")
             else:
-                mw, pi = compute_seq_stats(feat.get("aa", ""))
-                if mw is None:
-                    mw, pi = "", ""
-                else:
-                    stats_computed += 1
-
-            # EC and GO from psc
-            ec_ids = psc.get("ec_ids", [])
-            go_ids = psc.get("go_ids", [])
-
-            # UniRef50: prefer psc, fall back to pscc
-            uniref50 = psc.get("uniref50_id", "") or pscc.get("uniref50_id", "")
-
-            ann_w.writerow({
-                "gene_cluster_id": gene_cluster_id,
-                "length": feat["length"],
-                "gene": feat.get("gene") or "",
-                "product": feat.get("product", ""),
-                "hypothetical": feat.get("hypothetical", False),
-                "ec": ";".join(ec_ids) if ec_ids else "",
-                "go": ";".join(go_ids) if go_ids else "",
-                "cog_id": psc.get("cog_id", ""),
-                "cog_category": psc.get("cog_category", ""),
-                "kegg_orthology_id": psc.get("kegg_orthology_id", ""),
-                "refseq": ups.get("ncbi_nrp_id", ""),
-                "uniparc": ups.get("uniparc_id", ""),
-                "uniref100": ups.get("uniref100_id", ""),
-                "uniref90": ips.get("uniref90_id", ""),
-                "uniref50": uniref50,
-                "molecular_weight": mw,
-                "isoelectric_point": pi,
-            })
-            counts["annotations"] += 1
-
-            # db_xrefs
-            for xref in feat.get("db_xrefs", []):
-                parts = xref.split(":", 1)
-                if len(parts) == 2:
-                    xref_w.writerow({
-                        "gene_cluster_id": gene_cluster_id,
-                        "db": parts[0],
-                        "accession": parts[1],
-                    })
-                    counts["db_xrefs"] += 1
-
-            # Pfam domains
-            for pfam in feat.get("pfams", []):
-                pfam_w.writerow({
-                    "gene_cluster_id": gene_cluster_id,
-                    "pfam_id": pfam.get("id", ""),
-                    "pfam_name": pfam.get("name", ""),
-                    "start": pfam.get("start", ""),
-                    "stop": pfam.get("stop", ""),
-                    "score": pfam.get("score", ""),
-                    "evalue": pfam.get("evalue", ""),
-                    "aa_cov": pfam.get("aa_cov", ""),
-                    "hmm_cov": pfam.get("hmm_cov", ""),
-                })
-                counts["pfam_domains"] += 1
-
-            # AMR expert annotations (amrfinder only)
-            for expert in feat.get("expert", []):
-                if expert.get("type") == "amrfinder":
-                    amr_w.writerow({
-                        "gene_cluster_id": gene_cluster_id,
-                        "amr_gene": expert.get("gene", ""),
-                        "amr_product": expert.get("product", ""),
-                        "method": expert.get("method", ""),
-                        "identity": expert.get("identity", ""),
-                        "query_cov": expert.get("query_cov", ""),
-                        "subject_cov": expert.get("subject_cov", ""),
-                        "accession": expert.get("id", ""),
-                    })
-                    counts["amr"] += 1
-
-    print(f"\nResults written to {output_dir}/")
-    print(f"  annotations:  {counts['annotations']:>12,} rows")
-    print(f"  db_xrefs:     {counts['db_xrefs']:>12,} rows")
-    print(f"  pfam_domains: {counts['pfam_domains']:>12,} rows")
-    print(f"  amr:          {counts['amr']:>12,} rows")
-    print(f"  seq_stats:    {stats_from_json:>12,} from JSON, {stats_computed:,} computed")
+                yield stream.value()
+        stream.pos += 1
+
+
+class TSVTable:
+    """Batched TSV writer for one table."""
+
+    def __init__(self, path, columns):
+        self.f = open(path, "w", newline="")
+        self.writer = csv.writer(self.f, delimiter="\t")
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetTable:
+    """Batched Parquet writer for one table; "" becomes null in typed columns."""
+
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([(name, getattr(pa, t)()) for name, t in columns])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        if not rows:
+            return
+        arrays = []
+        for i, field in enumerate(self.schema):
+            values = [row[i] for row in rows]
+            if field.type != self.pa.string():
+                values = [None if v == "" else v for v in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def feature_rows(feat, out, counts):
+    """Append one feature's rows to the per-table lists in out.
+
+    Annotation rows still missing molecular weight and pI are listed with
+    their sequence in out["seq_stats"] for fill_seq_stats().
+    """
+    gene_cluster_id = feat["id"]
+    psc = feat.get("psc") or {}
+    pscc = feat.get("pscc") or {}
+    ups = feat.get("ups") or {}
+    ips = feat.get("ips") or {}
+
+    # Molecular weight and isoelectric point
+    seq_stats = feat.get("seq_stats")
+    if seq_stats:
+        mw = seq_stats.get("molecular_weight", "")
+        pi = seq_stats.get("isoelectric_point", "")
+        counts["stats_from_json"] += 1
+    else:
+        mw, pi = "", ""
+
+    # EC and GO from psc
+    ec_ids = psc.get("ec_ids", [])
+    go_ids = psc.get("go_ids", [])
+
+    # UniRef50: prefer psc, fall back to pscc
+    uniref50 = psc.get("uniref50_id", "") or pscc.get("uniref50_id", "")
+
+    out["bakta_annotations"].append([
+        gene_cluster_id,
+        feat["length"],
+        feat.get("gene") or "",
+        feat.get("product", ""),
+        feat.get("hypothetical", False),
+        ";".join(ec_ids) if ec_ids else "",
+        ";".join(go_ids) if go_ids else "",
+        psc.get("cog_id", ""),
+        psc.get("cog_category", ""),
+        psc.get("kegg_orthology_id", ""),
+        ups.get("ncbi_nrp_id", ""),
+        ups.get("uniparc_id", ""),
+        ups.get("uniref100_id", ""),
+        ips.get("uniref90_id", ""),
+        uniref50,
+        mw,
+        pi,
+    ])
+    if not seq_stats:
+        out["seq_stats"].append((out["bakta_annotations"][-1], feat.get("aa", "")))
+
+    # db_xrefs
+    for xref in feat.get("db_xrefs", []):
+        parts = xref.split(":", 1)
+        if len(parts) == 2:
+            out["bakta_db_xrefs"].append([gene_cluster_id, parts[0], parts[1]])
+
+    # Pfam domains
+    for pfam in feat.get("pfams", []):
+        out["bakta_pfam_domains"].append([
+            gene_cluster_id,
+            pfam.get("id", ""),
+            pfam.get("name", ""),
+            pfam.get("start", ""),
+            pfam.get("stop", ""),
+            pfam.get("score", ""),
+            pfam.get("evalue", ""),
+            pfam.get("aa_cov", ""),
+            pfam.get("hmm_cov", ""),
+        ])
+
+    # AMR expert annotations (amrfinder only)
+    for expert in feat.get("expert", []):
+        if expert.get("type") == "amrfinder":
+            out["bakta_amr"].append([
+                gene_cluster_id,
+                expert.get("gene", ""),
+                expert.get("product", ""),
+                expert.get("method", ""),
+                expert.get("identity", ""),
+                expert.get("query_cov", ""),
+                expert.get("subject_cov", ""),
+                expert.get("id", ""),
+            ])
+
+
+def fill_seq_stats(rows, mws, pis, counts):
+    """Set molecular weight and pI on annotation rows; None leaves them empty."""
+    for row, mw, pi in zip(rows, mws, pis):
+        if mw is not None:
+            row[-2], row[-1] = mw, pi
+            counts["stats_computed"] += 1
+
+
+def write_manifest(output_dir, json_path, ext, n_features, rows_written):
+    """Record each table's file, row count and size in MANIFEST_FILE, atomically."""
+    tables = {}
+    for name, rows in rows_written.items():
+        file_name = f"{name}.{ext}"
+        tables[name] = {
+            "file": file_name,
+            "rows": rows,
+            "bytes": os.path.getsize(os.path.join(output_dir, file_name)),
+        }
+    manifest = {
+        "source": os.path.abspath(json_path),
+        "format": ext,
+        "features": n_features,
+        "tables": tables,
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def extract_tables(json_path, output_dir, fmt="tsv", workers=1):
+    """Extract 4 tables from a bakta JSON file, streaming its features.
+
+    With workers > 1, sequence statistics for each batch are computed on a
+    process pool while later batches are parsed; batches are written in
+    order, with at most `workers` waiting on the pool.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # A manifest from an earlier run would vouch for the tables being rewritten
+    if os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+        os.remove(os.path.join(output_dir, MANIFEST_FILE))
+
+    table_cls = ParquetTable if fmt == "parquet" else TSVTable
+    ext = "parquet" if fmt == "parquet" else "tsv"
+    tables = {
+        name: table_cls(os.path.join(output_dir, f"{name}.{ext}"), columns)
+        for name, columns in TABLES.items()
+    }
+    pending = {name: [] for name in TABLES}
+    pending["seq_stats"] = []
+    rows_written = dict.fromkeys(TABLES, 0)
+    counts = {"stats_from_json": 0, "stats_computed": 0}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight = deque()
+
+    def write(batch, stats):
+        rows, mws, pis = stats
+        fill_seq_stats(rows, mws, pis, counts)
+        for name in TABLES:
+            tables[name].write(batch[name])
+            rows_written[name] += len(batch[name])
+
+    def write_oldest():
+        batch, rows, future = in_flight.popleft()
+        write(batch, (rows, *future.result()))
+
+    def flush():
+        nonlocal pending
+        batch = pending
+        pending = {name: [] for name in batch}
+        stats_rows = [row for row, _ in batch["seq_stats"]]
+        seqs = [seq for _, seq in batch["seq_stats"]]
+        if pool is None:
+            write(batch, (stats_rows, *compute_seq_stats_batch(seqs)))
+            return
+        in_flight.append((batch, stats_rows, pool.submit(compute_seq_stats_batch, seqs)))
+        while len(in_flight) > workers:
+            write_oldest()
+
+    file_size = os.path.getsize(json_path)
+    print(f"Streaming features from {json_path} ({file_size / 1e9:.2f} GB)...")
+    n_features = 0
+    try:
+        with open(json_path, "rb") as f:
+            features = iter_json_array(f, "features")
+            for n_features, feat in enumerate(features, 1):
+                feature_rows(feat, pending, counts)
+                if n_features % BATCH_FEATURES == 0:
+                    flush()
+                if n_features % REPORT_INTERVAL == 0:
+                    print(f"  Processing feature {n_features:,} "
+                          f"({f.tell() / max(file_size, 1) * 100:.0f}% of file)...")
+        flush()
+        while in_flight:
+            write_oldest()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        for table in tables.values():
+            table.close()
+    print(f"  {n_features:,} features processed")
+    write_manifest(output_dir, json_path, ext, n_features, rows_written)
+
+    print(f"\nResults written to {output_dir}/ ({ext})")
+    print(f"  annotations:  {rows_written['bakta_annotations']:>12,} rows")
+    print(f"  db_xrefs:     {rows_written['bakta_db_xrefs']:>12,} rows")
+    print(f"  pfam_domains: {rows_written['bakta_pfam_domains']:>12,} rows")
+    print(f"  amr:          {rows_written['bakta_amr']:>12,} rows")
+    print(f"  seq_stats:    {counts['stats_from_json']:>12,} from JSON, "
+          f"{counts['stats_computed']:,} computed")
 
 
 def main():
@@ -196,14 +403,18 @@ def main():
         description="Extract bakta annotation tables from JSON"
     )
     parser.add_argument("json_file", help="Input bakta JSON file")
-    parser.add_argument("output_dir", help="Output directory for TSV files")
+    parser.add_argument("output_dir", help="Output directory for the 4 tables")
+    parser.add_argument("--format", choices=["tsv", "parquet"], default="tsv",
+                        help="Output format (parquet needs pyarrow)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes computing sequence statistics (default: 1, in-process)")
     args = parser.parse_args()
 
     if not os.path.exists(args.json_file):
         print(f"ERROR: Input file not found: {args.json_file}", file=sys.stderr)
         sys.exit(1)
 
-    extract_tables(args.json_file, args.output_dir)
+    extract_tables(args.json_file, args.output_dir, args.format, args.workers)
 
 
 if __name__ == "__main__":
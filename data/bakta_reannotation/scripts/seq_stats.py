@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Batch molecular weight and isoelectric point for protein sequences.
+
+Vectorized equivalent of Biopython's ProteinAnalysis.molecular_weight() and
+isoelectric_point() (average masses, Bjellqvist pKs) for a whole batch of
+sequences at once:
+
+  - one np.bincount over (sequence, residue) gives every residue count
+  - MW adds residue masses from a lookup table position by position across
+    the batch (same order as Biopython), minus water for each peptide bond
+  - pI runs Biopython's bisection (same start, bounds, tolerance and
+    charge summation order) on all sequences together
+
+Sequences are stripped of trailing "*" and upper-cased. Empty sequences and
+sequences with letters Biopython rejects (X, B, Z, J, internal "*", ...)
+get None for both values, as compute_seq_stats did. Values are rounded to
+2 decimals with Python's round(), so they match Biopython's to the printed
+precision (benchmark_seq_stats.py checks this).
+
+compute_seq_stats_parallel() spreads batches over a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Average residue masses (Bio.Data.IUPACData.protein_weights)
+PROTEIN_WEIGHTS = {
+    "A": 89.0932, "C": 121.1582, "D": 133.1027, "E": 147.1293, "F": 165.1891,
+    "G": 75.0666, "H": 155.1546, "I": 131.1729, "K": 146.1876, "L": 131.1729,
+    "M": 149.2113, "N": 132.1179, "O": 255.3134, "P": 115.1305, "Q": 146.1445,
+    "R": 174.201, "S": 105.0926, "T": 119.1192, "U": 168.0532, "V": 117.1463,
+    "W": 204.2252, "Y": 181.1885,
+}
+WATER = 18.0153
+
+# Bjellqvist pKs (Bio.SeqUtils.IsoelectricPoint), in Biopython's summation order
+POSITIVE_PKS = {"Nterm": 7.5, "K": 10.0, "R": 12.0, "H": 5.98}
+NEGATIVE_PKS = {"Cterm": 3.55, "D": 4.05, "E": 4.45, "C": 9.0, "Y": 10.0}
+PK_CTERMINAL = {"D": 4.55, "E": 4.75}
+PK_NTERMINAL = {"A": 7.59, "M": 7.0, "S": 6.93, "P": 8.36, "T": 6.82, "V": 7.44, "E": 7.7}
+PI_START, PI_MIN, PI_MAX, PI_TOLERANCE = 7.775, 4.05, 12.0, 0.0001
+
+_WEIGHTS = np.zeros(256)
+_VALID = np.zeros(256, dtype=bool)
+for _aa, _w in PROTEIN_WEIGHTS.items():
+    _WEIGHTS[ord(_aa)] = _w
+    _VALID[ord(_aa)] = True
+
+
+def _residue_mass_sums(masses, starts, lengths):
+    """Per-sequence sums of masses, added left to right like Biopython's sum().
+
+    A dot product or np.add.reduceat adds in a different order, which moves
+    the last bit often enough to flip the rounded second decimal. Instead
+    walk residue positions, adding position p of every sequence at least
+    p + 1 long, longest sequences first.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    starts = starts[order]
+    # active[p]: how many sequences (longest first) have a residue at p
+    active = np.searchsorted(-lengths[order], -np.arange(lengths.max()), side="left")
+    sums = np.zeros(len(lengths))
+    for p, k in enumerate(active.tolist()):
+        sums[:k] += masses[starts[:k] + p]
+    out = np.empty_like(sums)
+    out[order] = sums
+    return out
+
+
+def _terminal_pks(residues, table, default):
+    """pK per sequence for its terminal residue (byte codes)."""
+    lookup = np.full(256, default)
+    for aa, pk in table.items():
+        lookup[ord(aa)] = pk
+    return lookup[residues]
+
+
+def _charge_at_ph(ph, counts, nterm_pk, cterm_pk):
+    positive = np.zeros_like(ph)
+    for aa, pk in POSITIVE_PKS.items():
+        if aa == "Nterm":
+            positive += 1.0 * (1.0 / (10 ** (ph - nterm_pk) + 1.0))
+        else:
+            positive += counts[:, ord(aa)] * (1.0 / (10 ** (ph - pk) + 1.0))
+    negative = np.zeros_like(ph)
+    for aa, pk in NEGATIVE_PKS.items():
+        if aa == "Cterm":
+            negative += 1.0 * (1.0 / (10 ** (cterm_pk - ph) + 1.0))
+        else:
+            negative += counts[:, ord(aa)] * (1.0 / (10 ** (pk - ph) + 1.0))
+    return positive - negative
+
+
+def isoelectric_points(counts, nterm, cterm):
+    """pI by bisection for sequences given residue counts and terminal residues."""
+    nterm_pk = _terminal_pks(nterm, PK_NTERMINAL, POSITIVE_PKS["Nterm"])
+    cterm_pk = _terminal_pks(cterm, PK_CTERMINAL, NEGATIVE_PKS["Cterm"])
+    counts = counts.astype(np.float64)
+    n = len(counts)
+    ph = np.full(n, PI_START)
+    lo = np.full(n, PI_MIN)
+    hi = np.full(n, PI_MAX)
+    active = np.ones(n, dtype=bool)
+    while True:
+        active &= (hi - lo) > PI_TOLERANCE
+        if not active.any():
+            return ph
+        charge = _charge_at_ph(ph, counts, nterm_pk, cterm_pk)
+        raise_lo = active & (charge > 0.0)
+        lower_hi = active & ~(charge > 0.0)
+        lo = np.where(raise_lo, ph, lo)
+        hi = np.where(lower_hi, ph, hi)
+        ph = np.where(active, (lo + hi) / 2, ph)
+
+
+def compute_seq_stats_batch(seqs):
+    """(molecular_weights, isoelectric_points) lists for a batch of sequences.
+
+    Entries are floats rounded to 2 decimals, or None where Biopython would
+    fail (empty sequence or non-standard letters).
+    """
+    n = len(seqs)
+    mws = [None] * n
+    pis = [None] * n
+    encoded = []
+    index = []
+    for i, seq in enumerate(seqs):
+        data = seq.rstrip("*").upper().encode("ascii", errors="replace")
+        if data:
+            encoded.append(data)
+            index.append(i)
+    if not encoded:
+        return mws, pis
+
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    residues = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    seq_ids = np.repeat(np.arange(len(encoded)), lengths)
+    counts = np.bincount(seq_ids * 256 + residues,
+                         minlength=len(encoded) * 256).reshape(len(encoded), 256)
+
+    valid = ~counts[:, ~_VALID].any(axis=1)
+    ends = np.cumsum(lengths)
+    nterm = residues[ends - lengths]
+    cterm = residues[ends - 1]
+    mw = _residue_mass_sums(_WEIGHTS[residues], ends - lengths, lengths) \
+        - (lengths - 1) * WATER
+    pi = isoelectric_points(counts, nterm, cterm)
+
+    for j in np.flatnonzero(valid).tolist():
+        mws[index[j]] = round(float(mw[j]), 2)
+        pis[index[j]] = round(float(pi[j]), 2)
+    return mws, pis
+
+
+def compute_seq_stats_parallel(seqs, workers=4, batch_size=10_000):
+    """compute_seq_stats_batch over a process pool, in batches, in order."""
+    batches = [seqs[i:i + batch_size] for i in range(0, len(seqs), batch_size)]
+    mws, pis = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch_mws, batch_pis in pool.map(compute_seq_stats_batch, batches):
+            mws.extend(batch_mws)
+            pis.extend(batch_pis)
+    return mws, pis
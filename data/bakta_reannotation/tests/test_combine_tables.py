@@ -0,0 +1,244 @@
+"""Tests for combine_tables.py — in-kernel copies, resume and recombining."""
+
+import errno
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import combine_tables
+from combine_tables import TABLE_NAMES, copy_range
+
+
+class Interrupted(Exception):
+    """Stands in for the job being killed mid-combine."""
+
+
+CHUNKS = ["chunk_000", "chunk_001", "chunk_002", "cts_chunk_000"]
+
+
+def table_rows(chunk, table_name, n=3):
+    return [f"{chunk}_{i}\t{table_name}\tvalue é {i}\n" for i in range(n)]
+
+
+class CombineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        tables_dir = os.path.join(self._tmp.name, "tables")
+        self.final_dir = os.path.join(tables_dir, "final")
+        for name, value in (("TABLES_DIR", tables_dir), ("FINAL_DIR", self.final_dir),
+                            ("PROGRESS_FILE",
+                             os.path.join(self.final_dir, "combine_progress.json"))):
+            patcher = mock.patch.object(combine_tables, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.tables_dir = tables_dir
+        self.rows = {}
+        for chunk in CHUNKS:
+            for table_name in TABLE_NAMES:
+                self.write_chunk(chunk, table_name, table_rows(chunk, table_name))
+
+    def write_chunk(self, chunk, table_name, rows, manifest=True):
+        chunk_dir = os.path.join(self.tables_dir, chunk)
+        os.makedirs(chunk_dir, exist_ok=True)
+        path = os.path.join(chunk_dir, f"{table_name}.tsv")
+        with open(path, "w", newline="") as f:
+            f.write(f"id\ttable\tvalue\n{''.join(rows)}")
+        self.rows[chunk, table_name] = rows
+        manifest_path = os.path.join(chunk_dir, "manifest.json")
+        if not manifest:
+            return
+        try:
+            with open(manifest_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {"format": "tsv", "tables": {}}
+        data["tables"][table_name] = {"file": f"{table_name}.tsv", "rows": len(rows),
+                                      "bytes": os.path.getsize(path)}
+        with open(manifest_path, "w") as f:
+            json.dump(data, f)
+
+    def expected(self, table_name):
+        chunks = sorted(CHUNKS)
+        body = "".join(r for c in chunks for r in self.rows[c, table_name])
+        return f"id\ttable\tvalue\n{body}".encode()
+
+    def combined(self, table_name):
+        with open(os.path.join(self.final_dir, f"{table_name}.tsv"), "rb") as f:
+            return f.read()
+
+    def run_main(self, *args):
+        with mock.patch.object(sys, "argv", ["combine_tables.py", *args]), \
+                mock.patch("builtins.print"):
+            combine_tables.main()
+        with open(os.path.join(self.final_dir, "manifest.json")) as f:
+            return {name: t["rows"] for name, t in json.load(f)["tables"].items()}
+
+
+class TestCopyRange(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.data = bytes(range(256)) * 40
+        self.src = os.path.join(self._tmp.name, "src")
+        with open(self.src, "wb") as f:
+            f.write(self.data)
+
+    def copy(self, methods, offset=5, end=None, dst_offset=3):
+        end = len(self.data) - 7 if end is None else end
+        dst = os.path.join(self._tmp.name, "dst")
+        with open(dst, "wb") as f:
+            f.write(b"#" * dst_offset)
+        with mock.patch.object(combine_tables, "_COPY_METHODS", methods), \
+                mock.patch.object(combine_tables, "COPY_BLOCK", 1000), \
+                open(self.src, "rb") as in_f, open(dst, "r+b") as out_f:
+            out_end = copy_range(in_f.fileno(), out_f.fileno(), offset, end, dst_offset)
+        with open(dst, "rb") as f:
+            out = f.read()
+        self.assertEqual(out, b"#" * dst_offset + self.data[offset:end])
+        self.assertEqual(out_end, len(out))
+
+    def recording(self, method, calls, fail=None):
+        def wrapper(*args):
+            calls.append(method.__name__)
+            if fail is not None:
+                raise OSError(fail, os.strerror(fail))
+            return method(*args)
+        wrapper.__name__ = method.__name__
+        return wrapper
+
+    def test_every_method_copies_in_blocks(self):
+        for method in combine_tables._COPY_METHODS:
+            with self.subTest(method=method.__name__):
+                calls = []
+                self.copy([self.recording(method, calls)])
+                self.assertGreater(len(calls), 1)  # COPY_BLOCK is smaller than the range
+
+    def test_falls_back_when_unsupported(self):
+        calls = []
+        methods = [
+            self.recording(combine_tables._copy_file_range, calls, fail=errno.EXDEV),
+            self.recording(combine_tables._sendfile, calls, fail=errno.EINVAL),
+            self.recording(combine_tables._pread_pwrite, calls),
+        ]
+        self.copy(methods)
+        # Each unsupported method is tried once, then dropped for the rest
+        self.assertEqual(calls[:2], ["_copy_file_range", "_sendfile"])
+        self.assertEqual(set(calls[2:]), {"_pread_pwrite"})
+
+    def test_other_errors_raised(self):
+        methods = [self.recording(combine_tables._pread_pwrite, [], fail=errno.EIO)]
+        with self.assertRaises(OSError):
+            self.copy(methods)
+
+    def test_short_input_raises(self):
+        with self.assertRaises(OSError):
+            self.copy(list(combine_tables._COPY_METHODS), end=len(self.data) + 10)
+
+
+class TestCombine(CombineTestCase):
+
+    def test_output_is_header_plus_every_chunk(self):
+        rows = self.run_main()
+        for table_name in TABLE_NAMES:
+            self.assertEqual(self.combined(table_name), self.expected(table_name))
+            self.assertEqual(rows[table_name], 3 * len(CHUNKS))
+
+    def test_chunk_without_manifest_counted_by_line_index(self):
+        self.write_chunk("chunk_001", "bakta_amr", table_rows("chunk_001", "bakta_amr", 5),
+                         manifest=False)
+        os.remove(os.path.join(self.tables_dir, "chunk_001", "manifest.json"))
+        rows = self.run_main()
+        self.assertEqual(rows["bakta_amr"], 3 * len(CHUNKS) + 2)
+        self.assertEqual(self.combined("bakta_amr"), self.expected("bakta_amr"))
+
+    def test_size_mismatch_with_manifest_rejected(self):
+        path = os.path.join(self.tables_dir, "chunk_002", "bakta_amr.tsv")
+        with open(path, "a") as f:
+            f.write("extra\trow\there\n")
+        with self.assertRaises(ValueError):
+            self.run_main()
+
+    def test_interrupted_run_resumes_after_last_chunk(self):
+        copy = combine_tables.copy_range
+        copied = []
+        limit = [2]
+
+        def failing_copy(src, *args):
+            if len(copied) == limit[0]:
+                raise Interrupted
+            copied.append(src)
+            return copy(src, *args)
+
+        with mock.patch.object(combine_tables, "TABLE_NAMES", ["bakta_annotations"]), \
+                mock.patch.object(combine_tables, "copy_range", failing_copy):
+            with self.assertRaises(Interrupted):
+                self.run_main()
+            with open(combine_tables.PROGRESS_FILE) as f:
+                prog = json.load(f)["bakta_annotations"]
+            self.assertEqual((prog["chunk"], prog["rows"], prog["done"]),
+                             ("chunk_001", 6, False))
+
+            # Bytes written past the checkpoint are truncated away on resume
+            with open(os.path.join(self.final_dir, "bakta_annotations.tsv"), "ab") as f:
+                f.write(b"partial row without newline " * 100)
+            copied.clear()
+            limit[0] = None
+            rows = self.run_main()
+        self.assertEqual(len(copied), 2)  # chunk_002 and cts_chunk_000 only
+        self.assertEqual(rows, {"bakta_annotations": 3 * len(CHUNKS)})
+        self.assertEqual(self.combined("bakta_annotations"),
+                         self.expected("bakta_annotations"))
+
+    def test_changed_chunk_recombines_only_its_table(self):
+        self.run_main()
+        before = {t: os.stat(os.path.join(self.final_dir, f"{t}.tsv")).st_mtime_ns
+                  for t in TABLE_NAMES}
+
+        self.write_chunk("chunk_001", "bakta_pfam_domains",
+                         table_rows("chunk_001", "bakta_pfam_domains", 7))
+        with mock.patch.object(combine_tables, "chunk_table",
+                               wraps=combine_tables.chunk_table) as chunk_table:
+            rows = self.run_main()
+
+        self.assertEqual({args[1] for args, _ in chunk_table.call_args_list},
+                         {"bakta_pfam_domains"})
+        self.assertEqual(rows["bakta_pfam_domains"], 3 * len(CHUNKS) + 4)
+        for table_name in TABLE_NAMES:
+            self.assertEqual(self.combined(table_name), self.expected(table_name))
+            mtime = os.stat(os.path.join(self.final_dir, f"{table_name}.tsv")).st_mtime_ns
+            if table_name != "bakta_pfam_domains":
+                self.assertEqual(mtime, before[table_name])
+
+    def test_removed_chunk_recombines(self):
+        self.run_main()
+        # Re-extracted without the table: gone from the chunk and its manifest
+        chunk_dir = os.path.join(self.tables_dir, "cts_chunk_000")
+        os.remove(os.path.join(chunk_dir, "bakta_amr.tsv"))
+        with open(os.path.join(chunk_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        del manifest["tables"]["bakta_amr"]
+        with open(os.path.join(chunk_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        self.rows["cts_chunk_000", "bakta_amr"] = []
+        rows = self.run_main()
+        self.assertEqual(rows["bakta_amr"], 3 * (len(CHUNKS) - 1))
+        self.assertEqual(self.combined("bakta_amr"), self.expected("bakta_amr"))
+
+    def test_restart_ignores_progress(self):
+        self.run_main()
+        with mock.patch.object(combine_tables, "chunk_table",
+                               wraps=combine_tables.chunk_table) as chunk_table:
+            self.run_main("--restart")
+        self.assertEqual(chunk_table.call_count, len(TABLE_NAMES) * len(CHUNKS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+"""Tests for extract_bakta_tables.py — streaming JSON vs a whole-file json.load."""
+
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import extract_bakta_tables
+from extract_bakta_tables import (
+    TABLES,
+    ParquetTable,
+    extract_tables,
+    feature_rows,
+    fill_seq_stats,
+    iter_json_array,
+)
+from seq_stats import compute_seq_stats_batch
+
+# Read sizes that cut the file inside strings, escapes, numbers and
+# multi-byte UTF-8 characters
+BLOCK_SIZES = [1, 2, 3, 5, 7, 16, 61, 1 << 20]
+
+
+def feature(i):
+    feat = {
+        "id": f"gc_{i}",
+        "length": 100 + i,
+        "gene": ["dnaA", None, "é漢"][i % 3],
+        "product": f'quoted "name" \\ back\\slash\ttab\nline ünïcödé 漢字 😀 #{i}',
+        "hypothetical": i % 2 == 0,
+        "aa": "MKVLAAGIVGLLLAQ" * (1 + i % 3),
+        "psc": {"ec_ids": ["1.1.1.1", "2.7.7.7"], "go_ids": ["GO:0003677"],
+                "cog_id": "COG0593", "cog_category": "L", "uniref50_id": "UniRef50_X"},
+        "ups": {"uniparc_id": f"UPI{i:010d}"},
+        "ips": {"uniref90_id": "UniRef90_é"},
+        "db_xrefs": ["SO:0001217", "UniRef:UniRef50_X", "bad-xref", "GO:0003677:x"],
+        "pfams": [{"id": "PF00308", "name": "Bac_DnaA", "start": 3, "stop": 90,
+                   "score": 123.25, "evalue": 1.5e-30, "aa_cov": 0.9, "hmm_cov": 1.0}],
+        "expert": [
+            {"type": "amrfinder", "gene": "blaTEM", "product": "β-lactamase",
+             "method": "BLASTX", "identity": 99.5, "query_cov": 1.0,
+             "subject_cov": 0.98, "id": "WP_000027057.1"},
+            {"type": "other", "gene": "skip"},
+        ],
+    }
+    if i % 4 == 0:
+        feat["seq_stats"] = {"molecular_weight": 12345.67, "isoelectric_point": 6.5}
+    return feat
+
+
+def bakta_json(n_features, indent=None):
+    doc = {
+        "genome": {"genus": "Escherichia", "note": "\"features\": [not this one]"},
+        "stats": {"no_sequences": 1, "size": 1.25e3},
+        "features": [feature(i) for i in range(n_features)],
+        "sequences": [{"id": "contig_1", "nt": "ACGT" * 10}],
+        "version": {"bakta": "1.9.4"},
+    }
+    return json.dumps(doc, ensure_ascii=False, indent=indent).encode()
+
+
+def expected_rows(json_path):
+    """Rows per table from the whole file via json.load, as extract_tables builds them."""
+    with open(json_path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    out = {name: [] for name in TABLES}
+    out["seq_stats"] = []
+    counts = {"stats_from_json": 0, "stats_computed": 0}
+    for feat in features:
+        feature_rows(feat, out, counts)
+    rows = [row for row, _ in out["seq_stats"]]
+    fill_seq_stats(rows, *compute_seq_stats_batch([seq for _, seq in out["seq_stats"]]),
+                   counts)
+    return {name: out[name] for name in TABLES}
+
+
+def tsv_text(columns, rows):
+    buf = io.StringIO(newline="")
+    writer = csv.writer(buf, delimiter="\t")
+    writer.writerow([name for name, _ in columns])
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def test_matches_json_load_at_every_block_size(self):
+        for indent in (None, 2):
+            data = bakta_json(5, indent)
+            expected = json.loads(data)["features"]
+            for block_size in BLOCK_SIZES:
+                with self.subTest(indent=indent, block_size=block_size):
+                    features = list(iter_json_array(io.BytesIO(data), "features", block_size))
+                    self.assertEqual(features, expected)
+
+    def test_escapes_and_numbers_split_across_blocks(self):
+        data = (b'{"features": [{"s": "a\\"b\\\\c\\u00e9\\ud83d\\ude00\\n"}, '
+                b'12345.678e-3, -0.5, true, null, "\xe6\xbc\xa2\xf0\x9f\x98\x80"]}')
+        for block_size in range(1, 12):
+            with self.subTest(block_size=block_size):
+                features = list(iter_json_array(io.BytesIO(data), "features", block_size))
+                self.assertEqual(features, json.loads(data)["features"])
+
+    def test_missing_key_and_empty_array(self):
+        self.assertEqual(list(iter_json_array(io.BytesIO(b'{"a": [1]}'), "features", 2)), [])
+        self.assertEqual(list(iter_json_array(io.BytesIO(b'{"features": []}'), "features")),
+                         [])
+
+    def test_truncated_file_rejected(self):
+        data = bakta_json(3)[:-40]
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.BytesIO(data), "features", 7))
+
+
+class TestExtractTables(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.json_path = os.path.join(self._tmp.name, "chunk.json")
+        with open(self.json_path, "wb") as f:
+            f.write(bakta_json(7, indent=1))
+        self.expected = expected_rows(self.json_path)
+
+    def extract(self, fmt, block_size, **kwargs):
+        output_dir = os.path.join(self._tmp.name, f"{fmt}_{block_size}")
+        stream = extract_bakta_tables.iter_json_array
+        with mock.patch.object(extract_bakta_tables, "iter_json_array",
+                               lambda f, key: stream(f, key, block_size)), \
+                mock.patch("builtins.print"):
+            extract_tables(self.json_path, output_dir, fmt, **kwargs)
+        return output_dir
+
+    def test_tsv_matches_json_load(self):
+        for block_size in BLOCK_SIZES:
+            with self.subTest(block_size=block_size):
+                output_dir = self.extract("tsv", block_size)
+                for name, columns in TABLES.items():
+                    with open(os.path.join(output_dir, f"{name}.tsv"), newline="") as f:
+                        self.assertEqual(f.read(), tsv_text(columns, self.expected[name]))
+
+    def test_parquet_matches_json_load(self):
+        reference_dir = os.path.join(self._tmp.name, "reference")
+        os.makedirs(reference_dir)
+        for block_size in (3, 1 << 20):
+            with self.subTest(block_size=block_size):
+                output_dir = self.extract("parquet", block_size)
+                for name, columns in TABLES.items():
+                    reference = os.path.join(reference_dir, f"{name}.parquet")
+                    table = ParquetTable(reference, columns)
+                    table.write(self.expected[name])
+                    table.close()
+                    self.assertEqual(
+                        pq.read_table(os.path.join(output_dir, f"{name}.parquet")),
+                        pq.read_table(reference))
+
+    def test_manifest_counts_rows(self):
+        output_dir = self.extract("tsv", 5)
+        with open(os.path.join(output_dir, extract_bakta_tables.MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["features"], 7)
+        self.assertEqual({name: t["rows"] for name, t in manifest["tables"].items()},
+                         {name: len(rows) for name, rows in self.expected.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
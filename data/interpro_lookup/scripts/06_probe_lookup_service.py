@@ -5,54 +5,87 @@ unmatched pangenome cluster reps.
 
 Two-phase approach for 94M sequences:
   Phase 1 (extract): Compute MD5 hashes via Spark → local TSV (~3 GB)
-  Phase 2 (probe):   Query EBI lookup API from the MD5 file, high concurrency
+  Phase 2 (probe):   Query EBI lookup API from the MD5 file, high concurrency.
+                     Each distinct MD5 is probed once; results are kept in a
+                     local SQLite cache (lookup_probe/lookup_cache.sqlite)
+                     that re-runs and sample probes read before the network.
 
 Usage:
   # Phase 1: Extract MD5s for all unmatched clusters
   python 06_probe_lookup_service.py extract
 
-  # Phase 2: Probe the lookup service (resumable, default 25 workers)
-  python 06_probe_lookup_service.py probe --concurrency 25
+  # Phase 2: Probe the lookup service (resumable; concurrency adapts from 25)
+  python 06_probe_lookup_service.py probe --concurrency 25 --max-concurrency 200
 
   # Check progress
   python 06_probe_lookup_service.py status
 
   # Quick test with 10K sample
   python 06_probe_lookup_service.py probe --sample 10000
+
+  # Point the prober at a local stub service (mock_lookup_service.py)
+  python mock_lookup_service.py --port 8080 --error-rate 0.02 --max-in-flight 50 &
+  python 06_probe_lookup_service.py probe --lookup-url http://localhost:8080
 """
 
 import argparse
+import asyncio
 import csv
 import hashlib
 import json
 import os
+import sqlite3
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-import requests
+import httpx
+
+try:
+    import h2  # noqa: F401 — enables HTTP/2 in httpx
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
 
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = SCRIPT_DIR.parent
 PROBE_DIR = DATA_DIR / "lookup_probe"
 
-LOOKUP_URL = "http://www.ebi.ac.uk/interpro/match-lookup"
+sys.path.insert(0, str(SCRIPT_DIR.resolve().parents[1]))
+from tsv_cursor import LineIndexBuilder, TSVCursor  # noqa: E402
+
+# HTTPS so the connection pool can negotiate HTTP/2 when h2 is installed
+LOOKUP_URL = "https://www.ebi.ac.uk/interpro/match-lookup"
 
 # Files
 MD5_FILE = PROBE_DIR / "unmatched_md5s.tsv"       # Phase 1 output
 RESULTS_FILE = PROBE_DIR / "lookup_results.tsv"    # Phase 2 output
-PROGRESS_FILE = PROBE_DIR / "progress.json"        # Phase 2 checkpoint
+JOURNAL_FILE = PROBE_DIR / "progress.jsonl"        # Phase 2 checkpoint journal
+PROGRESS_FILE = PROBE_DIR / "progress.json"        # Legacy checkpoint (read-only)
+CACHE_DB = PROBE_DIR / "lookup_cache.sqlite"       # MD5 → lookup result cache
 
 REQUEST_TIMEOUT = 30
 RETRY_MAX = 3
 RETRY_BACKOFF = 2
 
-# Write results every N sequences
-FLUSH_INTERVAL = 500
+# Append a checkpoint to the journal every N sequences
+CHECKPOINT_INTERVAL = 5000
+# Input rows are resolved in chunks: distinct MD5s of a chunk that are not
+# in the cache are probed once each, then the chunk's rows are written.
+DEDUP_CHUNK = 50_000
+# Store fresh lookup results in the cache every N probes
+CACHE_COMMIT_INTERVAL = 1000
 # Print progress every N sequences
 REPORT_INTERVAL = 5000
 
+# Adaptive concurrency (AIMD): the in-flight window grows by one request
+# per window of fast successes and halves on 429/5xx, transport errors or
+# responses slower than TARGET_LATENCY.
+MIN_CONCURRENCY = 4
+MAX_CONCURRENCY = 200
+TARGET_LATENCY = 2.0  # seconds
+DECREASE_FACTOR = 0.5
+
 IPR = "kescience_interpro"
 PAN = "kbase_ke_pangenome"
 
@@ -63,33 +96,238 @@ def md5_sequence(seq: str) -> str:
     return hashlib.md5(cleaned.encode("utf-8")).hexdigest().upper()
 
 
-def query_lookup(session: requests.Session, md5: str) -> tuple[bool, int, str]:
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit."""
+
+    def __init__(self, initial: int, minimum: int = MIN_CONCURRENCY,
+                 maximum: int = MAX_CONCURRENCY,
+                 target_latency: float = TARGET_LATENCY):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.target_latency = target_latency
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.decreases = 0
+        self._last_decrease = 0.0
+
+    @property
+    def window(self) -> int:
+        """Number of requests that may be in flight."""
+        return int(self.limit)
+
+    def on_success(self, latency: float):
+        if latency > self.target_latency:
+            self.on_congestion()
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_congestion(self):
+        # Requests in flight when congestion starts fail together; count
+        # them as one signal by backing off at most once per target latency.
+        now = time.monotonic()
+        if now - self._last_decrease < self.target_latency:
+            return
+        self._last_decrease = now
+        self.decreases += 1
+        self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+
+
+def _retry_delay(attempt: int, resp: httpx.Response | None = None) -> float:
+    """Exponential backoff, or the server's Retry-After if it sent one."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return RETRY_BACKOFF * (2 ** attempt)
+
+
+async def query_lookup(client: httpx.AsyncClient, lookup_url: str, md5: str,
+                       limiter: AIMDLimiter) -> tuple[bool, int, str]:
     """
-    Query EBI lookup for one MD5.
+    Query EBI lookup for one MD5, reporting latency and congestion to limiter.
     Returns (hit, n_matches, error_or_empty).
     """
-    url = f"{LOOKUP_URL}/matches?md5={md5}"
+    url = f"{lookup_url}/matches?md5={md5}"
+    error = "max retries"
     for attempt in range(RETRY_MAX):
+        resp = None
+        started = time.monotonic()
         try:
-            resp = session.get(url, timeout=REQUEST_TIMEOUT)
+            resp = await client.get(url)
+        except httpx.HTTPError as e:
+            limiter.on_congestion()
+            error = str(e) or type(e).__name__
+        else:
             if resp.status_code == 200:
+                limiter.on_success(time.monotonic() - started)
                 content = resp.text
                 if "<hit>" in content:
                     return (True, content.count("<hit>"), "")
                 return (False, 0, "")
             elif resp.status_code in (204, 404):
+                limiter.on_success(time.monotonic() - started)
                 return (False, 0, "")
-            else:
-                if attempt < RETRY_MAX - 1:
-                    time.sleep(RETRY_BACKOFF * (2 ** attempt))
-                    continue
-                return (False, 0, f"HTTP {resp.status_code}")
-        except requests.RequestException as e:
-            if attempt < RETRY_MAX - 1:
-                time.sleep(RETRY_BACKOFF * (2 ** attempt))
-                continue
-            return (False, 0, str(e))
-    return (False, 0, "max retries")
+            if resp.status_code == 429 or resp.status_code >= 500:
+                limiter.on_congestion()
+            error = f"HTTP {resp.status_code}"
+        if attempt < RETRY_MAX - 1:
+            await asyncio.sleep(_retry_delay(attempt, resp))
+    return (False, 0, error)
+
+
+def lookup_client(limiter: AIMDLimiter) -> httpx.AsyncClient:
+    """Async client whose connection pool fits the limiter's maximum window."""
+    limits = httpx.Limits(max_connections=limiter.maximum,
+                          max_keepalive_connections=limiter.maximum)
+    return httpx.AsyncClient(http2=HTTP2, limits=limits,
+                             timeout=REQUEST_TIMEOUT, follow_redirects=True,
+                             headers={"Accept": "application/xml"})
+
+
+async def probe_md5s(client: httpx.AsyncClient, md5s, lookup_url: str,
+                     limiter: AIMDLimiter, on_result):
+    """
+    Probe each MD5 once, keeping limiter.window requests in flight.
+
+    Refills the window as each request completes rather than draining a
+    batch. on_result(md5, result) is called in completion order.
+    """
+    md5s = iter(md5s)
+    in_flight = {}
+    exhausted = False
+    while True:
+        while not exhausted and len(in_flight) < limiter.window:
+            md5 = next(md5s, None)
+            if md5 is None:
+                exhausted = True
+                break
+            task = asyncio.create_task(
+                query_lookup(client, lookup_url, md5, limiter))
+            in_flight[task] = md5
+        if not in_flight:
+            break
+        done, _ = await asyncio.wait(in_flight,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            on_result(in_flight.pop(task), task.result())
+
+
+class LookupCache:
+    """
+    Persistent MD5 → lookup result cache (SQLite).
+
+    One row per distinct MD5 with its status ('hit', 'miss' or 'error'),
+    match count, error text and when it was checked. Hits and misses are
+    final and never probed again; errors are retried on the next run.
+    """
+
+    _BATCH = 500  # MD5s per IN (...) query, under SQLite's variable limit
+
+    def __init__(self, path: Path = CACHE_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS lookups (
+                md5        TEXT PRIMARY KEY,
+                status     TEXT NOT NULL,
+                n_matches  INTEGER NOT NULL,
+                error      TEXT NOT NULL DEFAULT '',
+                checked_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def resolved(self, md5s) -> dict:
+        """Cached (hit, n_matches, '') results for the given MD5s that are final."""
+        md5s = list(md5s)
+        found = {}
+        for i in range(0, len(md5s), self._BATCH):
+            batch = md5s[i:i + self._BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for md5, status, n_matches in self.conn.execute(
+                    f"SELECT md5, status, n_matches FROM lookups "
+                    f"WHERE status != 'error' AND md5 IN ({placeholders})", batch):
+                found[md5] = (status == "hit", n_matches, "")
+        return found
+
+    def store(self, results: dict):
+        """Record fresh (hit, n_matches, error) results keyed by MD5."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?, ?)",
+            [(md5, "hit" if hit else "error" if error else "miss",
+              n_matches, error, now)
+             for md5, (hit, n_matches, error) in results.items()])
+        self.conn.commit()
+
+    def counts(self) -> dict:
+        """Number of cached MD5s per status."""
+        counts = {"hit": 0, "miss": 0, "error": 0}
+        counts.update(self.conn.execute(
+            "SELECT status, COUNT(*) FROM lookups GROUP BY status"))
+        return counts
+
+    def import_results(self, results_file: Path) -> int:
+        """Seed the cache from a results TSV written before the cache existed."""
+        rows = []
+        with open(results_file, newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                if not row["error"]:
+                    hit = row["hit"] == "True"
+                    rows.append((row["seq_md5"], "hit" if hit else "miss",
+                                 int(row["n_matches"]), "", time.time()))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO lookups VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+async def resolve_md5s(cache: LookupCache, client: httpx.AsyncClient,
+                       md5s, lookup_url: str,
+                       limiter: AIMDLimiter) -> tuple[dict, int]:
+    """
+    Return results for distinct MD5s, probing only those not in the cache.
+
+    Fresh results are written to the cache as they arrive, so an
+    interrupted run keeps what it already paid for. Returns (results,
+    number of MD5s probed).
+    """
+    results = cache.resolved(md5s)
+    todo = [md5 for md5 in md5s if md5 not in results]
+    fresh = {}
+
+    def on_result(md5, result):
+        fresh[md5] = result
+        results[md5] = result
+        if len(fresh) >= CACHE_COMMIT_INTERVAL:
+            cache.store(fresh)
+            fresh.clear()
+
+    await probe_md5s(client, todo, lookup_url, limiter, on_result)
+    cache.store(fresh)
+    return results, len(todo)
+
+
+def open_cache() -> LookupCache:
+    """Open the lookup cache, seeding it from an existing results TSV once."""
+    cache = LookupCache(CACHE_DB)
+    if not any(cache.counts().values()) and RESULTS_FILE.exists():
+        n = cache.import_results(RESULTS_FILE)
+        print(f"Seeded lookup cache with {n:,} results from {RESULTS_FILE.name}")
+    return cache
+
+
+def check_service(lookup_url: str):
+    """Print the lookup service version; exit if it cannot be reached."""
+    try:
+        resp = httpx.get(f"{lookup_url}/version", timeout=10,
+                         follow_redirects=True)
+        print(f"EBI lookup service: HTTP {resp.status_code} — {resp.text.strip()}")
+    except Exception as e:
+        print(f"ERROR: Cannot reach lookup service: {e}")
+        sys.exit(1)
 
 
 # ── Phase 1: Extract ────────────────────────────────────────────────
@@ -101,7 +339,7 @@ def cmd_extract(args):
     PROBE_DIR.mkdir(parents=True, exist_ok=True)
 
     if MD5_FILE.exists() and not args.force:
-        n_lines = sum(1 for _ in open(MD5_FILE)) - 1  # subtract header
+        n_lines = TSVCursor(MD5_FILE).total_rows()
         print(f"MD5 file already exists: {MD5_FILE} ({n_lines:,} entries)")
         print("Use --force to regenerate.")
         return
@@ -190,8 +428,11 @@ def _download_md5s_from_s3(s3_path: str, expected_rows: int):
     # Download and merge
     tmp_file = PROBE_DIR / "unmatched_md5s.tsv.tmp"
     n_rows = 0
+    index = LineIndexBuilder()
     with open(tmp_file, "w") as out:
-        out.write("gene_cluster_id\tseq_md5\tseq_len\n")
+        header = "gene_cluster_id\tseq_md5\tseq_len\n"
+        out.write(header)
+        index.add(len(header))
         for pf in sorted(part_files, key=lambda o: o.object_name):
             resp = client.get_object(bucket, pf.object_name)
             first_line = True
@@ -202,170 +443,200 @@ def _download_md5s_from_s3(s3_path: str, expected_rows: int):
                 if line.strip():
                     # CSV → TSV conversion
                     parts = line.split(",")
-                    out.write("\t".join(parts) + "\n")
+                    row = "\t".join(parts) + "\n"
+                    out.write(row)
+                    index.add(len(row.encode()))
                     n_rows += 1
             resp.close()
 
     tmp_file.rename(MD5_FILE)
+    index.save(MD5_FILE)
     print(f"    Merged {n_rows:,} rows into {MD5_FILE}")
 
 
 # ── Phase 2: Probe ──────────────────────────────────────────────────
 
 def load_progress() -> dict:
-    """Load probe progress."""
-    if PROGRESS_FILE.exists():
+    """Load probe progress: the journal's last entry, else legacy progress.json."""
+    prog = None
+    if JOURNAL_FILE.exists():
+        with open(JOURNAL_FILE) as f:
+            for line in f:
+                try:
+                    prog = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final line from an interrupted write
+    if prog is None and PROGRESS_FILE.exists():
         with open(PROGRESS_FILE) as f:
-            return json.load(f)
-    return {"lines_done": 0, "hits": 0, "misses": 0, "errors": 0}
+            prog = json.load(f)
+    return prog or {"lines_done": 0, "hits": 0, "misses": 0, "errors": 0}
+
+
+class ProbeCheckpoint:
+    """
+    Write probe results in input order and journal progress append-only.
+
+    lines_done always means "the first N input lines are in the results
+    file", and md5_offset is the MD5 file byte offset just past them, so a
+    resume seeks straight there. Each journal entry also records the
+    results file size, so a resume can drop rows written after it.
+    """
+
+    def __init__(self, results_f, journal_f, prog: dict):
+        self.results_f = results_f
+        self.writer = csv.writer(results_f, delimiter="\t")
+        self.journal_f = journal_f
+        self.prog = prog
 
+    def record(self, gcid: str, md5: str, result: tuple, offset: int):
+        hit, n_matches, error = result
+        self.writer.writerow([gcid, md5, hit, n_matches, error])
+        if hit:
+            self.prog["hits"] += 1
+        elif error:
+            self.prog["errors"] += 1
+        else:
+            self.prog["misses"] += 1
+        self.prog["lines_done"] += 1
+        self.prog["md5_offset"] = offset
+        if self.prog["lines_done"] % CHECKPOINT_INTERVAL == 0:
+            self.save()
 
-def save_progress(prog: dict):
-    """Save probe progress."""
-    with open(PROGRESS_FILE, "w") as f:
-        json.dump(prog, f)
+    def save(self):
+        self.results_f.flush()
+        entry = dict(self.prog, results_bytes=self.results_f.tell(),
+                     time=time.time())
+        self.journal_f.write(json.dumps(entry) + "\n")
+        self.journal_f.flush()
+
+
+def resume_offset(cursor: TSVCursor, prog: dict) -> int:
+    """MD5 file byte offset to resume probing from.
+
+    Checkpoints written before md5_offset was journaled only have
+    lines_done; those are mapped through the MD5 file's line index.
+    """
+    size = MD5_FILE.stat().st_size
+    if prog.get("md5_file_size", size) != size:
+        print(f"ERROR: {MD5_FILE} changed since the last checkpoint "
+              f"({prog['md5_file_size']:,} → {size:,} bytes).")
+        print("Remove the journal to start over.")
+        sys.exit(1)
+    prog["md5_file_size"] = size
+    if "md5_offset" in prog:
+        return prog["md5_offset"]
+    return cursor.offset_of(prog["lines_done"])
 
 
 def cmd_probe(args):
     """Probe the EBI lookup service using the extracted MD5 file."""
     PROBE_DIR.mkdir(parents=True, exist_ok=True)
-    concurrency = args.concurrency
+    limiter = AIMDLimiter(args.concurrency, maximum=args.max_concurrency)
 
     # Handle --sample mode: extract a small sample directly
     if args.sample:
-        return cmd_probe_sample(args.sample, concurrency)
+        return cmd_probe_sample(args.sample, limiter, args.lookup_url)
 
     if not MD5_FILE.exists():
         print(f"MD5 file not found: {MD5_FILE}")
         print("Run 'extract' first.")
         sys.exit(1)
 
-    # Count total lines
-    total_lines = sum(1 for _ in open(MD5_FILE)) - 1  # subtract header
-    print(f"MD5 file: {total_lines:,} entries")
-
     # Load progress
     prog = load_progress()
+    cursor = TSVCursor(MD5_FILE)
+    total_lines = prog["total_lines"] = cursor.total_rows()
+    print(f"MD5 file: {total_lines:,} entries")
     start_line = prog["lines_done"]
+    start_offset = resume_offset(cursor, prog)
     if start_line > 0:
-        print(f"Resuming from line {start_line:,} ({start_line/total_lines*100:.1f}% done)")
+        print(f"Resuming from line {start_line:,} at byte {start_offset:,} "
+              f"({start_line/total_lines*100:.1f}% done)")
         print(f"  Previous: {prog['hits']:,} hits, {prog['misses']:,} misses, {prog['errors']:,} errors")
 
-    # Test connectivity
-    session = requests.Session()
-    session.headers.update({"Accept": "application/xml"})
-    try:
-        resp = session.get(f"{LOOKUP_URL}/version", timeout=10)
-        print(f"EBI lookup service: HTTP {resp.status_code} — {resp.text.strip()}")
-    except Exception as e:
-        print(f"ERROR: Cannot reach lookup service: {e}")
-        sys.exit(1)
+    cache = open_cache()
+    check_service(args.lookup_url)
 
-    print(f"Starting probe with {concurrency} concurrent workers...")
+    print(f"Starting probe with {limiter.window} concurrent requests "
+          f"(adaptive, {limiter.minimum}-{limiter.maximum}, HTTP/2: {HTTP2})...")
     t0 = time.time()
 
-    # Open results file for appending
+    # Open results file for appending, dropping rows past the checkpoint
     results_mode = "a" if start_line > 0 and RESULTS_FILE.exists() else "w"
+    if results_mode == "a" and "results_bytes" in prog:
+        os.truncate(RESULTS_FILE, prog["results_bytes"])
     results_f = open(RESULTS_FILE, results_mode, newline="")
-    writer = csv.writer(results_f, delimiter="\t")
     if results_mode == "w":
-        writer.writerow(["gene_cluster_id", "seq_md5", "hit", "n_matches", "error"])
+        csv.writer(results_f, delimiter="\t").writerow(
+            ["gene_cluster_id", "seq_md5", "hit", "n_matches", "error"])
+    journal_f = open(JOURNAL_FILE, "a")
+    checkpoint = ProbeCheckpoint(results_f, journal_f, prog)
+    report_start = time.time()
+    probed = 0
+
+    def report(lines_done):
+        nonlocal report_start
+        now = time.time()
+        elapsed = now - t0
+        recent_rate = REPORT_INTERVAL / (now - report_start) if now > report_start else 0
+        total_rate = (lines_done - start_line) / elapsed if elapsed > 0 else 0
+        pct = lines_done / total_lines * 100
+        hit_rate = prog["hits"] / lines_done * 100
+        eta_h = (total_lines - lines_done) / total_rate / 3600 if total_rate > 0 else 0
+        print(f"  {lines_done:>12,}/{total_lines:,} ({pct:.1f}%) | "
+              f"rate: {recent_rate:.0f}/s (avg {total_rate:.0f}/s) | "
+              f"probed: {probed:,} | window: {limiter.window} | "
+              f"hits: {hit_rate:.1f}% | "
+              f"ETA: {eta_h:.1f}h | "
+              f"errors: {prog['errors']}")
+        report_start = now
+
+    def pending_chunks():
+        gcid_col = cursor.column("gene_cluster_id")
+        md5_col = cursor.column("seq_md5")
+        chunk = []
+        for fields, offset in cursor.rows(start_offset):
+            chunk.append((fields[gcid_col], fields[md5_col], offset))
+            if len(chunk) >= DEDUP_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def run():
+        nonlocal probed
+        async with lookup_client(limiter) as client:
+            for chunk in pending_chunks():
+                md5s = list(dict.fromkeys(md5 for _, md5, _ in chunk))
+                results, n_probed = await resolve_md5s(
+                    cache, client, md5s, args.lookup_url, limiter)
+                probed += n_probed
+                for gcid, md5, offset in chunk:
+                    checkpoint.record(gcid, md5, results[md5], offset)
+                    if prog["lines_done"] % REPORT_INTERVAL == 0:
+                        report(prog["lines_done"])
 
-    hits = prog["hits"]
-    misses = prog["misses"]
-    errors = prog["errors"]
-    lines_done = start_line
-    batch_start = time.time()
-
-    with open(MD5_FILE) as f:
-        reader = csv.DictReader(f, delimiter="\t")
-
-        # Skip already-done lines
-        for _ in range(start_line):
-            next(reader, None)
-
-        # Process in batches using thread pool
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            # Submit work in windows to control memory
-            WINDOW = concurrency * 20  # keep ~20 requests queued per worker
-            window_entries = []
-            futures = {}
-
-            for row in reader:
-                gcid = row["gene_cluster_id"]
-                md5 = row["seq_md5"]
-
-                future = executor.submit(query_lookup, session, md5)
-                futures[future] = (gcid, md5)
-
-                if len(futures) >= WINDOW:
-                    # Drain completed futures
-                    _drain_futures(futures, writer, prog, results_f)
-                    lines_done = prog["lines_done"]
-                    hits = prog["hits"]
-                    misses = prog["misses"]
-                    errors = prog["errors"]
-
-                    if lines_done % REPORT_INTERVAL < WINDOW:
-                        elapsed = time.time() - t0
-                        recent_rate = REPORT_INTERVAL / (time.time() - batch_start) if time.time() > batch_start else 0
-                        total_rate = (lines_done - start_line) / elapsed if elapsed > 0 else 0
-                        pct = lines_done / total_lines * 100
-                        hit_rate = hits / lines_done * 100 if lines_done > 0 else 0
-                        eta_h = (total_lines - lines_done) / total_rate / 3600 if total_rate > 0 else 0
-                        print(f"  {lines_done:>12,}/{total_lines:,} ({pct:.1f}%) | "
-                              f"rate: {recent_rate:.0f}/s (avg {total_rate:.0f}/s) | "
-                              f"hits: {hit_rate:.1f}% | "
-                              f"ETA: {eta_h:.1f}h | "
-                              f"errors: {errors}")
-                        batch_start = time.time()
-
-            # Drain remaining
-            if futures:
-                _drain_futures(futures, writer, prog, results_f)
-
-    results_f.close()
+    try:
+        asyncio.run(run())
+    finally:
+        # Final save (also on interrupt: only written rows are recorded)
+        checkpoint.save()
+        journal_f.close()
+        results_f.close()
+        cache.close()
     elapsed = time.time() - t0
 
-    # Final save
-    save_progress(prog)
-
     lines_done = prog["lines_done"]
-    hits = prog["hits"]
-    misses = prog["misses"]
-    errors = prog["errors"]
-
     print(f"\nCompleted in {elapsed:.0f}s ({elapsed/60:.1f} min, {elapsed/3600:.1f}h)")
     total_rate = (lines_done - start_line) / elapsed if elapsed > 0 else 0
-    print(f"Throughput: {total_rate:.0f} sequences/second")
+    print(f"Throughput: {total_rate:.0f} sequences/second "
+          f"(final window {limiter.window}, {limiter.decreases} backoffs)")
+    print(f"Probed {probed:,} distinct MD5s for {lines_done - start_line:,} rows; "
+          f"the rest came from the lookup cache")
     _print_report(prog, total_lines)
 
 
-def _drain_futures(futures, writer, prog, results_f):
-    """Drain all completed futures, write results, update progress."""
-    done_futures = []
-    for future in as_completed(futures):
-        gcid, md5 = futures[future]
-        hit, n_matches, error = future.result()
-        writer.writerow([gcid, md5, hit, n_matches, error])
-
-        if hit:
-            prog["hits"] += 1
-        elif error:
-            prog["errors"] += 1
-        else:
-            prog["misses"] += 1
-        prog["lines_done"] += 1
-        done_futures.append(future)
-
-    for f in done_futures:
-        del futures[f]
-
-    results_f.flush()
-    save_progress(prog)
-
-
-def cmd_probe_sample(n_sample, concurrency):
+def cmd_probe_sample(n_sample, limiter, lookup_url):
     """Quick sample probe — extracts sequences from Spark inline."""
     from berdl_notebook_utils.setup_spark_session import get_spark_session
 
@@ -387,35 +658,37 @@ def cmd_probe_sample(n_sample, concurrency):
     spark.stop()
     print(f"  Got {len(rows):,} sequences")
 
-    session = requests.Session()
-    session.headers.update({"Accept": "application/xml"})
-    resp = session.get(f"{LOOKUP_URL}/version", timeout=10)
-    print(f"EBI lookup: {resp.text.strip()}")
+    sample_md5s = [md5_sequence(row["faa_sequence"]) for row in rows]
+    md5s = list(dict.fromkeys(sample_md5s))
+    cache = open_cache()
+    print(f"  {len(md5s):,} distinct MD5s, "
+          f"{len(cache.resolved(md5s)):,} already in the lookup cache")
+    check_service(lookup_url)
+
+    async def run():
+        async with lookup_client(limiter) as client:
+            return await resolve_md5s(cache, client, md5s, lookup_url, limiter)
 
-    hits = misses = errors = 0
     t0 = time.time()
+    try:
+        results, probed = asyncio.run(run())
+    finally:
+        cache.close()
 
-    with ThreadPoolExecutor(max_workers=concurrency) as executor:
-        future_map = {}
-        for row in rows:
-            md5 = md5_sequence(row["faa_sequence"])
-            future = executor.submit(query_lookup, session, md5)
-            future_map[future] = row["gene_cluster_id"]
-
-        for i, future in enumerate(as_completed(future_map)):
-            hit, n_matches, error = future.result()
-            if hit:
-                hits += 1
-            elif error:
-                errors += 1
-            else:
-                misses += 1
-            if (i + 1) % 1000 == 0:
-                print(f"  {i+1:,} done, hit rate: {hits/(i+1)*100:.1f}%")
+    hits = misses = errors = 0
+    for md5 in sample_md5s:
+        hit, n_matches, error = results[md5]
+        if hit:
+            hits += 1
+        elif error:
+            errors += 1
+        else:
+            misses += 1
 
     elapsed = time.time() - t0
     total = hits + misses + errors
-    print(f"\nSample of {total:,} in {elapsed:.0f}s ({total/elapsed:.0f}/s)")
+    print(f"\nSample of {total:,} in {elapsed:.0f}s "
+          f"({probed:,} probed, {probed/elapsed if elapsed else 0:.0f}/s)")
     print(f"  Hits:   {hits:>8,} ({hits/total*100:.1f}%)")
     print(f"  Misses: {misses:>8,} ({misses/total*100:.1f}%)")
     print(f"  Errors: {errors:>8,}")
@@ -430,17 +703,25 @@ def cmd_probe_sample(n_sample, concurrency):
 
 def cmd_status(args):
     """Show current progress."""
-    if not PROGRESS_FILE.exists():
+    if not JOURNAL_FILE.exists() and not PROGRESS_FILE.exists():
         print("No probe in progress. Run 'extract' then 'probe'.")
         return
 
     prog = load_progress()
-    total_lines = 0
+    total_lines = prog.get("total_lines", 0)
     if MD5_FILE.exists():
-        total_lines = sum(1 for _ in open(MD5_FILE)) - 1
+        total_lines = TSVCursor(MD5_FILE).total_rows()
 
     _print_report(prog, total_lines)
 
+    if CACHE_DB.exists():
+        cache = LookupCache(CACHE_DB)
+        counts = cache.counts()
+        cache.close()
+        print(f"\n  Lookup cache: {sum(counts.values()):,} distinct MD5s "
+              f"({counts['hit']:,} hits, {counts['miss']:,} misses, "
+              f"{counts['error']:,} errors to retry)")
+
 
 def _print_report(prog, total_lines):
     """Print summary."""
@@ -489,7 +770,12 @@ def main():
     # probe
     p_probe = sub.add_parser("probe", help="Phase 2: Query EBI lookup service")
     p_probe.add_argument("--concurrency", type=int, default=25,
-                         help="Concurrent API requests (default: 25)")
+                         help="Initial concurrent API requests (default: 25)")
+    p_probe.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY,
+                         help="Upper bound for adaptive concurrency "
+                              f"(default: {MAX_CONCURRENCY})")
+    p_probe.add_argument("--lookup-url", default=LOOKUP_URL,
+                         help="Lookup service base URL (default: EBI)")
     p_probe.add_argument("--sample", type=int, metavar="N",
                          help="Quick sample of N sequences (skips extract)")
 
@@ -24,18 +24,34 @@ InterProScan TSV format (11 or 15 columns depending on options):
   14. go_annotations (if -goterms)
   15. pathways (if -pa)
 
+Well-formed lines (15 tab-separated fields and nothing normalization
+would change) are copied through in large blocks; only
+blocks containing malformed lines (short rows, blank lines, CR line
+endings, stray whitespace, quotes) are parsed and normalized row by row.
+With --shards N the splits are divided into N contiguous shards written
+in parallel, each with its own header, and a manifest
+(<output stem>.manifest.json) records per-split and per-shard row counts.
+
 Usage:
   # Point at the directory of InterProScan TSV results
   python 08_collect_results.py /path/to/results/
 
+  # 64 sharded outputs written by 16 processes
+  python 08_collect_results.py /path/to/results/ --shards 64 --workers 16
+
   # Or upload from MinIO path
   python 08_collect_results.py --minio-path cts/io/psdehal/interproscan_results/
 """
 
 import argparse
 import csv
+import io
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from operator import methodcaller
 from pathlib import Path
 
 HEADER = [
@@ -55,49 +71,193 @@ HEADER = [
     "go_annotations",
     "pathways",
 ]
+N_COLUMNS = len(HEADER)
+
+# Read splits in blocks of this size (cut back to the last newline)
+BLOCK_SIZE = 16 << 20
+# Bytes that send a block to normalization wherever they occur: quotes
+# (csv quoting) and CR, VT, FF (line breaks / whitespace strip() removes)
+_NEEDS_NORMALIZING = (b'"', b"\r", b"\x0b", b"\x0c")
+# UTF-8 encodings of every character str.strip() removes (the last is U+3000)
+_WHITESPACE = tuple(chr(c).encode() for c in range(0x3001) if chr(c).isspace())
+_count_tabs = methodcaller("count", b"\t")
+_starts_with_blank = methodcaller("startswith", _WHITESPACE)
+
+
+def _ends_with_blank(line: bytes) -> bool:
+    return line.rstrip(b"\t").endswith(_WHITESPACE)
+
+
+def well_formed(block: bytes) -> bool:
+    """True if every line of block (complete lines only) can be copied as is.
 
+    Lines must have exactly 15 fields (so no blank lines) and nothing at
+    either end for strip() to remove, Unicode whitespace included. Trailing
+    tabs alone are harmless: strip() drops them and padding puts them back.
+    """
+    if not block.endswith(b"\n"):
+        return False
+    if any(byte in block for byte in _NEEDS_NORMALIZING):
+        return False
+    lines = block.split(b"\n")
+    lines.pop()  # empty string after the final newline
+    return (set(map(_count_tabs, lines)) == {N_COLUMNS - 1}
+            and not any(map(_starts_with_blank, lines))
+            and not any(map(_ends_with_blank, lines)))
 
-def collect_results(results_dir: str, output_file: str):
-    """Combine all InterProScan TSV files into one with header."""
+
+def normalize_block(block: bytes) -> tuple[bytes, int]:
+    """Strip, pad/truncate to 15 columns and drop blank lines; return (data, rows)."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter="\t", lineterminator="\n")
+    n_rows = 0
+    # Same line breaks as text-mode iteration: \n, \r\n and lone \r
+    for line in block.decode().replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        # InterProScan TSV has no header, just data
+        parts = line.split("\t")
+        # Pad to 15 columns if needed
+        parts.extend([""] * (N_COLUMNS - len(parts)))
+        writer.writerow(parts[:N_COLUMNS])
+        n_rows += 1
+    return out.getvalue().encode(), n_rows
+
+
+def read_blocks(path, block_size=BLOCK_SIZE):
+    """Yield blocks of complete lines (the last may lack a final newline)."""
+    with open(path, "rb") as f:
+        carry = b""
+        while chunk := f.read(block_size):
+            chunk = carry + chunk
+            cut = chunk.rfind(b"\n") + 1
+            if cut == 0:
+                carry = chunk
+                continue
+            carry = chunk[cut:]
+            yield chunk[:cut]
+        if carry:
+            yield carry
+
+
+def copy_split(tsv_file, out) -> dict:
+    """Append one split's rows to out; return its row counts."""
+    n_rows = 0
+    n_normalized_blocks = 0
+    for block in read_blocks(tsv_file):
+        if well_formed(block):
+            out.write(block)
+            n_rows += block.count(b"\n")
+        else:
+            data, rows = normalize_block(block)
+            out.write(data)
+            n_rows += rows
+            n_normalized_blocks += 1
+    return {"rows": n_rows, "normalized_blocks": n_normalized_blocks}
+
+
+def collect_shard(tsv_files, output_file, report_every=0) -> dict:
+    """Concatenate split files, in order, into output_file with a header."""
+    splits = {}
+    n_rows = 0
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "wb", buffering=BLOCK_SIZE) as out:
+        out.write(("\t".join(HEADER) + "\n").encode())
+        for i, tsv_file in enumerate(tsv_files, 1):
+            stats = copy_split(tsv_file, out)
+            splits[Path(tsv_file).name] = stats
+            n_rows += stats["rows"]
+            if report_every and i % report_every == 0:
+                print(f"  Processed {i}/{len(tsv_files)} files, {n_rows:,} rows so far")
+    os.replace(tmp_file, output_file)
+    return {
+        "file": os.path.basename(output_file),
+        "rows": n_rows,
+        "bytes": os.path.getsize(output_file),
+        "splits": splits,
+    }
+
+
+def shard_paths(output_file: str, n_shards: int) -> list[str]:
+    if n_shards == 1:
+        return [output_file]
+    stem, ext = os.path.splitext(output_file)
+    return [f"{stem}.part-{i:05d}{ext}" for i in range(n_shards)]
+
+
+def manifest_path(output_file: str) -> str:
+    return f"{os.path.splitext(output_file)[0]}.manifest.json"
+
+
+def collect_results(results_dir: str, output_file: str, n_shards: int = 1,
+                    workers: int = 1):
+    """Combine all InterProScan TSV files into one or more files with header."""
     results_path = Path(results_dir)
-    tsv_files = sorted(results_path.glob("split_*.tsv"))
+    tsv_files = sorted(str(p) for p in results_path.glob("split_*.tsv"))
 
     if not tsv_files:
         print(f"No split_*.tsv files found in {results_dir}")
         sys.exit(1)
 
+    n_shards = max(1, min(n_shards, len(tsv_files)))
     print(f"Found {len(tsv_files)} result files in {results_dir}")
+    t0 = time.time()
 
-    n_rows = 0
-    n_empty = 0
-    with open(output_file, "w", newline="") as out:
-        writer = csv.writer(out, delimiter="\t")
-        writer.writerow(HEADER)
-
-        for tsv_file in tsv_files:
-            file_rows = 0
-            with open(tsv_file) as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    # InterProScan TSV has no header, just data
-                    parts = line.split("\t")
-                    # Pad to 15 columns if needed
-                    while len(parts) < 15:
-                        parts.append("")
-                    writer.writerow(parts[:15])
-                    file_rows += 1
-                    n_rows += 1
-
-            if file_rows == 0:
-                n_empty += 1
-
-            if (tsv_files.index(tsv_file) + 1) % 1000 == 0:
-                print(f"  Processed {tsv_files.index(tsv_file) + 1}/{len(tsv_files)} files, "
-                      f"{n_rows:,} rows so far")
-
-    print(f"\nDone: {n_rows:,} rows from {len(tsv_files)} files → {output_file}")
+    # Contiguous runs of splits, so shard order follows split order
+    bounds = [len(tsv_files) * i // n_shards for i in range(n_shards + 1)]
+    jobs = [
+        (tsv_files[bounds[i]:bounds[i + 1]], path)
+        for i, path in enumerate(shard_paths(output_file, n_shards))
+    ]
+    if n_shards == 1 or workers <= 1:
+        shards = [collect_shard(files, path, report_every=1000) for files, path in jobs]
+    else:
+        print(f"Writing {n_shards} shards with {workers} workers")
+        shards = [None] * n_shards
+        n_rows = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(collect_shard, files, path): i
+                       for i, (files, path) in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                shards[futures[future]] = shard = future.result()
+                n_rows += shard["rows"]
+                print(f"  [{done:>5}/{n_shards}] {shard['file']}: "
+                      f"{shard['rows']:,} rows ({n_rows:,} so far)")
+
+    splits = {}
+    for shard in shards:
+        shard_splits = shard.pop("splits")
+        shard["n_splits"] = len(shard_splits)
+        for name, stats in shard_splits.items():
+            splits[name] = {"shard": shard["file"], **stats}
+    n_rows = sum(s["rows"] for s in shards)
+    n_empty = sum(1 for s in splits.values() if s["rows"] == 0)
+    n_normalized = sum(1 for s in splits.values() if s["normalized_blocks"])
+    elapsed = time.time() - t0
+
+    manifest = {
+        "results_dir": str(results_path.resolve()),
+        "columns": HEADER,
+        "total_rows": n_rows,
+        "n_splits": len(tsv_files),
+        "n_empty_splits": n_empty,
+        "n_normalized_splits": n_normalized,
+        "collect_time_sec": round(elapsed, 1),
+        "shards": shards,
+        "splits": splits,
+    }
+    with open(manifest_path(output_file), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    outputs = output_file if n_shards == 1 else f"{n_shards} shards ({shards[0]['file']} ...)"
+    total_bytes = sum(s["bytes"] for s in shards)
+    print(f"\nDone: {n_rows:,} rows from {len(tsv_files)} files → {outputs}")
+    print(f"  {total_bytes / 1e9:.1f} GB in {elapsed:.0f}s "
+          f"({total_bytes / 1e6 / max(elapsed, 1e-9):.0f} MB/s); "
+          f"manifest: {manifest_path(output_file)}")
+    if n_normalized:
+        print(f"  ({n_normalized} files had malformed rows that were normalized)")
     if n_empty:
         print(f"  ({n_empty} files had no results — sequences with no domain hits)")
 
@@ -107,14 +267,20 @@ def main():
         description="Collect InterProScan results for BERDL ingest")
     parser.add_argument("results_dir", help="Directory with split_NNNNN.tsv files")
     parser.add_argument("--output", default="interproscan_combined.tsv",
-                        help="Output combined TSV file")
+                        help="Output combined TSV file (shards are named <stem>.part-NNNNN.tsv)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Number of output files to split the results across")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Processes writing shards in parallel")
     args = parser.parse_args()
 
-    collect_results(args.results_dir, args.output)
+    collect_results(args.results_dir, args.output, args.shards, args.workers)
 
     print(f"\nNext steps:")
-    print(f"  1. Upload {args.output} to MinIO:")
-    print(f"     mc cp {args.output} cts/io/psdehal/interproscan_results/")
+    stem, ext = os.path.splitext(args.output)
+    outputs = args.output if args.shards <= 1 else f"{stem}.part-*{ext}"
+    print(f"  1. Upload {outputs} to MinIO:")
+    print(f"     mc cp {outputs} cts/io/psdehal/interproscan_results/")
     print(f"  2. Ingest into BERDL (add interproscan_results table to interpro_ingest.json)")
 
 
@@ -7,169 +7,305 @@ Reads 13,254 split TSV files from InterProScan output and produces:
   2. interproscan_go — deduplicated GO term assignments per protein
   3. interproscan_pathways — deduplicated pathway assignments per protein
 
+Each split is read in bounded blocks with pyarrow and transformed with Arrow
+compute kernels (no per-line Python), and written as one zstd Parquet file
+per split and table: {output_dir}/{domains,go,pathways}/split_NNNNN.parquet.
+Splits are scheduled largest first over a process pool with at most
+--workers in flight, and the Arrow block size is derived from --memory-gb
+so peak memory stays within that budget. Splits whose three Parquet files
+already exist are skipped, so an interrupted run can simply be restarted.
+
 Usage:
   # Run directly (small test)
   python 09_transform_results.py /pscratch/sd/p/psdehal/interproscan/results/
 
   # Submit as SLURM job (production)
   sbatch --account=amsc002 --qos=shared --cpus-per-task=16 --mem=8G --time=02:00:00 \
-    --wrap="python scripts/09_transform_results.py /pscratch/sd/p/psdehal/interproscan/results/ --workers 16"
+    --wrap="python scripts/09_transform_results.py /pscratch/sd/p/psdehal/interproscan/results/ --workers 16 --memory-gb 6"
 """
 
 import argparse
 import os
 import sys
-from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
 RESULTS_DIR_DEFAULT = "/pscratch/sd/p/psdehal/interproscan/results"
 OUTPUT_DIR_DEFAULT = "/pscratch/sd/p/psdehal/interproscan/tables"
 
-DOMAINS_HEADER = "\t".join([
-    "gene_cluster_id", "md5", "seq_len", "analysis",
-    "signature_acc", "signature_desc", "start", "stop",
-    "score", "ipr_acc", "ipr_desc",
-]) + "\n"
-
-GO_HEADER = "\t".join([
-    "gene_cluster_id", "go_id", "go_source", "n_supporting_analyses",
-]) + "\n"
-
-PATHWAYS_HEADER = "\t".join([
-    "gene_cluster_id", "pathway_db", "pathway_id", "n_supporting_analyses",
-]) + "\n"
-
-
-def normalize_reactome_id(rid):
+N_COLUMNS = 15
+# Arrow memory per worker is roughly this multiple of the raw block size
+# (line column, split lists, per-column arrays, output batches).
+BLOCK_EXPANSION = 12
+MIN_BLOCK_SIZE = 1 << 20
+MAX_BLOCK_SIZE = 256 << 20
+PARQUET_COMPRESSION = "zstd"
+
+DOMAINS_SCHEMA = pa.schema([
+    ("gene_cluster_id", pa.string()),
+    ("md5", pa.string()),
+    ("seq_len", pa.int32()),
+    ("analysis", pa.string()),
+    ("signature_acc", pa.string()),
+    ("signature_desc", pa.string()),
+    ("start", pa.int32()),
+    ("stop", pa.int32()),
+    ("score", pa.string()),
+    ("ipr_acc", pa.string()),
+    ("ipr_desc", pa.string()),
+])
+
+GO_SCHEMA = pa.schema([
+    ("gene_cluster_id", pa.string()),
+    ("go_id", pa.string()),
+    ("go_source", pa.string()),
+    ("n_supporting_analyses", pa.int32()),
+])
+
+PATHWAYS_SCHEMA = pa.schema([
+    ("gene_cluster_id", pa.string()),
+    ("pathway_db", pa.string()),
+    ("pathway_id", pa.string()),
+    ("n_supporting_analyses", pa.int32()),
+])
+
+TABLE_DIRS = ("domains", "go", "pathways")
+
+
+def normalize_reactome_ids(ids):
     """Strip species prefix from Reactome IDs: R-HSA-350562 → 350562.
 
     Reactome maps the same pathway across 16+ eukaryotic species, inflating
     the pathway table ~15x. For bacterial proteins these species-specific
     entries are not meaningful; normalizing to the base pathway ID deduplicates
-    them. MetaCyc/KEGG IDs are returned unchanged.
+    them. IDs not of the form R-{species}-{rest} are returned unchanged.
     """
-    # Reactome format: R-{species}-{number} e.g. R-HSA-350562
-    parts = rid.split("-", 2)
-    if len(parts) == 3 and parts[0] == "R":
-        return parts[2]
-    return rid
+    return pc.replace_substring_regex(ids, pattern=r"^R-[^-]*-", replacement="")
 
 
-def process_split(args):
-    """Process a single split TSV file, producing 3 output files."""
-    input_path, domains_dir, go_dir, pathways_dir, norm_reactome, include_reactome = args
-    split_name = os.path.basename(input_path)
+def _open_split(input_path, block_size):
+    """Stream a split as batches with one string column holding each line."""
+    return pacsv.open_csv(
+        input_path,
+        read_options=pacsv.ReadOptions(
+            column_names=["line"], block_size=block_size, use_threads=False),
+        # \x1f never occurs in InterProScan output, so each line is one field
+        parse_options=pacsv.ParseOptions(
+            delimiter="\x1f", quote_char=False, escape_char=False,
+            ignore_empty_lines=True),
+        convert_options=pacsv.ConvertOptions(column_types={"line": pa.string()}),
+    )
 
-    domains_rows = 0
-    go_rows = 0
-    pathways_rows = 0
 
-    # Per-file dedup for GO and pathways: (gene_cluster_id, go_id, source) -> count
-    go_dedup = defaultdict(int)
-    pw_dedup = defaultdict(int)
+def split_columns(lines):
+    """Split TSV lines into N_COLUMNS string arrays, padding short rows with ""."""
+    # Append enough tabs that every line has at least N_COLUMNS fields; the
+    # surplus ends up trailing the last field and is trimmed off it.
+    padded = pc.binary_join_element_wise(lines, "\t" * (N_COLUMNS - 1), "")
+    fields = pc.split_pattern(padded, "\t", max_splits=N_COLUMNS - 1)
+    columns = [pc.list_element(fields, i) for i in range(N_COLUMNS)]
+    columns[-1] = pc.utf8_rtrim(columns[-1], characters="\t")
+    return columns
+
+
+def to_int32(values):
+    """Cast strings to int32; empty, non-integer or out-of-range values become null."""
+    is_int = pc.match_substring_regex(values, r"^[+-]?[0-9]{1,18}$")
+    wide = pc.cast(pc.if_else(is_int, values, pa.scalar(None, pa.string())), pa.int64())
+    in_range = pc.and_(pc.greater_equal(wide, -2**31), pc.less_equal(wide, 2**31 - 1))
+    return pc.cast(pc.if_else(in_range, wide, pa.scalar(None, pa.int64())), pa.int32())
+
 
-    domains_path = os.path.join(domains_dir, split_name)
-    go_path = os.path.join(go_dir, split_name)
-    pathways_path = os.path.join(pathways_dir, split_name)
+def _blank_dash(values):
+    return pc.if_else(pc.equal(values, "-"), "", values)
 
-    with open(input_path) as fin, open(domains_path, "w") as fdom:
-        for line in fin:
-            line = line.rstrip("\n")
-            if not line:
+
+def explode_entries(gene_cluster_ids, values):
+    """(gene_cluster_id, entry) pairs for the |-separated entries of values.
+
+    "-" and empty values contribute nothing; entries are whitespace-trimmed
+    and empty entries dropped.
+    """
+    present = pc.and_(pc.not_equal(values, ""), pc.not_equal(values, "-"))
+    gids = pc.filter(gene_cluster_ids, present)
+    lists = pc.split_pattern(pc.filter(values, present), "|")
+    entries = pc.utf8_trim_whitespace(pc.list_flatten(lists))
+    gids = pc.take(gids, pc.list_parent_indices(lists))
+    keep = pc.not_equal(entries, "")
+    return pc.filter(gids, keep), pc.filter(entries, keep)
+
+
+def go_assignments(gene_cluster_ids, go_terms):
+    """GO terms from GO:0005515(InterPro)|GO:0046933(PANTHER) strings."""
+    gids, entries = explode_entries(gene_cluster_ids, go_terms)
+    # Format: GO:NNNNNNN(Source), split at the last "(". The "((" prefix
+    # gives every entry a "(" to split at; a prefix-only first part means
+    # the entry had no "(" after a non-empty ID.
+    parts = pc.split_pattern(pc.binary_join_element_wise("((", entries, ""), "(",
+                             max_splits=1, reverse=True)
+    head = pc.utf8_slice_codeunits(pc.list_element(parts, 0), 2)
+    tail = pc.utf8_slice_codeunits(pc.list_element(parts, 1), 0, -1)
+    matched = pc.and_(pc.greater(pc.binary_length(head), 0),
+                      pc.ends_with(entries, ")"))
+    go_id = pc.if_else(matched, head, entries)
+    go_source = pc.if_else(matched, tail, "")
+    return pa.table({"gene_cluster_id": gids, "go_id": go_id, "go_source": go_source})
+
+
+def pathway_assignments(gene_cluster_ids, pathways, norm_reactome, include_reactome):
+    """Pathways from MetaCyc:PWY-2941|Reactome:R-HSA-209905 strings."""
+    gids, entries = explode_entries(gene_cluster_ids, pathways)
+    # Split on the first colon: DB:ID (ID may contain colons). The appended
+    # ":" gives every entry a colon to split at and is sliced off the ID.
+    parts = pc.split_pattern(pc.binary_join_element_wise(entries, ":", ""), ":",
+                             max_splits=1)
+    head = pc.list_element(parts, 0)
+    matched = pc.greater(pc.binary_length(head), 0)
+    pw_db = pc.if_else(matched, head, entries)
+    pw_id = pc.if_else(
+        matched, pc.utf8_slice_codeunits(pc.list_element(parts, 1), 0, -1), "")
+    is_reactome = pc.equal(pw_db, "Reactome")
+    if not include_reactome:
+        keep = pc.invert(is_reactome)
+        gids, pw_db, pw_id = (pc.filter(a, keep) for a in (gids, pw_db, pw_id))
+    elif norm_reactome:
+        pw_id = pc.if_else(is_reactome, normalize_reactome_ids(pw_id), pw_id)
+    return pa.table({"gene_cluster_id": gids, "pathway_db": pw_db, "pathway_id": pw_id})
+
+
+def count_assignments(tables, keys, schema):
+    """Deduplicate assignment rows, counting occurrences, sorted by keys.
+
+    tables may hold partial counts (n_supporting_analyses) from earlier
+    blocks; plain assignment rows count once each.
+    """
+    parts = []
+    for table in tables:
+        if "n_supporting_analyses" not in table.column_names:
+            table = table.append_column(
+                "n_supporting_analyses", pa.repeat(pa.scalar(1, pa.int64()), len(table)))
+        parts.append(table.select(keys + ["n_supporting_analyses"]))
+    if not parts:
+        return schema.empty_table()
+    counted = (pa.concat_tables(parts)
+               .group_by(keys, use_threads=False)
+               .aggregate([("n_supporting_analyses", "sum")])
+               .select(keys + ["n_supporting_analyses_sum"])
+               .rename_columns(keys + ["n_supporting_analyses"])
+               .sort_by([(k, "ascending") for k in keys]))
+    return counted.cast(schema)
+
+
+def domain_batch(columns):
+    """Domain rows from split columns (status and date columns dropped)."""
+    gid, md5, seq_len, analysis, sig_acc, sig_desc, start, stop, score = columns[:9]
+    ipr_acc, ipr_desc = columns[11], columns[12]
+    return pa.record_batch([
+        gid, md5, to_int32(seq_len), analysis,
+        sig_acc, sig_desc, to_int32(start), to_int32(stop),
+        score, _blank_dash(ipr_acc), _blank_dash(ipr_desc),
+    ], schema=DOMAINS_SCHEMA)
+
+
+def _write_table(path, table):
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, path)
+
+
+def process_split(args):
+    """Process a single split TSV file, producing 3 Parquet files."""
+    (input_path, output_dir, block_size, norm_reactome, include_reactome) = args
+    split_name = Path(input_path).stem
+    domains_path, go_path, pathways_path = (
+        os.path.join(output_dir, d, f"{split_name}.parquet") for d in TABLE_DIRS)
+
+    domains_rows = 0
+    go_keys = ["gene_cluster_id", "go_id", "go_source"]
+    pw_keys = ["gene_cluster_id", "pathway_db", "pathway_id"]
+    go_parts = []
+    pw_parts = []
+
+    domains_tmp = domains_path + ".tmp"
+    with pq.ParquetWriter(domains_tmp, DOMAINS_SCHEMA,
+                          compression=PARQUET_COMPRESSION) as writer:
+        for batch in _open_split(input_path, block_size):
+            if batch.num_rows == 0:
                 continue
-            parts = line.split("\t")
-            # Pad to 15 columns
-            while len(parts) < 15:
-                parts.append("")
-
-            gene_cluster_id = parts[0]
-            md5 = parts[1]
-            seq_len = parts[2]
-            analysis = parts[3]
-            sig_acc = parts[4]
-            sig_desc = parts[5]
-            start = parts[6]
-            stop = parts[7]
-            score = parts[8]
-            # parts[9] = status (always "T"), parts[10] = date — skip
-            ipr_acc = parts[11] if parts[11] != "-" else ""
-            ipr_desc = parts[12] if parts[12] != "-" else ""
-            go_terms = parts[13]
-            pathways = parts[14]
-
-            # Write domain row
-            fdom.write("\t".join([
-                gene_cluster_id, md5, seq_len, analysis,
-                sig_acc, sig_desc, start, stop,
-                score, ipr_acc, ipr_desc,
-            ]) + "\n")
-            domains_rows += 1
-
-            # Parse GO terms: GO:0005515(InterPro)|GO:0046933(PANTHER)
-            if go_terms and go_terms != "-":
-                for entry in go_terms.split("|"):
-                    entry = entry.strip()
-                    if not entry:
-                        continue
-                    # Format: GO:NNNNNNN(Source)
-                    paren = entry.rfind("(")
-                    if paren > 0 and entry.endswith(")"):
-                        go_id = entry[:paren]
-                        go_source = entry[paren + 1:-1]
-                    else:
-                        go_id = entry
-                        go_source = ""
-                    go_dedup[(gene_cluster_id, go_id, go_source)] += 1
-
-            # Parse pathways: MetaCyc:PWY-2941|Reactome:R-HSA-209905
-            if pathways and pathways != "-":
-                for entry in pathways.split("|"):
-                    entry = entry.strip()
-                    if not entry:
-                        continue
-                    # Split on first colon: DB:ID (ID may contain colons)
-                    colon = entry.find(":")
-                    if colon > 0:
-                        pw_db = entry[:colon]
-                        pw_id = entry[colon + 1:]
-                    else:
-                        pw_db = entry
-                        pw_id = ""
-                    # Skip Reactome unless explicitly requested
-                    if pw_db == "Reactome" and not include_reactome:
-                        continue
-                    # Normalize Reactome IDs to strip species prefix
-                    if norm_reactome and pw_db == "Reactome":
-                        pw_id = normalize_reactome_id(pw_id)
-                    pw_dedup[(gene_cluster_id, pw_db, pw_id)] += 1
-
-    # Write deduplicated GO file
-    with open(go_path, "w") as fgo:
-        for (gid, go_id, go_source), count in sorted(go_dedup.items()):
-            fgo.write(f"{gid}\t{go_id}\t{go_source}\t{count}\n")
-            go_rows += 1
-
-    # Write deduplicated pathways file
-    with open(pathways_path, "w") as fpw:
-        for (gid, pw_db, pw_id), count in sorted(pw_dedup.items()):
-            fpw.write(f"{gid}\t{pw_db}\t{pw_id}\t{count}\n")
-            pathways_rows += 1
-
-    return split_name, domains_rows, go_rows, pathways_rows
+            columns = split_columns(batch.column(0))
+            writer.write_batch(domain_batch(columns))
+            domains_rows += batch.num_rows
+
+            # Collapse each block right away so only distinct assignments
+            # (with partial counts) are held until the split is done
+            go_parts.append(count_assignments(
+                [go_assignments(columns[0], columns[13])], go_keys, GO_SCHEMA))
+            pw_parts.append(count_assignments(
+                [pathway_assignments(columns[0], columns[14],
+                                     norm_reactome, include_reactome)],
+                pw_keys, PATHWAYS_SCHEMA))
+    os.replace(domains_tmp, domains_path)
+
+    go_table = count_assignments(go_parts, go_keys, GO_SCHEMA)
+    pw_table = count_assignments(pw_parts, pw_keys, PATHWAYS_SCHEMA)
+    _write_table(go_path, go_table)
+    _write_table(pathways_path, pw_table)
+
+    return split_name, domains_rows, go_table.num_rows, pw_table.num_rows
+
+
+def existing_counts(output_dir, split_name):
+    """Row counts of a split's Parquet files, or None if any is missing."""
+    paths = [os.path.join(output_dir, d, f"{split_name}.parquet") for d in TABLE_DIRS]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    return tuple(pq.ParquetFile(p).metadata.num_rows for p in paths)
+
+
+def block_size_for(memory_gb, workers):
+    """Arrow block size that keeps workers × blocks within memory_gb."""
+    per_worker = memory_gb * (1 << 30) / workers / BLOCK_EXPANSION
+    return int(min(max(per_worker, MIN_BLOCK_SIZE), MAX_BLOCK_SIZE))
+
+
+def run_pool(work, workers, on_done):
+    """Run process_split over work with at most `workers` splits in flight."""
+    pending = iter(work)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        while True:
+            while len(in_flight) < workers:
+                item = next(pending, None)
+                if item is None:
+                    break
+                in_flight.add(pool.submit(process_split, item))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                on_done(*future.result())
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Transform InterProScan TSV into 3 normalized tables")
+        description="Transform InterProScan TSV into 3 normalized Parquet tables")
     parser.add_argument("results_dir", nargs="?", default=RESULTS_DIR_DEFAULT,
                         help="Directory with split_NNNNN.tsv files")
     parser.add_argument("--output-dir", default=OUTPUT_DIR_DEFAULT,
                         help="Output directory for transformed tables")
     parser.add_argument("--workers", type=int, default=8,
                         help="Number of parallel workers")
+    parser.add_argument("--memory-gb", type=float, default=6.0,
+                        help="Memory budget shared by all workers (sets the read block size)")
     parser.add_argument("--limit", type=int, default=0,
                         help="Process only first N splits (0 = all, for testing)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Re-transform splits whose Parquet files already exist")
     parser.add_argument("--include-reactome", action="store_true",
                         help="Include Reactome pathways (eukaryotic, ~12B extra rows). "
                              "Default: exclude Reactome, keep MetaCyc/KEGG only.")
@@ -188,15 +324,14 @@ def main():
         split_files = split_files[:args.limit]
 
     # Create output directories
-    domains_dir = os.path.join(args.output_dir, "domains")
-    go_dir = os.path.join(args.output_dir, "go")
-    pathways_dir = os.path.join(args.output_dir, "pathways")
-    for d in [domains_dir, go_dir, pathways_dir]:
-        os.makedirs(d, exist_ok=True)
+    for d in TABLE_DIRS:
+        os.makedirs(os.path.join(args.output_dir, d), exist_ok=True)
 
+    block_size = block_size_for(args.memory_gb, args.workers)
     print(f"Input:   {len(split_files)} split files in {args.results_dir}")
-    print(f"Output:  {args.output_dir}/{{domains,go,pathways}}/")
-    print(f"Workers: {args.workers}")
+    print(f"Output:  {args.output_dir}/{{domains,go,pathways}}/*.parquet")
+    print(f"Workers: {args.workers} (memory budget {args.memory_gb:g} GB, "
+          f"{block_size / (1 << 20):.0f} MB read blocks)")
     print()
 
     include_reactome = args.include_reactome
@@ -210,48 +345,42 @@ def main():
         print("Reactome IDs: keeping species-specific (WARNING: ~15x more pathway rows)")
     print()
 
-    # Build work items
-    work = [
-        (str(f), domains_dir, go_dir, pathways_dir, norm_reactome, include_reactome)
-        for f in split_files
-    ]
-
     total_domains = 0
     total_go = 0
     total_pathways = 0
     done = 0
 
-    with ProcessPoolExecutor(max_workers=args.workers) as pool:
-        futures = {pool.submit(process_split, w): w[0] for w in work}
-        for future in as_completed(futures):
-            split_name, d, g, p = future.result()
-            total_domains += d
-            total_go += g
-            total_pathways += p
-            done += 1
-            if done % 500 == 0 or done == len(split_files):
-                print(f"  [{done:>6}/{len(split_files)}] "
-                      f"domains={total_domains:>12,}  "
-                      f"go={total_go:>10,}  "
-                      f"pathways={total_pathways:>10,}")
+    def on_done(split_name, d, g, p):
+        nonlocal total_domains, total_go, total_pathways, done
+        total_domains += d
+        total_go += g
+        total_pathways += p
+        done += 1
+        if done % 500 == 0 or done == len(split_files):
+            print(f"  [{done:>6}/{len(split_files)}] "
+                  f"domains={total_domains:>12,}  "
+                  f"go={total_go:>10,}  "
+                  f"pathways={total_pathways:>10,}")
+
+    # Build work items, largest splits first so stragglers start early
+    work = []
+    for f in sorted(split_files, key=lambda f: f.stat().st_size, reverse=True):
+        counts = None if args.overwrite else existing_counts(args.output_dir, f.stem)
+        if counts is not None:
+            on_done(f.stem, *counts)
+            continue
+        work.append((str(f), args.output_dir, block_size, norm_reactome, include_reactome))
+    if done:
+        print(f"  Skipped {done} splits already transformed (--overwrite to redo)")
+
+    run_pool(work, args.workers, on_done)
 
     print(f"\nTransform complete:")
-    print(f"  Domains:  {total_domains:>14,} rows → {domains_dir}/")
-    print(f"  GO:       {total_go:>14,} rows → {go_dir}/")
-    print(f"  Pathways: {total_pathways:>14,} rows → {pathways_dir}/")
-
-    # Write header files (will be prepended during concatenation)
-    with open(os.path.join(args.output_dir, "domains_header.tsv"), "w") as f:
-        f.write(DOMAINS_HEADER)
-    with open(os.path.join(args.output_dir, "go_header.tsv"), "w") as f:
-        f.write(GO_HEADER)
-    with open(os.path.join(args.output_dir, "pathways_header.tsv"), "w") as f:
-        f.write(PATHWAYS_HEADER)
-
-    print(f"\nNext: concatenate and compress for upload:")
-    print(f"  cat {args.output_dir}/domains_header.tsv {domains_dir}/split_*.tsv | pigz > interproscan_domains.tsv.gz")
-    print(f"  cat {args.output_dir}/go_header.tsv {go_dir}/split_*.tsv | pigz > interproscan_go.tsv.gz")
-    print(f"  cat {args.output_dir}/pathways_header.tsv {pathways_dir}/split_*.tsv | pigz > interproscan_pathways.tsv.gz")
+    for name, rows in zip(TABLE_DIRS, (total_domains, total_go, total_pathways)):
+        print(f"  {name + ':':<9} {rows:>14,} rows → {os.path.join(args.output_dir, name)}/")
+
+    print(f"\nNext: upload and ingest the Parquet tables:")
+    print(f"  python scripts/10_ingest_interproscan_results.py --local-dir {args.output_dir}")
 
 
 if __name__ == "__main__":
@@ -8,7 +8,8 @@ Adds 3 tables to the existing kbase_ke_pangenome database:
   - interproscan_pathways (deduplicated pathway assignments)
 
 Prerequisites:
-  1. Run 09_transform_results.py to produce the 3 gzipped TSVs
+  1. Run 09_transform_results.py to produce the 3 Parquet table directories
+     ({domains,go,pathways}/split_NNNNN.parquet)
   2. Run from JupyterHub (needs berdl_notebook_utils, data_lakehouse_ingest)
 
 Usage:
@@ -34,10 +35,11 @@ from minio import Minio
 BUCKET = "cdm-lake"
 MINIO_PREFIX = "users-general-warehouse/psdehal/data/interproscan_results"
 
-TABLE_FILES = {
-    "interproscan_domains": "interproscan_domains.tsv.gz",
-    "interproscan_go": "interproscan_go.tsv.gz",
-    "interproscan_pathways": "interproscan_pathways.tsv.gz",
+# Table → local directory of per-split Parquet files (uploaded under the table name)
+TABLE_DIRS = {
+    "interproscan_domains": "domains",
+    "interproscan_go": "go",
+    "interproscan_pathways": "pathways",
 }
 
 INGEST_CONFIG = {
@@ -47,12 +49,11 @@ INGEST_CONFIG = {
         "bronze_base": f"s3a://{BUCKET}/{MINIO_PREFIX}/",
         "silver_base": "s3a://cdm-lake/tenant-sql-warehouse/kbase/kbase_ke_pangenome.db",
     },
-    "defaults": {"tsv": {"header": True, "delimiter": "\t", "inferSchema": False}},
     "tables": [
         {
             "name": "interproscan_domains",
-            "format": "tsv",
-            "bronze_path": f"s3a://{BUCKET}/{MINIO_PREFIX}/interproscan_domains.tsv.gz",
+            "format": "parquet",
+            "bronze_path": f"s3a://{BUCKET}/{MINIO_PREFIX}/interproscan_domains/",
             "schema_sql": (
                 "gene_cluster_id STRING, md5 STRING, seq_len INT, analysis STRING, "
                 "signature_acc STRING, signature_desc STRING, start INT, stop INT, "
@@ -61,8 +62,8 @@ INGEST_CONFIG = {
         },
         {
             "name": "interproscan_go",
-            "format": "tsv",
-            "bronze_path": f"s3a://{BUCKET}/{MINIO_PREFIX}/interproscan_go.tsv.gz",
+            "format": "parquet",
+            "bronze_path": f"s3a://{BUCKET}/{MINIO_PREFIX}/interproscan_go/",
             "schema_sql": (
                 "gene_cluster_id STRING, go_id STRING, go_source STRING, "
                 "n_supporting_analyses INT"
@@ -70,8 +71,8 @@ INGEST_CONFIG = {
         },
         {
             "name": "interproscan_pathways",
-            "format": "tsv",
-            "bronze_path": f"s3a://{BUCKET}/{MINIO_PREFIX}/interproscan_pathways.tsv.gz",
+            "format": "parquet",
+            "bronze_path": f"s3a://{BUCKET}/{MINIO_PREFIX}/interproscan_pathways/",
             "schema_sql": (
                 "gene_cluster_id STRING, pathway_db STRING, pathway_id STRING, "
                 "n_supporting_analyses INT"
@@ -95,39 +96,54 @@ def get_minio_client():
     return client
 
 
+def local_parts(local_dir, table_name):
+    """Sorted Parquet part files for a table, or [] if its directory is missing."""
+    table_dir = os.path.join(local_dir, TABLE_DIRS[table_name])
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(f for f in os.listdir(table_dir) if f.endswith(".parquet"))
+
+
 def upload_files(minio_client, local_dir, tables=None):
-    """Upload gzipped TSV files to MinIO."""
-    for table_name, filename in TABLE_FILES.items():
+    """Upload each table's Parquet part files to MinIO."""
+    for table_name, dirname in TABLE_DIRS.items():
         if tables and table_name not in tables:
             continue
-        local_path = os.path.join(local_dir, filename)
-        if not os.path.exists(local_path):
-            print(f"  SKIP  {filename} (not found at {local_path})")
+        parts = local_parts(local_dir, table_name)
+        if not parts:
+            print(f"  SKIP  {table_name} (no Parquet files in {os.path.join(local_dir, dirname)})")
             continue
-        size = os.path.getsize(local_path)
-        object_name = f"{MINIO_PREFIX}/{filename}"
-        print(f"  Uploading {filename} ({size / 1e9:.1f} GB) → {object_name}")
-        minio_client.fput_object(
-            BUCKET, object_name, local_path,
-            content_type="application/gzip",
-        )
+        size = sum(os.path.getsize(os.path.join(local_dir, dirname, f)) for f in parts)
+        print(f"  Uploading {table_name}: {len(parts):,} files ({size / 1e9:.1f} GB) "
+              f"→ {MINIO_PREFIX}/{table_name}/")
+        for f in parts:
+            minio_client.fput_object(
+                BUCKET, f"{MINIO_PREFIX}/{table_name}/{f}",
+                os.path.join(local_dir, dirname, f),
+                content_type="application/vnd.apache.parquet",
+            )
         print(f"    Done.")
 
 
 def verify_files(minio_client, tables=None):
-    """Verify all source files exist on MinIO."""
-    objs = {
-        o.object_name.split("/")[-1]: o.size
-        for o in minio_client.list_objects(BUCKET, prefix=MINIO_PREFIX, recursive=True)
-    }
+    """Verify every table has Parquet files on MinIO."""
+    counts = {}
+    sizes = {}
+    for o in minio_client.list_objects(BUCKET, prefix=MINIO_PREFIX + "/", recursive=True):
+        if not o.object_name.endswith(".parquet"):
+            continue
+        table_name = o.object_name[len(MINIO_PREFIX) + 1:].split("/")[0]
+        counts[table_name] = counts.get(table_name, 0) + 1
+        sizes[table_name] = sizes.get(table_name, 0) + o.size
     all_ok = True
-    for table_name, filename in TABLE_FILES.items():
+    for table_name in TABLE_DIRS:
         if tables and table_name not in tables:
             continue
-        if filename in objs:
-            print(f"  OK  {filename:45s} {objs[filename]:>15,} bytes")
+        if counts.get(table_name):
+            print(f"  OK  {table_name:30s} {counts[table_name]:>7,} files "
+                  f"{sizes[table_name]:>15,} bytes")
         else:
-            print(f"  MISSING  {filename}")
+            print(f"  MISSING  {table_name}/*.parquet")
             all_ok = False
     return all_ok
 
@@ -136,10 +152,10 @@ def main():
     parser = argparse.ArgumentParser(
         description="Upload and ingest InterProScan results into BERDL")
     parser.add_argument("--local-dir", default="/pscratch/sd/p/psdehal/interproscan/tables",
-                        help="Directory with gzipped TSV files")
+                        help="Directory with the domains/, go/ and pathways/ Parquet directories")
     parser.add_argument("--skip-upload", action="store_true",
                         help="Skip upload, files already on MinIO")
-    parser.add_argument("--table", choices=list(TABLE_FILES.keys()),
+    parser.add_argument("--table", choices=list(TABLE_DIRS.keys()),
                         help="Ingest only this table")
     args = parser.parse_args()
 
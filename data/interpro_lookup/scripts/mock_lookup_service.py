@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Local stub of the EBI InterProScan match lookup service, for exercising
+06_probe_lookup_service.py.
+
+Serves GET /version and GET /matches?md5=<MD5>. An MD5 is a hit, with one
+to three <hit> elements, if it is in the stub's hit table or (for MD5s
+outside it) its leading bits fall under --hit-rate; otherwise the response
+has no hits. With --error-rate a fraction of requests get a 503, with
+--max-in-flight requests beyond that many at once get a 429 with
+Retry-After, and --latency delays every response.
+
+Usage:
+    python mock_lookup_service.py --port 8080 --hit-rate 0.3 \\
+        --error-rate 0.02 --max-in-flight 50 --latency 0.05
+    python 06_probe_lookup_service.py probe --sample 1000 \\
+        --lookup-url http://localhost:8080
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+VERSION = "5.0-stub"
+
+
+def hit_xml(md5: str, n_matches: int) -> str:
+    hits = "".join(
+        f"<hit><signature><ac>PF{i:05d}</ac></signature></hit>" for i in range(n_matches))
+    return f'<?xml version="1.0"?><kinds><md5>{md5}</md5><matches>{hits}</matches></kinds>'
+
+
+class MockLookup:
+    """Request state shared by handler threads: hits, failures and counters."""
+
+    def __init__(self, hits=None, hit_rate=0.0, error_rate=0.0, max_in_flight=0,
+                 latency=0.0, seed=0):
+        self.hits = dict(hits or {})
+        self.hit_rate = hit_rate
+        self.error_rate = error_rate
+        self.max_in_flight = max_in_flight
+        self.latency = latency
+        self.random = random.Random(seed)
+        # MD5 -> status codes returned before it is answered normally
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.counts = {"hit": 0, "miss": 0, "error": 0, "throttled": 0}
+        self.requests = {}
+
+    def n_matches(self, md5: str) -> int:
+        if md5 in self.hits:
+            return self.hits[md5]
+        if self.hit_rate and int(md5[:8], 16) < self.hit_rate * 16 ** 8:
+            return 1 + int(md5[8], 16) % 3
+        return 0
+
+    def respond(self, md5: str):
+        """(status, body) for a lookup of md5."""
+        with self.lock:
+            self.requests[md5] = self.requests.get(md5, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            throttled = self.max_in_flight and self.in_flight > self.max_in_flight
+            pending = self.failures.get(md5)
+            forced = pending.pop(0) if pending else None
+            error = forced is None and self.random.random() < self.error_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            with self.lock:
+                if throttled:
+                    self.counts["throttled"] += 1
+                    return 429, ""
+                if forced or error:
+                    self.counts["error"] += 1
+                    return forced or 503, ""
+                n = self.n_matches(md5)
+                self.counts["hit" if n else "miss"] += 1
+            return 200, hit_xml(md5, n)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_server(mock: MockLookup, port: int = 0) -> ThreadingHTTPServer:
+    """HTTP server for mock on localhost (port 0 picks a free port)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            md5 = parse_qs(url.query).get("md5", [""])[0].upper()
+            if url.path == "/version":
+                status, body = 200, VERSION
+            elif url.path == "/matches" and md5:
+                status, body = mock.respond(md5)
+            else:
+                status, body = 404, ""
+            payload = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(payload)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub InterProScan lookup service")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--hit-rate", type=float, default=0.3,
+                        help="Fraction of MD5s that have matches")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 503")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Answer 429 to requests beyond this many at once")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds to wait before each response")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mock = MockLookup(hit_rate=args.hit_rate, error_rate=args.error_rate,
+                      max_in_flight=args.max_in_flight, latency=args.latency,
+                      seed=args.seed)
+    server = make_server(mock, args.port)
+    print(f"Stub lookup service on http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests: {mock.counts} (peak {mock.peak_in_flight} in flight)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Tests for 08_collect_results.py — fast path vs row-by-row normalization."""
+
+import importlib.util
+import os
+import unittest
+
+_spec = importlib.util.spec_from_file_location(
+    "collect_results",
+    os.path.join(os.path.dirname(__file__), "..", "scripts", "08_collect_results.py"))
+collect = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(collect)
+
+
+def line(first="P12345", description="desc", go="", pathways=""):
+    fields = [first, "MD5", "100", "Pfam", "PF00001", description] + [""] * 7
+    return "\t".join(fields + [go, pathways]) + "\n"
+
+
+class TestWellFormed(unittest.TestCase):
+
+    def test_clean_lines_copied_as_normalized(self):
+        block = (line() + line(pathways="KEGG: 1") + line(description="café – β")).encode()
+        self.assertTrue(collect.well_formed(block))
+        self.assertEqual(collect.normalize_block(block), (block, 3))
+
+    def test_rejects_lines_strip_would_change(self):
+        for ws in ["\x1c", "\x1f", "\x85", "\xa0", " ", "　", " "]:
+            for text in [line(first=ws + "P1"), line(pathways="x" + ws),
+                         line(pathways=ws), line(go=ws)]:
+                with self.subTest(line=text):
+                    block = text.encode()
+                    self.assertNotEqual(collect.normalize_block(block)[0], block)
+                    self.assertFalse(collect.well_formed(block))
+
+
+if __name__ == "__main__":
+    unittest.main()
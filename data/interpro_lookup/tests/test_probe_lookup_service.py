@@ -0,0 +1,139 @@
+"""Tests for 06_probe_lookup_service.py — adaptive prober against a local stub service."""
+
+import asyncio
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from mock_lookup_service import MockLookup, make_server
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "scripts")
+_spec = importlib.util.spec_from_file_location(
+    "probe_lookup_service", os.path.join(SCRIPTS_DIR, "06_probe_lookup_service.py"))
+probe = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(probe)
+
+
+def md5s(n, tag="seq"):
+    return [hashlib.md5(f"{tag}{i}".encode()).hexdigest().upper() for i in range(n)]
+
+
+class TestAIMDLimiter(unittest.TestCase):
+
+    def test_additive_increase(self):
+        limiter = probe.AIMDLimiter(10, minimum=4, maximum=12)
+        for _ in range(10):
+            limiter.on_success(0.01)
+        self.assertEqual(limiter.window, 10)
+        limiter.on_success(0.01)
+        # About one window of fast successes grows the window by one
+        self.assertEqual(limiter.window, 11)
+        for _ in range(100):
+            limiter.on_success(0.01)
+        self.assertEqual(limiter.window, 12)
+
+    def test_multiplicative_decrease_once_per_target_latency(self):
+        limiter = probe.AIMDLimiter(40, minimum=4, maximum=100, target_latency=60)
+        limiter.on_congestion()
+        limiter.on_congestion()  # same congestion episode
+        self.assertEqual(limiter.window, 20)
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_slow_success_is_congestion_and_minimum_holds(self):
+        limiter = probe.AIMDLimiter(5, minimum=4, maximum=100, target_latency=0)
+        limiter.on_success(1.0)
+        limiter.on_success(1.0)
+        self.assertEqual(limiter.window, 4)
+        self.assertEqual(limiter.decreases, 2)
+
+
+@mock.patch.object(probe, "RETRY_BACKOFF", 0)
+class TestProbeAgainstStub(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = MockLookup()
+        self.server = make_server(self.stub)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def probe_all(self, md5_list, limiter):
+        results = {}
+
+        async def run():
+            async with probe.lookup_client(limiter) as client:
+                await probe.probe_md5s(client, md5_list, self.url, limiter,
+                                       results.__setitem__)
+        asyncio.run(run())
+        return results
+
+    def test_hits_misses_and_retried_errors(self):
+        hit, miss, flaky, broken = md5s(4)
+        self.stub.hits[hit] = 2
+        self.stub.failures[flaky] = [503, 500]
+        self.stub.failures[broken] = [503] * probe.RETRY_MAX
+        limiter = probe.AIMDLimiter(4, minimum=1, target_latency=60)
+        results = self.probe_all([hit, miss, flaky, broken], limiter)
+
+        self.assertEqual(results[hit], (True, 2, ""))
+        self.assertEqual(results[miss], (False, 0, ""))
+        self.assertEqual(results[flaky], (False, 0, ""))
+        self.assertEqual(results[broken], (False, 0, "HTTP 503"))
+        self.assertEqual(self.stub.requests[flaky], 3)
+        self.assertEqual(self.stub.requests[broken], probe.RETRY_MAX)
+        # Concurrent 5xx responses back off once, not once per error
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_window_shrinks_under_throttling(self):
+        self.stub.max_in_flight = 4
+        self.stub.latency = 0.02
+        self.stub.hit_rate = 0.5
+        limiter = probe.AIMDLimiter(32, minimum=2, maximum=32, target_latency=0.05)
+        batch = md5s(100)
+        with mock.patch.object(probe, "_retry_delay", return_value=0):
+            results = self.probe_all(batch, limiter)
+
+        self.assertEqual(set(results), set(batch))
+        self.assertGreater(self.stub.counts["throttled"], 0)
+        self.assertLess(limiter.window, 32)
+        answered = {md5: hit for md5, (hit, _, error) in results.items() if not error}
+        self.assertGreater(len(answered), len(batch) // 2)
+        self.assertEqual(answered, {md5: bool(self.stub.n_matches(md5)) for md5 in answered})
+
+    def test_resolve_md5s_probes_each_md5_once_across_runs(self):
+        batch = md5s(50)
+        self.stub.hit_rate = 0.5
+        self.stub.failures[batch[0]] = [503] * probe.RETRY_MAX
+        limiter = probe.AIMDLimiter(8, minimum=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = probe.LookupCache(os.path.join(tmp, "cache.sqlite"))
+
+            async def run():
+                async with probe.lookup_client(limiter) as client:
+                    return await probe.resolve_md5s(cache, client, batch, self.url, limiter)
+
+            first, n_first = asyncio.run(run())
+            second, n_second = asyncio.run(run())
+            counts = cache.counts()
+            cache.close()
+
+        self.assertEqual(n_first, 50)
+        # Only the MD5 that errored is probed again
+        self.assertEqual(n_second, 1)
+        self.assertEqual(second[batch[0]][2], "")
+        self.assertEqual({k: v for k, v in first.items() if k != batch[0]},
+                         {k: v for k, v in second.items() if k != batch[0]})
+        self.assertEqual(counts["error"], 0)
+        self.assertEqual(sum(counts.values()), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Tests for 09_transform_results.py — domain rows from raw TSV lines."""
+
+import importlib.util
+import os
+import unittest
+
+import pyarrow as pa
+
+_spec = importlib.util.spec_from_file_location(
+    "transform_results",
+    os.path.join(os.path.dirname(__file__), "..", "scripts", "09_transform_results.py"))
+transform = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(transform)
+
+
+def domains(lines):
+    batch = transform.domain_batch(transform.split_columns(pa.array(lines, pa.string())))
+    return batch.to_pylist()
+
+
+class TestDomainBatch(unittest.TestCase):
+
+    def test_full_row(self):
+        line = "\t".join(["g1", "md5", "200", "Pfam", "PF1", "desc", "5", "80", "1e-5",
+                          "T", "2024-01-01", "-", "-", "GO:1", "KEGG: 1"])
+        [row] = domains([line])
+        self.assertEqual((row["seq_len"], row["start"], row["stop"]), (200, 5, 80))
+        self.assertEqual((row["ipr_acc"], row["ipr_desc"]), ("", ""))
+
+    def test_short_row_gets_null_coordinates(self):
+        [row] = domains(["g2\tmd5\t200\tPfam\tPF2"])
+        self.assertEqual(row["gene_cluster_id"], "g2")
+        self.assertEqual(row["seq_len"], 200)
+        self.assertEqual(row["signature_acc"], "PF2")
+        self.assertEqual(row["signature_desc"], "")
+        self.assertIsNone(row["start"])
+        self.assertIsNone(row["stop"])
+
+    def test_non_numeric_coordinates_become_null(self):
+        lines = ["\t".join(["g3", "md5", seq_len, "Pfam", "PF3", "d", start, stop, "1"])
+                 for seq_len, start, stop in [("abc", "1.5", "-"), ("99999999999", " 7", "8x")]]
+        rows = domains(lines)
+        self.assertEqual([(r["seq_len"], r["start"], r["stop"]) for r in rows],
+                         [(None, None, None), (None, None, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,15 +4,23 @@ Download PDB metadata from RCSB and SIFTS for Delta Lake ingestion.
 
 Strategy:
   1. Fetch all current PDB IDs from RCSB holdings API (~250K IDs)
-  2. Batch-query RCSB GraphQL API for metadata (1000 IDs per request, ~3 min total)
-  3. Download SIFTS pdb_chain_uniprot.tsv.gz for PDB→UniProt mapping
-  4. Output headerized TSVs: pdb_entries.tsv, pdb_uniprot_mapping.tsv
+  2. Batch-query RCSB GraphQL API for entry and validation metadata in one
+     pass (1000 IDs per request, several requests in flight, rate limited;
+     see rcsb_graphql.py)
+  3. Meanwhile, download SIFTS pdb_chain_uniprot.tsv.gz for PDB→UniProt mapping
+  4. Output headerized TSVs: pdb_entries.tsv, pdb_uniprot_mapping.tsv,
+     pdb_validation.tsv
 
 Usage:
   python download_pdb_data.py --output-dir /pscratch/sd/p/psdehal/pdb_collection/
   python download_pdb_data.py --output-dir ./pdb_data --batch-size 500
   python download_pdb_data.py --output-dir ./pdb_data --sifts-only
   python download_pdb_data.py --output-dir ./pdb_data --entries-only
+  python download_pdb_data.py --output-dir ./pdb_data --concurrency 4 --rate 5
+  python download_pdb_data.py --output-dir ./pdb_data --incremental
+
+--incremental fetches only new and revised entries and upserts them into
+the existing entries/validation tables (see pdb_incremental.py).
 """
 
 import argparse
@@ -20,18 +28,22 @@ import csv
 import gzip
 import json
 import os
-import sys
-import time
 import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+from pdb_incremental import incremental_refresh
+from rcsb_graphql import (
+    BATCH_SIZE,
+    CONCURRENCY,
+    RATE_LIMIT,
+    GraphQLTable,
+    download_tables,
+)
 
 RCSB_HOLDINGS_URL = "https://data.rcsb.org/rest/v1/holdings/current/entry_ids"
-RCSB_GRAPHQL_URL = "https://data.rcsb.org/graphql"
 SIFTS_URL = "https://ftp.ebi.ac.uk/pub/databases/msd/sifts/flatfiles/tsv/pdb_chain_uniprot.tsv.gz"
 
-GRAPHQL_QUERY = """{
-  entries(entry_ids: %s) {
-    rcsb_id
+ENTRY_FIELDS = """
     struct { title }
     rcsb_entry_info { resolution_combined experimental_method }
     exptl { method }
@@ -41,8 +53,7 @@ GRAPHQL_QUERY = """{
     polymer_entities {
       rcsb_entity_source_organism { ncbi_scientific_name }
     }
-  }
-}"""
+"""
 
 ENTRIES_COLUMNS = [
     "pdb_id", "title", "method", "method_full", "resolution",
@@ -55,9 +66,7 @@ MAPPING_COLUMNS = [
     "res_beg", "res_end", "pdb_beg", "pdb_end", "sp_beg", "sp_end",
 ]
 
-VALIDATION_GRAPHQL_QUERY = """{
-  entries(entry_ids: %s) {
-    rcsb_id
+VALIDATION_FIELDS = """
     pdbx_vrpt_summary_geometry {
       clashscore
       percent_ramachandran_outliers
@@ -65,8 +74,7 @@ VALIDATION_GRAPHQL_QUERY = """{
       angles_RMSZ
       bonds_RMSZ
     }
-  }
-}"""
+"""
 
 VALIDATION_COLUMNS = [
     "pdb_id", "clashscore", "percent_ramachandran_outliers",
@@ -84,52 +92,6 @@ def fetch_all_pdb_ids():
     return ids
 
 
-def batch_graphql_query(pdb_ids, batch_size=1000, query_template=None):
-    """Query RCSB GraphQL API in batches. Yields parsed entry dicts."""
-    if query_template is None:
-        query_template = GRAPHQL_QUERY
-    total = len(pdb_ids)
-    n_batches = (total + batch_size - 1) // batch_size
-
-    for i in range(0, total, batch_size):
-        batch = pdb_ids[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        print(f"  Batch {batch_num}/{n_batches} ({len(batch)} IDs)...", end="", flush=True)
-
-        query = query_template % json.dumps(batch)
-        data = json.dumps({"query": query}).encode("utf-8")
-        req = urllib.request.Request(
-            RCSB_GRAPHQL_URL, data=data,
-            headers={"Content-Type": "application/json"},
-        )
-
-        retries = 3
-        for attempt in range(retries):
-            try:
-                with urllib.request.urlopen(req, timeout=60) as resp:
-                    result = json.loads(resp.read())
-                break
-            except (urllib.error.URLError, TimeoutError) as e:
-                if attempt < retries - 1:
-                    print(f" retry {attempt + 1}...", end="", flush=True)
-                    time.sleep(2 ** attempt)
-                else:
-                    print(f" FAILED: {e}")
-                    continue
-
-        entries = result.get("data", {}).get("entries", [])
-        print(f" {len(entries)} entries")
-
-        for entry in entries:
-            if entry is None:
-                continue
-            yield entry
-
-        # Brief pause between batches to be polite
-        if i + batch_size < total:
-            time.sleep(0.1)
-
-
 def parse_entry(entry):
     """Parse a GraphQL entry response into a flat dict for TSV output."""
     rcsb_info = entry.get("rcsb_entry_info") or {}
@@ -180,26 +142,13 @@ def parse_entry(entry):
     }
 
 
-def download_entries(pdb_ids, output_path, batch_size=1000):
-    """Download PDB entry metadata via GraphQL and write to TSV."""
-    print(f"\nDownloading PDB entry metadata ({len(pdb_ids):,} entries)...")
-    t0 = time.time()
+def entry_rows(entry):
+    row = parse_entry(entry)
+    return [[_fmt(row.get(col)) for col in ENTRIES_COLUMNS]]
 
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
-        writer.writerow(ENTRIES_COLUMNS)
 
-        count = 0
-        for entry in batch_graphql_query(pdb_ids, batch_size):
-            row = parse_entry(entry)
-            writer.writerow([
-                _fmt(row.get(col)) for col in ENTRIES_COLUMNS
-            ])
-            count += 1
-
-    dt = time.time() - t0
-    print(f"  Wrote {count:,} entries to {output_path} in {dt:.1f}s")
-    return count
+def entries_table(output_path):
+    return GraphQLTable(output_path, ENTRIES_COLUMNS, ENTRY_FIELDS, entry_rows)
 
 
 def download_sifts(output_path):
@@ -260,25 +209,26 @@ def parse_validation_entry(entry):
     }
 
 
-def download_validation(pdb_ids, output_path, batch_size=1000):
-    """Download PDB validation metrics via GraphQL and write to TSV."""
-    print(f"\nDownloading PDB validation metrics ({len(pdb_ids):,} entries)...")
-    t0 = time.time()
-
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
-        writer.writerow(VALIDATION_COLUMNS)
-
-        count = 0
-        for entry in batch_graphql_query(pdb_ids, batch_size,
-                                          query_template=VALIDATION_GRAPHQL_QUERY):
-            row = parse_validation_entry(entry)
-            writer.writerow([_fmt(row.get(col)) for col in VALIDATION_COLUMNS])
-            count += 1
+def validation_rows(entry):
+    row = parse_validation_entry(entry)
+    return [[_fmt(row.get(col)) for col in VALIDATION_COLUMNS]]
 
-    dt = time.time() - t0
-    print(f"  Wrote {count:,} validation rows to {output_path} in {dt:.1f}s")
-    return count
+
+def validation_table(output_path):
+    return GraphQLTable(output_path, VALIDATION_COLUMNS, VALIDATION_FIELDS, validation_rows)
+
+
+def download_entries(pdb_ids, output_path, batch_size=BATCH_SIZE, **kwargs):
+    """Download PDB entry metadata via GraphQL and write to TSV."""
+    counts, _ = download_tables(pdb_ids, [entries_table(output_path)], batch_size, **kwargs)
+    return counts[output_path]
+
+
+def download_validation(pdb_ids, output_path, batch_size=BATCH_SIZE, **kwargs):
+    """Download PDB validation metrics via GraphQL and write to TSV."""
+    counts, _ = download_tables(pdb_ids, [validation_table(output_path)], batch_size,
+                                **kwargs)
+    return counts[output_path]
 
 
 def _fmt(val):
@@ -299,8 +249,12 @@ def main():
         default="/pscratch/sd/p/psdehal/pdb_collection",
         help="Output directory for TSV files",
     )
-    parser.add_argument("--batch-size", type=int, default=1000,
-                        help="GraphQL batch size (default: 1000)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"GraphQL batch size (default: {BATCH_SIZE})")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"GraphQL requests in flight (default: {CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT,
+                        help=f"Max GraphQL requests per second (default: {RATE_LIMIT:g})")
     parser.add_argument("--entries-only", action="store_true",
                         help="Only download PDB entries, skip SIFTS and validation")
     parser.add_argument("--sifts-only", action="store_true",
@@ -309,7 +263,13 @@ def main():
                         help="Only download validation metrics")
     parser.add_argument("--sample", type=int, default=0,
                         help="Only download first N entries (for testing)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch new and revised entries and upsert them "
+                             "into the existing GraphQL tables")
     args = parser.parse_args()
+    if args.incremental and args.sample:
+        # A sample would look like every other entry had been removed
+        parser.error("--incremental cannot be combined with --sample")
 
     os.makedirs(args.output_dir, exist_ok=True)
 
@@ -331,14 +291,27 @@ def main():
             pdb_ids = pdb_ids[:args.sample]
             print(f"  Sampling first {args.sample} entries")
 
+    tables = []
     if do_all or args.entries_only:
-        n_entries = download_entries(pdb_ids, entries_path, args.batch_size)
-
-    if do_all or args.sifts_only:
-        n_mappings = download_sifts(mapping_path)
-
+        tables.append(entries_table(entries_path))
     if do_all or args.validation_only:
-        n_validation = download_validation(pdb_ids, validation_path, args.batch_size)
+        tables.append(validation_table(validation_path))
+
+    # SIFTS comes from EBI, so fetch it alongside the GraphQL pass
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        sifts = pool.submit(download_sifts, mapping_path) if do_all or args.sifts_only else None
+        if tables:
+            if args.incremental:
+                print(f"\nIncremental refresh of {len(tables)} GraphQL tables...")
+                counts = incremental_refresh(args.output_dir, tables, pdb_ids,
+                                             args.batch_size, args.concurrency, args.rate)
+            else:
+                counts, _ = download_tables(pdb_ids, tables, args.batch_size,
+                                            args.concurrency, args.rate)
+            n_entries = counts.get(entries_path, 0)
+            n_validation = counts.get(validation_path, 0)
+        if sifts is not None:
+            n_mappings = sifts.result()
 
     print(f"\n{'=' * 60}")
     print("SUMMARY")
@@ -11,6 +11,12 @@ Usage:
   python download_pdb_extended.py --output-dir /path/ --only pfam clusters
   python download_pdb_extended.py --output-dir /path/ --only taxonomy --force
   python download_pdb_extended.py --output-dir /path/ --sample 100
+  python download_pdb_extended.py --output-dir /path/ --only taxonomy ligands --incremental
+
+Taxonomy, ligands and citations are fetched together in one GraphQL pass
+(see rcsb_graphql.py) while Pfam and clusters download alongside it.
+With --incremental, existing GraphQL tables are not skipped: only new and
+revised entries are fetched and upserted into them (see pdb_incremental.py).
 
 Data sources:
   - Taxonomy + ligands + citations: RCSB GraphQL API (batch 1000/request)
@@ -23,45 +29,48 @@ import csv
 import gzip
 import json
 import os
-import sys
-import time
 import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+from pdb_incremental import incremental_refresh
+from rcsb_graphql import (
+    BATCH_SIZE,
+    CONCURRENCY,
+    RATE_LIMIT,
+    GraphQLTable,
+    download_tables,
+)
 
 RCSB_HOLDINGS_URL = "https://data.rcsb.org/rest/v1/holdings/current/entry_ids"
-RCSB_GRAPHQL_URL = "https://data.rcsb.org/graphql"
 SIFTS_PFAM_URL = "https://ftp.ebi.ac.uk/pub/databases/msd/sifts/flatfiles/tsv/pdb_chain_pfam.tsv.gz"
 RCSB_CLUSTERS_URL = "https://cdn.rcsb.org/resources/sequence/clusters/clusters-by-entity-%d.txt"
 
-# --- GraphQL queries ---
+# --- GraphQL field groups ---
 
-TAXONOMY_LIGANDS_QUERY = """{
-  entries(entry_ids: %s) {
-    rcsb_id
+TAXONOMY_FIELDS = """
     polymer_entities {
       rcsb_entity_source_organism {
         ncbi_scientific_name
         taxonomy_lineage { id name depth }
       }
     }
+"""
+
+LIGAND_FIELDS = """
     nonpolymer_entities {
       nonpolymer_comp {
         chem_comp { id name type formula formula_weight }
       }
     }
-  }
-}"""
+"""
 
-CITATIONS_QUERY = """{
-  entries(entry_ids: %s) {
-    rcsb_id
+CITATION_FIELDS = """
     citation {
       id title year journal_abbrev journal_volume page_first
       pdbx_database_id_DOI pdbx_database_id_PubMed
       rcsb_is_primary rcsb_authors
     }
-  }
-}"""
+"""
 
 # --- Column definitions ---
 
@@ -94,51 +103,6 @@ def fetch_all_pdb_ids():
     return ids
 
 
-def batch_graphql(pdb_ids, query_template, batch_size=1000):
-    """Query RCSB GraphQL API in batches. Yields parsed entry dicts.
-
-    Handles retries and network errors gracefully.
-    """
-    total = len(pdb_ids)
-    n_batches = (total + batch_size - 1) // batch_size
-
-    for i in range(0, total, batch_size):
-        batch = pdb_ids[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        print(f"  Batch {batch_num}/{n_batches} ({len(batch)} IDs)...", end="", flush=True)
-
-        query = query_template % json.dumps(batch)
-        data = json.dumps({"query": query}).encode("utf-8")
-        req = urllib.request.Request(
-            RCSB_GRAPHQL_URL, data=data,
-            headers={"Content-Type": "application/json"},
-        )
-
-        entries = None
-        for attempt in range(5):
-            try:
-                with urllib.request.urlopen(req, timeout=60) as resp:
-                    result = json.loads(resp.read())
-                entries = result.get("data", {}).get("entries", [])
-                break
-            except (urllib.error.URLError, TimeoutError, OSError) as e:
-                wait = 2 ** attempt
-                print(f" retry {attempt + 1} (wait {wait}s)...", end="", flush=True)
-                time.sleep(wait)
-
-        if entries is None:
-            print(f" FAILED after 5 retries, skipping batch")
-            continue
-
-        print(f" {len(entries)} entries")
-        for entry in entries:
-            if entry is not None:
-                yield entry
-
-        if i + batch_size < total:
-            time.sleep(0.1)
-
-
 def _fmt(val):
     """Format a value for TSV output."""
     if val is None:
@@ -161,108 +125,67 @@ def _should_download(path, force):
 
 # --- Download functions ---
 
-def download_taxonomy(pdb_ids, output_path, batch_size=1000):
-    """Download taxonomy IDs for all PDB entries."""
-    print(f"\nDownloading taxonomy data ({len(pdb_ids):,} entries)...")
-    t0 = time.time()
-
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
-        writer.writerow(TAXONOMY_COLUMNS)
-        count = 0
-
-        for entry in batch_graphql(pdb_ids, TAXONOMY_LIGANDS_QUERY, batch_size):
-            pdb_id = entry.get("rcsb_id", "")
-            tax_id = None
-            organism = ""
-
-            for pe in (entry.get("polymer_entities") or []):
-                for org in (pe.get("rcsb_entity_source_organism") or []):
-                    organism = org.get("ncbi_scientific_name") or ""
-                    lineage = org.get("taxonomy_lineage") or []
-                    # depth=0 is the species level
-                    for t in lineage:
-                        if t.get("depth") == 0:
-                            tax_id = t.get("id")
-                            break
-                    if tax_id:
-                        break
-                if tax_id:
+def taxonomy_rows(entry):
+    pdb_id = entry.get("rcsb_id", "")
+    tax_id = None
+    organism = ""
+
+    for pe in (entry.get("polymer_entities") or []):
+        for org in (pe.get("rcsb_entity_source_organism") or []):
+            organism = org.get("ncbi_scientific_name") or ""
+            lineage = org.get("taxonomy_lineage") or []
+            # depth=0 is the species level
+            for t in lineage:
+                if t.get("depth") == 0:
+                    tax_id = t.get("id")
                     break
+            if tax_id:
+                break
+        if tax_id:
+            break
 
-            writer.writerow([pdb_id, _fmt(tax_id), _fmt(organism)])
-            count += 1
-
-    dt = time.time() - t0
-    print(f"  Wrote {count:,} taxonomy rows to {output_path} in {dt:.1f}s")
-    return count
-
-
-def download_ligands(pdb_ids, output_path, batch_size=1000):
-    """Download ligand/small molecule data for all PDB entries."""
-    print(f"\nDownloading ligand data ({len(pdb_ids):,} entries)...")
-    t0 = time.time()
-
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
-        writer.writerow(LIGAND_COLUMNS)
-        count = 0
-
-        for entry in batch_graphql(pdb_ids, TAXONOMY_LIGANDS_QUERY, batch_size):
-            pdb_id = entry.get("rcsb_id", "")
-            for ne in (entry.get("nonpolymer_entities") or []):
-                comp = (ne.get("nonpolymer_comp") or {}).get("chem_comp") or {}
-                if not comp.get("id"):
-                    continue
-                writer.writerow([
-                    pdb_id,
-                    _fmt(comp.get("id")),
-                    _fmt(comp.get("name")),
-                    _fmt(comp.get("type")),
-                    _fmt(comp.get("formula")),
-                    _fmt(comp.get("formula_weight")),
-                ])
-                count += 1
-
-    dt = time.time() - t0
-    print(f"  Wrote {count:,} ligand rows to {output_path} in {dt:.1f}s")
-    return count
-
+    return [[pdb_id, _fmt(tax_id), _fmt(organism)]]
 
-def download_citations(pdb_ids, output_path, batch_size=1000):
-    """Download citation data for all PDB entries."""
-    print(f"\nDownloading citation data ({len(pdb_ids):,} entries)...")
-    t0 = time.time()
 
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
-        writer.writerow(CITATION_COLUMNS)
-        count = 0
-
-        for entry in batch_graphql(pdb_ids, CITATIONS_QUERY, batch_size):
-            pdb_id = entry.get("rcsb_id", "")
-            for c in (entry.get("citation") or []):
-                authors = c.get("rcsb_authors") or []
-                if isinstance(authors, list):
-                    authors = "; ".join(str(a) for a in authors)
-                writer.writerow([
-                    pdb_id,
-                    _fmt(c.get("id")),
-                    _fmt(c.get("rcsb_is_primary")),
-                    _fmt(c.get("title")),
-                    _fmt(c.get("year")),
-                    _fmt(c.get("journal_abbrev")),
-                    _fmt(c.get("journal_volume")),
-                    _fmt(c.get("page_first")),
-                    _fmt(c.get("pdbx_database_id_DOI")),
-                    _fmt(c.get("pdbx_database_id_PubMed")),
-                    _fmt(authors),
-                ])
-                count += 1
-
-    dt = time.time() - t0
-    print(f"  Wrote {count:,} citation rows to {output_path} in {dt:.1f}s")
-    return count
+def ligand_rows(entry):
+    pdb_id = entry.get("rcsb_id", "")
+    rows = []
+    for ne in (entry.get("nonpolymer_entities") or []):
+        comp = (ne.get("nonpolymer_comp") or {}).get("chem_comp") or {}
+        if not comp.get("id"):
+            continue
+        rows.append([
+            pdb_id,
+            _fmt(comp.get("id")),
+            _fmt(comp.get("name")),
+            _fmt(comp.get("type")),
+            _fmt(comp.get("formula")),
+            _fmt(comp.get("formula_weight")),
+        ])
+    return rows
+
+
+def citation_rows(entry):
+    pdb_id = entry.get("rcsb_id", "")
+    rows = []
+    for c in (entry.get("citation") or []):
+        authors = c.get("rcsb_authors") or []
+        if isinstance(authors, list):
+            authors = "; ".join(str(a) for a in authors)
+        rows.append([
+            pdb_id,
+            _fmt(c.get("id")),
+            _fmt(c.get("rcsb_is_primary")),
+            _fmt(c.get("title")),
+            _fmt(c.get("year")),
+            _fmt(c.get("journal_abbrev")),
+            _fmt(c.get("journal_volume")),
+            _fmt(c.get("page_first")),
+            _fmt(c.get("pdbx_database_id_DOI")),
+            _fmt(c.get("pdbx_database_id_PubMed")),
+            _fmt(authors),
+        ])
+    return rows
 
 
 def download_pfam(output_path):
@@ -344,12 +267,22 @@ def download_clusters(output_path, identity_levels=None):
 
 # --- Main ---
 
+# GraphQL datasets: (file, columns, fields, rows function)
+GRAPHQL_DATASETS = {
+    "taxonomy": ("pdb_taxonomy.tsv", TAXONOMY_COLUMNS, TAXONOMY_FIELDS, taxonomy_rows),
+    "ligands": ("pdb_ligands.tsv", LIGAND_COLUMNS, LIGAND_FIELDS, ligand_rows),
+    "citations": ("pdb_citations.tsv", CITATION_COLUMNS, CITATION_FIELDS, citation_rows),
+}
+
+# File downloads: (file, download function)
+FILE_DATASETS = {
+    "pfam": ("pdb_pfam.tsv", download_pfam),
+    "clusters": ("pdb_sequence_clusters.tsv", download_clusters),
+}
+
 DATASETS = {
-    "taxonomy": ("pdb_taxonomy.tsv", download_taxonomy, True),
-    "ligands": ("pdb_ligands.tsv", download_ligands, True),
-    "citations": ("pdb_citations.tsv", download_citations, True),
-    "pfam": ("pdb_pfam.tsv", download_pfam, False),
-    "clusters": ("pdb_sequence_clusters.tsv", download_clusters, False),
+    **{name: spec[0] for name, spec in GRAPHQL_DATASETS.items()},
+    **{name: spec[0] for name, spec in FILE_DATASETS.items()},
 }
 
 
@@ -367,47 +300,74 @@ def main():
         choices=list(DATASETS.keys()),
         help="Only download specific datasets",
     )
-    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"GraphQL requests in flight (default: {CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT,
+                        help=f"Max GraphQL requests per second (default: {RATE_LIMIT:g})")
     parser.add_argument("--sample", type=int, default=0,
                         help="Only process first N entries (for testing)")
     parser.add_argument("--force", action="store_true",
                         help="Re-download even if files exist")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upsert new and revised entries into existing GraphQL tables")
     args = parser.parse_args()
+    if args.incremental and args.sample:
+        # A sample would look like every other entry had been removed
+        parser.error("--incremental cannot be combined with --sample")
 
     os.makedirs(args.output_dir, exist_ok=True)
 
     datasets_to_run = args.only or list(DATASETS.keys())
 
-    # Fetch PDB IDs if any GraphQL-based datasets are requested
-    needs_ids = any(DATASETS[d][2] for d in datasets_to_run)
-    pdb_ids = None
-    if needs_ids:
-        pdb_ids = fetch_all_pdb_ids()
-        if args.sample:
-            pdb_ids = pdb_ids[:args.sample]
-            print(f"  Sampling first {args.sample} entries")
-
     results = {}
+    to_download = []
     for name in datasets_to_run:
-        filename, func, needs_pdb_ids = DATASETS[name]
-        output_path = os.path.join(args.output_dir, filename)
-
-        if not _should_download(output_path, args.force):
+        output_path = os.path.join(args.output_dir, DATASETS[name])
+        if (args.incremental and name in GRAPHQL_DATASETS) or \
+                _should_download(output_path, args.force):
+            to_download.append(name)
+        else:
             results[name] = -1  # skipped
-            continue
 
-        if needs_pdb_ids:
-            results[name] = func(pdb_ids, output_path, args.batch_size)
-        elif name == "pfam":
-            results[name] = func(output_path)
-        elif name == "clusters":
-            results[name] = func(output_path)
+    tables = {
+        name: GraphQLTable(os.path.join(args.output_dir, GRAPHQL_DATASETS[name][0]),
+                           *GRAPHQL_DATASETS[name][1:])
+        for name in to_download if name in GRAPHQL_DATASETS
+    }
+    files = [name for name in to_download if name in FILE_DATASETS]
+
+    # File downloads come from other hosts, so run them alongside the GraphQL pass
+    with ThreadPoolExecutor(max_workers=max(len(files), 1)) as pool:
+        futures = {
+            name: pool.submit(FILE_DATASETS[name][1],
+                              os.path.join(args.output_dir, FILE_DATASETS[name][0]))
+            for name in files
+        }
+        if tables:
+            pdb_ids = fetch_all_pdb_ids()
+            if args.sample:
+                pdb_ids = pdb_ids[:args.sample]
+                print(f"  Sampling first {args.sample} entries")
+            if args.incremental:
+                print(f"\nIncremental refresh of {len(tables)} GraphQL tables...")
+                counts = incremental_refresh(
+                    args.output_dir, list(tables.values()), pdb_ids,
+                    args.batch_size, args.concurrency, args.rate)
+            else:
+                counts, _ = download_tables(
+                    pdb_ids, list(tables.values()), args.batch_size, args.concurrency,
+                    args.rate)
+            for name, table in tables.items():
+                results[name] = counts[table.path]
+        for name, future in futures.items():
+            results[name] = future.result()
 
     print(f"\n{'=' * 60}")
     print("SUMMARY")
     print(f"{'=' * 60}")
     for name in datasets_to_run:
-        filename = DATASETS[name][0]
+        filename = DATASETS[name]
         count = results.get(name, 0)
         status = "SKIPPED" if count == -1 else f"{count:>10,} rows"
         print(f"  {filename:35s} {status}")
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Incremental refresh of the GraphQL-derived PDB tables.
+
+A full run of download_pdb_data.py / download_pdb_extended.py re-downloads
+metadata for every PDB entry. With --incremental they instead:
+
+  1. diff the current RCSB holdings against a local state table
+     (pdb_state.sqlite in the output directory) to find new and removed
+     entries
+  2. ask the RCSB Search API for entries revised since each table's last
+     refresh (falling back to a GraphQL sweep of revision dates if the
+     search fails)
+  3. fetch only new and revised entries, into <table>.delta.tsv
+  4. upsert them into <table>.tsv -- and <table>.parquet if one exists --
+     dropping the rows of refetched and removed entries
+
+The state table records, per output table, each PDB ID with the revision
+date it was last fetched at, and the date of the last refresh. The first
+incremental run against a table downloaded in full seeds the state from
+the PDB IDs in the TSV, taking its modification time as its last refresh,
+so entries obsoleted since are dropped and entries the full run missed are
+fetched. (Entries that have no rows in a table -- no ligands, say -- are
+fetched once on that first run, after which the state records them.)
+"""
+
+import csv
+import datetime
+import os
+import sqlite3
+import time
+
+import httpx
+
+from rcsb_graphql import BATCH_SIZE, CONCURRENCY, RATE_LIMIT, GraphQLTable, download_tables
+
+RCSB_SEARCH_URL = "https://search.rcsb.org/rcsbsearch/v2/query"
+STATE_DB = "pdb_state.sqlite"
+DELTA_SUFFIX = ".delta.tsv"
+
+REVISION_FIELDS = """
+    rcsb_accession_info { revision_date }
+"""
+# Revisions published on the day of a refresh may not be indexed yet
+REFRESH_OVERLAP = datetime.timedelta(days=1)
+
+
+def revision_rows(entry):
+    accession = entry.get("rcsb_accession_info") or {}
+    return [[entry.get("rcsb_id", ""), (accession.get("revision_date") or "")[:10]]]
+
+
+def table_name(table: GraphQLTable) -> str:
+    return os.path.basename(table.path).removesuffix(".tsv")
+
+
+class PDBState:
+    """
+    Local state of the incremental refresh (SQLite).
+
+    fetched holds one row per (table, PDB ID) with the revision date the
+    entry was last fetched at; refreshes holds each table's last refresh
+    date, the cutoff for the next revision search.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fetched (
+                table_name    TEXT NOT NULL,
+                pdb_id        TEXT NOT NULL,
+                revision_date TEXT,
+                fetched_at    REAL NOT NULL,
+                PRIMARY KEY (table_name, pdb_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS refreshes (
+                table_name   TEXT PRIMARY KEY,
+                last_refresh TEXT NOT NULL
+            )
+        """)
+
+    def last_refresh(self, name: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT last_refresh FROM refreshes WHERE table_name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def known_ids(self, name: str) -> set:
+        return {pdb_id for (pdb_id,) in self.conn.execute(
+            "SELECT pdb_id FROM fetched WHERE table_name = ?", (name,))}
+
+    def seed(self, name: str, pdb_ids, last_refresh: str):
+        """Record pdb_ids as fetched at an unknown revision, as of last_refresh."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO fetched VALUES (?, ?, NULL, ?)",
+            ((name, pdb_id, now) for pdb_id in pdb_ids))
+        self.set_last_refresh(name, last_refresh)
+
+    def record(self, name: str, revisions: dict, removed=()):
+        """Store fetched revision dates by PDB ID and forget removed IDs."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO fetched VALUES (?, ?, ?, ?)",
+            ((name, pdb_id, rev or None, now) for pdb_id, rev in revisions.items()))
+        self.conn.executemany(
+            "DELETE FROM fetched WHERE table_name = ? AND pdb_id = ?",
+            ((name, pdb_id) for pdb_id in removed))
+
+    def set_last_refresh(self, name: str, date: str):
+        self.conn.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?)", (name, date))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def revised_since(since: str, client: httpx.Client | None = None) -> set:
+    """PDB IDs whose latest revision is on or after since (YYYY-MM-DD), via RCSB Search.
+
+    Raises:
+        httpx.HTTPError: If the search request fails
+    """
+    query = {
+        "query": {
+            "type": "terminal",
+            "service": "text",
+            "parameters": {
+                "attribute": "rcsb_accession_info.revision_date",
+                "operator": "greater_or_equal",
+                "value": since,
+            },
+        },
+        "return_type": "entry",
+        "request_options": {"return_all_hits": True},
+    }
+    own_client = client is None
+    client = client or httpx.Client(timeout=120)
+    try:
+        resp = client.post(RCSB_SEARCH_URL, json=query)
+        if resp.status_code == 204:  # no hits
+            return set()
+        resp.raise_for_status()
+        return {hit["identifier"] for hit in resp.json().get("result_set", [])}
+    finally:
+        if own_client:
+            client.close()
+
+
+def _revised_by_sweep(pdb_ids, since, work_dir, download_kwargs) -> set:
+    """Fallback for revised_since: fetch revision dates of pdb_ids over GraphQL."""
+    path = os.path.join(work_dir, "pdb_revisions" + DELTA_SUFFIX)
+    table = GraphQLTable(path, ["pdb_id", "revision_date"], REVISION_FIELDS, revision_rows)
+    download_tables(sorted(pdb_ids), [table], **download_kwargs)
+    try:
+        with open(path, newline="") as f:
+            rows = csv.reader(f, delimiter="\t")
+            next(rows)
+            return {pdb_id for pdb_id, rev in rows if rev and rev >= since}
+    finally:
+        os.remove(path)
+
+
+def tsv_ids(path) -> set:
+    """PDB IDs (first column) of the rows in a TSV table."""
+    with open(path, newline="") as f:
+        rows = csv.reader(f, delimiter="\t")
+        next(rows, None)
+        return {row[0] for row in rows if row}
+
+
+def upsert_tsv(path, delta_path, drop_ids) -> int:
+    """Replace path's rows for drop_ids with delta_path's rows; return row count.
+
+    Rows are keyed on their first column (pdb_id). A missing path is
+    created from the delta.
+    """
+    tmp_path = path + ".tmp"
+    rows = 0
+    with open(delta_path, newline="") as delta, open(tmp_path, "w", newline="") as out:
+        delta_rows = csv.reader(delta, delimiter="\t")
+        writer = csv.writer(out, delimiter="\t", lineterminator="\n")
+        writer.writerow(next(delta_rows))
+        if os.path.exists(path):
+            with open(path, newline="") as old:
+                old_rows = csv.reader(old, delimiter="\t")
+                next(old_rows, None)
+                for row in old_rows:
+                    if row and row[0] not in drop_ids:
+                        writer.writerow(row)
+                        rows += 1
+        for row in delta_rows:
+            writer.writerow(row)
+            rows += 1
+    os.replace(tmp_path, path)
+    return rows
+
+
+def upsert_parquet(path, delta_path, drop_ids) -> int:
+    """Parquet counterpart of upsert_tsv, keeping the file's schema."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    keep = pc.invert(pc.is_in(table.column("pdb_id"),
+                              value_set=pa.array(sorted(drop_ids), pa.string())))
+    delta = pv.read_csv(
+        delta_path,
+        parse_options=pv.ParseOptions(delimiter="\t"),
+        convert_options=pv.ConvertOptions(column_types=table.schema,
+                                          strings_can_be_null=False),
+    ).select(table.schema.names).cast(table.schema)
+    merged = pa.concat_tables([table.filter(keep), delta])
+    tmp_path = path + ".tmp"
+    pq.write_table(merged, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return merged.num_rows
+
+
+def incremental_refresh(output_dir, tables, current_ids, batch_size=BATCH_SIZE,
+                        concurrency=CONCURRENCY, rate=RATE_LIMIT,
+                        http_client=None, search_client=None):
+    """Bring the GraphQL tables in output_dir up to date with current_ids.
+
+    Returns {table path: rows in the table after the upsert}.
+    """
+    state = PDBState(os.path.join(output_dir, STATE_DB))
+    download_kwargs = dict(batch_size=batch_size, concurrency=concurrency, rate=rate,
+                           http_client=http_client)
+    started = datetime.date.today().isoformat()
+    current = set(current_ids)
+    names = [table_name(t) for t in tables]
+
+    try:
+        for table, name in zip(tables, names):
+            if state.last_refresh(name) is None and os.path.exists(table.path):
+                mtime = datetime.date.fromtimestamp(os.path.getmtime(table.path))
+                print(f"  {name}: no refresh state, seeding from its PDB IDs as of {mtime}")
+                state.seed(name, tsv_ids(table.path), mtime.isoformat())
+        state.commit()
+
+        known = {name: state.known_ids(name) for name in names}
+        cutoffs = [state.last_refresh(name) for name in names]
+        new = set().union(*(current - ids for ids in known.values()))
+        removed = {name: ids - current for name, ids in known.items()}
+        revised = set()
+        if any(cutoffs) and known:
+            since = (datetime.date.fromisoformat(min(c for c in cutoffs if c))
+                     - REFRESH_OVERLAP).isoformat()
+            try:
+                revised = revised_since(since, search_client) & current
+            except httpx.HTTPError as e:
+                print(f"  WARNING: revision search failed ({e}); sweeping revision dates")
+                revised = _revised_by_sweep(current - new, since, output_dir, download_kwargs)
+            revised -= new
+            print(f"  Revised since {since}: {len(revised):,}")
+        n_removed = len(set().union(*removed.values()))
+        print(f"  New: {len(new):,}  Removed: {n_removed:,}  Current: {len(current):,}")
+
+        changed = [pdb_id for pdb_id in current_ids if pdb_id in new or pdb_id in revised]
+        delta_tables = [
+            GraphQLTable(t.path + DELTA_SUFFIX, t.columns, t.fields, t.rows) for t in tables
+        ]
+        revisions_table = GraphQLTable(
+            os.path.join(output_dir, "pdb_revisions" + DELTA_SUFFIX),
+            ["pdb_id", "revision_date"], REVISION_FIELDS, revision_rows)
+        _, failed_ids = download_tables(changed, delta_tables + [revisions_table],
+                                        **download_kwargs)
+
+        with open(revisions_table.path, newline="") as f:
+            rows = csv.reader(f, delimiter="\t")
+            next(rows)
+            revisions = dict(rows)
+        # Entries that failed keep their old rows and are retried next time
+        fetched = set(changed) - set(failed_ids)
+
+        counts = {}
+        for table, delta, name in zip(tables, delta_tables, names):
+            drop = fetched | removed[name]
+            counts[table.path] = upsert_tsv(table.path, delta.path, drop)
+            parquet_path = table.path.removesuffix(".tsv") + ".parquet"
+            if os.path.exists(parquet_path):
+                upsert_parquet(parquet_path, delta.path, drop)
+            state.record(name, {pdb_id: revisions.get(pdb_id) for pdb_id in fetched},
+                         removed[name])
+            if not failed_ids:
+                state.set_last_refresh(name, started)
+            print(f"  {os.path.basename(table.path)}: {counts[table.path]:,} rows after upsert")
+        state.commit()
+    finally:
+        state.close()
+        for path in [t.path + DELTA_SUFFIX for t in tables] + [
+                os.path.join(output_dir, "pdb_revisions" + DELTA_SUFFIX)]:
+            if os.path.exists(path):
+                os.remove(path)
+    return counts
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Shared async client for the RCSB GraphQL API.
+
+download_pdb_data.py and download_pdb_extended.py fetch entry metadata for
+every PDB ID in batches of up to 1000 IDs. This client:
+
+  - keeps several batches in flight at once (bounded concurrency)
+  - spaces request starts to a requests-per-second rate limit
+  - retries transport errors, 429, 5xx and non-JSON responses with
+    exponential backoff, or the server's Retry-After, and gives failed
+    batches one more pass at the end
+  - merges the field groups of several output tables into one query per
+    batch, so a refresh walks the ID list once and writes every TSV as the
+    batches arrive
+
+Usage:
+    tables = [
+        GraphQLTable("pdb_entries.tsv", ENTRIES_COLUMNS, ENTRY_FIELDS, entry_rows),
+        GraphQLTable("pdb_validation.tsv", VALIDATION_COLUMNS, VALIDATION_FIELDS,
+                     validation_rows),
+    ]
+    counts, failed_ids = download_tables(pdb_ids, tables)
+"""
+
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from contextlib import aclosing
+from dataclasses import dataclass
+
+import httpx
+
+RCSB_GRAPHQL_URL = "https://data.rcsb.org/graphql"
+
+BATCH_SIZE = 1000
+# Batches in flight at once
+CONCURRENCY = 8
+# Request starts per second
+RATE_LIMIT = 10.0
+REQUEST_TIMEOUT = 120
+RETRY_MAX = 5
+RETRY_BACKOFF = 2
+# Print progress every N batches
+REPORT_INTERVAL = 20
+
+
+class GraphQLError(RuntimeError):
+    """A GraphQL request failed for good (bad query, or out of retries)."""
+
+
+@dataclass
+class GraphQLTable:
+    """One output TSV filled from the entries of each batch.
+
+    fields is the selection inside entries { ... } (rcsb_id is always
+    fetched); rows(entry) returns the TSV rows for one entry.
+    """
+
+    path: str
+    columns: list
+    fields: str
+    rows: Callable[[dict], list]
+
+
+def entries_query(fields: str) -> str:
+    """Query template for fields of a batch of entries; fill in the IDs with %."""
+    return "{\n  entries(entry_ids: %s) {\n    rcsb_id\n" + fields + "\n  }\n}"
+
+
+def merge_fields(field_groups) -> str:
+    """One selection covering several field groups (duplicates dropped).
+
+    GraphQL merges repeated fields such as polymer_entities { ... } that
+    appear in more than one group.
+    """
+    return "\n".join(dict.fromkeys(group.strip("\n") for group in field_groups))
+
+
+class RateLimiter:
+    """Space request starts at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _retry_delay(attempt: int, resp: httpx.Response | None = None) -> float:
+    """Exponential backoff, or the server's Retry-After if it sent one."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return RETRY_BACKOFF * (2 ** attempt)
+
+
+class RCSBGraphQLClient:
+    """Rate-limited, retrying RCSB GraphQL client with bounded concurrency."""
+
+    def __init__(self, url: str = RCSB_GRAPHQL_URL, concurrency: int = CONCURRENCY,
+                 rate: float = RATE_LIMIT, client: httpx.AsyncClient | None = None):
+        self.url = url
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self._own_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            headers={"Content-Type": "application/json"},
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._own_client:
+            await self.client.aclose()
+
+    async def query(self, query: str) -> dict:
+        """POST a query and return its "data", retrying transient failures.
+
+        Raises:
+            GraphQLError: on a 4xx other than 429, a response with errors and
+                no data, or when retries run out
+        """
+        error = "max retries"
+        for attempt in range(RETRY_MAX):
+            resp = None
+            await self.limiter.wait()
+            try:
+                resp = await self.client.post(self.url, json={"query": query})
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            else:
+                if resp.status_code == 200:
+                    try:
+                        result = resp.json()
+                    except ValueError:
+                        # e.g. an HTML error page from a proxy: retry
+                        result = None
+                    if isinstance(result, dict):
+                        if result.get("data") is None:
+                            raise GraphQLError(f"GraphQL errors: {result.get('errors')}")
+                        return result["data"]
+                    error = "HTTP 200 with a non-JSON body"
+                else:
+                    error = f"HTTP {resp.status_code}"
+                    if resp.status_code != 429 and resp.status_code < 500:
+                        raise GraphQLError(error)
+            if attempt < RETRY_MAX - 1:
+                await asyncio.sleep(_retry_delay(attempt, resp))
+        raise GraphQLError(f"{error} after {RETRY_MAX} attempts")
+
+    async def entries(self, pdb_ids, fields: str) -> list:
+        """Entries (non-null) for a batch of PDB IDs."""
+        data = await self.query(entries_query(fields) % json.dumps(list(pdb_ids)))
+        return [entry for entry in data.get("entries") or [] if entry is not None]
+
+    async def _batch(self, pdb_ids, fields):
+        try:
+            return await self.entries(pdb_ids, fields)
+        except GraphQLError as e:
+            print(f"  FAILED batch starting {pdb_ids[0]} ({len(pdb_ids)} IDs): {e}")
+            return None
+
+    async def iter_batches(self, pdb_ids, fields: str, batch_size: int = BATCH_SIZE):
+        """Yield (batch_ids, entries or None if it failed) for each batch, in order.
+
+        Keeps up to `concurrency` batches in flight; batches still in flight
+        when the caller stops early (or one raises) are cancelled.
+        """
+        batches = (pdb_ids[i:i + batch_size] for i in range(0, len(pdb_ids), batch_size))
+        in_flight = deque()
+        try:
+            for batch in batches:
+                in_flight.append((batch, asyncio.create_task(self._batch(batch, fields))))
+                if len(in_flight) >= self.concurrency:
+                    batch, task = in_flight.popleft()
+                    yield batch, await task
+            while in_flight:
+                batch, task = in_flight.popleft()
+                yield batch, await task
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
+
+
+async def _download_tables(pdb_ids, tables, batch_size, concurrency, rate, url, http_client):
+    fields = merge_fields(t.fields for t in tables)
+    files = [open(t.path, "w", newline="") for t in tables]
+    try:
+        writers = [csv.writer(f, delimiter="\t", lineterminator="\n") for f in files]
+        for table, writer in zip(tables, writers):
+            writer.writerow(table.columns)
+        counts = [0] * len(tables)
+
+        def write(entries):
+            for entry in entries:
+                for i, table in enumerate(tables):
+                    rows = table.rows(entry)
+                    writers[i].writerows(rows)
+                    counts[i] += len(rows)
+
+        n_batches = (len(pdb_ids) + batch_size - 1) // batch_size
+        failed = []
+        t0 = time.time()
+        async with RCSBGraphQLClient(url, concurrency, rate, http_client) as client:
+            done = 0
+            async with aclosing(client.iter_batches(pdb_ids, fields, batch_size)) as batches:
+                async for batch, entries in batches:
+                    done += 1
+                    if entries is None:
+                        failed.append(batch)
+                    else:
+                        write(entries)
+                    if done % REPORT_INTERVAL == 0 or done == n_batches:
+                        dt = time.time() - t0
+                        eta = dt / done * (n_batches - done)
+                        print(f"  Batch {done:,}/{n_batches:,} "
+                              f"({dt:.0f}s elapsed, ~{eta:.0f}s left)")
+
+            # One more pass over failed batches, one at a time
+            still_failed = []
+            if failed:
+                print(f"  Retrying {len(failed)} failed batches...")
+                for batch in failed:
+                    entries = await client._batch(batch, fields)
+                    if entries is None:
+                        still_failed.extend(batch)
+                    else:
+                        write(entries)
+    finally:
+        for f in files:
+            f.close()
+    return {t.path: n for t, n in zip(tables, counts)}, still_failed
+
+
+def download_tables(pdb_ids, tables, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                    rate=RATE_LIMIT, url=RCSB_GRAPHQL_URL, http_client=None):
+    """Fetch all tables' fields for pdb_ids in one pass and write their TSVs.
+
+    http_client is an optional httpx.AsyncClient to send requests with.
+    Returns ({table path: rows written}, [PDB IDs whose batch failed]).
+    """
+    names = ", ".join(os.path.basename(t.path) for t in tables)
+    print(f"\nDownloading {names} via GraphQL ({len(pdb_ids):,} entries, "
+          f"{concurrency} requests in flight, {rate:g}/s)...")
+    t0 = time.time()
+    counts, failed_ids = asyncio.run(
+        _download_tables(list(pdb_ids), tables, batch_size, concurrency, rate, url,
+                         http_client))
+    for path, count in counts.items():
+        print(f"  Wrote {count:,} rows to {path}")
+    print(f"  GraphQL pass took {time.time() - t0:.1f}s")
+    if failed_ids:
+        print(f"  WARNING: {len(failed_ids):,} PDB IDs missing after retries "
+              f"(first: {failed_ids[0]})")
+    return counts, failed_ids
@@ -0,0 +1,81 @@
+"""Fake RCSB GraphQL and Search endpoints for httpx.MockTransport."""
+
+import asyncio
+import json
+import re
+
+import httpx
+
+IDS_PATTERN = re.compile(r"entry_ids: (\[.*?\])", re.S)
+
+
+def query_ids(request) -> list:
+    """PDB IDs of an entries query."""
+    return json.loads(IDS_PATTERN.search(json.loads(request.content)["query"]).group(1))
+
+
+class FakeRCSB:
+    """Answers entries queries (when called) and revision searches (search).
+
+    entries maps PDB ID → (title, revision date); IDs not in it come back
+    as null, as obsolete entries do. Without entries every ID is answered.
+    fail maps a batch's first PDB ID to status codes returned before it
+    succeeds; a 200 among them is an HTML page, as from a failing proxy.
+    """
+
+    def __init__(self, entries=None, fail=None, search_status=200):
+        self.entries = entries
+        self.fail = {k: list(v) for k, v in (fail or {}).items()}
+        self.search_status = search_status
+        self.queries = []
+        self.fetched = []
+        self.searches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def entry(self, pdb_id):
+        if self.entries is None:
+            title, revised = f"Structure {pdb_id}", "2020-01-01"
+        elif pdb_id in self.entries:
+            title, revised = self.entries[pdb_id]
+        else:
+            return None
+        return {
+            "rcsb_id": pdb_id,
+            "struct": {"title": title},
+            "rcsb_accession_info": {"revision_date": revised},
+            "rcsb_entry_info": {"resolution_combined": [2.0],
+                                "experimental_method": "X-ray"},
+            "pdbx_vrpt_summary_geometry": [{"clashscore": 1.5}],
+        }
+
+    async def __call__(self, request):
+        ids = query_ids(request)
+        self.queries.append(json.loads(request.content)["query"])
+        self.fetched.extend(ids)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        codes = self.fail.get(ids[0])
+        if codes:
+            code = codes.pop(0)
+            if code == 200:
+                return httpx.Response(200, text="<html>502 Bad Gateway</html>")
+            return httpx.Response(code)
+        entries = [self.entry(pdb_id) for pdb_id in ids]
+        entries.append(None)  # obsolete IDs come back as null
+        return httpx.Response(200, json={"data": {"entries": entries}})
+
+    def search(self, request):
+        since = json.loads(request.content)["query"]["parameters"]["value"]
+        self.searches.append(since)
+        if self.search_status != 200:
+            return httpx.Response(self.search_status)
+        hits = [{"identifier": pdb_id, "score": 1.0}
+                for pdb_id, (_, rev) in (self.entries or {}).items() if rev[:10] >= since]
+        if not hits:
+            return httpx.Response(204)
+        return httpx.Response(200, json={"result_set": hits})
@@ -0,0 +1,151 @@
+"""Tests for pdb_incremental.py — state table, revision deltas and upserts."""
+
+import csv
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import rcsb_graphql
+from download_pdb_data import ENTRIES_COLUMNS, entries_table
+from pdb_incremental import (
+    STATE_DB,
+    PDBState,
+    incremental_refresh,
+    upsert_tsv,
+)
+
+from .fake_rcsb import FakeRCSB
+
+
+def refresh(fake, output_dir):
+    return incremental_refresh(
+        output_dir, [entries_table(os.path.join(output_dir, "pdb_entries.tsv"))],
+        sorted(fake.entries), batch_size=2, rate=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake)),
+        search_client=httpx.Client(transport=httpx.MockTransport(fake.search)),
+    )
+
+
+def titles(output_dir):
+    with open(os.path.join(output_dir, "pdb_entries.tsv"), newline="") as f:
+        rows = list(csv.reader(f, delimiter="\t"))
+    assert rows[0] == ENTRIES_COLUMNS
+    return {row[0]: row[1] for row in rows[1:]}
+
+
+@mock.patch.object(rcsb_graphql, "RETRY_BACKOFF", 0)
+class TestIncrementalRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        self.today = datetime.date.today().isoformat()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_first_run_fetches_everything(self):
+        fake = FakeRCSB({"1AAA": ("one", "2020-01-01"), "2BBB": ("two", "2021-01-01")})
+        counts = refresh(fake, self.dir)
+        self.assertEqual(titles(self.dir), {"1AAA": "one", "2BBB": "two"})
+        self.assertEqual(list(counts.values()), [2])
+        self.assertEqual(sorted(fake.fetched), ["1AAA", "2BBB"])
+        self.assertFalse([f for f in os.listdir(self.dir) if f.endswith(".delta.tsv")])
+
+    def test_refresh_fetches_only_new_and_revised(self):
+        fake = FakeRCSB({"1AAA": ("one", "2020-01-01"), "2BBB": ("two", "2021-01-01"),
+                         "3CCC": ("three", "2022-01-01")})
+        refresh(fake, self.dir)
+
+        state = PDBState(os.path.join(self.dir, STATE_DB))
+        state.set_last_refresh("pdb_entries", "2023-01-01")
+        state.commit()
+        state.close()
+
+        fake.fetched.clear()
+        fake.entries["2BBB"] = ("two v2", "2024-05-01")  # revised
+        fake.entries["4DDD"] = ("four", "2024-06-01")   # new
+        del fake.entries["3CCC"]                        # obsoleted
+        refresh(fake, self.dir)
+
+        self.assertEqual(sorted(fake.fetched), ["2BBB", "4DDD"])
+        self.assertEqual(fake.searches[-1], "2022-12-31")  # one day of overlap
+        self.assertEqual(titles(self.dir), {"1AAA": "one", "2BBB": "two v2", "4DDD": "four"})
+
+        state = PDBState(os.path.join(self.dir, STATE_DB))
+        self.assertEqual(state.known_ids("pdb_entries"), {"1AAA", "2BBB", "4DDD"})
+        self.assertEqual(state.last_refresh("pdb_entries"), self.today)
+        state.close()
+
+    def test_seeds_state_from_existing_full_download(self):
+        fake = FakeRCSB({"1AAA": ("one", "2020-01-01"), "2BBB": ("two", "2030-01-01")})
+        path = os.path.join(self.dir, "pdb_entries.tsv")
+        with open(path, "w") as f:
+            f.write("\t".join(ENTRIES_COLUMNS) + "\n")
+            f.write("1AAA\told one" + "\t" * (len(ENTRIES_COLUMNS) - 2) + "\n")
+            f.write("2BBB\told two" + "\t" * (len(ENTRIES_COLUMNS) - 2) + "\n")
+        refresh(fake, self.dir)
+        # Only the entry revised after the file was written is refetched
+        self.assertEqual(fake.fetched, ["2BBB"])
+        self.assertEqual(titles(self.dir), {"1AAA": "old one", "2BBB": "two"})
+
+    def test_seeding_drops_obsolete_and_fetches_missing_rows(self):
+        # 9ZZZ was obsoleted after the full download; 3CCC's batch failed in it
+        fake = FakeRCSB({"1AAA": ("one", "2020-01-01"), "3CCC": ("three", "2020-01-01")})
+        path = os.path.join(self.dir, "pdb_entries.tsv")
+        with open(path, "w") as f:
+            f.write("\t".join(ENTRIES_COLUMNS) + "\n")
+            f.write("1AAA\told one" + "\t" * (len(ENTRIES_COLUMNS) - 2) + "\n")
+            f.write("9ZZZ\told gone" + "\t" * (len(ENTRIES_COLUMNS) - 2) + "\n")
+        os.utime(path, (0, datetime.datetime(2023, 1, 1).timestamp()))
+        refresh(fake, self.dir)
+
+        self.assertEqual(fake.fetched, ["3CCC"])
+        self.assertEqual(titles(self.dir), {"1AAA": "old one", "3CCC": "three"})
+        state = PDBState(os.path.join(self.dir, STATE_DB))
+        self.assertEqual(state.known_ids("pdb_entries"), {"1AAA", "3CCC"})
+        state.close()
+
+    def test_search_failure_falls_back_to_revision_sweep(self):
+        fake = FakeRCSB({"1AAA": ("one", "2020-01-01"), "2BBB": ("two", "2021-01-01")})
+        refresh(fake, self.dir)
+        state = PDBState(os.path.join(self.dir, STATE_DB))
+        state.set_last_refresh("pdb_entries", "2023-01-01")
+        state.commit()
+        state.close()
+
+        fake.search_status = 500
+        fake.entries["1AAA"] = ("one v2", "2024-01-01")
+        fake.fetched.clear()
+        refresh(fake, self.dir)
+        # Sweep reads revision dates of both, then refetches the revised one
+        self.assertEqual(sorted(fake.fetched), ["1AAA", "1AAA", "2BBB"])
+        self.assertEqual(titles(self.dir), {"1AAA": "one v2", "2BBB": "two"})
+
+
+class TestUpsert(unittest.TestCase):
+
+    def test_upsert_tsv_replaces_rows_of_dropped_ids(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "t.tsv")
+            delta = os.path.join(tmp, "t.delta.tsv")
+            with open(path, "w") as f:
+                f.write('pdb_id\tv\n1AAA\ta\n1AAA\tb\n2BBB\t"multi\nline"\n3CCC\tc\n')
+            with open(delta, "w") as f:
+                f.write("pdb_id\tv\n1AAA\tnew\n")
+            rows = upsert_tsv(path, delta, {"1AAA", "2BBB"})
+            with open(path) as f:
+                content = f.read()
+        self.assertEqual(rows, 2)
+        self.assertEqual(content, "pdb_id\tv\n3CCC\tc\n1AAA\tnew\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
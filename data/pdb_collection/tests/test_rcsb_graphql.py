@@ -0,0 +1,182 @@
+"""Tests for rcsb_graphql.py — concurrent, rate-limited RCSB GraphQL client."""
+
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import rcsb_graphql
+from download_pdb_data import (
+    ENTRIES_COLUMNS,
+    VALIDATION_COLUMNS,
+    entries_table,
+    validation_table,
+)
+from rcsb_graphql import (
+    GraphQLError,
+    GraphQLTable,
+    RateLimiter,
+    RCSBGraphQLClient,
+    download_tables,
+    entries_query,
+    merge_fields,
+)
+
+from .fake_rcsb import FakeRCSB, query_ids
+
+URL = "https://rcsb.test/graphql"
+def make_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def read_tsv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f, delimiter="\t"))
+
+
+@mock.patch.object(rcsb_graphql, "RETRY_BACKOFF", 0)
+class TestClient(unittest.TestCase):
+
+    def test_query_retries_429_and_5xx(self):
+        fake = FakeRCSB(fail={"1ABC": [429, 503]})
+
+        async def run():
+            async with RCSBGraphQLClient(URL, rate=0, client=make_client(fake)) as client:
+                return await client.entries(["1ABC", "2XYZ"], "struct { title }")
+
+        entries = asyncio.run(run())
+        self.assertEqual([e["rcsb_id"] for e in entries], ["1ABC", "2XYZ"])
+        self.assertEqual(len(fake.queries), 3)
+
+    def test_non_json_response_retried(self):
+        fake = FakeRCSB(fail={"1ABC": [200, 200]})
+
+        async def run():
+            async with RCSBGraphQLClient(URL, rate=0, client=make_client(fake)) as client:
+                return await client.entries(["1ABC"], "struct { title }")
+
+        self.assertEqual([e["rcsb_id"] for e in asyncio.run(run())], ["1ABC"])
+        self.assertEqual(len(fake.queries), 3)
+
+    def test_iter_batches_cancels_pending_tasks_on_early_exit(self):
+        fake = FakeRCSB()
+        ids = [f"{i}AAA" for i in range(40)]
+
+        async def slow_after_first(request):
+            if query_ids(request)[0] != "0AAA":
+                await asyncio.sleep(5)
+            return await fake(request)
+
+        async def run():
+            async with RCSBGraphQLClient(URL, concurrency=4, rate=0,
+                                         client=make_client(slow_after_first)) as client:
+                batches = client.iter_batches(ids, "struct { title }", batch_size=2)
+                async for _ in batches:
+                    break
+                await batches.aclose()
+                return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+        self.assertEqual(asyncio.run(run()), [])
+
+    def test_client_error_not_retried(self):
+        fake = FakeRCSB(fail={"1ABC": [400]})
+
+        async def run():
+            async with RCSBGraphQLClient(URL, rate=0, client=make_client(fake)) as client:
+                await client.entries(["1ABC"], "struct { title }")
+
+        with self.assertRaises(GraphQLError):
+            asyncio.run(run())
+        self.assertEqual(len(fake.queries), 1)
+
+    def test_batches_in_order_with_bounded_concurrency(self):
+        fake = FakeRCSB()
+        ids = [f"{i}AAA" for i in range(20)]
+
+        async def run():
+            async with RCSBGraphQLClient(URL, concurrency=3, rate=0,
+                                         client=make_client(fake)) as client:
+                return [(batch, entries) async for batch, entries
+                        in client.iter_batches(ids, "struct { title }", batch_size=2)]
+
+        results = asyncio.run(run())
+        self.assertEqual([b for batch, _ in results for b in batch], ids)
+        self.assertEqual([e["rcsb_id"] for _, entries in results for e in entries], ids)
+        self.assertGreater(fake.max_in_flight, 1)
+        self.assertLessEqual(fake.max_in_flight, 3)
+
+    def test_rate_limiter_spaces_requests(self):
+        async def run():
+            limiter = RateLimiter(50)
+            t0 = time.monotonic()
+            await asyncio.gather(*(limiter.wait() for _ in range(6)))
+            return time.monotonic() - t0
+
+        self.assertGreaterEqual(asyncio.run(run()), 5 / 50 * 0.9)
+
+
+class TestQueries(unittest.TestCase):
+
+    def test_merge_fields_drops_duplicates(self):
+        merged = merge_fields(["\n  a { b }\n", "  c\n", "\n  a { b }\n"])
+        self.assertEqual(merged, "  a { b }\n  c")
+
+    def test_entries_query_template(self):
+        query = entries_query("struct { title }") % json.dumps(["1ABC"])
+        self.assertIn('entry_ids: ["1ABC"]', query)
+        self.assertIn("rcsb_id", query)
+
+
+@mock.patch.object(rcsb_graphql, "RETRY_BACKOFF", 0)
+class TestDownloadTables(unittest.TestCase):
+
+    def test_one_pass_writes_every_table(self):
+        fake = FakeRCSB()
+        ids = [f"{i}ABC" for i in range(7)]
+        with tempfile.TemporaryDirectory() as tmp:
+            tables = [entries_table(os.path.join(tmp, "pdb_entries.tsv")),
+                      validation_table(os.path.join(tmp, "pdb_validation.tsv"))]
+            counts, failed = download_tables(ids, tables, batch_size=3, rate=0,
+                                             url=URL, http_client=make_client(fake))
+            entries = read_tsv(tables[0].path)
+            validation = read_tsv(tables[1].path)
+
+        self.assertEqual(len(fake.queries), 3)  # one query per batch for both tables
+        self.assertIn("pdbx_vrpt_summary_geometry", fake.queries[0])
+        self.assertIn("rcsb_entry_info", fake.queries[0])
+        self.assertEqual(failed, [])
+        self.assertEqual(list(counts.values()), [7, 7])
+        self.assertEqual(entries[0], ENTRIES_COLUMNS)
+        self.assertEqual([row[0] for row in entries[1:]], ids)
+        self.assertEqual(validation[0], VALIDATION_COLUMNS)
+        self.assertEqual(validation[1][:2], ["0ABC", "1.5"])
+
+    def test_failed_batch_retried_then_reported(self):
+        # 3ABC's batch exhausts its retries in the first pass and recovers
+        # in the retry pass; 6ABC's batch never succeeds.
+        fake = FakeRCSB(fail={"3ABC": [500] * rcsb_graphql.RETRY_MAX,
+                              "6ABC": [500] * (2 * rcsb_graphql.RETRY_MAX)})
+        ids = [f"{i}ABC" for i in range(7)]
+        with tempfile.TemporaryDirectory() as tmp:
+            table = GraphQLTable(os.path.join(tmp, "ids.tsv"), ["pdb_id"], "",
+                                 lambda entry: [[entry["rcsb_id"]]])
+            counts, failed = download_tables(ids, [table], batch_size=3, rate=0,
+                                             url=URL, http_client=make_client(fake))
+            rows = read_tsv(table.path)
+
+        self.assertEqual(failed, ["6ABC"])
+        self.assertEqual(counts[table.path], 6)
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ids[:6])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,10 +6,16 @@ Validates multiple structures in one run, producing per-structure reports
 and a combined summary TSV. No Phenix required for AlphaFold models (pLDDT
 is extracted from B-factor column).
 
+Each model is read once for residues, mean pLDDT and the CA pLDDT
+distribution. PDB and mmCIF inputs are accepted, gzipped or not. With
+--workers N structures are parsed on a process pool; each report JSON and
+summary.tsv row is written as soon as its structure is validated, in
+input order.
+
 Usage:
   python batch_validate.py --accessions P0A6Y8 Q9Y6K9 --output-dir results/
   python batch_validate.py --accession-file accessions.txt --output-dir results/
-  python batch_validate.py --pdb-dir models/ --output-dir results/
+  python batch_validate.py --pdb-dir models/ --output-dir results/ --workers 8
   python batch_validate.py --pdb-dir models/ --output-dir results/ --export-tsv
 """
 
@@ -19,52 +25,56 @@ import glob
 import json
 import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
 SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, SCRIPTS_DIR)
 
-from retrieve_alphafold import validate_pdb, METADATA_HEADER
+from retrieve_alphafold import parse_structure, DEFAULT_CACHE_DIR, METADATA_HEADER
+
+# Model files picked up from --pdb-dir
+STRUCTURE_PATTERNS = ["*.pdb", "*.pdb.gz", "*.cif", "*.cif.gz"]
+
+SUMMARY_COLUMNS = [
+    "name", "n_residues", "mean_plddt", "quality",
+    "plddt_very_high", "plddt_high", "plddt_low", "plddt_very_low",
+]
+
+
+def find_structures(directory):
+    """Sorted PDB/mmCIF model files (optionally gzipped) in directory."""
+    paths = []
+    for pattern in STRUCTURE_PATTERNS:
+        paths.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(paths)
+
+
+def structure_name(path):
+    """Report name for a model file: its basename without extension(s)."""
+    return os.path.splitext(os.path.basename(path).removesuffix(".gz"))[0]
 
 
 def validate_pdb_file(pdb_path):
-    """Validate a single PDB file and return a report dict.
+    """Validate a single PDB or mmCIF file and return a report dict.
 
     For AlphaFold models, pLDDT is in the B-factor column.
     No Phenix required.
     """
-    n_residues, mean_plddt = validate_pdb(pdb_path)
-
-    # Compute pLDDT distribution from B-factor column
-    plddt_bins = {"very_high": 0, "high": 0, "low": 0, "very_low": 0}
-    atom_count = 0
-
-    with open(pdb_path) as f:
-        for line in f:
-            if line.startswith("ATOM") and line[12:16].strip() == "CA":
-                atom_count += 1
-                try:
-                    plddt = float(line[60:66].strip())
-                    if plddt >= 90:
-                        plddt_bins["very_high"] += 1
-                    elif plddt >= 70:
-                        plddt_bins["high"] += 1
-                    elif plddt >= 50:
-                        plddt_bins["low"] += 1
-                    else:
-                        plddt_bins["very_low"] += 1
-                except (ValueError, IndexError):
-                    pass
-
-    # Convert to percentages
-    if atom_count > 0:
+    stats = parse_structure(pdb_path)
+    mean_plddt = stats["mean_plddt"]
+
+    # Convert CA pLDDT counts to percentages
+    plddt_bins = dict(stats["ca_plddt_bins"])
+    if stats["n_ca"] > 0:
         for key in plddt_bins:
-            plddt_bins[key] = round(100.0 * plddt_bins[key] / atom_count, 1)
+            plddt_bins[key] = round(100.0 * plddt_bins[key] / stats["n_ca"], 1)
 
     report = {
         "model": pdb_path,
-        "name": os.path.splitext(os.path.basename(pdb_path))[0],
-        "n_residues": n_residues,
+        "name": structure_name(pdb_path),
+        "n_residues": stats["n_residues"],
         "mean_plddt": mean_plddt,
         "plddt_distribution": plddt_bins,
         "validation_date": date.today().isoformat(),
@@ -83,69 +93,122 @@ def validate_pdb_file(pdb_path):
     return report
 
 
-def batch_validate_pdbs(pdb_paths, output_dir):
-    """Validate a list of PDB files and produce reports.
+def _validate_or_error(pdb_path):
+    """validate_pdb_file, with a failure turned into an error report."""
+    try:
+        return validate_pdb_file(pdb_path)
+    except Exception as e:
+        return {"model": pdb_path, "name": structure_name(pdb_path), "error": str(e)}
 
-    Returns list of report dicts.
-    """
-    os.makedirs(output_dir, exist_ok=True)
-    reports = []
 
-    for i, pdb_path in enumerate(pdb_paths, 1):
-        name = os.path.splitext(os.path.basename(pdb_path))[0]
-        print(f"[{i}/{len(pdb_paths)}] Validating {name}...")
+class SummaryWriter:
+    """Appends summary TSV rows as reports arrive (header written once)."""
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.path = path
+        self.f = open(path, "a", newline="")
+        self.writer = csv.writer(self.f, delimiter="\t", lineterminator="\n")
+        if new_file:
+            self.writer.writerow(SUMMARY_COLUMNS)
+
+    def write(self, report):
+        if "error" in report:
+            return
+        self.writer.writerow(summary_row(report))
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
 
-        try:
-            report = validate_pdb_file(pdb_path)
-            reports.append(report)
 
+def batch_validate_pdbs(pdb_paths, output_dir, workers=1, summary_path=None):
+    """Validate a list of PDB/mmCIF files and produce reports.
+
+    With workers > 1, files are parsed on a process pool, at most
+    2 x workers at a time. Each structure's JSON report is written, and
+    its row appended to summary_path if given, as soon as it is validated
+    (in input order).
+
+    Returns list of report dicts, in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    reports = []
+    summary = SummaryWriter(summary_path) if summary_path else None
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight = deque()
+
+    def finish(report):
+        reports.append(report)
+        name = report["name"]
+        prefix = f"[{len(reports)}/{len(pdb_paths)}] {name}:"
+        if "error" in report:
+            print(f"{prefix} ERROR: {report['error']}")
+        else:
             # Write per-structure JSON report
             report_path = os.path.join(output_dir, f"{name}_report.json")
             with open(report_path, "w") as f:
                 json.dump(report, f, indent=2)
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            reports.append({
-                "model": pdb_path,
-                "name": name,
-                "error": str(e),
-            })
+            print(f"{prefix} {report['n_residues']} residues, "
+                  f"mean pLDDT={report['mean_plddt']} ({report['quality']})")
+        if summary is not None:
+            summary.write(report)
+
+    try:
+        for pdb_path in pdb_paths:
+            if pool is None:
+                finish(_validate_or_error(pdb_path))
+                continue
+            in_flight.append(pool.submit(_validate_or_error, pdb_path))
+            while len(in_flight) > 2 * workers:
+                finish(in_flight.popleft().result())
+        while in_flight:
+            finish(in_flight.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if summary is not None:
+            summary.close()
 
     return reports
 
 
-def batch_validate_accessions(accessions, output_dir):
+def batch_validate_accessions(accessions, output_dir, workers=1, summary_path=None,
+                              cache_dir=DEFAULT_CACHE_DIR):
     """Retrieve AlphaFold structures and validate them.
 
+    Structures are retrieved concurrently through the structure cache at
+    cache_dir (None to always download). workers and summary_path are
+    passed on to batch_validate_pdbs.
     Returns list of report dicts.
     """
     try:
-        import requests
+        import requests  # noqa: F401
     except ImportError:
         print("ERROR: 'requests' package required for accession retrieval")
         sys.exit(1)
 
-    from retrieve_alphafold import retrieve_structure
+    from retrieve_alphafold import StructureCache, retrieve_structures
 
     os.makedirs(output_dir, exist_ok=True)
     download_dir = os.path.join(output_dir, "structures")
     os.makedirs(download_dir, exist_ok=True)
 
-    session = requests.Session()
+    cache = StructureCache(cache_dir) if cache_dir else None
+    print(f"Retrieving {len(accessions)} accessions...")
+    retrieved = retrieve_structures(accessions, download_dir, cache=cache)
+    print()
+
     pdb_paths = []
     metadata_list = []
-
-    for i, acc in enumerate(accessions, 1):
-        print(f"[{i}/{len(accessions)}] Retrieving {acc}...")
-        metadata = retrieve_structure(acc, download_dir, session=session)
+    for acc, metadata in retrieved.items():
         if metadata:
             pdb_path = os.path.join(download_dir, acc, "model.pdb")
             if os.path.exists(pdb_path):
                 pdb_paths.append(pdb_path)
                 metadata_list.append(metadata)
-        print()
 
-    reports = batch_validate_pdbs(pdb_paths, output_dir)
+    reports = batch_validate_pdbs(pdb_paths, output_dir, workers, summary_path)
 
     # Enrich reports with accession info
     for report, metadata in zip(reports, metadata_list):
@@ -154,30 +217,30 @@ def batch_validate_accessions(accessions, output_dir):
     return reports
 
 
-def write_summary_tsv(reports, output_path):
-    """Write a combined summary TSV from batch reports."""
-    columns = [
-        "name", "n_residues", "mean_plddt", "quality",
-        "plddt_very_high", "plddt_high", "plddt_low", "plddt_very_low",
+def summary_row(report):
+    """Summary TSV row (SUMMARY_COLUMNS) for a successful report."""
+    dist = report.get("plddt_distribution", {})
+    return [
+        report.get("name", ""),
+        report.get("n_residues", 0),
+        report.get("mean_plddt", 0),
+        report.get("quality", ""),
+        dist.get("very_high", 0),
+        dist.get("high", 0),
+        dist.get("low", 0),
+        dist.get("very_low", 0),
     ]
 
+
+def write_summary_tsv(reports, output_path):
+    """Write a combined summary TSV from batch reports."""
     with open(output_path, "w", newline="") as f:
         writer = csv.writer(f, delimiter="\t", lineterminator="\n")
-        writer.writerow(columns)
+        writer.writerow(SUMMARY_COLUMNS)
         for r in reports:
             if "error" in r:
                 continue
-            dist = r.get("plddt_distribution", {})
-            writer.writerow([
-                r.get("name", ""),
-                r.get("n_residues", 0),
-                r.get("mean_plddt", 0),
-                r.get("quality", ""),
-                dist.get("very_high", 0),
-                dist.get("high", 0),
-                dist.get("low", 0),
-                dist.get("very_low", 0),
-            ])
+            writer.writerow(summary_row(r))
 
     print(f"Summary written to {output_path}")
 
@@ -259,9 +322,16 @@ def main():
     )
     parser.add_argument("--accessions", nargs="+", help="UniProt accessions to retrieve and validate")
     parser.add_argument("--accession-file", help="File with one accession per line")
-    parser.add_argument("--pdb-dir", help="Directory of PDB files to validate")
-    parser.add_argument("--pdb-files", nargs="+", help="Individual PDB files to validate")
+    parser.add_argument("--pdb-dir",
+                        help="Directory of PDB/mmCIF files (.pdb, .cif, optionally .gz) to validate")
+    parser.add_argument("--pdb-files", nargs="+", help="Individual PDB/mmCIF files to validate")
     parser.add_argument("--output-dir", default="batch_results", help="Output directory")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes parsing structures (default: 1, in-process)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"AlphaFold structure cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Download accessions without using the structure cache")
     parser.add_argument("--export-tsv", action="store_true",
                         help="Also export to validation_reports.tsv for Delta Lake")
     args = parser.parse_args()
@@ -279,7 +349,7 @@ def main():
 
     pdb_files = []
     if args.pdb_dir:
-        pdb_files.extend(sorted(glob.glob(os.path.join(args.pdb_dir, "*.pdb"))))
+        pdb_files.extend(find_structures(args.pdb_dir))
     if args.pdb_files:
         pdb_files.extend(args.pdb_files)
 
@@ -287,16 +357,22 @@ def main():
         parser.error("Provide --accessions, --accession-file, --pdb-dir, or --pdb-files")
 
     os.makedirs(args.output_dir, exist_ok=True)
+    summary_path = os.path.join(args.output_dir, "summary.tsv")
+    if os.path.exists(summary_path):
+        os.remove(summary_path)
 
-    # Validate
+    # Validate (summary.tsv rows are appended as structures finish)
     reports = []
     if accessions:
-        reports.extend(batch_validate_accessions(accessions, args.output_dir))
+        reports.extend(batch_validate_accessions(
+            accessions, args.output_dir, args.workers, summary_path,
+            None if args.no_cache else args.cache_dir))
     if pdb_files:
-        reports.extend(batch_validate_pdbs(pdb_files, args.output_dir))
+        reports.extend(batch_validate_pdbs(
+            pdb_files, args.output_dir, args.workers, summary_path))
 
     # Write outputs
-    write_summary_tsv(reports, os.path.join(args.output_dir, "summary.tsv"))
+    print(f"Summary written to {summary_path}")
     write_batch_stats(reports, args.output_dir)
 
     if args.export_tsv:
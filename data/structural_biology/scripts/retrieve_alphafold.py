@@ -6,10 +6,18 @@ Downloads PDB, mmCIF, and PAE (Predicted Aligned Error) files for given UniProt
 accession(s). Validates downloaded files and outputs metadata as TSV rows
 suitable for the `alphafold_structures` Delta Lake table.
 
+Accessions are retrieved concurrently (--workers threads) with requests to
+each host spaced to a rate limit, and transient failures (429, 5xx,
+connection errors) retried with backoff. Downloaded files are kept in a
+content-addressed cache (--cache-dir, default $ALPHAFOLD_CACHE or
+$SCRATCH/alphafold_cache) keyed by accession and model version, so later
+runs and other projects copy them from local disk without contacting EBI
+(--refresh re-checks the latest model version).
+
 Usage:
   python retrieve_alphafold.py --accession P0A6Y8
   python retrieve_alphafold.py --accession P0A6Y8 Q9Y6K9 --output-dir ./structures
-  python retrieve_alphafold.py --accession-file accessions.txt --output-dir ./structures
+  python retrieve_alphafold.py --accession-file accessions.txt --output-dir ./structures --workers 16
   python retrieve_alphafold.py --accession P0A6Y8 --upload  # upload to MinIO
 
 Output:
@@ -21,10 +29,20 @@ Output:
 """
 
 import argparse
+import gzip
+import hashlib
 import json
 import os
+import re
+import shlex
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from urllib.parse import urlsplit
 
 try:
     import requests
@@ -36,6 +54,20 @@ EBI_BASE_URL = "https://alphafold.ebi.ac.uk"
 EBI_API_URL = f"{EBI_BASE_URL}/api"
 MINIO_BASE = "s3a://cdm-lake/tenant-general-warehouse/kescience/structural-biology/alphafold-structures"
 
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ALPHAFOLD_CACHE",
+    os.path.join(os.environ.get("SCRATCH", "/tmp"), "alphafold_cache"),
+)
+# Accessions retrieved at once
+WORKERS = 8
+# Requests per second to any one host
+HOST_RATE_LIMIT = 10.0
+RETRY_MAX = 4
+RETRY_BACKOFF = 2
+DOWNLOAD_CHUNK = 1 << 20
+# Files kept per accession (model.pdb is required, the others optional)
+STRUCTURE_FILES = ["model.pdb", "model.cif", "pae.json"]
+
 METADATA_HEADER = [
     "uniprot_accession",
     "pdb_path",
@@ -48,61 +80,299 @@ METADATA_HEADER = [
 ]
 
 
+class HostRateLimiter:
+    """Space requests to each host at least 1/rate seconds apart (thread-safe)."""
+
+    def __init__(self, rate=HOST_RATE_LIMIT, host_rates=None):
+        self.rate = rate
+        self.host_rates = dict(host_rates or {})
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        rate = self.host_rates.get(host, self.rate)
+        interval = 1.0 / rate if rate > 0 else 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, 0.0))
+            self._next[host] = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+
+RATE_LIMITER = HostRateLimiter()
+
+
+def _retry_delay(attempt, resp=None):
+    """Exponential backoff, or the server's Retry-After if it sent one."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return RETRY_BACKOFF * (2 ** attempt)
+
+
+def http_get(url, session, timeout=30, stream=False):
+    """GET url under RATE_LIMITER, retrying 429, 5xx and connection errors.
+
+    A 404 response is returned as is; other errors raise requests.HTTPError.
+    """
+    for attempt in range(RETRY_MAX):
+        RATE_LIMITER.wait(url)
+        resp = None
+        try:
+            resp = session.get(url, timeout=timeout, stream=stream)
+            if resp.status_code == 404:
+                return resp
+            resp.raise_for_status()
+            return resp
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 0
+            if (status != 429 and status < 500) or attempt == RETRY_MAX - 1:
+                raise
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == RETRY_MAX - 1:
+                raise
+        time.sleep(_retry_delay(attempt, resp))
+
+
 def fetch_alphafold_entry(accession, session=None):
     """Fetch AlphaFold entry metadata from the EBI API."""
     s = session or requests.Session()
     url = f"{EBI_API_URL}/prediction/{accession}"
-    resp = s.get(url, timeout=30)
+    resp = http_get(url, s, timeout=30)
     if resp.status_code == 404:
         print(f"  WARNING: No AlphaFold entry found for {accession}")
         return None
-    resp.raise_for_status()
     return resp.json()
 
 
 def download_file(url, output_path, session=None):
     """Download a file from URL to output_path."""
     s = session or requests.Session()
-    resp = s.get(url, timeout=120, stream=True)
-    resp.raise_for_status()
-    with open(output_path, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=8192):
+    resp = http_get(url, s, timeout=120, stream=True)
+    if resp.status_code == 404:
+        resp.raise_for_status()
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK):
             f.write(chunk)
+    os.replace(tmp_path, output_path)
     size = os.path.getsize(output_path)
     print(f"  Downloaded {output_path} ({size:,} bytes)")
     return size
 
 
-def validate_pdb(pdb_path):
-    """Validate PDB file: check for ATOM records and count residues."""
+def clear_structure_files(acc_dir):
+    """Create acc_dir, removing any STRUCTURE_FILES left by an earlier retrieval."""
+    os.makedirs(acc_dir, exist_ok=True)
+    for name in STRUCTURE_FILES:
+        path = os.path.join(acc_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def model_version(entry, pdb_url):
+    """Model version of an API entry (latestVersion, else from the PDB URL)."""
+    if entry.get("latestVersion"):
+        return str(entry["latestVersion"])
+    match = re.search(r"_v(\d+)\.pdb$", pdb_url)
+    return match.group(1) if match else "unknown"
+
+
+class StructureCache:
+    """
+    Content-addressed local cache of AlphaFold files.
+
+    objects/ab/abcd... holds each file's bytes once under its SHA-256,
+    however many accessions or versions share it. index/<accession>/
+    v<version>.json maps an accession and model version to its files'
+    hashes and API entry; index/<accession>/latest.json is the last
+    version fetched, used when no version is asked for. Writes go through
+    temp files and renames, so concurrent retrievals are safe.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _manifest_path(self, accession, version):
+        return os.path.join(self.root, "index", accession, f"{version}.json")
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def store(self, path):
+        """Add a file's content to the object store; return its SHA-256."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK), b""):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        object_path = self.object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+            os.close(fd)
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, object_path)
+        return digest
+
+    def get(self, accession, version=None):
+        """Manifest for accession (at version, else the latest fetched), or None.
+
+        A manifest whose objects are missing counts as a miss.
+        """
+        name = f"v{version}" if version is not None else "latest"
+        try:
+            with open(self._manifest_path(accession, name)) as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not all(os.path.exists(self.object_path(d)) for d in manifest["files"].values()):
+            return None
+        return manifest
+
+    def put(self, accession, version, entry, paths):
+        """Store {file name: local path} as accession's files at version."""
+        manifest = {
+            "accession": accession,
+            "version": version,
+            "entry": entry,
+            "files": {name: self.store(path) for name, path in paths.items()},
+            "fetched": date.today().isoformat(),
+        }
+        self._write_json(self._manifest_path(accession, f"v{version}"), manifest)
+        self._write_json(self._manifest_path(accession, "latest"), manifest)
+        return manifest
+
+    def materialize(self, manifest, dest_dir):
+        """Copy a manifest's files into dest_dir, replacing any other version's."""
+        clear_structure_files(dest_dir)
+        for name, digest in manifest["files"].items():
+            dest = os.path.join(dest_dir, name)
+            shutil.copyfile(self.object_path(digest), dest + ".tmp")
+            os.replace(dest + ".tmp", dest)
+
+
+# CA pLDDT bins, highest first: (name, lower bound)
+PLDDT_BINS = [("very_high", 90), ("high", 70), ("low", 50), ("very_low", float("-inf"))]
+
+
+def plddt_bin(plddt):
+    """Name of the pLDDT bin a value falls in."""
+    for name, lower in PLDDT_BINS:
+        if plddt >= lower:
+            return name
+
+
+def open_structure(path):
+    """Open a PDB or mmCIF file as text, decompressing .gz files."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def is_mmcif(path):
+    """Whether path names an mmCIF file (.cif/.mmcif, optionally .gz)."""
+    return path.removesuffix(".gz").endswith((".cif", ".mmcif"))
+
+
+def _mmcif_atoms(f):
+    """(chain, residue number, atom name, B-factor text) per mmCIF ATOM row.
+
+    Reads the _atom_site loop, preferring author chain/residue/atom names
+    as the PDB format uses.
+    """
+    index = {}
+    fields = None
+    for line in f:
+        if line.startswith("_atom_site."):
+            index[line.strip()[len("_atom_site."):]] = len(index)
+            continue
+        if not index or not line.strip():
+            continue
+        if line.startswith(("#", "loop_", "_", "data_")):
+            break  # end of the _atom_site loop
+        if fields is None:
+            fields = (
+                index["group_PDB"],
+                index.get("auth_asym_id", index.get("label_asym_id")),
+                index.get("auth_seq_id", index.get("label_seq_id")),
+                index.get("auth_atom_id", index.get("label_atom_id")),
+                index["B_iso_or_equiv"],
+            )
+            group, chain, resnum, atom, bfactor = fields
+        values = shlex.split(line) if "'" in line or '"' in line else line.split()
+        if values[group] == "ATOM":
+            yield values[chain], values[resnum], values[atom], values[bfactor]
+
+
+def parse_structure(path):
+    """Read a PDB or mmCIF model (optionally gzipped) in a single pass.
+
+    Returns a dict with n_atoms and n_residues over ATOM records,
+    mean_plddt (mean B-factor over those atoms, which holds pLDDT in
+    AlphaFold models), n_ca, and ca_plddt_bins counting CA atoms per
+    PLDDT_BINS bin.
+    """
     residues = set()
     atom_count = 0
     plddt_sum = 0.0
     plddt_count = 0
+    ca_count = 0
+    ca_bins = {name: 0 for name, _ in PLDDT_BINS}
 
-    with open(pdb_path) as f:
-        for line in f:
-            if line.startswith("ATOM"):
-                atom_count += 1
-                chain = line[21]
-                resnum = line[22:26].strip()
-                residues.add((chain, resnum))
-                # B-factor column contains pLDDT in AlphaFold models
-                try:
-                    plddt = float(line[60:66].strip())
-                    plddt_sum += plddt
-                    plddt_count += 1
-                except (ValueError, IndexError):
-                    pass
-
-    n_residues = len(residues)
-    mean_plddt = round(plddt_sum / plddt_count, 2) if plddt_count > 0 else 0.0
-
-    if atom_count == 0:
+    with open_structure(path) as f:
+        if is_mmcif(path):
+            atoms = _mmcif_atoms(f)
+        else:
+            # (chain, residue number, atom name, B-factor text) per ATOM record
+            atoms = ((line[21], line[22:26].strip(), line[12:16].strip(), line[60:66])
+                     for line in f if line.startswith("ATOM"))
+        for chain, resnum, atom_name, bfactor in atoms:
+            atom_count += 1
+            residues.add((chain, resnum))
+            try:
+                plddt = float(bfactor)
+            except ValueError:
+                if atom_name == "CA":
+                    ca_count += 1
+                continue
+            plddt_sum += plddt
+            plddt_count += 1
+            if atom_name == "CA":
+                ca_count += 1
+                ca_bins[plddt_bin(plddt)] += 1
+
+    return {
+        "n_atoms": atom_count,
+        "n_residues": len(residues),
+        "mean_plddt": round(plddt_sum / plddt_count, 2) if plddt_count > 0 else 0.0,
+        "n_ca": ca_count,
+        "ca_plddt_bins": ca_bins,
+    }
+
+
+def validate_pdb(pdb_path):
+    """Validate PDB file: check for ATOM records and count residues."""
+    stats = parse_structure(pdb_path)
+    if stats["n_atoms"] == 0:
         print(f"  WARNING: No ATOM records found in {pdb_path}")
         return 0, 0.0
 
-    print(f"  PDB validation: {atom_count} atoms, {n_residues} residues, mean pLDDT={mean_plddt}")
+    n_residues, mean_plddt = stats["n_residues"], stats["mean_plddt"]
+    print(f"  PDB validation: {stats['n_atoms']} atoms, {n_residues} residues, "
+          f"mean pLDDT={mean_plddt}")
     return n_residues, mean_plddt
 
 
@@ -145,60 +415,88 @@ def validate_pae(pae_path):
     return True
 
 
-def retrieve_structure(accession, output_dir, session=None):
-    """Retrieve all files for a single accession. Returns metadata dict or None."""
-    print(f"Retrieving AlphaFold structure for {accession}...")
-    s = session or requests.Session()
-
-    # Fetch entry metadata from API
-    entry = fetch_alphafold_entry(accession, session=s)
-    if entry is None:
-        return None
-
-    # Handle API response (can be a list)
-    if isinstance(entry, list):
-        if len(entry) == 0:
-            print(f"  WARNING: Empty response for {accession}")
-            return None
-        entry = entry[0]
+def retrieve_structure(accession, output_dir, session=None, cache=None, refresh=False):
+    """Retrieve all files for a single accession. Returns metadata dict or None.
 
-    # Create output directory
+    With a StructureCache, the files of the latest version fetched before
+    are copied from it without contacting EBI (unless refresh), and new
+    downloads are added to it once every file the entry advertises has
+    been downloaded.
+    """
+    print(f"Retrieving AlphaFold structure for {accession}...")
     acc_dir = os.path.join(output_dir, accession)
-    os.makedirs(acc_dir, exist_ok=True)
-
-    # Extract download URLs from API response
-    pdb_url = entry.get("pdbUrl")
-    cif_url = entry.get("cifUrl")
-    pae_url = entry.get("paeDocUrl") or entry.get("paeImageUrl")
-
-    # Fallback to constructed URLs if API doesn't provide them
-    if not pdb_url:
-        pdb_url = f"{EBI_BASE_URL}/files/AF-{accession}-F1-model_v4.pdb"
-    if not cif_url:
-        cif_url = f"{EBI_BASE_URL}/files/AF-{accession}-F1-model_v4.cif"
-    if not pae_url:
-        pae_url = f"{EBI_BASE_URL}/files/AF-{accession}-F1-predicted_aligned_error_v4.json"
-
     pdb_path = os.path.join(acc_dir, "model.pdb")
     cif_path = os.path.join(acc_dir, "model.cif")
     pae_path = os.path.join(acc_dir, "pae.json")
 
-    # Download files
-    try:
-        download_file(pdb_url, pdb_path, session=s)
-    except Exception as e:
-        print(f"  ERROR downloading PDB: {e}")
-        return None
+    manifest = cache.get(accession) if cache is not None and not refresh else None
+    if manifest is None:
+        s = session or requests.Session()
 
-    try:
-        download_file(cif_url, cif_path, session=s)
-    except Exception as e:
-        print(f"  WARNING: Could not download mmCIF: {e}")
+        # Fetch entry metadata from API
+        entry = fetch_alphafold_entry(accession, session=s)
+        if entry is None:
+            return None
 
-    try:
-        download_file(pae_url, pae_path, session=s)
-    except Exception as e:
-        print(f"  WARNING: Could not download PAE: {e}")
+        # Handle API response (can be a list)
+        if isinstance(entry, list):
+            if len(entry) == 0:
+                print(f"  WARNING: Empty response for {accession}")
+                return None
+            entry = entry[0]
+
+        # Extract download URLs from API response
+        pdb_url = entry.get("pdbUrl")
+        cif_url = entry.get("cifUrl")
+        pae_url = entry.get("paeDocUrl") or entry.get("paeImageUrl")
+        advertised = {"model.pdb": pdb_url, "model.cif": cif_url, "pae.json": pae_url}
+
+        # Fallback to constructed URLs if API doesn't provide them
+        if not pdb_url:
+            pdb_url = f"{EBI_BASE_URL}/files/AF-{accession}-F1-model_v4.pdb"
+        if not cif_url:
+            cif_url = f"{EBI_BASE_URL}/files/AF-{accession}-F1-model_v4.cif"
+        if not pae_url:
+            pae_url = f"{EBI_BASE_URL}/files/AF-{accession}-F1-predicted_aligned_error_v4.json"
+
+        version = model_version(entry, pdb_url)
+        if cache is not None:
+            manifest = cache.get(accession, version)
+
+    if manifest is not None:
+        cache.materialize(manifest, acc_dir)
+        print(f"  Cached: {accession} v{manifest['version']} ({', '.join(manifest['files'])})")
+    else:
+        # Create output directory (without files of another version)
+        clear_structure_files(acc_dir)
+
+        # Download files
+        try:
+            download_file(pdb_url, pdb_path, session=s)
+        except Exception as e:
+            print(f"  ERROR downloading PDB: {e}")
+            return None
+
+        try:
+            download_file(cif_url, cif_path, session=s)
+        except Exception as e:
+            print(f"  WARNING: Could not download mmCIF: {e}")
+
+        try:
+            download_file(pae_url, pae_path, session=s)
+        except Exception as e:
+            print(f"  WARNING: Could not download PAE: {e}")
+
+        # Cache only complete retrievals, so a file the entry advertises but
+        # that failed to download is retried next time instead of cached away
+        paths = {name: os.path.join(acc_dir, name) for name in STRUCTURE_FILES}
+        missing = [name for name, url in advertised.items()
+                   if url and not os.path.exists(paths[name])]
+        if cache is not None and missing:
+            print(f"  Not caching {accession}: {', '.join(missing)} missing")
+        elif cache is not None:
+            cache.put(accession, version, entry,
+                      {name: path for name, path in paths.items() if os.path.exists(path)})
 
     # Validate
     n_residues, mean_plddt = validate_pdb(pdb_path)
@@ -252,6 +550,29 @@ def upload_to_minio(accession, local_dir):
                 print(f"  Uploaded {filename}")
 
 
+def retrieve_structures(accessions, output_dir, workers=WORKERS, cache=None, refresh=False):
+    """Retrieve several accessions concurrently, one requests.Session per thread.
+
+    Returns {accession: metadata dict or None}, in input order (duplicates
+    are retrieved once).
+    """
+    accessions = list(dict.fromkeys(accessions))
+    local = threading.local()
+
+    def retrieve(accession):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        try:
+            return retrieve_structure(accession, output_dir, session=local.session,
+                                      cache=cache, refresh=refresh)
+        except Exception as e:
+            print(f"  ERROR retrieving {accession}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(zip(accessions, pool.map(retrieve, accessions)))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Retrieve AlphaFold structures from EBI"
@@ -279,6 +600,33 @@ def main():
         "--metadata-tsv",
         help="Append all metadata rows to this combined TSV file",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help=f"Accessions retrieved at once (default: {WORKERS})",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=HOST_RATE_LIMIT,
+        help=f"Max requests per second to each host (default: {HOST_RATE_LIMIT:g})",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Content-addressed file cache (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download, without reading or filling the cache",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ask EBI for the latest model version even if one is cached",
+    )
     args = parser.parse_args()
 
     # Collect accessions
@@ -295,21 +643,23 @@ def main():
         parser.error("Provide --accession or --accession-file")
 
     os.makedirs(args.output_dir, exist_ok=True)
+    RATE_LIMITER.rate = args.rate
+    cache = None if args.no_cache else StructureCache(args.cache_dir)
 
-    # Process each accession
-    session = requests.Session()
+    # Retrieve accessions concurrently
+    retrieved = retrieve_structures(accessions, args.output_dir, args.workers, cache,
+                                    args.refresh)
     results = []
     failed = []
 
-    for acc in accessions:
-        metadata = retrieve_structure(acc, args.output_dir, session=session)
+    for acc, metadata in retrieved.items():
         if metadata:
             results.append(metadata)
             if args.upload:
                 upload_to_minio(acc, args.output_dir)
         else:
             failed.append(acc)
-        print()
+    print()
 
     # Write combined metadata TSV
     if args.metadata_tsv and results:
@@ -325,7 +675,7 @@ def main():
     print("=" * 60)
     print("SUMMARY")
     print("=" * 60)
-    print(f"  Retrieved: {len(results)}/{len(accessions)}")
+    print(f"  Retrieved: {len(results)}/{len(retrieved)}")
     if failed:
         print(f"  Failed:    {', '.join(failed)}")
     print(f"  Output:    {args.output_dir}")
@@ -179,7 +179,8 @@ def upload_to_minio(local_path, minio_path):
 
 def cmd_retrieve(args):
     """Retrieve AlphaFold structure(s)."""
-    from retrieve_alphafold import retrieve_structure
+    from retrieve_alphafold import DEFAULT_CACHE_DIR, RATE_LIMITER, WORKERS, \
+        StructureCache, retrieve_structures
 
     project_dir = None
     if args.project_id:
@@ -189,11 +190,13 @@ def cmd_retrieve(args):
         os.path.join(project_dir, "input") if project_dir else "."
     )
 
-    import requests as req
-    session = req.Session()
+    if args.rate:
+        RATE_LIMITER.rate = args.rate
+    cache = None if args.no_cache else StructureCache(args.cache_dir or DEFAULT_CACHE_DIR)
+    retrieved = retrieve_structures(args.accession, output_dir, args.workers or WORKERS,
+                                    cache, args.refresh)
 
-    for acc in args.accession:
-        metadata = retrieve_structure(acc, output_dir, session=session)
+    for acc, metadata in retrieved.items():
         if metadata and project_dir:
             log_provenance(
                 project_dir,
@@ -495,25 +498,30 @@ def cmd_finalize(args):
 
 
 def cmd_batch_validate(args):
-    """Batch validate AlphaFold structures or local PDB files."""
+    """Batch validate AlphaFold structures or local PDB/mmCIF files."""
     from batch_validate import batch_validate_accessions, batch_validate_pdbs, \
-        write_summary_tsv, write_batch_stats, print_summary
-    import glob as globmod
+        find_structures, write_batch_stats, print_summary
+    from retrieve_alphafold import DEFAULT_CACHE_DIR
 
     os.makedirs(args.output_dir, exist_ok=True)
+    summary_path = os.path.join(args.output_dir, "summary.tsv")
+    if os.path.exists(summary_path):
+        os.remove(summary_path)
     reports = []
 
     accessions = args.accessions or []
     if accessions:
-        reports.extend(batch_validate_accessions(accessions, args.output_dir))
+        reports.extend(batch_validate_accessions(
+            accessions, args.output_dir, args.workers, summary_path,
+            None if args.no_cache else args.cache_dir or DEFAULT_CACHE_DIR))
 
     if args.pdb_dir:
-        pdb_files = sorted(globmod.glob(os.path.join(args.pdb_dir, "*.pdb")))
+        pdb_files = find_structures(args.pdb_dir)
         if pdb_files:
-            reports.extend(batch_validate_pdbs(pdb_files, args.output_dir))
+            reports.extend(batch_validate_pdbs(
+                pdb_files, args.output_dir, args.workers, summary_path))
 
     if reports:
-        write_summary_tsv(reports, os.path.join(args.output_dir, "summary.tsv"))
         write_batch_stats(reports, args.output_dir)
         print_summary(reports)
 
@@ -614,6 +622,15 @@ def main():
     p_ret.add_argument("--accession", nargs="+", required=True)
     p_ret.add_argument("--project-id")
     p_ret.add_argument("--output-dir")
+    p_ret.add_argument("--workers", type=int, help="Accessions retrieved at once (default: 8)")
+    p_ret.add_argument("--rate", type=float,
+                       help="Max requests per second to each host (default: 10)")
+    p_ret.add_argument("--cache-dir",
+                       help="Content-addressed AlphaFold file cache (default: $ALPHAFOLD_CACHE)")
+    p_ret.add_argument("--no-cache", action="store_true",
+                       help="Always download, without reading or filling the cache")
+    p_ret.add_argument("--refresh", action="store_true",
+                       help="Check EBI for the latest model version even if one is cached")
 
     # validate
     p_val = subparsers.add_parser("validate", help="Run validation on a model")
@@ -671,8 +688,13 @@ def main():
     # batch-validate (M4)
     p_bv = subparsers.add_parser("batch-validate", help="Batch validate structures")
     p_bv.add_argument("--accessions", nargs="+", help="UniProt accessions")
-    p_bv.add_argument("--pdb-dir", help="Directory of PDB files")
+    p_bv.add_argument("--pdb-dir", help="Directory of PDB/mmCIF files (optionally gzipped)")
     p_bv.add_argument("--output-dir", default="batch_results")
+    p_bv.add_argument("--workers", type=int, default=1, help="Processes parsing structures")
+    p_bv.add_argument("--cache-dir",
+                      help="Content-addressed AlphaFold file cache (default: $ALPHAFOLD_CACHE)")
+    p_bv.add_argument("--no-cache", action="store_true",
+                      help="Download accessions without using the structure cache")
 
     # advise (M4)
     p_adv = subparsers.add_parser("advise", help="Get strategy recommendation")
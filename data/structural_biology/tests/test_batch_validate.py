@@ -1,8 +1,10 @@
 """Tests for batch_validate.py — batch structure validation."""
 
 import csv
+import gzip
 import json
 import os
+import shutil
 import sys
 import tempfile
 import unittest
@@ -12,6 +14,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
 from batch_validate import (
     validate_pdb_file,
     batch_validate_pdbs,
+    find_structures,
     write_summary_tsv,
     write_batch_stats,
 )
@@ -38,6 +41,26 @@ def _make_pdb(filepath, n_residues=10, mean_plddt=85.0):
         f.write("END\n")
 
 
+def _pdb_to_mmcif(pdb_path, cif_path):
+    """Write the ATOM records of a PDB file as an mmCIF _atom_site loop."""
+    columns = ["group_PDB", "id", "type_symbol", "label_atom_id", "label_comp_id",
+               "label_asym_id", "label_seq_id", "Cartn_x", "Cartn_y", "Cartn_z",
+               "occupancy", "B_iso_or_equiv", "auth_seq_id", "auth_asym_id", "auth_atom_id"]
+    with open(pdb_path) as f, open(cif_path, "w") as out:
+        out.write("data_model\n#\nloop_\n")
+        out.writelines(f"_atom_site.{c}\n" for c in columns)
+        for line in f:
+            if not line.startswith("ATOM"):
+                continue
+            name, chain, resnum = line[12:16].strip(), line[21], line[22:26].strip()
+            out.write(" ".join([
+                "ATOM", line[6:11].strip(), line[76:78].strip(), name, line[17:20], chain,
+                resnum, line[30:38].strip(), line[38:46].strip(), line[46:54].strip(),
+                line[54:60].strip(), line[60:66].strip(), resnum, chain, name,
+            ]) + "\n")
+        out.write("#\n")
+
+
 class TestValidatePdbFile(unittest.TestCase):
     """Test single PDB validation."""
 
@@ -70,6 +93,33 @@ class TestValidatePdbFile(unittest.TestCase):
                        "plddt_distribution", "validation_date"]:
             self.assertIn(field, report)
 
+    def test_ca_distribution(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "model.pdb")
+            _make_pdb(path, n_residues=10, mean_plddt=80.0)  # CA pLDDT 70-90
+            report = validate_pdb_file(path)
+        # i % 5 - 2 gives offsets -10, -5, 0, 5, 10 twice each
+        self.assertEqual(report["plddt_distribution"],
+                         {"very_high": 20.0, "high": 80.0, "low": 0.0, "very_low": 0.0})
+
+    def test_gzip_and_mmcif_match_pdb(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pdb_path = os.path.join(tmpdir, "model.pdb")
+            _make_pdb(pdb_path, n_residues=25, mean_plddt=72.0)
+            with open(pdb_path, "rb") as f, gzip.open(pdb_path + ".gz", "wb") as gz:
+                shutil.copyfileobj(f, gz)
+            cif_path = os.path.join(tmpdir, "model.cif")
+            _pdb_to_mmcif(pdb_path, cif_path)
+            with open(cif_path, "rb") as f, gzip.open(cif_path + ".gz", "wb") as gz:
+                shutil.copyfileobj(f, gz)
+
+            expected = validate_pdb_file(pdb_path)
+            for path in [pdb_path + ".gz", cif_path, cif_path + ".gz"]:
+                report = validate_pdb_file(path)
+                self.assertEqual(report["name"], "model")
+                for key in ["n_residues", "mean_plddt", "plddt_distribution", "quality"]:
+                    self.assertEqual(report[key], expected[key], f"{path}: {key}")
+
 
 class TestBatchValidation(unittest.TestCase):
     """Test batch PDB validation."""
@@ -95,6 +145,41 @@ class TestBatchValidation(unittest.TestCase):
                     os.path.join(outdir, f"{name}_report.json")
                 ))
 
+    def test_find_structures(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ["a.pdb", "b.cif.gz", "c.pdb.gz", "d.cif", "notes.txt"]:
+                open(os.path.join(tmpdir, name), "w").close()
+            found = [os.path.basename(p) for p in find_structures(tmpdir)]
+        self.assertEqual(found, ["a.pdb", "b.cif.gz", "c.pdb.gz", "d.cif"])
+
+    def test_process_pool_streams_reports_and_summary(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pdb_files = []
+            for i, plddt in enumerate([92.0, 75.0, 45.0, 60.0, 88.0]):
+                path = os.path.join(tmpdir, f"model_{i}.pdb")
+                _make_pdb(path, n_residues=10 + i, mean_plddt=plddt)
+                pdb_files.append(path)
+            pdb_files.insert(2, os.path.join(tmpdir, "missing.pdb"))
+
+            serial = batch_validate_pdbs(pdb_files, os.path.join(tmpdir, "serial"))
+            outdir = os.path.join(tmpdir, "pool")
+            summary_path = os.path.join(outdir, "summary.tsv")
+            reports = batch_validate_pdbs(pdb_files, outdir, workers=2,
+                                          summary_path=summary_path)
+
+            self.assertEqual(reports, serial)
+            self.assertEqual([r["name"] for r in reports],
+                             ["model_0", "model_1", "missing", "model_2", "model_3", "model_4"])
+            self.assertIn("error", reports[2])
+            self.assertFalse(os.path.exists(os.path.join(outdir, "missing_report.json")))
+            with open(os.path.join(outdir, "model_3_report.json")) as f:
+                self.assertEqual(json.load(f), reports[4])
+
+            expected_path = os.path.join(tmpdir, "expected.tsv")
+            write_summary_tsv(serial, expected_path)
+            with open(summary_path) as f, open(expected_path) as g:
+                self.assertEqual(f.read(), g.read())
+
 
 class TestSummaryTsv(unittest.TestCase):
     """Test summary TSV generation."""
@@ -4,7 +4,10 @@ import json
 import os
 import sys
 import tempfile
+import threading
 import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
 
 # Add scripts directory to path
@@ -171,5 +174,183 @@ class TestRetrieveWithMockApi(unittest.TestCase):
             self.assertIsNone(result)
 
 
+class FixtureEBI:
+    """Local HTTP stand-in for the EBI AlphaFold API and file server.
+
+    Serves /api/prediction/<accession> for the accessions in models and
+    /files/<name> for their files, counting requests by path. Paths in
+    failures get those statuses (e.g. [503]) before succeeding.
+    """
+
+    PAE = json.dumps([{"predicted_aligned_error": [[0.0, 1.0], [1.0, 0.0]]}]).encode()
+
+    def __init__(self, accessions, version=4):
+        self.version = version
+        self.models = {acc: self.pdb(i) for i, acc in enumerate(accessions)}
+        self.requests = Counter()
+        self.failures = {}
+        self.lock = threading.Lock()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = fixture.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    @staticmethod
+    def pdb(i):
+        return "".join(
+            f"ATOM  {n:5d}  CA  ALA A{n:4d}      10.000  20.000  30.000  1.00 {50 + i + n:5.2f}           C\n"
+            for n in range(1, 4)
+        ).encode() + b"END\n"
+
+    def respond(self, path):
+        with self.lock:
+            self.requests[path] += 1
+            pending = self.failures.get(path)
+            if pending:
+                return pending.pop(0), b""
+        if path.startswith("/api/prediction/"):
+            acc = path.rsplit("/", 1)[1]
+            if acc not in self.models:
+                return 404, b""
+            prefix = f"{self.base}/files/AF-{acc}-F1"
+            return 200, json.dumps([{
+                "uniprotAccession": acc,
+                "latestVersion": self.version,
+                "pdbUrl": f"{prefix}-model_v{self.version}.pdb",
+                "cifUrl": f"{prefix}-model_v{self.version}.cif",
+                "paeDocUrl": f"{prefix}-predicted_aligned_error_v{self.version}.json",
+            }]).encode()
+        name = path.rsplit("/", 1)[1]
+        acc = name.split("-")[1]
+        if acc not in self.models:
+            return 404, b""
+        if name.endswith(".pdb"):
+            return 200, self.models[acc]
+        if name.endswith(".cif"):
+            return 200, f"data_{acc}\nloop_\n_atom_site.id\n1\n".encode()
+        return 200, self.PAE
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@patch("retrieve_alphafold.RETRY_BACKOFF", 0)
+class TestConcurrentRetrievalWithCache(unittest.TestCase):
+    """retrieve_structures against a local fixture server, with a StructureCache."""
+
+    ACCESSIONS = ["P00001", "P00002", "P00003", "P00004", "P00005"]
+
+    def setUp(self):
+        self.ebi = FixtureEBI(self.ACCESSIONS)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        patches = [
+            patch("retrieve_alphafold.EBI_API_URL", f"{self.ebi.base}/api"),
+            patch("retrieve_alphafold.RATE_LIMITER.rate", 0),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.ebi.close()
+        self._tmp.cleanup()
+
+    def retrieve(self, accessions, out="run", refresh=False):
+        from retrieve_alphafold import StructureCache, retrieve_structures
+
+        cache = StructureCache(os.path.join(self.dir, "cache"))
+        return retrieve_structures(accessions, os.path.join(self.dir, out), workers=4,
+                                   cache=cache, refresh=refresh)
+
+    def read(self, out, acc, name):
+        with open(os.path.join(self.dir, out, acc, name), "rb") as f:
+            return f.read()
+
+    def test_retrieves_all_in_order(self):
+        results = self.retrieve(self.ACCESSIONS + ["P00001"])
+        self.assertEqual(list(results), self.ACCESSIONS)
+        for acc in self.ACCESSIONS:
+            self.assertEqual(results[acc]["uniprot_accession"], acc)
+            self.assertEqual(results[acc]["n_residues"], 3)
+            self.assertEqual(self.read("run", acc, "model.pdb"), self.ebi.models[acc])
+        # Duplicate accession fetched once
+        self.assertEqual(self.ebi.requests["/api/prediction/P00001"], 1)
+
+    def test_second_run_served_from_cache(self):
+        first = self.retrieve(self.ACCESSIONS)
+        n_requests = sum(self.ebi.requests.values())
+        second = self.retrieve(self.ACCESSIONS, out="again")
+        self.assertEqual(sum(self.ebi.requests.values()), n_requests)
+        for acc in self.ACCESSIONS:
+            self.assertEqual(second[acc]["mean_plddt"], first[acc]["mean_plddt"])
+            self.assertEqual(self.read("again", acc, "model.pdb"), self.ebi.models[acc])
+            self.assertEqual(self.read("again", acc, "pae.json"), FixtureEBI.PAE)
+
+    def test_shared_content_stored_once(self):
+        self.retrieve(self.ACCESSIONS)
+        objects = [f for _, _, files in os.walk(os.path.join(self.dir, "cache", "objects"))
+                   for f in files]
+        # One PDB and mmCIF per accession plus the PAE they all share
+        self.assertEqual(len(objects), 2 * len(self.ACCESSIONS) + 1)
+
+    def test_refresh_rechecks_version(self):
+        self.retrieve(self.ACCESSIONS[:1])
+        self.retrieve(self.ACCESSIONS[:1], refresh=True)
+        # Same version: API consulted again, files not re-downloaded
+        self.assertEqual(self.ebi.requests["/api/prediction/P00001"], 2)
+        self.assertEqual(self.ebi.requests["/files/AF-P00001-F1-model_v4.pdb"], 1)
+
+        self.ebi.version = 5
+        self.ebi.models["P00001"] = FixtureEBI.pdb(9)
+        self.retrieve(self.ACCESSIONS[:1], refresh=True)
+        self.assertEqual(self.ebi.requests["/files/AF-P00001-F1-model_v5.pdb"], 1)
+        self.assertEqual(self.read("run", "P00001", "model.pdb"), FixtureEBI.pdb(9))
+
+    def test_transient_errors_retried_and_missing_skipped(self):
+        self.ebi.failures["/api/prediction/P00002"] = [503, 429]
+        self.ebi.failures["/files/AF-P00003-F1-model_v4.pdb"] = [500]
+        results = self.retrieve(["P00002", "P00003", "Q99999"])
+        self.assertIsNotNone(results["P00002"])
+        self.assertIsNotNone(results["P00003"])
+        self.assertIsNone(results["Q99999"])
+        self.assertEqual(self.ebi.requests["/api/prediction/P00002"], 3)
+
+        # Only successful retrievals are cached
+        self.retrieve(["Q99999"])
+        self.assertEqual(self.ebi.requests["/api/prediction/Q99999"], 2)
+
+    def test_incomplete_retrieval_not_cached(self):
+        from retrieve_alphafold import RETRY_MAX
+
+        cif = "/files/AF-P00001-F1-model_v4.cif"
+        self.ebi.failures[cif] = [503] * RETRY_MAX
+        first = self.retrieve(["P00001"])
+        self.assertIsNotNone(first["P00001"])
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "run", "P00001", "model.cif")))
+
+        # The mmCIF failure is not cached as a hit: the next run downloads again
+        self.retrieve(["P00001"], out="again")
+        self.assertEqual(self.ebi.requests[cif], RETRY_MAX + 1)
+        self.assertTrue(self.read("again", "P00001", "model.cif").startswith(b"data_P00001"))
+        self.retrieve(["P00001"], out="third")
+        self.assertEqual(self.ebi.requests["/api/prediction/P00001"], 2)
+        self.assertEqual(self.read("third", "P00001", "model.cif"),
+                         self.read("again", "P00001", "model.cif"))
+
+
 if __name__ == "__main__":
     unittest.main()
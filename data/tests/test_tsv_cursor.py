@@ -0,0 +1,178 @@
+"""Tests for tsv_cursor.py — line indexes and resumable TSV cursors."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import tsv_cursor
+from tsv_cursor import (
+    LineIndexBuilder,
+    TSVCursor,
+    build_line_index,
+    index_path,
+    line_index,
+    load_line_index,
+)
+
+
+def line_starts(data: bytes) -> list:
+    """Offset of every line in data, by a plain scan."""
+    starts = [0]
+    starts += [i + 1 for i, byte in enumerate(data) if byte == ord("\n") and i + 1 < len(data)]
+    return starts
+
+
+class TSVTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def write(self, data: bytes, name="t.tsv"):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+
+def table(n_rows, trailing_newline=True):
+    rows = ["id\tname"] + [f"{i}\t{'x' * (i % 7)}é" for i in range(n_rows)]
+    return ("\n".join(rows) + ("\n" if trailing_newline else "")).encode()
+
+
+# Blocks and newline windows far smaller than the file, so indexed lines
+# fall on, just before and just after block and window boundaries
+@mock.patch.object(tsv_cursor, "READ_BLOCK", 64)
+@mock.patch.object(tsv_cursor, "_FIND_WINDOW", 8)
+class TestLineIndex(TSVTestCase):
+
+    def check_index(self, data, stride):
+        path = self.write(data)
+        index = build_line_index(path, stride)
+        starts = line_starts(data)
+        self.assertEqual(index["lines"], len(starts) if data else 0)
+        self.assertEqual(index["offsets"], starts[::stride] if data else [])
+        self.assertEqual(index["size"], len(data))
+        return path, starts
+
+    def test_offsets_across_block_boundaries(self):
+        for stride in (1, 2, 3, 5, 16):
+            for n_rows in (0, 1, 40, 41):
+                for trailing_newline in (True, False):
+                    with self.subTest(stride=stride, n_rows=n_rows,
+                                      trailing_newline=trailing_newline):
+                        self.check_index(table(n_rows, trailing_newline), stride)
+
+    def test_newline_on_block_boundary(self):
+        # Every line is 8 bytes, so each 64-byte block ends with a newline
+        data = b"".join(f"{i:06d}\t\n".encode() for i in range(50))
+        self.check_index(data, 4)
+
+    def test_empty_file(self):
+        self.check_index(b"", 3)
+
+    def test_offset_of_every_row(self):
+        for trailing_newline in (True, False):
+            data = table(45, trailing_newline)
+            path = self.write(data)
+            starts = line_starts(data)
+            cursor = TSVCursor(path, stride=4)
+            with self.subTest(trailing_newline=trailing_newline):
+                self.assertEqual(cursor.total_rows(), 45)
+                self.assertEqual([cursor.offset_of(r) for r in range(45)], starts[1:])
+                self.assertEqual(cursor.offset_of(45), len(data))
+
+    def test_builder_matches_scan(self):
+        data = table(30, trailing_newline=False)
+        path = self.write(data)
+        builder = LineIndexBuilder(stride=4)
+        for line in data.splitlines(keepends=True):
+            builder.add(len(line))
+        builder.save(path)
+        self.assertEqual(load_line_index(path, 4), build_line_index(path, 4))
+
+    def test_builder_rejects_wrong_size(self):
+        path = self.write(table(3))
+        builder = LineIndexBuilder()
+        builder.add(1)
+        with self.assertRaises(ValueError):
+            builder.save(path)
+
+
+class TestSidecar(TSVTestCase):
+
+    def test_saved_on_first_use_and_reused(self):
+        path = self.write(table(10))
+        index = line_index(path, 4)
+        self.assertTrue(index_path(path).exists())
+        with mock.patch.object(tsv_cursor, "build_line_index") as build:
+            self.assertEqual(line_index(path, 4), index)
+        build.assert_not_called()
+
+    def test_stale_sidecar_rejected_after_change(self):
+        path = self.write(table(10))
+        self.assertEqual(TSVCursor(path, stride=4).total_rows(), 10)
+        stat = os.stat(path)
+        with open(path, "ab") as f:
+            f.write(b"10\tnew\n")
+        self.assertIsNone(load_line_index(path, 4))
+        self.assertEqual(TSVCursor(path, stride=4).total_rows(), 11)
+
+        # Same size, new contents: the mtime alone marks it stale
+        self.write(table(10).replace(b"x", b"y"))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNone(load_line_index(path, 4))
+
+    def test_sidecar_with_other_stride_or_version_rejected(self):
+        path = self.write(table(10))
+        line_index(path, 4)
+        self.assertIsNone(load_line_index(path, 5))
+        with mock.patch.object(tsv_cursor, "INDEX_VERSION", 2):
+            self.assertIsNone(load_line_index(path, 4))
+
+    def test_corrupt_sidecar_rebuilt(self):
+        path = self.write(table(10))
+        index_path(path).write_text("{not json")
+        self.assertEqual(line_index(path, 4)["lines"], 11)
+
+
+class TestCursor(TSVTestCase):
+
+    def test_rows_resume_mid_file(self):
+        path = self.write(table(20))
+        cursor = TSVCursor(path, stride=3)
+        self.assertEqual(cursor.header, ["id", "name"])
+        rows = list(cursor.rows())
+        self.assertEqual([fields[0] for fields, _ in rows], [str(i) for i in range(20)])
+
+        # Checkpoint after row 7 and resume from the saved offset
+        saved = rows[7][1]
+        resumed = list(TSVCursor(path, stride=3).rows(start=saved))
+        self.assertEqual(resumed, rows[8:])
+        self.assertEqual(cursor.offset_of(8), saved)
+        self.assertEqual(list(cursor.rows(start=rows[-1][1])), [])
+
+    def test_rows_without_trailing_newline(self):
+        path = self.write(b"id\tname\r\n1\ta\r\n2\tb")
+        rows = list(TSVCursor(path).rows())
+        self.assertEqual([fields for fields, _ in rows], [["1", "a"], ["2", "b"]])
+        self.assertEqual(rows[-1][1], os.path.getsize(path))
+
+    def test_offset_inside_header_rejected(self):
+        path = self.write(table(2))
+        with self.assertRaises(ValueError):
+            next(TSVCursor(path).rows(start=2))
+
+    def test_column(self):
+        cursor = TSVCursor(self.write(table(1)))
+        self.assertEqual(cursor.column("name"), 1)
+        with self.assertRaises(ValueError):
+            cursor.column("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+"""
+Resumable byte-offset cursors and sidecar line indexes for large TSV files.
+
+Long jobs under data/ stream multi-gigabyte TSVs and checkpoint as they go.
+Checkpointing the byte offset just past the last processed row, rather than
+a row count, lets a restart seek straight back to it instead of re-reading
+everything before it. A sidecar line index (<file>.lineidx.json) records
+the file's line count and the offset of every INDEX_STRIDE-th line, so row
+totals are instant after the first scan and legacy row-count checkpoints
+can still be turned into offsets cheaply.
+
+The sidecar is tied to the file's size and mtime and rebuilt when either
+changes. Writers that already see every line can build it for free with
+LineIndexBuilder.
+
+Scripts import this module by putting data/ on sys.path:
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from tsv_cursor import TSVCursor
+
+    cursor = TSVCursor(path)
+    print(f"{cursor.total_rows():,} rows")
+    for fields, offset in cursor.rows(start=saved_offset):
+        ...                       # process the row, then
+        saved_offset = offset     # checkpoint this
+"""
+
+import json
+import os
+from pathlib import Path
+
+INDEX_SUFFIX = ".lineidx.json"
+INDEX_VERSION = 1
+# Record the byte offset of every Nth line
+INDEX_STRIDE = 100_000
+READ_BLOCK = 16 << 20
+# Window used to narrow down a newline position before scanning for it
+_FIND_WINDOW = 1 << 16
+
+
+def index_path(path) -> Path:
+    """Path of the sidecar line index for path."""
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _stamp(path) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _nth_newline(block: bytes, start: int, n: int) -> int:
+    """Position of the nth (1-based) newline in block at or after start."""
+    pos = start
+    while True:
+        end = pos + _FIND_WINDOW
+        c = block.count(b"\n", pos, end)
+        if c >= n:
+            break
+        n -= c
+        pos = end
+    for _ in range(n):
+        pos = block.index(b"\n", pos) + 1
+    return pos - 1
+
+
+def build_line_index(path, stride: int = INDEX_STRIDE) -> dict:
+    """Scan path once and return its line index (not saved)."""
+    offsets = [0]  # line k starts right after the kth newline
+    newlines = 0   # newlines before the current block
+    base = 0       # file offset of the current block
+    last = b"\n"
+    with open(path, "rb") as f:
+        while block := f.read(READ_BLOCK):
+            n = block.count(b"\n")
+            pos, seen = 0, newlines
+            while (k := len(offsets) * stride) <= newlines + n:
+                pos = _nth_newline(block, pos, k - seen) + 1
+                seen = k
+                offsets.append(base + pos)
+            newlines += n
+            base += len(block)
+            last = block[-1:]
+    size = base
+    lines = newlines + (1 if size and last != b"\n" else 0)
+    return {
+        "version": INDEX_VERSION,
+        **_stamp(path),
+        "stride": stride,
+        "lines": lines,
+        "offsets": [o for o in offsets if o < size],
+    }
+
+
+def load_line_index(path, stride: int = INDEX_STRIDE) -> dict | None:
+    """The saved line index for path, or None if missing or stale."""
+    try:
+        with open(index_path(path)) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (index.get("version") != INDEX_VERSION or index.get("stride") != stride
+            or {k: index.get(k) for k in ("size", "mtime_ns")} != _stamp(path)):
+        return None
+    return index
+
+
+def save_line_index(path, index: dict):
+    """Write index as path's sidecar, atomically."""
+    sidecar = index_path(path)
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, sidecar)
+
+
+def line_index(path, stride: int = INDEX_STRIDE) -> dict:
+    """path's line index, from its sidecar or built and saved on first use."""
+    index = load_line_index(path, stride)
+    if index is None:
+        index = build_line_index(path, stride)
+        try:
+            save_line_index(path, index)
+        except OSError as e:
+            print(f"  WARNING: could not save line index for {path}: {e}")
+    return index
+
+
+def count_lines(path, stride: int = INDEX_STRIDE) -> int:
+    """Number of lines in path (a final line without newline counts)."""
+    return line_index(path, stride)["lines"]
+
+
+class LineIndexBuilder:
+    """Build a line index while writing (or reading) a file line by line.
+
+    Call add() with the encoded length of every line, in order, then save()
+    once the file is closed.
+    """
+
+    def __init__(self, stride: int = INDEX_STRIDE):
+        self.stride = stride
+        self.lines = 0
+        self.offset = 0
+        self.offsets = []
+
+    def add(self, nbytes: int):
+        if self.lines % self.stride == 0:
+            self.offsets.append(self.offset)
+        self.lines += 1
+        self.offset += nbytes
+
+    def save(self, path):
+        """Save the index as path's sidecar; path must be exactly what was added."""
+        stamp = _stamp(path)
+        if stamp["size"] != self.offset:
+            raise ValueError(
+                f"{path} is {stamp['size']:,} bytes but {self.offset:,} were indexed")
+        save_line_index(path, {
+            "version": INDEX_VERSION,
+            **stamp,
+            "stride": self.stride,
+            "lines": self.lines,
+            "offsets": self.offsets,
+        })
+
+
+class TSVCursor:
+    """Read the data rows of a TSV with a header line from a byte offset.
+
+    Offsets handed out by lines() and rows() are positions just past a row,
+    so a job that checkpoints the offset of its last processed row resumes
+    with rows(start=offset). Fields are split on tabs without CSV quoting,
+    which is how the pipelines under data/ write their TSVs.
+    """
+
+    def __init__(self, path, stride: int = INDEX_STRIDE):
+        self.path = Path(path)
+        self.stride = stride
+        with open(self.path, "rb") as f:
+            header_line = f.readline()
+        self.data_start = len(header_line)
+        self.header_line = header_line
+        self.header = header_line.decode().rstrip("\r\n").split("\t")
+
+    def total_rows(self) -> int:
+        """Number of data rows, via the sidecar line index."""
+        return max(count_lines(self.path, self.stride) - 1, 0)
+
+    def offset_of(self, row: int) -> int:
+        """Byte offset where data row `row` (0-based) starts.
+
+        Seeks to the nearest indexed line and reads at most stride lines.
+        Returns the file size if row is past the end.
+        """
+        index = line_index(self.path, self.stride)
+        line = row + 1  # the header is line 0
+        if line >= index["lines"]:
+            return index["size"]
+        k = line // self.stride
+        offset = index["offsets"][k]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for _ in range(line - k * self.stride):
+                offset += len(f.readline())
+        return offset
+
+    def lines(self, start: int | None = None):
+        """Yield (raw line bytes, offset past it) for each row from start."""
+        offset = self.data_start if start is None else start
+        if offset < self.data_start:
+            raise ValueError(f"Offset {offset} is inside the header of {self.path}")
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                yield line, offset
+
+    def rows(self, start: int | None = None):
+        """Yield (fields, offset past the row) for each row from start."""
+        for line, offset in self.lines(start):
+            yield line.rstrip(b"\r\n").decode().split("\t"), offset
+
+    def column(self, name: str) -> int:
+        """Index of a header column."""
+        try:
+            return self.header.index(name)
+        except ValueError:
+            raise ValueError(f"{self.path} has no column {name!r}") from None
@@ -3,11 +3,19 @@
 
 This script:
 1. Parses all repository data using the RepositoryParser
-2. Saves the RepositoryData object to a gzipped pickle file
-3. Creates a timestamp.json file with metadata
+2. Saves the RepositoryData object as a lazily-loadable data cache
+   (metadata + memory-mapped blob file), plus the legacy gzipped pickle
+   used for URL-based loading
+3. Creates a timestamp.json file with metadata, including the SHA-256 of
+   the pickle so URL-based loaders can verify their download
+
+Pass --parse-cache PATH to reuse parsed projects whose input files are
+unchanged since the previous build (delta rebuild).
 """
 
+import argparse
 import gzip
+import hashlib
 import json
 import pickle
 import subprocess
@@ -31,8 +39,29 @@ def get_git_commit_hash() -> str:
         return "unknown"
 
 
+def file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the UI data cache.")
+    parser.add_argument(
+        "--parse-cache",
+        type=Path,
+        help="Incremental parse cache file; only changed projects are re-parsed.",
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main execution function."""
+    args = parse_args()
+
     # Add the ui directory to the path so we can import the app modules
     script_dir = Path(__file__).parent
     repo_dir = script_dir.parent
@@ -40,21 +69,39 @@ def main():
     sys.path.insert(0, str(ui_dir))
 
     # Import after path is set
-    from app.dataloader import get_parser, REPOSITORY_DATA_FILE
+    from app.dataloader import (
+        REPOSITORY_DATA_FILE,
+        REPOSITORY_META_FILE,
+        RepositoryParser,
+        get_parser,
+        write_data_cache,
+    )
 
     print("Starting data cache build...")
     print(f"Repository directory: {repo_dir}")
 
     # Parse all data
     print("Parsing repository data...")
-    parser = get_parser()
+    if args.parse_cache:
+        print(f"Using incremental parse cache: {args.parse_cache}")
+        parser = RepositoryParser(parse_cache_path=args.parse_cache.resolve())
+    else:
+        parser = get_parser()
     repository_data = parser.parse_all()
 
     # Create output directory if it doesn't exist
     output_dir = repo_dir / "data_cache"
     output_dir.mkdir(exist_ok=True)
 
-    # Save pickle file
+    # Save lazily-loadable data cache
+    print(f"Writing data cache to {output_dir}...")
+    write_data_cache(repository_data, output_dir)
+    print(
+        f"Data cache written: {(output_dir / REPOSITORY_META_FILE).stat().st_size:,} "
+        "bytes of metadata"
+    )
+
+    # Save legacy pickle file
     pickle_path = output_dir / REPOSITORY_DATA_FILE
     print(f"Writing pickle file to {pickle_path}...")
     with gzip.open(pickle_path, "wb") as f:
@@ -69,6 +116,8 @@ def main():
     timestamp_data = {
         "timestamp": repository_data.last_updated.isoformat() if repository_data.last_updated else datetime.now().isoformat(),
         "commit": commit_hash,
+        "sha256": file_sha256(pickle_path),
+        "size": pickle_path.stat().st_size,
     }
 
     # Save timestamp file
@@ -0,0 +1,99 @@
+"""Memory-mapped, offset-indexed store for large text fields of the data cache.
+
+The blob file is a short header followed by UTF-8 blobs laid end to end.
+Callers keep (offset, length) refs and read blobs through a read-only mmap,
+so nothing is loaded until a blob is first accessed, and several processes
+mapping the same file share its pages.
+
+Files are always written to a temp path and renamed into place, so a new
+cache never overwrites pages another process still has mapped.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Self
+
+BLOB_MAGIC = b"BERILBLB"
+BLOB_VERSION = 1
+_HEADER = struct.Struct("<8sI")  # magic, version
+
+BlobRef = tuple[int, int]  # (offset, length) in bytes
+
+
+class BlobWriter:
+    """Append text blobs to a new blob file, renamed into place on close."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self._file = open(self._tmp_path, "wb")  # noqa: SIM115 - closed in close()/abort()
+        self._sha256 = hashlib.sha256()
+        self._write(_HEADER.pack(BLOB_MAGIC, BLOB_VERSION))
+        self._offset = _HEADER.size
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._sha256.update(data)
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 hex digest of everything written so far."""
+        return self._sha256.hexdigest()
+
+    def add(self, text: str) -> BlobRef:
+        """Append a blob and return its ref."""
+        data = text.encode("utf-8")
+        self._write(data)
+        ref = (self._offset, len(data))
+        self._offset += len(data)
+        return ref
+
+    def close(self) -> None:
+        """Flush and atomically move the blob file into place."""
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Discard the partially written file."""
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BlobStore:
+    """Read-only, memory-mapped view of a blob file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"Blob file too short: {path}")
+        magic, version = _HEADER.unpack_from(self._mmap, 0)
+        if magic != BLOB_MAGIC:
+            raise ValueError(f"Not a blob file: {path}")
+        if version != BLOB_VERSION:
+            raise ValueError(
+                f"Unsupported blob file version {version} (expected {BLOB_VERSION})"
+            )
+
+    def read(self, ref: BlobRef) -> str:
+        """Decode the blob at ref."""
+        offset, length = ref
+        if offset < _HEADER.size or offset + length > len(self._mmap):
+            raise ValueError(f"Blob ref {ref} out of range for {self.path}")
+        return self._mmap[offset : offset + length].decode("utf-8")
+
+    def close(self) -> None:
+        self._mmap.close()
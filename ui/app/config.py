@@ -23,9 +23,22 @@ class Settings(BaseSettings):
     data_repo_branch: str = "data-cache"  # Branch to checkout
     data_repo_path: Path = Path("/tmp/beril_data_cache")  # Local clone path
     force_local_data: bool = False
+    # Reuse parsed projects whose input files are unchanged between parses
+    incremental_parse: bool = False
+    # Parallel project parsing; 1 parses serially
+    parse_workers: int = 1
+    parse_use_processes: bool = False  # Process pool instead of threads
 
     plotly_cdn_url: str = "https://cdn.plot.ly/plotly-3.4.0.min.js"
 
+    # Rendered notebook HTML cache
+    notebook_cache_max_bytes: int = 64 * 1024 * 1024  # In-memory LRU size cap
+    notebook_disk_cache: bool = False  # Also keep renders in notebook_cache_dir
+    notebook_disk_cache_max_bytes: int = 512 * 1024 * 1024  # Disk store size cap
+    prerender_notebooks: bool = False  # Render all notebooks after each data load
+    # Render all project markdown fields into the filter cache at data load
+    prerender_markdown: bool = False
+
     # Webhook configuration
     webhook_secret: str | None = None
 
@@ -72,6 +85,18 @@ class Settings(BaseSettings):
     def cache_file(self) -> Path:
         return self.cache_dir / "cache.json"
 
+    @property
+    def notebook_cache_dir(self) -> Path:
+        return self.cache_dir / "notebooks"
+
+    @property
+    def parse_cache_file(self) -> Path:
+        return self.cache_dir / "parse_cache.pkl.gz"
+
+    @property
+    def remote_cache_dir(self) -> Path:
+        return self.cache_dir / "remote"
+
     @property
     def search_index_dir(self) -> Path:
         return self.cache_dir / "indexdir"
@@ -1,11 +1,15 @@
 import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
 
-from fastapi import Request
+from fastapi import Depends, Request
 from fastapi.templating import Jinja2Templates
 
 from app.auth import get_current_user
 from app.config import Settings
 from app.dataloader import load_repository_data
+from app.filters import prerender_project_markdown
 from app.git_data_sync import ensure_repo_cloned
 from app.models import RepositoryData
 
@@ -15,12 +19,42 @@ logger = logging.getLogger(__name__)
 templates: Jinja2Templates | None = None
 
 
-def get_repo_data(request: Request) -> RepositoryData:
-    return request.app.state.repo_data
+@dataclass(frozen=True)
+class DataSnapshot:
+    """Repository data and the base template context derived from it.
 
+    Stored as app.state.snapshot and replaced as a whole on reload, so a
+    request never sees data from one load and counts from another.
+    """
 
-def get_base_context(request: Request) -> dict:
-    context = dict(request.app.state.base_context)
+    repo_data: RepositoryData
+    base_context: Mapping
+
+
+def build_snapshot(settings: Settings, repo_data: RepositoryData) -> DataSnapshot:
+    if settings.prerender_markdown:
+        rendered = prerender_project_markdown(repo_data)
+        logger.info(f"Pre-rendered {rendered} project markdown fields")
+    return DataSnapshot(
+        repo_data=repo_data,
+        base_context=MappingProxyType(generate_base_context(settings, repo_data)),
+    )
+
+
+def get_snapshot(request: Request) -> DataSnapshot:
+    # FastAPI caches dependencies per request, so every dependency of one
+    # request resolves against the same snapshot even if a reload swaps it.
+    return request.app.state.snapshot
+
+
+def get_repo_data(snapshot: DataSnapshot = Depends(get_snapshot)) -> RepositoryData:
+    return snapshot.repo_data
+
+
+def get_base_context(
+    request: Request, snapshot: DataSnapshot = Depends(get_snapshot)
+) -> dict:
+    context = dict(snapshot.base_context)
     context["current_user"] = get_current_user(request)
     context["path"] = request.url.path
     return context
@@ -42,8 +76,8 @@ async def initialize_data(settings: Settings) -> RepositoryData:
                 settings.data_repo_branch,
                 settings.data_repo_path,
             )
-            data_file = settings.data_repo_path / "data_cache" / "data.pkl.gz"
-            repo_data = load_repository_data(data_file)
+            cache_dir = settings.data_repo_path / "data_cache"
+            repo_data = load_repository_data(cache_dir)
             logger.info(
                 f"Repository data loaded from git. Last updated: {repo_data.last_updated}"
             )
@@ -1,16 +1,19 @@
 """Repository parser - reads markdown files and extracts structured data."""
 
 import gzip
+import hashlib
+import logging
 import pickle
 import re
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 import yaml
 
-import httpx
-
+from .blob_store import BlobStore, BlobWriter
 from .config import get_settings
 from .models import (
     Collection,
@@ -37,10 +40,27 @@ from .models import (
     Skill,
     Table,
     Visualization,
+    _contributor_key,
 )
+from .remote_data import DATA_FILE as REPOSITORY_DATA_FILE
+from .remote_data import RemoteDataFetcher
+
+# Lazily-loadable data cache: eagerly loaded metadata plus a memory-mapped
+# blob file holding the large raw markdown fields. Blob files are named by
+# content digest so metadata never points into a blob file being replaced.
+REPOSITORY_META_FILE = "data.meta.pkl.gz"
+REPOSITORY_BLOB_PATTERN = "data.{digest}.blobs"
+DATA_CACHE_VERSION = 2
+
+# Bump when Project or the project parsing rules change, so stale
+# incremental parse caches are discarded instead of reused.
+PARSE_CACHE_VERSION = 1
+
+# Project input files whose contents are parsed. Other files under data/ and
+# figures/ only contribute their name and size to a project's fingerprint.
+_CONTENT_INPUT_SUFFIXES = (".md", ".ipynb", ".html")
 
-REPOSITORY_DATA_FILE = "data.pkl.gz"
-TIMESTAMP_FILE = "timestamp.json"
+logger = logging.getLogger(__name__)
 
 
 def load_repository_data(source_path: Path | str | None = None) -> RepositoryData:
@@ -49,7 +69,8 @@ def load_repository_data(source_path: Path | str | None = None) -> RepositoryDat
 
     Args:
         source_path: Optional file path or URL to load data from.
-                    If Path: loads from local pickle file
+                    If Path to a directory: loads the data cache in it
+                    If Path to a file: loads from local pickle file
                     If str (URL): loads from HTTP
                     If None: parses from local repository files
 
@@ -59,7 +80,9 @@ def load_repository_data(source_path: Path | str | None = None) -> RepositoryDat
     if source_path:
         try:
             if isinstance(source_path, Path):
-                # Load from local file
+                # Load from a local cache directory or legacy pickle file
+                if source_path.is_dir():
+                    return load_local_cache(source_path)
                 return load_local_pickle(source_path)
             else:
                 # Load from URL
@@ -111,44 +134,139 @@ def load_local_pickle(file_path: Path) -> RepositoryData:
     return repository_data
 
 
-def check_for_updates(data_source_url: str, current_last_updated: datetime) -> bool:
+def _blob_holders(repository_data: RepositoryData) -> list:
+    """Return the objects whose BlobFields are stored in the blob file."""
+    holders = []
+    for project in repository_data.projects:
+        holders.append(project)
+        if project.review:
+            holders.append(project.review)
+    return holders
+
+
+def write_data_cache(repository_data: RepositoryData, output_dir: Path) -> None:
     """
-    Check if remote data has been updated since the current data.
+    Write repository data as a lazily-loadable data cache.
+
+    Large text fields (BlobFields such as Project.raw_readme) go to a blob
+    file named by its content digest; everything else is pickled into
+    REPOSITORY_META_FILE with blob refs in their place. The metadata file is
+    replaced last, and blob files it no longer references are removed.
 
     Args:
-        data_source_url: Base URL where timestamp.json is located
-        current_last_updated: The last_updated timestamp of currently loaded data
+        repository_data: Data to write; it is not modified.
+        output_dir: Directory to write the cache files into.
+    """
+    import copy
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    detached = copy.deepcopy(repository_data)
+
+    staging_path = output_dir / REPOSITORY_BLOB_PATTERN.format(digest="staging")
+    with BlobWriter(staging_path) as writer:
+        for holder in _blob_holders(detached):
+            refs = {}
+            for name in type(holder).blob_field_names():
+                value = holder.__dict__.get(name)
+                if value:
+                    refs[name] = writer.add(value)
+                    del holder.__dict__[name]
+            if refs:
+                holder.__dict__["_blob_refs"] = refs
+    blob_file = REPOSITORY_BLOB_PATTERN.format(digest=writer.digest[:16])
+    staging_path.replace(output_dir / blob_file)
+
+    meta = {
+        "version": DATA_CACHE_VERSION,
+        "blob_file": blob_file,
+        "repository_data": detached,
+    }
+    meta_path = output_dir / REPOSITORY_META_FILE
+    tmp_path = meta_path.with_name(meta_path.name + ".tmp")
+    with gzip.open(tmp_path, "wb") as f:
+        pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(meta_path)
+
+    for stale in output_dir.glob(REPOSITORY_BLOB_PATTERN.format(digest="*")):
+        if stale.name != blob_file:
+            stale.unlink(missing_ok=True)
+
+
+def load_local_cache(cache_dir: Path) -> RepositoryData:
+    """
+    Load repository data from a data cache directory.
+
+    Reads the lazily-loadable format if REPOSITORY_META_FILE is present,
+    otherwise falls back to the legacy REPOSITORY_DATA_FILE pickle. Large
+    text fields are only read from the memory-mapped blob file on access.
+
+    Args:
+        cache_dir: Directory containing the cache files
 
     Returns:
-        True if remote data is newer, False otherwise
+        RepositoryData object
+
+    Raises:
+        FileNotFoundError: If no cache file exists
+        ValueError: If the cache is of an unsupported version or type
     """
+    meta_path = cache_dir / REPOSITORY_META_FILE
+    if not meta_path.exists():
+        return load_local_pickle(cache_dir / REPOSITORY_DATA_FILE)
+
+    logger.info(f"Loading data from cache: {cache_dir}")
+    with gzip.open(meta_path, "rb") as f:
+        meta = pickle.load(f)
+
+    if not isinstance(meta, dict) or meta.get("version") != DATA_CACHE_VERSION:
+        version = meta.get("version") if isinstance(meta, dict) else None
+        raise ValueError(
+            f"Unsupported data cache version {version} (expected {DATA_CACHE_VERSION})"
+        )
+    repository_data = meta["repository_data"]
+    if not isinstance(repository_data, RepositoryData):
+        raise ValueError(f"Expected RepositoryData object, got {type(repository_data)}")
 
-    # Ensure URL ends with a slash
-    if not data_source_url.endswith("/"):
-        data_source_url = data_source_url + "/"
+    store = BlobStore(cache_dir / meta["blob_file"])
+    for holder in _blob_holders(repository_data):
+        if "_blob_refs" in holder.__dict__:
+            holder.__dict__["_blob_store"] = store
 
-    # Construct URL to timestamp file
-    timestamp_url = data_source_url + TIMESTAMP_FILE
+    logger.info(f"Loaded data with last_updated: {repository_data.last_updated}")
+    return repository_data
 
-    try:
-        # Fetch timestamp metadata
-        response = httpx.get(timestamp_url, follow_redirects=True, timeout=5.0)
-        response.raise_for_status()
 
-        timestamp_data = response.json()
-        remote_timestamp_str = timestamp_data.get("timestamp")
+# One fetcher per data source URL, so timestamp.json validators are reused
+# across update checks.
+_fetchers: dict[str, RemoteDataFetcher] = {}
+
 
-        if not remote_timestamp_str:
-            return False
+def _get_fetcher(data_source_url: str) -> RemoteDataFetcher:
+    fetcher = _fetchers.get(data_source_url)
+    if fetcher is None:
+        url_key = hashlib.sha256(data_source_url.encode()).hexdigest()[:16]
+        download_dir = get_settings().remote_cache_dir / url_key
+        fetcher = RemoteDataFetcher(data_source_url, download_dir)
+        _fetchers[data_source_url] = fetcher
+    return fetcher
 
-        # Parse the remote timestamp
-        from datetime import datetime as dt
 
-        remote_timestamp = dt.fromisoformat(remote_timestamp_str)
+def check_for_updates(data_source_url: str, current_last_updated: datetime) -> bool:
+    """
+    Check if remote data has been updated since the current data.
+
+    timestamp.json is fetched conditionally, so an unchanged file costs a
+    304 response.
 
-        # Compare timestamps
-        return remote_timestamp > current_last_updated
+    Args:
+        data_source_url: Base URL where timestamp.json is located
+        current_last_updated: The last_updated timestamp of currently loaded data
 
+    Returns:
+        True if remote data is newer, False otherwise
+    """
+    try:
+        return _get_fetcher(data_source_url).check_for_updates(current_last_updated)
     except Exception:
         # If we can't check for updates, assume no update needed
         return False
@@ -158,33 +276,28 @@ def load_external_data(url: str) -> RepositoryData:
     """
     This loads an external pickle file from url/REPOSITORY_DATA_FILE.
     This gets returned as RepositoryData.
+
+    The file is streamed to the remote cache directory, skipped if unchanged
+    since the last download, resumed if a previous download was interrupted,
+    verified against the sha256 in timestamp.json when present, and then
+    unpickled through a streaming gzip reader.
+
     Possible failures:
     HTTPError - if the url doesn't exist, or is inaccessible
-    ValueError - if the url is invalid
+    ValueError - if the url is invalid, or the checksum doesn't match
     UnpicklingError - if the file is not a pickle file
     """
-    # Ensure URL ends with a slash
-    if not url.endswith("/"):
-        url = url + "/"
-
-    # Construct full URL to the data file
-    full_url = url + REPOSITORY_DATA_FILE
-
-    # Fetch the file from the URL
-    response = httpx.get(full_url, follow_redirects=True)
-    response.raise_for_status()  # Raises HTTPError for bad status codes
+    data_path = _get_fetcher(url).fetch()
+    return load_local_pickle(data_path)
 
-    # Decompress the gzipped content
-    decompressed_data = gzip.decompress(response.content)
-
-    # Unpickle the data
-    repository_data = pickle.loads(decompressed_data)
-
-    # Validate that we got a RepositoryData object
-    if not isinstance(repository_data, RepositoryData):
-        raise ValueError(f"Expected RepositoryData object, got {type(repository_data)}")
 
-    return repository_data
+def _file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 def slugify(text: str) -> str:
@@ -195,6 +308,22 @@ def slugify(text: str) -> str:
     return text
 
 
+def _parse_project_in_worker(
+    repo_path: Path,
+    project_dir: Path,
+    previous: dict | None,
+    git_dates: tuple[datetime | None, datetime | None],
+) -> tuple:
+    """Process-pool task: parse one project directory with a parser of its own.
+
+    Takes only the project's own git dates, so the parent parser and its
+    whole-history git date index are not pickled with every task.
+    """
+    parser = RepositoryParser(repo_path)
+    parser._git_date_index = {project_dir.relative_to(repo_path).as_posix(): git_dates}
+    return parser._parse_project_entry(project_dir, previous)
+
+
 class RepositoryParser:
     """Parse git repository file system into structured data."""
 
@@ -214,9 +343,28 @@ class RepositoryParser:
         "kbase_uniref",
     ]
 
-    def __init__(self, repo_path: Path | None = None):
-        """Initialize parser with repository path."""
+    def __init__(
+        self,
+        repo_path: Path | None = None,
+        parse_cache_path: Path | None = None,
+        workers: int = 1,
+        use_processes: bool = False,
+    ):
+        """Initialize parser with repository path.
+
+        If parse_cache_path is given, parse_projects runs incrementally: project
+        directories whose inputs are unchanged since the last run are restored
+        from the cache instead of being re-parsed.
+
+        With workers > 1, project directories are parsed in parallel on a
+        thread pool, or on a process pool if use_processes is set. Output
+        order does not depend on the worker count.
+        """
         self.repo_path = repo_path or get_settings().repo_dir
+        self.parse_cache_path = parse_cache_path
+        self.workers = workers
+        self.use_processes = use_processes
+        self._git_date_index: dict[str, tuple[datetime, datetime]] | None = None
 
     def parse_all(self) -> RepositoryData:
         """Parse entire repository into structured data."""
@@ -268,9 +416,7 @@ class RepositoryParser:
         Strips middle initials (single chars followed by period) so
         'Paramvir S. Dehal' and 'Paramvir Dehal' merge correctly.
         """
-        # Remove single-letter-dot patterns like "S." or "J."
-        normalized = re.sub(r"\b[A-Za-z]\.\s*", "", name)
-        return " ".join(normalized.lower().split())
+        return _contributor_key(name)
 
     def _aggregate_contributors(self, projects: list[Project]) -> list[Contributor]:
         """Merge contributors across projects by normalized name."""
@@ -314,10 +460,11 @@ class RepositoryParser:
 
         Uses text similarity (title + research question), data provenance,
         and shared collections as signals. Agglomerative clustering with
-        average linkage.
+        average linkage, vectorized with NumPy.
         """
         from collections import Counter
-        from math import sqrt
+
+        import numpy as np
 
         _STOP = {
             "the",
@@ -405,61 +552,64 @@ class RepositoryParser:
             words = re.findall(r"[a-z]{4,}", text.lower())
             return Counter(w for w in words if w not in _STOP)
 
-        def _cosine(a: Counter, b: Counter) -> float:
-            keys = set(a) | set(b)
-            dot = sum(a.get(k, 0) * b.get(k, 0) for k in keys)
-            mag_a = sqrt(sum(v**2 for v in a.values()))
-            mag_b = sqrt(sum(v**2 for v in b.values()))
-            if mag_a == 0 or mag_b == 0:
-                return 0.0
-            return dot / (mag_a * mag_b)
-
         if not projects:
             return []
 
         pids = [p.id for p in projects]
+        n = len(pids)
+        index = {pid: i for i, pid in enumerate(pids)}
         features = {}
         dep_sets = {}
         for p in projects:
             features[p.id] = _terms(p.title) + _terms(p.research_question)
             dep_sets[p.id] = {r.source_project for r in p.derived_from}
 
-        # Pairwise similarity with data dep boost
-        sims: dict[tuple[str, str], float] = {}
-        for i in range(len(pids)):
-            for j in range(i + 1, len(pids)):
-                a, b = pids[i], pids[j]
-                s = _cosine(features[a], features[b])
-                if b in dep_sets[a] or a in dep_sets[b]:
-                    s += 0.3
-                if dep_sets[a] & dep_sets[b]:
-                    s += 0.15
-                sims[(a, b)] = s
-                sims[(b, a)] = s
-
-        # Agglomerative clustering (average linkage)
-        clusters: dict[str, list[str]] = {pid: [pid] for pid in pids}
+        # Cosine similarity of term-count vectors. Counts are integers, so
+        # dot products and norms come out exactly as in the scalar formula.
+        vocab = {t: k for k, t in enumerate(sorted(set().union(*features.values())))}
+        counts = np.zeros((n, len(vocab)), dtype=np.int64)
+        for i, pid in enumerate(pids):
+            for term, count in features[pid].items():
+                counts[i, vocab[term]] = count
+        dots = (counts @ counts.T).astype(np.float64)
+        norms = np.sqrt(np.diag(dots))
+        mags = np.outer(norms, norms)
+        sims = np.divide(dots, mags, out=np.zeros_like(dots), where=mags != 0)
+
+        # Data dep boost: direct derivation, then a shared source project
+        sources = {s: k for k, s in enumerate(sorted(set().union(*dep_sets.values())))}
+        derives = np.zeros((n, n), dtype=bool)
+        uses = np.zeros((n, len(sources)), dtype=np.int64)
+        for i, pid in enumerate(pids):
+            for source in dep_sets[pid]:
+                uses[i, sources[source]] = 1
+                if source in index:
+                    derives[i, index[source]] = True
+        sims += np.where(derives | derives.T, 0.3, 0.0)
+        sims += np.where(uses @ uses.T > 0, 0.15, 0.0)
+
+        # Agglomerative clustering (average linkage). totals holds the summed
+        # pairwise similarity between clusters and is updated in place on
+        # each merge (Lance-Williams), so every step is a single argmax.
+        # Ties go to the first pair in (i, j) order, as in a pairwise scan.
         THRESHOLD = 0.25
-
-        while True:
-            best_sim = 0.0
-            best_pair = None
-            ckeys = list(clusters.keys())
-            for i in range(len(ckeys)):
-                for j in range(i + 1, len(ckeys)):
-                    total = sum(
-                        sims.get((a, b), 0.0)
-                        for a in clusters[ckeys[i]]
-                        for b in clusters[ckeys[j]]
-                    )
-                    count = len(clusters[ckeys[i]]) * len(clusters[ckeys[j]])
-                    avg = total / count if count else 0.0
-                    if avg > best_sim:
-                        best_sim = avg
-                        best_pair = (ckeys[i], ckeys[j])
-            if best_sim < THRESHOLD or best_pair is None:
+        totals = sims
+        sizes = np.ones(n)
+        active = np.ones(n, dtype=bool)
+        upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+        clusters: dict[int, list[str]] = {i: [pid] for i, pid in enumerate(pids)}
+
+        while len(clusters) > 1:
+            candidates = upper & active[:, None] & active[None, :]
+            avg = np.where(candidates, totals / np.outer(sizes, sizes), 0.0)
+            a, b = divmod(int(np.argmax(avg)), n)
+            best_sim = avg[a, b]
+            if best_sim < THRESHOLD:
                 break
-            a, b = best_pair
+            totals[a, :] += totals[b, :]
+            totals[:, a] += totals[:, b]
+            sizes[a] += sizes[b]
+            active[b] = False
             clusters[a].extend(clusters[b])
             del clusters[b]
 
@@ -547,37 +697,67 @@ class RepositoryParser:
 
         return sorted(edges.values(), key=lambda e: (e.source_id, e.target_id))
 
+    def _build_git_date_index(self) -> dict[str, tuple[datetime, datetime]]:
+        """Index first/last commit dates for every path in one git log pass.
+
+        Walks the whole history once with --name-only and records, for each
+        changed file and each of its ancestor directories (relative to
+        repo_path), the (first, last) author dates of commits touching it.
+        """
+        result = subprocess.run(
+            [
+                "git",
+                "-c",
+                "core.quotePath=false",
+                "log",
+                "--format=%x00%aI",
+                "--name-only",
+                "--no-renames",
+                "--relative",
+            ],
+            capture_output=True,
+            text=True,
+            cwd=self.repo_path,
+        )
+        if result.returncode != 0:
+            return {}
+
+        # git log is newest first: the first date seen for a path is its last
+        # commit, and every later sighting pushes its first commit back.
+        index: dict[str, tuple[datetime, datetime]] = {}
+        for record in result.stdout.split("\0")[1:]:
+            lines = record.split("\n")
+            commit_date = datetime.fromisoformat(lines[0].strip())
+            touched: set[str] = set()
+            for line in lines[1:]:
+                if not line:
+                    continue
+                parts = line.split("/")
+                for depth in range(1, len(parts) + 1):
+                    touched.add("/".join(parts[:depth]))
+            for path in touched:
+                seen = index.get(path)
+                index[path] = (commit_date, seen[1] if seen else commit_date)
+        return index
+
+    def _ensure_git_date_index(self) -> None:
+        """Build the git date index if it has not been built yet."""
+        if self._git_date_index is None:
+            try:
+                self._git_date_index = self._build_git_date_index()
+            except Exception:
+                self._git_date_index = {}
+
     def _get_git_dates(
         self, project_dir: Path
     ) -> tuple[datetime | None, datetime | None]:
-        """Get first and last commit dates for a project directory using git log."""
+        """Get first and last commit dates for a project directory from git history."""
+        self._ensure_git_date_index()
         try:
-            # Last commit date
-            result = subprocess.run(
-                ["git", "log", "-1", "--format=%aI", "--", str(project_dir)],
-                capture_output=True,
-                text=True,
-                cwd=self.repo_path,
-            )
-            updated = (
-                datetime.fromisoformat(result.stdout.strip())
-                if result.stdout.strip()
-                else None
-            )
-
-            # First commit date
-            result = subprocess.run(
-                ["git", "log", "--reverse", "--format=%aI", "--", str(project_dir)],
-                capture_output=True,
-                text=True,
-                cwd=self.repo_path,
-            )
-            lines = result.stdout.strip().split("\n")
-            created = datetime.fromisoformat(lines[0]) if lines and lines[0] else None
-
-            return created, updated
-        except Exception:
+            rel = project_dir.relative_to(self.repo_path).as_posix()
+        except ValueError:
             return None, None
+        return self._git_date_index.get(rel, (None, None))
 
     def parse_projects(self) -> list[Project]:
         """Parse all projects from projects/ directory."""
@@ -587,14 +767,49 @@ class RepositoryParser:
         if not projects_dir.exists():
             return projects
 
-        for project_dir in projects_dir.iterdir():
-            if not project_dir.is_dir() or project_dir.name.startswith("."):
-                continue
+        # Built up front so each parse sees the current git history and
+        # parallel workers share a single git log pass
+        self._git_date_index = None
+        self._ensure_git_date_index()
 
-            project = self._parse_project_dir(project_dir)
+        cached = self._load_parse_cache() if self.parse_cache_path else None
+        project_dirs = sorted(
+            d
+            for d in projects_dir.iterdir()
+            if d.is_dir() and not d.name.startswith(".")
+        )
+        previous = [
+            cached.get(d.name, {}) if cached is not None else None for d in project_dirs
+        ]
+
+        if self.use_processes and self.workers > 1:
+            parsed = self._map_workers(
+                partial(_parse_project_in_worker, self.repo_path),
+                project_dirs,
+                previous,
+                [self._get_git_dates(d) for d in project_dirs],
+            )
+        else:
+            parsed = self._map_workers(
+                self._parse_project_entry, project_dirs, previous
+            )
+
+        entries: dict[str, dict] = {}
+        reused = 0
+        for project_dir, (project, entry, was_reused) in zip(project_dirs, parsed):
+            if entry is not None:
+                entries[project_dir.name] = entry
+            reused += was_reused
             if project:
                 projects.append(project)
 
+        if cached is not None:
+            # Saved before used_by is filled in, which depends on other projects
+            self._save_parse_cache(entries)
+            logger.info(
+                f"Incremental parse: reused {reused} of {len(entries)} project dirs"
+            )
+
         # Compute reverse mapping: which projects use each project's data
         project_ids = {p.id for p in projects}
         for project in projects:
@@ -611,6 +826,121 @@ class RepositoryParser:
             projects, key=lambda p: p.updated_date or datetime.min, reverse=True
         )
 
+    def _map_workers(self, fn, *iterables) -> list:
+        """Map fn over iterables, in parallel if workers > 1, preserving order."""
+        if self.workers <= 1:
+            return list(map(fn, *iterables))
+        executor_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with executor_cls(max_workers=self.workers) as executor:
+            return list(executor.map(fn, *iterables))
+
+    def _parse_project_entry(
+        self, project_dir: Path, previous: dict | None
+    ) -> tuple[Project | None, dict | None, bool]:
+        """Parse one project directory, reusing its cache entry if unchanged.
+
+        previous is None when incremental parsing is off. Returns the project,
+        the cache entry to store for it (or None), and whether it was reused.
+        """
+        if previous is None:
+            return self._parse_project_dir(project_dir), None, False
+
+        fingerprint, files = self._fingerprint_project(
+            project_dir, previous.get("files", {})
+        )
+        reused = bool(previous) and previous["fingerprint"] == fingerprint
+        if reused:
+            project = previous["project"]
+            if project:
+                # Dates come from git history, which can move without any
+                # input file changing, so they are never cached.
+                project.created_date, project.updated_date = (
+                    self._resolve_project_dates(project_dir)
+                )
+                project.used_by = []
+        else:
+            project = self._parse_project_dir(project_dir)
+        entry = {"fingerprint": fingerprint, "files": files, "project": project}
+        return project, entry, reused
+
+    def _project_input_files(self, project_dir: Path) -> list[Path]:
+        """List the files that _parse_project_dir reads or stats."""
+        files = [
+            project_dir / name
+            for name in ("README.md", "RESEARCH_PLAN.md", "REPORT.md", "REVIEW.md")
+            if (project_dir / name).exists()
+        ]
+        notebooks_dir = project_dir / "notebooks"
+        if notebooks_dir.exists():
+            files.extend(notebooks_dir.glob("*.ipynb"))
+        for scan_dir in (project_dir / "data", project_dir / "figures"):
+            if scan_dir.exists():
+                files.extend(
+                    p for p in scan_dir.iterdir() if not p.name.startswith(".")
+                )
+        return files
+
+    def _fingerprint_project(
+        self, project_dir: Path, previous: dict[str, tuple[int, int, str]]
+    ) -> tuple[str, dict[str, tuple[int, int, str]]]:
+        """Fingerprint a project directory's parser inputs.
+
+        Returns the fingerprint and a {relative_path: (mtime_ns, size, digest)}
+        manifest. Content digests are only recomputed for files whose mtime or
+        size differ from the previous manifest.
+        """
+        files: dict[str, tuple[int, int, str]] = {}
+        for path in self._project_input_files(project_dir):
+            rel = path.relative_to(project_dir).as_posix()
+            stat = path.stat()
+            prev = previous.get(rel)
+            if prev and prev[0] == stat.st_mtime_ns and prev[1] == stat.st_size:
+                digest = prev[2]
+            elif path.suffix.lower() in _CONTENT_INPUT_SUFFIXES and path.is_file():
+                digest = _file_digest(path)
+            else:
+                digest = ""
+            files[rel] = (stat.st_mtime_ns, stat.st_size, digest)
+
+        fingerprint = hashlib.sha256()
+        for rel, (_, size, digest) in sorted(files.items()):
+            fingerprint.update(f"{rel}\0{size}\0{digest}\n".encode())
+        return fingerprint.hexdigest(), files
+
+    def _load_parse_cache(self) -> dict[str, dict]:
+        """Load per-project cache entries, or {} if missing or stale."""
+        try:
+            with gzip.open(self.parse_cache_path, "rb") as f:
+                manifest = pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(
+                f"Ignoring unreadable parse cache {self.parse_cache_path}: {e}"
+            )
+            return {}
+
+        if (
+            not isinstance(manifest, dict)
+            or manifest.get("version") != PARSE_CACHE_VERSION
+            or manifest.get("repo_path") != str(self.repo_path)
+        ):
+            return {}
+        return manifest.get("projects", {})
+
+    def _save_parse_cache(self, entries: dict[str, dict]) -> None:
+        """Atomically write per-project cache entries to parse_cache_path."""
+        manifest = {
+            "version": PARSE_CACHE_VERSION,
+            "repo_path": str(self.repo_path),
+            "projects": entries,
+        }
+        self.parse_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.parse_cache_path.with_name(self.parse_cache_path.name + ".tmp")
+        with gzip.open(tmp_path, "wb") as f:
+            pickle.dump(manifest, f)
+        tmp_path.replace(self.parse_cache_path)
+
     def _parse_project_dir(self, project_dir: Path) -> Project | None:
         """Parse single project directory.
 
@@ -721,19 +1051,7 @@ class RepositoryParser:
         # Parse contributors
         contributors = self._parse_contributors(readme_content, project_dir.name)
 
-        # Get dates from git history (reliable in CI), fall back to filesystem
-        git_created, git_updated = self._get_git_dates(project_dir)
-        if git_created and git_updated:
-            created_date = git_created
-            updated_date = git_updated
-        else:
-            created_date = datetime.fromtimestamp(readme_path.stat().st_ctime)
-            mtimes = [readme_path.stat().st_mtime]
-            if has_research_plan:
-                mtimes.append(plan_path.stat().st_mtime)
-            if has_report:
-                mtimes.append(report_path.stat().st_mtime)
-            updated_date = datetime.fromtimestamp(max(mtimes))
+        created_date, updated_date = self._resolve_project_dates(project_dir)
 
         # Parse review
         review = self._parse_review(project_dir)
@@ -784,6 +1102,26 @@ class RepositoryParser:
             derived_from=derived_from,
         )
 
+    def _resolve_project_dates(
+        self, project_dir: Path
+    ) -> tuple[datetime | None, datetime | None]:
+        """Get created/updated dates from git history (reliable in CI).
+
+        Falls back to filesystem timestamps of the project markdown files.
+        """
+        git_created, git_updated = self._get_git_dates(project_dir)
+        if git_created and git_updated:
+            return git_created, git_updated
+
+        readme_path = project_dir / "README.md"
+        created_date = datetime.fromtimestamp(readme_path.stat().st_ctime)
+        mtimes = [readme_path.stat().st_mtime]
+        for extra in ("RESEARCH_PLAN.md", "REPORT.md"):
+            extra_path = project_dir / extra
+            if extra_path.exists():
+                mtimes.append(extra_path.stat().st_mtime)
+        return created_date, datetime.fromtimestamp(max(mtimes))
+
     @staticmethod
     def _rewrite_md_links(content: str | None, project_id: str) -> str | None:
         """Rewrite bare .md links and image paths to be project-relative.
@@ -1706,5 +2044,12 @@ def get_parser() -> RepositoryParser:
     """Get or create parser singleton."""
     global _parser
     if _parser is None:
-        _parser = RepositoryParser()
+        settings = get_settings()
+        _parser = RepositoryParser(
+            parse_cache_path=settings.parse_cache_file
+            if settings.incremental_parse
+            else None,
+            workers=settings.parse_workers,
+            use_processes=settings.parse_use_processes,
+        )
     return _parser
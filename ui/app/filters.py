@@ -1,32 +1,107 @@
+import functools
 import re
+import threading
 
 import markdown
 from markupsafe import Markup
 
+from app.models import RepositoryData
+
+MARKDOWN_EXTENSIONS = ("fenced_code", "tables", "nl2br")
+MARKDOWN_INLINE_EXTENSIONS = ("fenced_code",)
+
+# Rendered HTML entries kept by render_markdown. Comfortably holds every
+# markdown field of every project, so pre-rendered pages stay cached.
+MARKDOWN_CACHE_SIZE = 4096
+
+# Markdown instances keep per-conversion state, so each thread gets its own
+_local = threading.local()
+
+# Project fields rendered with the markdown filter on project pages
+_PROJECT_MARKDOWN_FIELDS = (
+    "research_question",
+    "hypothesis",
+    "approach",
+    "findings",
+    "overview",
+    "results",
+    "interpretation",
+    "limitations",
+    "future_directions",
+    "data_section",
+    "references",
+    "revision_history",
+)
+_REVIEW_MARKDOWN_FIELDS = (
+    "summary",
+    "methodology",
+    "code_quality",
+    "findings_assessment",
+    "suggestions",
+)
+
+
+def _markdown_instance(extensions: tuple[str, ...]) -> markdown.Markdown:
+    """Return this thread's reusable Markdown instance for an extension set."""
+    instances = _local.__dict__.setdefault("instances", {})
+    md = instances.get(extensions)
+    if md is None:
+        md = instances[extensions] = markdown.Markdown(extensions=list(extensions))
+    return md
+
+
+@functools.lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def render_markdown(
+    text: str, extensions: tuple[str, ...] = MARKDOWN_EXTENSIONS
+) -> str:
+    """Convert markdown text to HTML, memoized on (text, extensions)."""
+    md = _markdown_instance(extensions)
+    try:
+        return md.convert(text)
+    finally:
+        md.reset()
+
 
 def markdown_filter(text: str) -> Markup:
     """Convert markdown text to HTML."""
     if not text:
         return Markup("")
-    # Convert markdown to HTML
-    html = markdown.markdown(
-        text,
-        extensions=["fenced_code", "tables", "nl2br"],
-    )
-    return Markup(html)
+    return Markup(render_markdown(text, MARKDOWN_EXTENSIONS))
 
 
 def markdown_inline_filter(text: str) -> Markup:
     """Convert markdown text to inline HTML (strips outer <p> tags)."""
     if not text:
         return Markup("")
-    html = markdown.markdown(text, extensions=["fenced_code"])
+    html = render_markdown(text, MARKDOWN_INLINE_EXTENSIONS)
     # Strip outer <p> tags for inline use
     if html.startswith("<p>") and html.endswith("</p>"):
         html = html[3:-4]
     return Markup(html)
 
 
+def prerender_project_markdown(repo_data: RepositoryData) -> int:
+    """Render every project's markdown fields into the render cache.
+
+    Meant to run at data-load time, off the event loop, so project pages
+    are served from the cache. Returns the number of fields rendered.
+    """
+    rendered = 0
+    for project in repo_data.projects:
+        texts = [getattr(project, name) for name in _PROJECT_MARKDOWN_FIELDS]
+        texts += [content for _, content in project.other_sections]
+        if project.review:
+            texts += [getattr(project.review, name) for name in _REVIEW_MARKDOWN_FIELDS]
+        for text in texts:
+            if text:
+                markdown_filter(text)
+                rendered += 1
+        if project.title:
+            markdown_inline_filter(project.title)
+            rendered += 1
+    return rendered
+
+
 def strip_images_filter(text: str) -> str:
     """Strip markdown image syntax from text for preview use."""
     if not text:
@@ -1,5 +1,6 @@
 """BERIL Research Observatory - FastAPI Application."""
 
+import asyncio
 import hashlib
 import hmac
 import logging
@@ -7,14 +8,19 @@ from contextlib import asynccontextmanager
 from datetime import datetime
 
 import app.context as ctx
-from app.context import generate_base_context, get_base_context, get_repo_data, initialize_data
-from app.notebook_processors import PlotlyPreprocessor
-import nbformat
+from app.context import (
+    DataSnapshot,
+    build_snapshot,
+    get_base_context,
+    get_repo_data,
+    initialize_data,
+)
+from app.notebook_cache import NotebookHTMLCache
 from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Request
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from nbconvert import HTMLExporter
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.filters import (
@@ -27,7 +33,7 @@ from app.filters import (
 from .routes.auth import ROUTER_AUTH
 from .routes.user import ROUTER_USER
 from .config import get_settings
-from .dataloader import load_repository_data, RepositoryParser
+from .dataloader import load_repository_data
 from .git_data_sync import pull_latest
 from .models import CollectionCategory, RepositoryData
 
@@ -46,11 +52,75 @@ templates = None
 async def lifespan(app: FastAPI):
     settings = get_settings()
     if not settings.test_skip_lifespan:
-        app.state.repo_data = await initialize_data(settings)
-        app.state.base_context = generate_base_context(settings, app.state.repo_data)
+        repo_data = await initialize_data(settings)
+        app.state.snapshot = build_snapshot(settings, repo_data)
+        schedule_notebook_prerender(app)
     yield
 
 
+def schedule_notebook_prerender(app: FastAPI) -> None:
+    """Start pre-rendering all notebooks in the background, if enabled.
+
+    A pre-render still running from a previous data load is cancelled.
+    """
+    settings = get_settings()
+    if not settings.prerender_notebooks:
+        return
+    previous = getattr(app.state, "prerender_task", None)
+    if previous and not previous.done():
+        previous.cancel()
+    app.state.prerender_task = asyncio.create_task(
+        app.state.notebook_cache.prerender_all(
+            app.state.snapshot.repo_data, settings.repo_dir
+        )
+    )
+
+
+def _load_snapshot(settings) -> DataSnapshot:
+    """Load the pulled data cache and derive its base context (blocking)."""
+    cache_dir = settings.data_repo_path / "data_cache"
+    return build_snapshot(settings, load_repository_data(cache_dir))
+
+
+async def reload_data(app: FastAPI) -> None:
+    """Pull and load new data, then swap it in as one snapshot.
+
+    Loading runs in a worker thread so requests keep being served from the
+    current snapshot. Reload requests that arrive meanwhile are coalesced
+    into a single further reload. On failure the current snapshot is kept.
+    """
+    settings = get_settings()
+    while app.state.reload_pending:
+        app.state.reload_pending = False
+        try:
+            logger.info("Pulling latest changes from git repository")
+            await pull_latest(settings.data_repo_path, settings.data_repo_branch)
+            snapshot = await run_in_threadpool(_load_snapshot, settings)
+        except Exception as e:
+            logger.error(f"Failed to reload data from git: {e}")
+            continue
+
+        app.state.snapshot = snapshot
+        schedule_notebook_prerender(app)
+        logger.info(
+            f"Data reloaded successfully. New last_updated: {snapshot.repo_data.last_updated}"
+        )
+
+
+def schedule_data_reload(app: FastAPI) -> bool:
+    """Request a background data reload.
+
+    Returns True if a reload task was started, False if the request was
+    coalesced into the one already running.
+    """
+    app.state.reload_pending = True
+    task = getattr(app.state, "reload_task", None)
+    if task and not task.done():
+        return False
+    app.state.reload_task = asyncio.create_task(reload_data(app))
+    return True
+
+
 def create_app() -> FastAPI:
     settings = get_settings()
 
@@ -62,6 +132,13 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
+    app.state.notebook_cache = NotebookHTMLCache(
+        plotly_cdn_url=settings.plotly_cdn_url,
+        max_bytes=settings.notebook_cache_max_bytes,
+        disk_dir=settings.notebook_cache_dir if settings.notebook_disk_cache else None,
+        disk_max_bytes=settings.notebook_disk_cache_max_bytes,
+    )
+
     app.add_middleware(SessionMiddleware, secret_key=settings.session_secret_key, session_cookie="beril_session")
 
     # Mount static files
@@ -143,9 +220,7 @@ async def co_scientist(
     """AI Co-Scientist page."""
     context["skills"] = repo_data.skills
     # Example project for the workflow walkthrough
-    context["example_project"] = next(
-        (p for p in repo_data.projects if p.id == "costly_dispensable_genes"), None
-    )
+    context["example_project"] = repo_data.get_project("costly_dispensable_genes")
     return templates.TemplateResponse(request, "co-scientist.html", context)
 
 
@@ -214,16 +289,11 @@ async def research_areas(
 ):
     """Research areas page - auto-clustered project groups."""
     # Resolve project IDs to full objects for each area
-    project_map = {p.id: p for p in repo_data.projects}
     areas_with_projects = []
     for area in repo_data.research_areas:
+        projects = (repo_data.get_project(pid) for pid in area.project_ids)
         areas_with_projects.append(
-            {
-                "area": area,
-                "projects": [
-                    project_map[pid] for pid in area.project_ids if pid in project_map
-                ],
-            }
+            {"area": area, "projects": [p for p in projects if p]}
         )
 
     context["areas"] = areas_with_projects
@@ -240,7 +310,7 @@ async def project_detail(
     """Project detail page."""
 
     # Find project
-    project = next((p for p in repo_data.projects if p.id == project_id), None)
+    project = repo_data.get_project(project_id)
     if not project:
         context["error"] = f"Project '{project_id}' not found"
         return templates.TemplateResponse(
@@ -248,12 +318,8 @@ async def project_detail(
         )
 
     # Enrich project contributors with aggregated data (ORCID, full name)
-    agg_by_key = {
-        RepositoryParser._contributor_key(c.name): c for c in repo_data.contributors
-    }
     for contrib in project.contributors:
-        key = RepositoryParser._contributor_key(contrib.name)
-        agg = agg_by_key.get(key)
+        agg = repo_data.get_contributor_by_name(contrib.name)
         if agg:
             if not contrib.orcid and agg.orcid:
                 contrib.orcid = agg.orcid
@@ -263,9 +329,7 @@ async def project_detail(
     context["project"] = project
 
     # Find discoveries from this project
-    context["project_discoveries"] = [
-        d for d in repo_data.discoveries if d.project_tag == project_id
-    ]
+    context["project_discoveries"] = repo_data.get_discoveries_for_project(project_id)
 
     # Resolve collection IDs to full objects for richer display
     context["project_collections"] = [
@@ -275,9 +339,8 @@ async def project_detail(
     ]
 
     # Resolve used_by IDs to full Project objects
-    context["used_by_projects"] = [
-        p for p in repo_data.projects if p.id in project.used_by
-    ]
+    used_by = (repo_data.get_project(pid) for pid in project.used_by)
+    context["used_by_projects"] = [p for p in used_by if p]
 
     return templates.TemplateResponse(request, "projects/detail.html", context)
 
@@ -294,9 +357,7 @@ async def notebook_viewer(
 ):
     """Render a Jupyter notebook as HTML."""
     # Find project
-    project = next(
-        (p for p in repo_data.projects if p.id == project_id), None
-    )
+    project = repo_data.get_project(project_id)
     if not project:
         context["error"] = f"Project '{project_id}' not found"
         return templates.TemplateResponse(
@@ -304,7 +365,7 @@ async def notebook_viewer(
         )
 
     # Find notebook
-    notebook = next((n for n in project.notebooks if n.filename == notebook_name), None)
+    notebook = repo_data.get_notebook(project_id, notebook_name)
     if not notebook:
         context["error"] = (
             f"Notebook '{notebook_name}' not found in project '{project_id}'"
@@ -322,27 +383,8 @@ async def notebook_viewer(
         )
 
     try:
-        # Read the notebook
-        with open(notebook_path, "r", encoding="utf-8") as f:
-            nb = nbformat.read(f, as_version=4)
-
-        # Convert plotly outputs to renderable HTML before exporting
-        preprocessor = PlotlyPreprocessor()
-        nb, nb_resources = preprocessor.preprocess(nb, {})
-
-        # Convert to HTML
-        html_exporter = HTMLExporter()
-        html_exporter.template_name = "classic"
-        html_exporter.theme = "dark"
-        html_exporter.exclude_input_prompt = False
-        html_exporter.exclude_output_prompt = False
-
-        (body, _) = html_exporter.from_notebook_node(nb)
-
-        # Prepend Plotly CDN script if any plotly figures were found
-        if nb_resources.get("needs_plotly"):
-            plotly_cdn = f'<script src="{get_settings().plotly_cdn_url}" charset="utf-8"></script>'
-            body = plotly_cdn + body
+        # Rendered off the event loop; cached by notebook content
+        body = await request.app.state.notebook_cache.render(notebook_path)
 
         context.update(
             {
@@ -380,8 +422,6 @@ async def data_explorer(
 
     # Build collection lookup and node data
     collection_map = {c.id: c for c in repo_data.collections}
-    project_map = {p.id: p for p in repo_data.projects}
-
     # Build adjacency info for each collection
     adjacency: dict[str, dict] = {}
     for coll in repo_data.collections:
@@ -403,8 +443,7 @@ async def data_explorer(
         adj = adjacency.get(coll.id, {})
         connected_ids = adj.get("explicit", set()) | {
             e.target_id if e.source_id == coll.id else e.source_id
-            for e in repo_data.collection_edges
-            if coll.id in (e.source_id, e.target_id)
+            for e in repo_data.get_edges_for_collection(coll.id)
         }
         nodes.append(
             {
@@ -443,9 +482,8 @@ async def data_explorer(
         "webofmicrobes_explorer",
         "acinetobacter_adp1_explorer",
     ]
-    context["explorer_projects"] = [
-        project_map[pid] for pid in explorer_ids if pid in project_map
-    ]
+    explorer_projects = (repo_data.get_project(pid) for pid in explorer_ids)
+    context["explorer_projects"] = [p for p in explorer_projects if p]
 
     # Cross-collection stats
     multi_coll_projects = [
@@ -506,9 +544,7 @@ async def collection_detail(
     context["tables"] = repo_data.get_tables_for_collection(collection_id)
 
     # Find projects that reference this collection
-    context["related_projects"] = [
-        p for p in repo_data.projects if collection_id in p.related_collections
-    ]
+    context["related_projects"] = repo_data.get_projects_for_collection(collection_id)
 
     return templates.TemplateResponse(request, "collections/detail.html", context)
 
@@ -596,7 +632,7 @@ async def community_contributors(
     for contributor in contributors:
         colls = set()
         for pid in contributor.project_ids:
-            proj = next((p for p in repo_data.projects if p.id == pid), None)
+            proj = repo_data.get_project(pid)
             if proj:
                 colls.update(proj.related_collections)
         contributor_collections[contributor.name] = sorted(colls)
@@ -629,7 +665,8 @@ async def data_update_webhook(
     Webhook endpoint to receive data cache update notifications.
 
     Expected to be called by GitHub Actions after building new cache.
-    Validates signature and reloads data from the remote source.
+    Validates signature and schedules a background reload from the data
+    repository; responds 202 without waiting for it.
     """
     settings = get_settings()
 
@@ -653,41 +690,21 @@ async def data_update_webhook(
 
     logger.info("Received data update webhook notification")
 
-    # Pull latest changes and reload
-    if settings.data_repo_url:
-        try:
-            logger.info("Pulling latest changes from git repository")
-
-            # Pull latest changes
-            await pull_latest(settings.data_repo_path, settings.data_repo_branch)
-
-            # Reload from local git repo
-            data_file = settings.data_repo_path / "data_cache" / "data.pkl.gz"
-            request.app.state.repo_data = load_repository_data(data_file)
-            request.app.state.base_context = generate_base_context(settings, request.app.state.repo_data)
-
-            logger.info(
-                f"Data reloaded successfully. New last_updated: {request.app.state.repo_data.last_updated}"
-            )
-
-            return JSONResponse(
-                {
-                    "status": "success",
-                    "message": "Data reloaded successfully from git",
-                    "last_updated": request.app.state.repo_data.last_updated.isoformat()
-                    if request.app.state.repo_data.last_updated
-                    else None,
-                }
-            )
-        except Exception as e:
-            logger.error(f"Failed to reload data from git: {e}")
-            raise HTTPException(
-                status_code=500, detail=f"Failed to reload data: {str(e)}"
-            )
-    else:
+    if not settings.data_repo_url:
         logger.warning("Webhook received but no data_repo_url configured")
         raise HTTPException(status_code=400, detail="No git repository configured")
 
+    started = schedule_data_reload(request.app)
+    return JSONResponse(
+        {
+            "status": "accepted",
+            "message": "Data reload started"
+            if started
+            else "Data reload already in progress; queued another",
+        },
+        status_code=202,
+    )
+
 
 # Health check
 @ROUTER_GENERAL.get("/health")
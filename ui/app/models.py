@@ -16,6 +16,74 @@ def _slugify_name(name: str) -> str:
     return text
 
 
+class BlobField:
+    """Descriptor for a large text field that may live in the data cache blob store.
+
+    Behaves like a plain dataclass field. The data cache writer moves the
+    value out of the instance into a blob file and records its ref in
+    _blob_refs; the loader attaches the store as _blob_store, and the value
+    is read from it on first access.
+    """
+
+    def __init__(self, default: str | None = None):
+        self.default = default
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self.default
+        state = obj.__dict__
+        if self.name not in state:
+            ref = state.get("_blob_refs", {}).get(self.name)
+            store = state.get("_blob_store")
+            if ref is None or store is None:
+                raise AttributeError(self.name)
+            state[self.name] = store.read(ref)
+        return state[self.name]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+
+class _BlobFieldsMixin:
+    """Pickle support for dataclasses with BlobFields.
+
+    A detached instance (refs but no store) pickles as-is; an instance
+    attached to a store pickles with its blob values read back in, since the
+    store itself cannot be pickled.
+    """
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        store = state.pop("_blob_store", None)
+        if store is not None:
+            for name, ref in state.pop("_blob_refs", {}).items():
+                state.setdefault(name, store.read(ref))
+        return state
+
+    @classmethod
+    def blob_field_names(cls) -> list[str]:
+        return [
+            name
+            for klass in reversed(cls.__mro__)
+            for name, value in vars(klass).items()
+            if isinstance(value, BlobField)
+        ]
+
+
+def _contributor_key(name: str) -> str:
+    """Normalize a contributor name for deduplication.
+
+    Strips middle initials (single chars followed by period) so
+    'Paramvir S. Dehal' and 'Paramvir Dehal' merge correctly.
+    """
+    # Remove single-letter-dot patterns like "S." or "J."
+    normalized = re.sub(r"\b[A-Za-z]\.\s*", "", name)
+    return " ".join(normalized.lower().split())
+
+
 @dataclass
 class Contributor:
     """A project contributor with optional ORCID and affiliation."""
@@ -119,7 +187,7 @@ class Collection:
 
 
 @dataclass
-class Review:
+class Review(_BlobFieldsMixin):
     """An automated review of a project."""
 
     reviewer: str
@@ -130,7 +198,7 @@ class Review:
     code_quality: str | None = None
     findings_assessment: str | None = None
     suggestions: str | None = None
-    raw_content: str = ""
+    raw_content: str = BlobField("")
 
 
 @dataclass
@@ -176,7 +244,7 @@ class DataFile:
 
 
 @dataclass
-class Project:
+class Project(_BlobFieldsMixin):
     """A research project."""
 
     id: str
@@ -195,13 +263,13 @@ class Project:
     related_discoveries: list[str] = field(default_factory=list)
     related_ideas: list[str] = field(default_factory=list)
     related_collections: list[str] = field(default_factory=list)
-    raw_readme: str = ""
+    raw_readme: str = BlobField("")
     review: Review | None = None
     # Three-file structure fields
     has_research_plan: bool = False
     has_report: bool = False
-    research_plan_raw: str | None = None
-    report_raw: str | None = None
+    research_plan_raw: str | None = BlobField()
+    report_raw: str | None = BlobField()
     overview: str | None = None
     results: str | None = None
     interpretation: str | None = None
@@ -376,6 +444,102 @@ class RepositoryData:
     total_data_files: int = 0
     last_updated: datetime | None = None
 
+    # Lookup indexes used by route handlers. Built from the lists above at
+    # construction and unpickling time, never pickled themselves; call
+    # build_indexes() after replacing or mutating those lists.
+    _projects_by_id: dict[str, Project] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _projects_by_collection: dict[str, list[Project]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _notebooks_by_key: dict[tuple[str, str], Notebook] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _discoveries_by_project: dict[str, list[Discovery]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _collections_by_id: dict[str, Collection] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _edges_by_collection: dict[str, list[CollectionEdge]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _contributors_by_id: dict[str, Contributor] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _contributors_by_key: dict[str, Contributor] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    _INDEX_FIELDS = (
+        "_projects_by_id",
+        "_projects_by_collection",
+        "_notebooks_by_key",
+        "_discoveries_by_project",
+        "_collections_by_id",
+        "_edges_by_collection",
+        "_contributors_by_id",
+        "_contributors_by_key",
+    )
+
+    def __post_init__(self):
+        self.build_indexes()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for name in self._INDEX_FIELDS:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.build_indexes()
+
+    def build_indexes(self) -> None:
+        """(Re)build the lookup indexes from the current lists.
+
+        First occurrence wins for duplicate IDs, matching a linear scan.
+        """
+        self._projects_by_id = {}
+        self._projects_by_collection = {}
+        self._notebooks_by_key = {}
+        for project in self.projects:
+            self._projects_by_id.setdefault(project.id, project)
+            # A project listing a collection twice still appears once
+            for collection_id in dict.fromkeys(project.related_collections):
+                self._projects_by_collection.setdefault(collection_id, []).append(
+                    project
+                )
+            for notebook in project.notebooks:
+                self._notebooks_by_key.setdefault(
+                    (project.id, notebook.filename), notebook
+                )
+
+        self._discoveries_by_project = {}
+        for discovery in self.discoveries:
+            self._discoveries_by_project.setdefault(discovery.project_tag, []).append(
+                discovery
+            )
+
+        self._collections_by_id = {}
+        for collection in self.collections:
+            self._collections_by_id.setdefault(collection.id, collection)
+
+        self._edges_by_collection = {}
+        for edge in self.collection_edges:
+            self._edges_by_collection.setdefault(edge.source_id, []).append(edge)
+            if edge.target_id != edge.source_id:
+                self._edges_by_collection.setdefault(edge.target_id, []).append(edge)
+
+        self._contributors_by_id = {}
+        self._contributors_by_key = {}
+        for contributor in self.contributors:
+            self._contributors_by_id.setdefault(contributor.id, contributor)
+            self._contributors_by_key.setdefault(
+                _contributor_key(contributor.name), contributor
+            )
+
     def get_tables_for_collection(self, collection_id: str) -> list[Table]:
         """Get schema tables for a collection by ID, checking sub_collections."""
         if collection_id in self.tables:
@@ -390,7 +554,7 @@ class RepositoryData:
 
     def get_collection(self, collection_id: str) -> Collection | None:
         """Get a collection by ID."""
-        return next((c for c in self.collections if c.id == collection_id), None)
+        return self._collections_by_id.get(collection_id)
 
     def get_collections_by_category(
         self, category: CollectionCategory
@@ -400,4 +564,28 @@ class RepositoryData:
 
     def get_contributor(self, contributor_id: str) -> Contributor | None:
         """Get a contributor by ID."""
-        return next((c for c in self.contributors if c.id == contributor_id), None)
+        return self._contributors_by_id.get(contributor_id)
+
+    def get_contributor_by_name(self, name: str) -> Contributor | None:
+        """Get the aggregated contributor matching a name, ignoring middle initials."""
+        return self._contributors_by_key.get(_contributor_key(name))
+
+    def get_project(self, project_id: str) -> Project | None:
+        """Get a project by ID."""
+        return self._projects_by_id.get(project_id)
+
+    def get_projects_for_collection(self, collection_id: str) -> list[Project]:
+        """Get projects that reference a collection, in project list order."""
+        return self._projects_by_collection.get(collection_id, [])
+
+    def get_notebook(self, project_id: str, filename: str) -> Notebook | None:
+        """Get a notebook by project ID and filename."""
+        return self._notebooks_by_key.get((project_id, filename))
+
+    def get_discoveries_for_project(self, project_id: str) -> list[Discovery]:
+        """Get discoveries tagged with a project ID, in discovery list order."""
+        return self._discoveries_by_project.get(project_id, [])
+
+    def get_edges_for_collection(self, collection_id: str) -> list[CollectionEdge]:
+        """Get collection edges with the collection at either end."""
+        return self._edges_by_collection.get(collection_id, [])
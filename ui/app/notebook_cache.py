@@ -0,0 +1,181 @@
+"""Rendered notebook HTML cache.
+
+Converting a notebook with nbconvert takes hundreds of milliseconds to
+seconds, so rendered HTML is cached by notebook content hash: in memory in
+a byte-capped LRU, and optionally on disk (also byte-capped, evicting the
+least recently used files) so renders survive restarts and are shared
+between workers.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import nbformat
+from nbconvert import HTMLExporter
+from starlette.concurrency import run_in_threadpool
+
+from app.models import RepositoryData
+from app.notebook_processors import PlotlyPreprocessor
+
+logger = logging.getLogger(__name__)
+
+# Bump when render_notebook_html output changes, to invalidate stored renders.
+RENDER_VERSION = 1
+
+
+def render_notebook_html(notebook_bytes: bytes, plotly_cdn_url: str) -> str:
+    """Convert notebook JSON to an HTML fragment for projects/notebook.html."""
+    nb = nbformat.reads(notebook_bytes.decode("utf-8"), as_version=4)
+
+    # Convert plotly outputs to renderable HTML before exporting
+    preprocessor = PlotlyPreprocessor()
+    nb, nb_resources = preprocessor.preprocess(nb, {})
+
+    # Convert to HTML
+    html_exporter = HTMLExporter()
+    html_exporter.template_name = "classic"
+    html_exporter.theme = "dark"
+    html_exporter.exclude_input_prompt = False
+    html_exporter.exclude_output_prompt = False
+
+    (body, _) = html_exporter.from_notebook_node(nb)
+
+    # Prepend Plotly CDN script if any plotly figures were found
+    if nb_resources.get("needs_plotly"):
+        plotly_cdn = f'<script src="{plotly_cdn_url}" charset="utf-8"></script>'
+        body = plotly_cdn + body
+    return body
+
+
+class NotebookHTMLCache:
+    """Content-addressed cache of rendered notebook HTML.
+
+    Entries are keyed by notebook content, so an edited notebook is re-rendered
+    on its next request and stale renders simply age out of the LRU, in
+    memory and on disk. All methods are thread-safe; rendering runs outside
+    the lock.
+    """
+
+    def __init__(
+        self,
+        plotly_cdn_url: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Path | None = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.plotly_cdn_url = plotly_cdn_url
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _key(self, notebook_bytes: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{RENDER_VERSION}\0{self.plotly_cdn_url}\0".encode())
+        digest.update(notebook_bytes)
+        return digest.hexdigest()
+
+    def _remember(self, key: str, html: str) -> None:
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = html
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.encode("utf-8"))
+
+    def _recall(self, key: str) -> str | None:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                return html
+
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / f"{key}.html"
+        try:
+            html = path.read_text(encoding="utf-8")
+            path.touch()  # mark as recently used for _prune_disk
+        except OSError:
+            return None
+        self._remember(key, html)
+        return html
+
+    def _store(self, key: str, html: str) -> None:
+        self._remember(key, html)
+        if self.disk_dir is None:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self.disk_dir / f"{key}.html"
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(html, encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"Could not store rendered notebook {key}: {e}")
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete the least recently used renders until the store fits disk_max_bytes."""
+        files = []
+        for path in self.disk_dir.glob("*.html"):
+            try:
+                stat = path.stat()
+            except OSError:  # removed by another worker
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def get_or_render(self, notebook_path: Path) -> str:
+        """Return rendered HTML for a notebook file, rendering on a cache miss.
+
+        Blocking; call via render() from async code.
+        """
+        notebook_bytes = notebook_path.read_bytes()
+        key = self._key(notebook_bytes)
+        html = self._recall(key)
+        if html is None:
+            html = render_notebook_html(notebook_bytes, self.plotly_cdn_url)
+            self._store(key, html)
+        return html
+
+    async def render(self, notebook_path: Path) -> str:
+        """Async wrapper running get_or_render off the event loop."""
+        return await run_in_threadpool(self.get_or_render, notebook_path)
+
+    async def prerender_all(self, repo_data: RepositoryData, repo_dir: Path) -> int:
+        """Render every project notebook into the cache, one at a time.
+
+        Meant to run as a background task after data loads. Failures are
+        logged and skipped. Returns the number of notebooks rendered.
+        """
+        rendered = 0
+        for project in repo_data.projects:
+            for notebook in project.notebooks:
+                try:
+                    await self.render(repo_dir / notebook.path)
+                    rendered += 1
+                except Exception as e:
+                    logger.warning(f"Pre-render failed for {notebook.path}: {e}")
+        logger.info(f"Pre-rendered {rendered} notebooks")
+        return rendered
+
+    def __len__(self) -> int:
+        return len(self._entries)
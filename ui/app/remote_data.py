@@ -0,0 +1,228 @@
+"""Streaming, conditional and resumable fetch of the remote data cache.
+
+The data cache published at a base URL is downloaded straight to disk and
+then unpickled through a streaming gzip reader, so a reload never holds the
+compressed bytes, the decompressed bytes and the loaded objects in memory at
+once. Downloads are conditional (ETag / Last-Modified), interrupted downloads
+resume with an HTTP Range request, and the file is verified against the
+SHA-256 checksum published in timestamp.json.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = "data.pkl.gz"
+TIMESTAMP_FILE = "timestamp.json"
+STATE_FILE = "fetch_state.json"
+
+_CONTENT_RANGE_START = re.compile(r"bytes (\d+)-")
+
+
+def _validator_headers(validators: dict) -> dict[str, str]:
+    """Conditional request headers for previously seen response validators."""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _response_validators(response: httpx.Response) -> dict:
+    return {
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
+
+
+class RemoteDataFetcher:
+    """Fetch timestamp.json and the data file from a data cache base URL.
+
+    The downloaded data file, any partial download and the validators needed
+    to revalidate or resume it live in download_dir. Not safe for concurrent
+    use of the same download_dir.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        download_dir: Path,
+        client: httpx.Client | None = None,
+        timeout: float = 30.0,
+        chunk_size: int = 1 << 20,
+    ):
+        if not base_url.endswith("/"):
+            base_url = base_url + "/"
+        self.base_url = base_url
+        self.download_dir = download_dir
+        self.chunk_size = chunk_size
+        self._client = client or httpx.Client(follow_redirects=True, timeout=timeout)
+        self._timestamp_validators: dict = {}
+        self._timestamp_data: dict | None = None
+
+    @property
+    def data_path(self) -> Path:
+        return self.download_dir / DATA_FILE
+
+    @property
+    def _partial_path(self) -> Path:
+        return self.download_dir / f"{DATA_FILE}.part"
+
+    @property
+    def _state_path(self) -> Path:
+        return self.download_dir / STATE_FILE
+
+    def _load_state(self) -> dict:
+        try:
+            return json.loads(self._state_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict) -> None:
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._state_path.with_name(f"{STATE_FILE}.tmp")
+        tmp_path.write_text(json.dumps(state))
+        tmp_path.replace(self._state_path)
+
+    def fetch_timestamp(self) -> dict:
+        """Return the parsed timestamp.json, revalidating a cached copy.
+
+        Raises:
+            httpx.HTTPError: If the request fails
+        """
+        headers = {}
+        if self._timestamp_data is not None:
+            headers = _validator_headers(self._timestamp_validators)
+        response = self._client.get(
+            self.base_url + TIMESTAMP_FILE, headers=headers, timeout=5.0
+        )
+        if response.status_code == 304 and self._timestamp_data is not None:
+            return self._timestamp_data
+        response.raise_for_status()
+
+        self._timestamp_data = response.json()
+        self._timestamp_validators = _response_validators(response)
+        return self._timestamp_data
+
+    def check_for_updates(self, current_last_updated: datetime) -> bool:
+        """True if timestamp.json reports data newer than current_last_updated."""
+        remote_timestamp_str = self.fetch_timestamp().get("timestamp")
+        if not remote_timestamp_str:
+            return False
+        return datetime.fromisoformat(remote_timestamp_str) > current_last_updated
+
+    def download(self, expected_sha256: str | None = None) -> Path:
+        """Bring data_path up to date with the remote data file and return it.
+
+        Skips the transfer when the server reports the local copy is current
+        and resumes a previously interrupted transfer when the server honours
+        the Range request.
+
+        Raises:
+            httpx.HTTPError: If the request fails
+            ValueError: If the downloaded file does not match expected_sha256
+        """
+        state = self._load_state()
+        partial = state.get("partial")
+        complete = state.get("complete")
+        offset = 0
+        headers = {"Accept-Encoding": "identity"}
+
+        if partial and self._partial_path.exists():
+            offset = self._partial_path.stat().st_size
+            headers["Range"] = f"bytes={offset}-"
+            if partial.get("etag") or partial.get("last_modified"):
+                headers["If-Range"] = partial.get("etag") or partial["last_modified"]
+        elif complete and self.data_path.exists():
+            headers.update(_validator_headers(complete))
+
+        with self._client.stream(
+            "GET", self.base_url + DATA_FILE, headers=headers
+        ) as response:
+            if response.status_code == 304 and complete and self.data_path.exists():
+                logger.info("Remote data file not modified; reusing local copy")
+                self._verify(complete.get("sha256"), expected_sha256)
+                return self.data_path
+            if response.status_code == 416 and offset:
+                restart = True
+            else:
+                restart = False
+                response.raise_for_status()
+                sha256 = self._receive(response, offset, state)
+
+        if restart:
+            # The partial file is no longer a prefix of the remote file
+            logger.info("Cannot resume data file download; starting over")
+            self._discard_partial(state)
+            return self.download(expected_sha256)
+
+        try:
+            self._verify(sha256, expected_sha256)
+        except ValueError:
+            self._discard_partial(state)
+            raise
+
+        os.replace(self._partial_path, self.data_path)
+        state["complete"] = {**state.pop("partial"), "sha256": sha256}
+        self._save_state(state)
+        logger.info(f"Downloaded data file ({self.data_path.stat().st_size:,} bytes)")
+        return self.data_path
+
+    def _receive(self, response: httpx.Response, offset: int, state: dict) -> str:
+        """Stream the response body into the partial file; return its SHA-256."""
+        digest = hashlib.sha256()
+        if response.status_code == 206 and offset:
+            match = _CONTENT_RANGE_START.match(
+                response.headers.get("content-range", "")
+            )
+            if not match or int(match.group(1)) != offset:
+                raise ValueError(
+                    f"Server resumed at unexpected range: "
+                    f"{response.headers.get('content-range')!r}"
+                )
+            logger.info(f"Resuming data file download at byte {offset:,}")
+            with open(self._partial_path, "rb") as f:
+                for block in iter(lambda: f.read(self.chunk_size), b""):
+                    digest.update(block)
+            mode = "ab"
+        else:
+            mode = "wb"
+
+        # Persist validators first so an interrupted transfer can resume
+        state["partial"] = _response_validators(response)
+        self._save_state(state)
+
+        with open(self._partial_path, mode) as f:
+            for chunk in response.iter_bytes(self.chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _discard_partial(self, state: dict) -> None:
+        self._partial_path.unlink(missing_ok=True)
+        state.pop("partial", None)
+        self._save_state(state)
+
+    def _verify(self, actual: str | None, expected: str | None) -> None:
+        if expected and actual != expected:
+            raise ValueError(
+                f"Checksum mismatch for {DATA_FILE}: expected {expected}, got {actual}"
+            )
+
+    def fetch(self) -> Path:
+        """Download the data file, verified against timestamp.json if it has a checksum."""
+        try:
+            expected_sha256 = self.fetch_timestamp().get("sha256")
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch {TIMESTAMP_FILE}, skipping checksum: {e}")
+            expected_sha256 = None
+        return self.download(expected_sha256)
@@ -229,9 +229,11 @@ def test_client(repository_data):
     """Return a TestClient with app state pre-loaded."""
     from fastapi.testclient import TestClient
 
+    from app.config import get_settings
+    from app.context import build_snapshot
     from app.main import app
 
     with TestClient(app, raise_server_exceptions=False) as client:
         # Inject repository data directly into app state
-        app.state.repo_data = repository_data
+        app.state.snapshot = build_snapshot(get_settings(), repository_data)
         yield client
@@ -6,6 +6,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from fastapi.testclient import TestClient
 
+from app.context import DataSnapshot
 from app.main import create_app
 
 
@@ -30,8 +31,9 @@ def client(repository_data, app_data_context):
         cfg._settings = None
         app_instance = create_app()
         with TestClient(app_instance, raise_server_exceptions=True) as c:
-            app_instance.state.repo_data = repository_data
-            app_instance.state.base_context = app_data_context
+            app_instance.state.snapshot = DataSnapshot(
+                repository_data, app_data_context
+            )
             yield c
         cfg._settings = None
 
@@ -61,8 +63,9 @@ def client_no_orcid(repository_data, app_data_context):
         with patch("app.routes.auth.get_settings", return_value=no_orcid_settings):
             app_instance = create_app()
             with TestClient(app_instance, raise_server_exceptions=True) as c:
-                app_instance.state.repo_data = repository_data
-                app_instance.state.base_context = app_data_context
+                app_instance.state.snapshot = DataSnapshot(
+                    repository_data, app_data_context
+                )
                 yield c
 
 
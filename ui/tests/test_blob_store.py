@@ -0,0 +1,60 @@
+"""Unit tests for app.blob_store."""
+
+import pytest
+
+from app.blob_store import BlobStore, BlobWriter
+
+
+class TestBlobStore:
+    def test_roundtrip(self, tmp_path):
+        path = tmp_path / "data.blobs"
+        with BlobWriter(path) as writer:
+            ref_a = writer.add("alpha")
+            ref_b = writer.add("béta ✓")
+            ref_empty = writer.add("")
+        store = BlobStore(path)
+        assert store.read(ref_a) == "alpha"
+        assert store.read(ref_b) == "béta ✓"
+        assert store.read(ref_empty) == ""
+        store.close()
+
+    def test_no_temp_file_left(self, tmp_path):
+        with BlobWriter(tmp_path / "data.blobs") as writer:
+            writer.add("x")
+        assert [p.name for p in tmp_path.iterdir()] == ["data.blobs"]
+
+    def test_abort_on_error_keeps_existing_file(self, tmp_path):
+        path = tmp_path / "data.blobs"
+        with BlobWriter(path) as writer:
+            ref = writer.add("original")
+        with pytest.raises(RuntimeError), BlobWriter(path) as writer:
+            writer.add("replacement")
+            raise RuntimeError("boom")
+        assert BlobStore(path).read(ref) == "original"
+        assert [p.name for p in tmp_path.iterdir()] == ["data.blobs"]
+
+    def test_digest_depends_on_content(self, tmp_path):
+        with BlobWriter(tmp_path / "a.blobs") as a:
+            a.add("one")
+        with BlobWriter(tmp_path / "b.blobs") as b:
+            b.add("two")
+        assert a.digest != b.digest
+
+    def test_rejects_non_blob_file(self, tmp_path):
+        path = tmp_path / "bogus.blobs"
+        path.write_bytes(b"NOTBLOBS\x01\x00\x00\x00")
+        with pytest.raises(ValueError, match="Not a blob file"):
+            BlobStore(path)
+
+    def test_rejects_short_file(self, tmp_path):
+        path = tmp_path / "short.blobs"
+        path.write_bytes(b"BERIL")
+        with pytest.raises(ValueError, match="too short"):
+            BlobStore(path)
+
+    def test_out_of_range_ref(self, tmp_path):
+        path = tmp_path / "data.blobs"
+        with BlobWriter(path) as writer:
+            writer.add("abc")
+        with pytest.raises(ValueError, match="out of range"):
+            BlobStore(path).read((12, 100))
@@ -59,6 +59,26 @@ class TestDefaults:
         s = make_settings()
         assert s.data_repo_url is None
 
+    def test_incremental_parse_default_false(self):
+        s = make_settings()
+        assert s.incremental_parse is False
+
+    def test_notebook_cache_defaults(self):
+        s = make_settings()
+        assert s.notebook_cache_max_bytes == 64 * 1024 * 1024
+        assert s.notebook_disk_cache is False
+        assert s.notebook_disk_cache_max_bytes == 512 * 1024 * 1024
+        assert s.prerender_notebooks is False
+
+    def test_prerender_markdown_default_false(self):
+        s = make_settings()
+        assert s.prerender_markdown is False
+
+    def test_parse_workers_default_serial(self):
+        s = make_settings()
+        assert s.parse_workers == 1
+        assert s.parse_use_processes is False
+
     def test_data_repo_branch_default(self):
         s = make_settings()
         assert s.data_repo_branch == "data-cache"
@@ -136,6 +156,18 @@ class TestDerivedPaths:
         s = make_settings()
         assert s.search_index_dir == s.cache_dir / "indexdir"
 
+    def test_notebook_cache_dir(self):
+        s = make_settings()
+        assert s.notebook_cache_dir == s.cache_dir / "notebooks"
+
+    def test_parse_cache_file(self):
+        s = make_settings()
+        assert s.parse_cache_file == s.cache_dir / "parse_cache.pkl.gz"
+
+    def test_remote_cache_dir(self):
+        s = make_settings()
+        assert s.remote_cache_dir == s.cache_dir / "remote"
+
     def test_derived_paths_are_path_objects(self):
         s = make_settings()
         for prop in (
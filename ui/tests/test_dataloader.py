@@ -2,17 +2,23 @@
 
 import gzip
 import json
+import os
 import pickle
+import subprocess
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from app.dataloader import (
+    REPOSITORY_META_FILE,
     RepositoryParser,
+    load_local_cache,
     load_local_pickle,
     load_repository_data,
     slugify,
+    write_data_cache,
 )
 from app.models import (
     IdeaStatus,
@@ -73,6 +79,73 @@ class TestLoadLocalPickle:
             load_local_pickle(bad_file)
 
 
+# ---------------------------------------------------------------------------
+# write_data_cache / load_local_cache
+# ---------------------------------------------------------------------------
+
+
+class TestDataCache:
+    @pytest.fixture
+    def populated_data(self, repository_data, review):
+        project = repository_data.projects[0]
+        project.raw_readme = "# Test\n\nRaw readme body."
+        project.report_raw = "## Key Findings\nA report."
+        project.review = review
+        review.raw_content = "---\nreviewer: bot\n---\nReview body."
+        return repository_data
+
+    def test_roundtrip(self, tmp_path, populated_data):
+        write_data_cache(populated_data, tmp_path)
+        loaded = load_local_cache(tmp_path)
+        assert loaded == populated_data
+        assert (
+            loaded.get_project("test_project").report_raw
+            == "## Key Findings\nA report."
+        )
+
+    def test_blob_fields_load_lazily(self, tmp_path, populated_data):
+        write_data_cache(populated_data, tmp_path)
+        project = load_local_cache(tmp_path).projects[0]
+        assert "raw_readme" not in project.__dict__
+        assert project.raw_readme == "# Test\n\nRaw readme body."
+        assert "raw_readme" in project.__dict__
+        assert project.review.raw_content.endswith("Review body.")
+
+    def test_does_not_modify_input(self, tmp_path, populated_data):
+        write_data_cache(populated_data, tmp_path)
+        assert populated_data.projects[0].__dict__["raw_readme"].startswith("# Test")
+        assert "_blob_refs" not in populated_data.projects[0].__dict__
+
+    def test_loaded_data_can_be_repickled(self, tmp_path, populated_data):
+        write_data_cache(populated_data, tmp_path)
+        loaded = load_local_cache(tmp_path)
+        restored = pickle.loads(pickle.dumps(loaded))
+        assert restored.projects[0].raw_readme == "# Test\n\nRaw readme body."
+        assert "_blob_store" not in restored.projects[0].__dict__
+
+    def test_rewrite_removes_stale_blob_file(self, tmp_path, populated_data):
+        write_data_cache(populated_data, tmp_path)
+        populated_data.projects[0].raw_readme = "changed"
+        write_data_cache(populated_data, tmp_path)
+        assert len(list(tmp_path.glob("data.*.blobs"))) == 1
+        assert load_local_cache(tmp_path).projects[0].raw_readme == "changed"
+
+    def test_falls_back_to_legacy_pickle(self, pickle_file, repository_data):
+        loaded = load_local_cache(pickle_file.parent)
+        assert len(loaded.projects) == len(repository_data.projects)
+
+    def test_rejects_unknown_version(self, tmp_path):
+        with gzip.open(tmp_path / REPOSITORY_META_FILE, "wb") as f:
+            pickle.dump({"version": 99}, f)
+        with pytest.raises(ValueError, match="Unsupported data cache version"):
+            load_local_cache(tmp_path)
+
+    def test_load_repository_data_from_directory(self, tmp_path, populated_data):
+        write_data_cache(populated_data, tmp_path)
+        loaded = load_repository_data(tmp_path)
+        assert loaded.last_updated == populated_data.last_updated
+
+
 # ---------------------------------------------------------------------------
 # load_repository_data
 # ---------------------------------------------------------------------------
@@ -136,6 +209,7 @@ class TestContributorKey:
 class TestAggregateContributors:
     def _make_project(self, pid, contributors):
         from app.models import Contributor, Project
+
         return Project(
             id=pid,
             title=pid,
@@ -145,6 +219,7 @@ class TestAggregateContributors:
 
     def _make_contrib(self, name, pid, orcid=None, affiliation=None, roles=None):
         from app.models import Contributor
+
         return Contributor(
             name=name,
             orcid=orcid,
@@ -249,7 +324,9 @@ class TestExtractOtherSections:
         self.parser = RepositoryParser.__new__(RepositoryParser)
 
     def test_skips_known_sections(self):
-        content = "## Key Findings\nFindings here.\n\n## Custom Section\nCustom content.\n"
+        content = (
+            "## Key Findings\nFindings here.\n\n## Custom Section\nCustom content.\n"
+        )
         result = self.parser._extract_other_sections(content, {"Key Findings"})
         assert len(result) == 1
         assert result[0][0] == "Custom Section"
@@ -335,8 +412,7 @@ class TestParseContributors:
 
     def test_bold_format_with_affiliation_and_orcid(self):
         content = (
-            "## Authors\n"
-            "- **Alice Smith** (LBNL) | ORCID: 0000-0001-1111-1111 | lead\n"
+            "## Authors\n- **Alice Smith** (LBNL) | ORCID: 0000-0001-1111-1111 | lead\n"
         )
         contribs = self.parser._parse_contributors(content, "proj_a")
         assert len(contribs) == 1
@@ -355,8 +431,7 @@ class TestParseContributors:
 
     def test_plain_format_with_orcid_url(self):
         content = (
-            "## Authors\n"
-            "- Carol White (https://orcid.org/0000-0002-2222-2222), LBNL\n"
+            "## Authors\n- Carol White (https://orcid.org/0000-0002-2222-2222), LBNL\n"
         )
         contribs = self.parser._parse_contributors(content, "proj_c")
         assert len(contribs) == 1
@@ -445,8 +520,7 @@ class TestParseProjects:
         src_dir = tmp_repo / "projects" / "source_proj"
         src_dir.mkdir()
         (src_dir / "README.md").write_text(
-            "# Source\n\n## Research Question\nQ?\n\n"
-            "## Key Findings\nFound it.\n"
+            "# Source\n\n## Research Question\nQ?\n\n## Key Findings\nFound it.\n"
         )
 
         consumer_dir = tmp_repo / "projects" / "consumer_proj"
@@ -461,7 +535,9 @@ class TestParseProjects:
             "cells": [
                 {
                     "cell_type": "code",
-                    "source": ["df = pd.read_csv('../../source_proj/data/results.csv')"],
+                    "source": [
+                        "df = pd.read_csv('../../source_proj/data/results.csv')"
+                    ],
                     "outputs": [],
                     "metadata": {},
                 }
@@ -479,6 +555,237 @@ class TestParseProjects:
         assert "consumer_proj" in src.used_by
 
 
+# ---------------------------------------------------------------------------
+# RepositoryParser._get_git_dates (batched git history index)
+# ---------------------------------------------------------------------------
+
+
+class TestGitDateIndex:
+    def _commit(self, repo, message, date):
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_DATE=date,
+            GIT_COMMITTER_DATE=date,
+            GIT_AUTHOR_NAME="Test",
+            GIT_AUTHOR_EMAIL="test@example.com",
+            GIT_COMMITTER_NAME="Test",
+            GIT_COMMITTER_EMAIL="test@example.com",
+        )
+        subprocess.run(["git", "add", "-A"], cwd=repo, check=True, env=env)
+        subprocess.run(["git", "commit", "-qm", message], cwd=repo, check=True, env=env)
+
+    @pytest.fixture
+    def git_repo(self, tmp_repo):
+        subprocess.run(["git", "init", "-q"], cwd=tmp_repo, check=True)
+        alpha = tmp_repo / "projects" / "alpha"
+        beta = tmp_repo / "projects" / "beta"
+        alpha.mkdir()
+        (alpha / "README.md").write_text("# Alpha\n")
+        self._commit(tmp_repo, "alpha", "2024-01-01T00:00:00+00:00")
+        beta.mkdir()
+        (beta / "README.md").write_text("# Beta\n")
+        self._commit(tmp_repo, "beta", "2024-02-01T00:00:00+00:00")
+        (alpha / "notebooks").mkdir()
+        (alpha / "notebooks" / "a.ipynb").write_text("{}")
+        self._commit(tmp_repo, "alpha nb", "2024-03-01T00:00:00+00:00")
+        return tmp_repo
+
+    def test_first_and_last_dates(self, git_repo):
+        parser = RepositoryParser(repo_path=git_repo)
+        created, updated = parser._get_git_dates(git_repo / "projects" / "alpha")
+        assert created == datetime.fromisoformat("2024-01-01T00:00:00+00:00")
+        assert updated == datetime.fromisoformat("2024-03-01T00:00:00+00:00")
+
+    def test_matches_per_directory_git_log(self, git_repo):
+        parser = RepositoryParser(repo_path=git_repo)
+        for name in ("alpha", "beta"):
+            log = subprocess.run(
+                ["git", "log", "--format=%aI", "--", f"projects/{name}"],
+                cwd=git_repo,
+                capture_output=True,
+                text=True,
+            ).stdout.split()
+            expected = (
+                datetime.fromisoformat(log[-1]),
+                datetime.fromisoformat(log[0]),
+            )
+            assert parser._get_git_dates(git_repo / "projects" / name) == expected
+
+    def test_runs_git_log_once(self, git_repo):
+        parser = RepositoryParser(repo_path=git_repo)
+        with patch("app.dataloader.subprocess.run", wraps=subprocess.run) as spy:
+            parser._get_git_dates(git_repo / "projects" / "alpha")
+            parser._get_git_dates(git_repo / "projects" / "beta")
+        assert spy.call_count == 1
+
+    def test_untracked_dir_returns_none(self, git_repo):
+        parser = RepositoryParser(repo_path=git_repo)
+        assert parser._get_git_dates(git_repo / "projects" / "gamma") == (None, None)
+
+    def test_not_a_git_repo(self, tmp_repo):
+        parser = RepositoryParser(repo_path=tmp_repo)
+        assert parser._get_git_dates(tmp_repo / "projects" / "alpha") == (None, None)
+
+
+# ---------------------------------------------------------------------------
+# RepositoryParser.parse_projects (incremental parse cache)
+# ---------------------------------------------------------------------------
+
+
+class TestIncrementalParse:
+    def _parser(self, tmp_repo):
+        return RepositoryParser(
+            repo_path=tmp_repo, parse_cache_path=tmp_repo / "cache" / "parse.pkl.gz"
+        )
+
+    def _add_project(self, tmp_repo, name, findings="Found it."):
+        project_dir = tmp_repo / "projects" / name
+        project_dir.mkdir()
+        (project_dir / "README.md").write_text(
+            f"# {name}\n\n## Research Question\nQ?\n\n## Key Findings\n{findings}\n"
+        )
+        return project_dir
+
+    def test_writes_cache_file(self, tmp_repo):
+        self._add_project(tmp_repo, "proj_a")
+        parser = self._parser(tmp_repo)
+        parser.parse_projects()
+        assert parser.parse_cache_path.exists()
+
+    def test_unchanged_projects_are_not_reparsed(self, tmp_repo):
+        self._add_project(tmp_repo, "proj_a")
+        self._add_project(tmp_repo, "proj_b")
+        first = self._parser(tmp_repo).parse_projects()
+
+        parser = self._parser(tmp_repo)
+        with patch.object(
+            parser, "_parse_project_dir", wraps=parser._parse_project_dir
+        ) as spy:
+            second = parser.parse_projects()
+        spy.assert_not_called()
+        assert sorted(p.id for p in second) == sorted(p.id for p in first)
+        assert {p.id: p.findings for p in second} == {p.id: p.findings for p in first}
+
+    def test_changed_project_is_reparsed(self, tmp_repo):
+        self._add_project(tmp_repo, "proj_a")
+        proj_b = self._add_project(tmp_repo, "proj_b")
+        self._parser(tmp_repo).parse_projects()
+
+        (proj_b / "README.md").write_text(
+            "# proj_b\n\n## Research Question\nQ?\n\n## Key Findings\nNew result.\n"
+        )
+        parser = self._parser(tmp_repo)
+        with patch.object(
+            parser, "_parse_project_dir", wraps=parser._parse_project_dir
+        ) as spy:
+            projects = parser.parse_projects()
+        assert [c.args[0].name for c in spy.call_args_list] == ["proj_b"]
+        assert next(p for p in projects if p.id == "proj_b").findings == "New result."
+
+    def test_removed_project_dropped(self, tmp_repo):
+        self._add_project(tmp_repo, "proj_a")
+        proj_b = self._add_project(tmp_repo, "proj_b")
+        self._parser(tmp_repo).parse_projects()
+
+        (proj_b / "README.md").unlink()
+        proj_b.rmdir()
+        projects = self._parser(tmp_repo).parse_projects()
+        assert [p.id for p in projects] == ["proj_a"]
+
+    def test_used_by_recomputed_for_cached_projects(self, tmp_repo):
+        self._add_project(tmp_repo, "source_proj")
+        consumer = self._add_project(tmp_repo, "consumer_proj")
+        (consumer / "notebooks").mkdir()
+        nb = {
+            "cells": [
+                {
+                    "cell_type": "code",
+                    "source": ["pd.read_csv('../../source_proj/data/x.csv')"],
+                }
+            ]
+        }
+        (consumer / "notebooks" / "a.ipynb").write_text(json.dumps(nb))
+        self._parser(tmp_repo).parse_projects()
+
+        projects = self._parser(tmp_repo).parse_projects()
+        src = next(p for p in projects if p.id == "source_proj")
+        assert src.used_by == ["consumer_proj"]
+
+    def test_stale_version_ignored(self, tmp_repo):
+        self._add_project(tmp_repo, "proj_a")
+        parser = self._parser(tmp_repo)
+        parser.parse_cache_path.parent.mkdir()
+        with gzip.open(parser.parse_cache_path, "wb") as f:
+            pickle.dump({"version": -1, "projects": {}}, f)
+        assert parser._load_parse_cache() == {}
+
+    def test_corrupt_cache_ignored(self, tmp_repo):
+        self._add_project(tmp_repo, "proj_a")
+        parser = self._parser(tmp_repo)
+        parser.parse_cache_path.parent.mkdir()
+        parser.parse_cache_path.write_bytes(b"not a cache")
+        projects = parser.parse_projects()
+        assert [p.id for p in projects] == ["proj_a"]
+
+
+# ---------------------------------------------------------------------------
+# RepositoryParser.parse_projects (parallel workers)
+# ---------------------------------------------------------------------------
+
+
+class TestParallelParse:
+    @pytest.fixture
+    def many_projects(self, tmp_repo):
+        for i in range(6):
+            project_dir = tmp_repo / "projects" / f"proj_{i}"
+            project_dir.mkdir()
+            (project_dir / "README.md").write_text(
+                f"# Project {i}\n\n## Research Question\nQ{i}?\n\n"
+                f"## Key Findings\nFinding {i}.\n"
+            )
+        return tmp_repo
+
+    def _summary(self, projects):
+        return [(p.id, p.title, p.findings, p.status) for p in projects]
+
+    def test_threads_match_serial(self, many_projects):
+        serial = RepositoryParser(repo_path=many_projects).parse_projects()
+        threaded = RepositoryParser(repo_path=many_projects, workers=4).parse_projects()
+        assert self._summary(threaded) == self._summary(serial)
+
+    def test_processes_match_serial(self, many_projects):
+        serial = RepositoryParser(repo_path=many_projects).parse_projects()
+        forked = RepositoryParser(
+            repo_path=many_projects, workers=2, use_processes=True
+        ).parse_projects()
+        assert self._summary(forked) == self._summary(serial)
+
+    def test_processes_get_only_their_git_dates(self, many_projects):
+        created, updated = datetime(2024, 1, 1), datetime(2024, 6, 1)
+        index = {
+            "projects/proj_0": (created, updated),
+            # Unpicklable: fails the parse if the index is sent to workers
+            "projects/other": (lambda: None, None),
+        }
+        parser = RepositoryParser(
+            repo_path=many_projects, workers=2, use_processes=True
+        )
+        with patch.object(parser, "_build_git_date_index", return_value=index):
+            projects = parser.parse_projects()
+        proj_0 = next(p for p in projects if p.id == "proj_0")
+        assert (proj_0.created_date, proj_0.updated_date) == (created, updated)
+
+    def test_parallel_with_parse_cache(self, many_projects):
+        cache_path = many_projects / "parse.pkl.gz"
+        first = RepositoryParser(
+            repo_path=many_projects, parse_cache_path=cache_path, workers=3
+        ).parse_projects()
+        second = RepositoryParser(
+            repo_path=many_projects, parse_cache_path=cache_path, workers=3
+        ).parse_projects()
+        assert self._summary(second) == self._summary(first)
+
+
 # ---------------------------------------------------------------------------
 # RepositoryParser.parse_discoveries
 # ---------------------------------------------------------------------------
@@ -655,6 +962,7 @@ class TestParseRowCounts:
 class TestClusterResearchAreas:
     def _make_project(self, pid, title, research_question=""):
         from app.models import Project
+
         return Project(id=pid, title=title, research_question=research_question)
 
     def test_empty_returns_empty(self):
@@ -683,6 +991,7 @@ class TestClusterResearchAreas:
 
     def test_data_dep_boosts_similarity(self):
         from app.models import DerivedDataRef
+
         p1 = self._make_project("p1", "Essential genome analysis")
         p2 = self._make_project("p2", "Dispensable genome study")
         p2.derived_from = [DerivedDataRef(source_project="p1")]
@@ -691,6 +1000,35 @@ class TestClusterResearchAreas:
         assert "p1" in all_ids
         assert "p2" in all_ids
 
+    def test_data_dep_boosts_use_average_linkage(self):
+        from app.models import DerivedDataRef
+
+        p1 = self._make_project("p1", "Soil nitrogen cycling")
+        p2 = self._make_project("p2", "Marine phage diversity")
+        p3 = self._make_project("p3", "Plasmid transfer rates")
+        p2.derived_from = [DerivedDataRef(source_project="p1")]
+        p3.derived_from = [DerivedDataRef(source_project="p1")]
+        result = RepositoryParser._cluster_research_areas([p1, p2, p3])
+        # p1-p2 and p1-p3 derive (0.3); p2-p3 only share a source (0.15), so
+        # p3 averages (0.3 + 0.15) / 2 < 0.25 against the merged p1/p2 cluster
+        assert result[0].project_ids == ["p1", "p2"]
+        assert result[1].id == "independent-studies"
+        assert result[1].project_ids == ["p3"]
+
+    def test_average_linkage_threshold(self):
+        # p1/p2 are identical; p3 shares one of two terms with each, giving
+        # an average similarity of 0.5 to the merged cluster
+        p1 = self._make_project("p1", "operon regulon")
+        p2 = self._make_project("p2", "operon regulon")
+        p3 = self._make_project("p3", "operon motility")
+        p4 = self._make_project("p4", "secretion toxins")
+        result = RepositoryParser._cluster_research_areas([p1, p2, p3, p4])
+        assert result[0].project_ids == ["p1", "p2", "p3"]
+        assert result[0].name == "Operon & Regulon"
+        assert result[0].top_terms == ["operon", "regulon", "motility"]
+        assert result[-1].id == "independent-studies"
+        assert result[-1].project_ids == ["p4"]
+
 
 # ---------------------------------------------------------------------------
 # RepositoryParser._extract_plotly_height
@@ -698,7 +1036,7 @@ class TestClusterResearchAreas:
 
 
 class TestExtractPlotlyHeight:
-    BUFFER_HEIGHT=20
+    BUFFER_HEIGHT = 20
 
     def setup_method(self):
         self.parser = RepositoryParser.__new__(RepositoryParser)
@@ -743,7 +1081,7 @@ class TestExtractPlotlyHeight:
 
 
 class TestParseDataDir:
-    BUFFER_HEIGHT=20
+    BUFFER_HEIGHT = 20
 
     def setup_method(self):
         self.parser = RepositoryParser.__new__(RepositoryParser)
@@ -3,14 +3,20 @@
 # ---------------------------------------------------------------------------
 
 
+import markdown
+import pytest
 from markupsafe import Markup
 
 from app.filters import (
+    MARKDOWN_EXTENSIONS,
     markdown_filter,
     markdown_inline_filter,
+    prerender_project_markdown,
+    render_markdown,
     slugify_filter,
     strip_images_filter,
 )
+from app.models import RepositoryData
 
 
 class TestMarkdownFilter:
@@ -43,6 +49,51 @@ class TestMarkdownFilter:
         assert "<table>" in result
 
 
+# ---------------------------------------------------------------------------
+# render_markdown cache
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def empty_render_cache():
+    render_markdown.cache_clear()
+    yield
+    render_markdown.cache_clear()
+
+
+class TestRenderMarkdown:
+    def test_matches_markdown_module(self):
+        text = "# Title\n\n```\ncode\n```\n\n| a |\n|---|\n| 1 |\nline\nbreak"
+        expected = markdown.markdown(text, extensions=list(MARKDOWN_EXTENSIONS))
+        assert render_markdown(text) == expected
+        # A reused instance must not leak state between conversions
+        assert render_markdown(text + "\n") == expected
+
+    def test_repeated_text_hits_cache(self, empty_render_cache):
+        markdown_filter("**cached**")
+        markdown_filter("**cached**")
+        info = render_markdown.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_extension_sets_cached_separately(self, empty_render_cache):
+        assert markdown_filter("a\nb") != markdown_inline_filter("a\nb")
+
+
+class TestPrerenderProjectMarkdown:
+    def test_fills_cache_for_project_fields(self, empty_render_cache, project, review):
+        project.review = review
+        project.other_sections = [("Extra", "Extra *section*")]
+        count = prerender_project_markdown(RepositoryData(projects=[project]))
+        assert count == render_markdown.cache_info().currsize > 0
+
+        markdown_filter(project.research_question)
+        markdown_filter(project.review.summary)
+        markdown_filter("Extra *section*")
+        markdown_inline_filter(project.title)
+        assert render_markdown.cache_info().misses == count
+
+
 # ---------------------------------------------------------------------------
 # Filter: markdown_inline_filter
 # ---------------------------------------------------------------------------
@@ -10,7 +10,8 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app.config import Settings
-from app.main import create_app, generate_base_context
+from app.context import DataSnapshot, generate_base_context
+from app.main import create_app
 
 # ---------------------------------------------------------------------------
 # HTTP Routes via TestClient
@@ -24,8 +25,7 @@ def client(repository_data, app_data_context):
     with patch.dict(os.environ, {"BERIL_TEST_SKIP_LIFESPAN": "True"}):
         app = create_app()
         with TestClient(app, raise_server_exceptions=True) as c:
-            app.state.repo_data = repository_data
-            app.state.base_context = app_data_context
+            app.state.snapshot = DataSnapshot(repository_data, app_data_context)
             yield c
 
 
@@ -178,6 +178,67 @@ class TestNotebookViewerRoute:
         response = client.get("/projects/test_project/notebooks/nonexistent.ipynb")
         assert response.status_code == 404
 
+    def test_renders_notebook_through_cache(self, client, repository_data, tmp_path):
+        from app.models import Notebook
+
+        nb_path = tmp_path / "projects" / "test_project" / "notebooks" / "a.ipynb"
+        nb_path.parent.mkdir(parents=True)
+        nb_path.write_text("{}")
+        project = repository_data.projects[0]
+        project.notebooks = [
+            Notebook(filename="a.ipynb", path="projects/test_project/notebooks/a.ipynb")
+        ]
+        repository_data.build_indexes()
+
+        mock_settings = Settings()
+        mock_settings.repo_dir = tmp_path
+        with (
+            patch("app.main.get_settings", return_value=mock_settings),
+            patch(
+                "app.notebook_cache.render_notebook_html",
+                return_value="<div>rendered-nb</div>",
+            ) as render,
+        ):
+            first = client.get("/projects/test_project/notebooks/a.ipynb")
+            second = client.get("/projects/test_project/notebooks/a.ipynb")
+        assert first.status_code == 200
+        assert "rendered-nb" in first.text
+        assert second.status_code == 200
+        assert render.call_count == 1
+
+
+class TestScheduleNotebookPrerender:
+    async def test_disabled_by_default(self):
+        from types import SimpleNamespace
+
+        from app.main import schedule_notebook_prerender
+
+        app = SimpleNamespace(state=SimpleNamespace())
+        with patch("app.main.get_settings", return_value=Settings()):
+            schedule_notebook_prerender(app)
+        assert not hasattr(app.state, "prerender_task")
+
+    async def test_starts_background_task(self, repository_data):
+        from types import SimpleNamespace
+
+        from app.main import schedule_notebook_prerender
+
+        cache = MagicMock()
+        cache.prerender_all = AsyncMock(return_value=0)
+        app = SimpleNamespace(
+            state=SimpleNamespace(
+                notebook_cache=cache, snapshot=DataSnapshot(repository_data, {})
+            )
+        )
+        mock_settings = Settings()
+        mock_settings.prerender_notebooks = True
+        with patch("app.main.get_settings", return_value=mock_settings):
+            schedule_notebook_prerender(app)
+        await app.state.prerender_task
+        cache.prerender_all.assert_awaited_once_with(
+            repository_data, mock_settings.repo_dir
+        )
+
 
 # ---------------------------------------------------------------------------
 # Webhook endpoint
@@ -226,7 +287,7 @@ class TestWebhookEndpoint:
             )
         assert response.status_code == 401
 
-    def test_valid_signature_triggers_reload(self, client, repository_data):
+    def _post_signed(self, client, started):
         secret = "mysecret"
         body = b"{}"
         expected_sig = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
@@ -239,57 +300,56 @@ class TestWebhookEndpoint:
 
         with (
             patch("app.main.get_settings", return_value=mock_settings),
-            patch("app.main.pull_latest", new_callable=AsyncMock),
-            patch("app.main.load_repository_data", return_value=repository_data),
+            patch("app.main.schedule_data_reload", return_value=started) as schedule,
         ):
             response = client.post(
                 "/api/webhook/data-update",
                 content=body,
                 headers={"x-webhook-signature": expected_sig},
             )
-        assert response.status_code == 200
-        assert response.json()["status"] == "success"
+        return response, schedule
 
-    def test_valid_webhook_updates_repo_data(self, client, repository_data):
-        """After a successful webhook, app.state.repo_data is replaced."""
-        secret = "mysecret"
-        body = b"{}"
-        expected_sig = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    def test_valid_signature_schedules_reload(self, client):
+        response, schedule = self._post_signed(client, started=True)
+        assert response.status_code == 202
+        assert response.json()["status"] == "accepted"
+        schedule.assert_called_once_with(client.app)
 
-        mock_settings = Settings()
-        mock_settings.webhook_secret = secret
-        mock_settings.data_repo_url = "http://example.com/repo"
-        mock_settings.data_repo_path = MagicMock()
-        mock_settings.data_repo_branch = "data-cache"
+    def test_reload_in_progress_is_coalesced(self, client):
+        response, _ = self._post_signed(client, started=False)
+        assert response.status_code == 202
+        assert "in progress" in response.json()["message"]
 
-        new_repo_data = MagicMock()
-        new_repo_data.last_updated = datetime(2025, 1, 1)
 
-        with (
-            patch("app.main.get_settings", return_value=mock_settings),
-            patch("app.main.pull_latest", new_callable=AsyncMock),
-            patch("app.main.load_repository_data", return_value=new_repo_data),
-        ):
-            response = client.post(
-                "/api/webhook/data-update",
-                content=body,
-                headers={"x-webhook-signature": expected_sig},
-            )
+# ---------------------------------------------------------------------------
+# Background data reload
+# ---------------------------------------------------------------------------
 
-        assert response.status_code == 200
-        assert client.app.state.repo_data is new_repo_data
 
-    def test_valid_webhook_updates_base_context(self, client, repository_data):
-        """After a successful webhook, app.state.base_context reflects the new data."""
-        secret = "mysecret"
-        body = b"{}"
-        expected_sig = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+@pytest.fixture
+def reload_app(repository_data, app_data_context):
+    from types import SimpleNamespace
 
-        mock_settings = Settings()
-        mock_settings.webhook_secret = secret
-        mock_settings.data_repo_url = "http://example.com/repo"
-        mock_settings.data_repo_path = MagicMock()
-        mock_settings.data_repo_branch = "data-cache"
+    return SimpleNamespace(
+        state=SimpleNamespace(
+            snapshot=DataSnapshot(repository_data, app_data_context),
+            notebook_cache=MagicMock(),
+        )
+    )
+
+
+@pytest.fixture
+def reload_settings():
+    mock_settings = Settings()
+    mock_settings.data_repo_url = "http://example.com/repo"
+    mock_settings.data_repo_path = MagicMock()
+    mock_settings.data_repo_branch = "data-cache"
+    return mock_settings
+
+
+class TestReloadData:
+    async def test_swaps_in_new_snapshot(self, reload_app, reload_settings):
+        from app.main import schedule_data_reload
 
         new_repo_data = MagicMock()
         new_repo_data.last_updated = datetime(2025, 1, 1)
@@ -301,25 +361,76 @@ class TestWebhookEndpoint:
         new_repo_data.skills = [MagicMock(), MagicMock()]
 
         with (
-            patch("app.main.get_settings", return_value=mock_settings),
+            patch("app.main.get_settings", return_value=reload_settings),
             patch("app.main.pull_latest", new_callable=AsyncMock),
             patch("app.main.load_repository_data", return_value=new_repo_data),
         ):
-            response = client.post(
-                "/api/webhook/data-update",
-                content=body,
-                headers={"x-webhook-signature": expected_sig},
-            )
+            assert schedule_data_reload(reload_app) is True
+            await reload_app.state.reload_task
+
+        snapshot = reload_app.state.snapshot
+        assert snapshot.repo_data is new_repo_data
+        assert snapshot.base_context["project_count"] == 3
+        assert snapshot.base_context["discovery_count"] == 1
+        assert snapshot.base_context["idea_count"] == 0
+        assert snapshot.base_context["collection_count"] == 2
+        assert snapshot.base_context["contributor_count"] == 1
+        assert snapshot.base_context["skill_count"] == 2
+        assert snapshot.base_context["last_updated"] == datetime(2025, 1, 1)
+
+    async def test_failure_keeps_current_snapshot(self, reload_app, reload_settings):
+        from app.main import schedule_data_reload
+
+        before = reload_app.state.snapshot
+        with (
+            patch("app.main.get_settings", return_value=reload_settings),
+            patch(
+                "app.main.pull_latest",
+                new_callable=AsyncMock,
+                side_effect=RuntimeError("git failed"),
+            ),
+        ):
+            schedule_data_reload(reload_app)
+            await reload_app.state.reload_task
+        assert reload_app.state.snapshot is before
 
-        assert response.status_code == 200
-        ctx = client.app.state.base_context
-        assert ctx["project_count"] == 3
-        assert ctx["discovery_count"] == 1
-        assert ctx["idea_count"] == 0
-        assert ctx["collection_count"] == 2
-        assert ctx["contributor_count"] == 1
-        assert ctx["skill_count"] == 2
-        assert ctx["last_updated"] == datetime(2025, 1, 1)
+    async def test_burst_before_start_runs_once(
+        self, reload_app, reload_settings, repository_data
+    ):
+        from app.main import schedule_data_reload
+
+        with (
+            patch("app.main.get_settings", return_value=reload_settings),
+            patch("app.main.pull_latest", new_callable=AsyncMock) as pull,
+            patch("app.main.load_repository_data", return_value=repository_data),
+        ):
+            assert schedule_data_reload(reload_app) is True
+            assert schedule_data_reload(reload_app) is False
+            assert schedule_data_reload(reload_app) is False
+            await reload_app.state.reload_task
+        assert pull.await_count == 1
+
+    async def test_request_during_reload_runs_again(
+        self, reload_app, reload_settings, repository_data
+    ):
+        from app.main import schedule_data_reload
+
+        async def pull_and_request_again(*args):
+            if pull.await_count == 1:
+                assert schedule_data_reload(reload_app) is False
+
+        with (
+            patch("app.main.get_settings", return_value=reload_settings),
+            patch(
+                "app.main.pull_latest",
+                new_callable=AsyncMock,
+                side_effect=pull_and_request_again,
+            ) as pull,
+            patch("app.main.load_repository_data", return_value=repository_data),
+        ):
+            schedule_data_reload(reload_app)
+            await reload_app.state.reload_task
+        assert pull.await_count == 2
 
 
 # ---------------------------------------------------------------------------
@@ -1,5 +1,6 @@
 """Unit tests for app.models."""
 
+import pickle
 from datetime import datetime, date
 
 import pytest
@@ -7,6 +8,7 @@ import pytest
 from app.models import (
     Collection,
     CollectionCategory,
+    CollectionEdge,
     CollectionTable,
     Column,
     Contributor,
@@ -292,6 +294,65 @@ class TestRepositoryData:
         rd = RepositoryData(contributors=[contributor])
         assert rd.get_contributor("nobody") is None
 
+    def test_get_contributor_by_name_ignores_middle_initial(self):
+        c = Contributor(name="Paramvir S. Dehal")
+        rd = RepositoryData(contributors=[c])
+        assert rd.get_contributor_by_name("Paramvir Dehal") is c
+        assert rd.get_contributor_by_name("Someone Else") is None
+
+    def test_get_project(self, project):
+        rd = RepositoryData(projects=[project])
+        assert rd.get_project("test_project") is project
+        assert rd.get_project("missing") is None
+
+    def test_get_projects_for_collection(self, project, completed_project):
+        rd = RepositoryData(projects=[project, completed_project])
+        assert rd.get_projects_for_collection("kbase_ke_pangenome") == [project]
+        assert rd.get_projects_for_collection("unused") == []
+
+    def test_get_projects_for_collection_lists_project_once(self, project):
+        project.related_collections = ["kbase_ke_pangenome", "kbase_ke_pangenome"]
+        rd = RepositoryData(projects=[project])
+        assert rd.get_projects_for_collection("kbase_ke_pangenome") == [project]
+
+    def test_get_notebook(self, project):
+        nb = Notebook(filename="01_explore.ipynb", path="projects/x/01_explore.ipynb")
+        project.notebooks = [nb]
+        rd = RepositoryData(projects=[project])
+        assert rd.get_notebook("test_project", "01_explore.ipynb") is nb
+        assert rd.get_notebook("test_project", "missing.ipynb") is None
+        assert rd.get_notebook("other_project", "01_explore.ipynb") is None
+
+    def test_get_discoveries_for_project(self):
+        d1 = Discovery(id="d1", title="D1", content="", project_tag="p1")
+        d2 = Discovery(id="d2", title="D2", content="", project_tag="p2")
+        d3 = Discovery(id="d3", title="D3", content="", project_tag="p1")
+        rd = RepositoryData(discoveries=[d1, d2, d3])
+        assert rd.get_discoveries_for_project("p1") == [d1, d3]
+        assert rd.get_discoveries_for_project("p3") == []
+
+    def test_get_edges_for_collection(self):
+        e1 = CollectionEdge(source_id="a", target_id="b", edge_type="explicit")
+        e2 = CollectionEdge(source_id="b", target_id="c", edge_type="explicit")
+        rd = RepositoryData(collection_edges=[e1, e2])
+        assert rd.get_edges_for_collection("a") == [e1]
+        assert rd.get_edges_for_collection("b") == [e1, e2]
+        assert rd.get_edges_for_collection("d") == []
+
+    def test_build_indexes_after_mutation(self, project):
+        rd = RepositoryData()
+        rd.projects.append(project)
+        assert rd.get_project("test_project") is None
+        rd.build_indexes()
+        assert rd.get_project("test_project") is project
+
+    def test_indexes_rebuilt_after_unpickle(self, project, collection):
+        rd = RepositoryData(projects=[project], collections=[collection])
+        restored = pickle.loads(pickle.dumps(rd))
+        assert "_projects_by_id" not in rd.__getstate__()
+        assert restored.get_project("test_project").title == project.title
+        assert restored.get_collection("kbase_ke_pangenome").name == collection.name
+
     def test_defaults_are_empty(self):
         rd = RepositoryData()
         assert rd.projects == []
@@ -0,0 +1,157 @@
+"""Unit tests for app.notebook_cache."""
+
+import os
+from unittest.mock import patch
+
+import nbformat
+import pytest
+
+from app.models import Notebook, Project, RepositoryData
+from app.notebook_cache import NotebookHTMLCache, render_notebook_html
+
+CDN = "https://cdn.example.org/plotly.js"
+
+
+def _notebook_bytes(text="print('hello')", plotly=False):
+    outputs = []
+    if plotly:
+        outputs.append(
+            nbformat.v4.new_output(
+                "display_data",
+                data={"application/vnd.plotly.v1+json": {"data": [], "layout": {}}},
+            )
+        )
+    nb = nbformat.v4.new_notebook(
+        cells=[nbformat.v4.new_code_cell(text, outputs=outputs)]
+    )
+    return nbformat.writes(nb).encode("utf-8")
+
+
+@pytest.fixture
+def notebook_file(tmp_path):
+    path = tmp_path / "analysis.ipynb"
+    path.write_bytes(_notebook_bytes())
+    return path
+
+
+class TestRenderNotebookHtml:
+    def test_renders_code_cell(self):
+        html = render_notebook_html(_notebook_bytes("x = 42"), CDN)
+        assert "42" in html
+
+    def test_no_plotly_script_without_figures(self):
+        html = render_notebook_html(_notebook_bytes(), CDN)
+        assert CDN not in html
+
+    def test_prepends_plotly_script(self):
+        html = render_notebook_html(_notebook_bytes(plotly=True), CDN)
+        assert html.startswith(f'<script src="{CDN}"')
+
+
+class TestNotebookHTMLCache:
+    def test_second_request_is_cached(self, notebook_file):
+        cache = NotebookHTMLCache(CDN)
+        with patch(
+            "app.notebook_cache.render_notebook_html", return_value="<p>nb</p>"
+        ) as render:
+            assert cache.get_or_render(notebook_file) == "<p>nb</p>"
+            assert cache.get_or_render(notebook_file) == "<p>nb</p>"
+        assert render.call_count == 1
+
+    def test_changed_notebook_is_rerendered(self, notebook_file):
+        cache = NotebookHTMLCache(CDN)
+        with patch(
+            "app.notebook_cache.render_notebook_html",
+            side_effect=["<p>1</p>", "<p>2</p>"],
+        ):
+            assert cache.get_or_render(notebook_file) == "<p>1</p>"
+            notebook_file.write_bytes(_notebook_bytes("y = 1"))
+            assert cache.get_or_render(notebook_file) == "<p>2</p>"
+
+    def test_lru_evicts_by_size(self, tmp_path):
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"nb{i}.ipynb"
+            path.write_bytes(_notebook_bytes(f"x = {i}"))
+            paths.append(path)
+        cache = NotebookHTMLCache(CDN, max_bytes=25)
+        with patch("app.notebook_cache.render_notebook_html", return_value="x" * 10):
+            for path in paths:
+                cache.get_or_render(path)
+        assert len(cache) == 2
+        assert cache._size == 20
+
+    def test_oversized_render_not_kept(self, notebook_file):
+        cache = NotebookHTMLCache(CDN, max_bytes=5)
+        with patch("app.notebook_cache.render_notebook_html", return_value="x" * 10):
+            cache.get_or_render(notebook_file)
+        assert len(cache) == 0
+
+    def test_disk_store_shared_between_instances(self, notebook_file, tmp_path):
+        disk_dir = tmp_path / "rendered"
+        with patch(
+            "app.notebook_cache.render_notebook_html", return_value="<p>nb</p>"
+        ) as render:
+            NotebookHTMLCache(CDN, disk_dir=disk_dir).get_or_render(notebook_file)
+            html = NotebookHTMLCache(CDN, disk_dir=disk_dir).get_or_render(
+                notebook_file
+            )
+        assert html == "<p>nb</p>"
+        assert render.call_count == 1
+        assert len(list(disk_dir.glob("*.html"))) == 1
+
+    def test_disk_store_evicts_least_recently_used(self, tmp_path):
+        disk_dir = tmp_path / "rendered"
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"nb{i}.ipynb"
+            path.write_bytes(_notebook_bytes(f"x = {i}"))
+            paths.append(path)
+        cache = NotebookHTMLCache(CDN, disk_dir=disk_dir, disk_max_bytes=25)
+        with patch("app.notebook_cache.render_notebook_html", return_value="x" * 10):
+            cache.get_or_render(paths[0])
+            cache.get_or_render(paths[1])
+            first, second = (
+                disk_dir / f"{cache._key(p.read_bytes())}.html" for p in paths[:2]
+            )
+            os.utime(first, (1, 1))
+            os.utime(second, (2, 2))
+            # A disk hit marks nb0 as recently used, so nb1 is evicted instead
+            NotebookHTMLCache(CDN, disk_dir=disk_dir).get_or_render(paths[0])
+            cache.get_or_render(paths[2])
+        assert first.exists()
+        assert not second.exists()
+        assert len(list(disk_dir.glob("*.html"))) == 2
+
+    def test_cdn_url_is_part_of_key(self, notebook_file):
+        assert NotebookHTMLCache(CDN)._key(b"{}") != NotebookHTMLCache("other")._key(
+            b"{}"
+        )
+
+    async def test_render_runs_in_threadpool(self, notebook_file):
+        cache = NotebookHTMLCache(CDN)
+        with patch("app.notebook_cache.render_notebook_html", return_value="<p>nb</p>"):
+            assert await cache.render(notebook_file) == "<p>nb</p>"
+
+    async def test_prerender_all(self, tmp_path):
+        nb_dir = tmp_path / "projects" / "p1" / "notebooks"
+        nb_dir.mkdir(parents=True)
+        (nb_dir / "a.ipynb").write_bytes(_notebook_bytes())
+        project = Project(
+            id="p1",
+            title="P1",
+            research_question="",
+            notebooks=[
+                Notebook(filename="a.ipynb", path="projects/p1/notebooks/a.ipynb"),
+                Notebook(
+                    filename="gone.ipynb", path="projects/p1/notebooks/gone.ipynb"
+                ),
+            ],
+        )
+        cache = NotebookHTMLCache(CDN)
+        with patch("app.notebook_cache.render_notebook_html", return_value="<p>nb</p>"):
+            rendered = await cache.prerender_all(
+                RepositoryData(projects=[project]), tmp_path
+            )
+        assert rendered == 1
+        assert len(cache) == 1
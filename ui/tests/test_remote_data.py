@@ -0,0 +1,162 @@
+"""Unit tests for app.remote_data."""
+
+import gzip
+import hashlib
+import json
+import pickle
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.dataloader import check_for_updates, load_external_data
+from app.remote_data import DATA_FILE, TIMESTAMP_FILE, RemoteDataFetcher
+
+BASE_URL = "https://data.example.org/cache"
+ETAG = '"v1"'
+
+
+class FakeServer:
+    """In-memory data cache server honouring conditional and range requests."""
+
+    def __init__(self, payload: bytes, timestamp: dict):
+        self.payload = payload
+        self.timestamp = timestamp
+        self.etag = ETAG
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        name = request.url.path.rsplit("/", 1)[-1]
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304)
+        if name == TIMESTAMP_FILE:
+            return httpx.Response(200, json=self.timestamp, headers={"ETag": self.etag})
+        if name != DATA_FILE or self.payload is None:
+            return httpx.Response(404)
+
+        headers = {"ETag": self.etag}
+        range_header = request.headers.get("range")
+        if range_header and request.headers.get("if-range") == self.etag:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if start >= len(self.payload):
+                return httpx.Response(416)
+            headers["Content-Range"] = (
+                f"bytes {start}-{len(self.payload) - 1}/{len(self.payload)}"
+            )
+            return httpx.Response(206, content=self.payload[start:], headers=headers)
+        return httpx.Response(200, content=self.payload, headers=headers)
+
+    def data_requests(self) -> list[httpx.Request]:
+        return [r for r in self.requests if r.url.path.endswith(DATA_FILE)]
+
+
+@pytest.fixture
+def payload(repository_data):
+    return gzip.compress(pickle.dumps(repository_data))
+
+
+@pytest.fixture
+def server(payload):
+    return FakeServer(
+        payload,
+        {
+            "timestamp": "2024-06-01T00:00:00",
+            "sha256": hashlib.sha256(payload).hexdigest(),
+        },
+    )
+
+
+@pytest.fixture
+def fetcher(tmp_path, server):
+    client = httpx.Client(transport=httpx.MockTransport(server))
+    return RemoteDataFetcher(BASE_URL, tmp_path, client=client, chunk_size=64)
+
+
+class TestDownload:
+    def test_downloads_and_verifies(self, fetcher, payload):
+        path = fetcher.fetch()
+        assert path.read_bytes() == payload
+        assert not (fetcher.download_dir / f"{DATA_FILE}.part").exists()
+
+    def test_unchanged_file_is_not_downloaded_again(self, fetcher, server):
+        fetcher.fetch()
+        fetcher.fetch()
+        second = server.data_requests()[-1]
+        assert second.headers["if-none-match"] == ETAG
+        assert fetcher.data_path.exists()
+
+    def test_changed_file_is_downloaded_again(self, fetcher, server):
+        fetcher.fetch()
+        server.payload = b"new payload"
+        server.etag = '"v2"'
+        server.timestamp = {"sha256": hashlib.sha256(b"new payload").hexdigest()}
+        assert fetcher.fetch().read_bytes() == b"new payload"
+
+    def test_resumes_interrupted_download(self, fetcher, server, payload):
+        partial = fetcher.download_dir / f"{DATA_FILE}.part"
+        partial.write_bytes(payload[:100])
+        state = {"partial": {"etag": ETAG, "last_modified": None}}
+        (fetcher.download_dir / "fetch_state.json").write_text(json.dumps(state))
+
+        path = fetcher.fetch()
+
+        request = server.data_requests()[-1]
+        assert request.headers["range"] == "bytes=100-"
+        assert path.read_bytes() == payload
+
+    def test_restarts_when_partial_cannot_be_resumed(self, fetcher, server, payload):
+        partial = fetcher.download_dir / f"{DATA_FILE}.part"
+        partial.write_bytes(payload + b"junk")
+        state = {"partial": {"etag": ETAG, "last_modified": None}}
+        (fetcher.download_dir / "fetch_state.json").write_text(json.dumps(state))
+
+        assert fetcher.fetch().read_bytes() == payload
+        assert "range" not in server.data_requests()[-1].headers
+
+    def test_checksum_mismatch_discards_download(self, fetcher, server):
+        server.timestamp["sha256"] = "0" * 64
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            fetcher.fetch()
+        assert not fetcher.data_path.exists()
+        assert not (fetcher.download_dir / f"{DATA_FILE}.part").exists()
+
+    def test_missing_checksum_skips_verification(self, fetcher, server, payload):
+        del server.timestamp["sha256"]
+        assert fetcher.fetch().read_bytes() == payload
+
+    def test_http_error(self, fetcher, server):
+        server.payload = None
+        with pytest.raises(httpx.HTTPStatusError):
+            fetcher.download()
+
+
+class TestCheckForUpdates:
+    def test_newer_remote(self, fetcher):
+        assert fetcher.check_for_updates(datetime(2024, 1, 1)) is True
+
+    def test_older_remote(self, fetcher):
+        assert fetcher.check_for_updates(datetime(2025, 1, 1)) is False
+
+    def test_revalidates_cached_timestamp(self, fetcher, server):
+        fetcher.check_for_updates(datetime(2024, 1, 1))
+        assert fetcher.check_for_updates(datetime(2024, 1, 1)) is True
+        assert server.requests[-1].headers["if-none-match"] == ETAG
+
+    def test_missing_timestamp(self, fetcher, server):
+        server.timestamp = {}
+        assert fetcher.check_for_updates(datetime(2024, 1, 1)) is False
+
+
+class TestDataloaderIntegration:
+    def test_load_external_data(self, fetcher, repository_data):
+        with patch.dict("app.dataloader._fetchers", {BASE_URL: fetcher}):
+            loaded = load_external_data(BASE_URL)
+        assert loaded.last_updated == repository_data.last_updated
+        assert len(loaded.projects) == len(repository_data.projects)
+
+    def test_check_for_updates_swallows_errors(self, fetcher, server):
+        server.timestamp = None
+        with patch.dict("app.dataloader._fetchers", {BASE_URL: fetcher}):
+            assert check_for_updates(BASE_URL, datetime(2024, 1, 1)) is False